@@ -5,5 +5,6 @@ import sys
 
 import pytest
 
-exit_code = pytest.main()
-sys.exit(exit_code)
+if __name__ == '__main__':  # spawned worker processes import the main module again
+    exit_code = pytest.main()
+    sys.exit(exit_code)
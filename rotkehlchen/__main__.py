@@ -1,6 +1,7 @@
 from gevent import monkey  # isort:skip
 monkey.patch_all()  # isort:skip
 import logging
+import multiprocessing
 import sys
 import traceback
 
@@ -38,4 +39,6 @@ def main() -> None:
 
 
 if __name__ == '__main__':
+    # needed by the cost basis worker processes in the pyinstaller bundle
+    multiprocessing.freeze_support()
     main()
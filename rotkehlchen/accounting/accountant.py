@@ -1,20 +1,33 @@
+import itertools
 import logging
 from pathlib import Path
-from typing import TYPE_CHECKING, Iterator, Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Sequence
 
 import gevent
 
-from rotkehlchen.accounting.constants import FREE_PNL_EVENTS_LIMIT
+from rotkehlchen.accounting.checkpoints import (
+    PnlCheckpoint,
+    history_fingerprint,
+    next_checkpoint_timestamp,
+    settings_fingerprint,
+)
+from rotkehlchen.accounting.constants import FREE_PNL_EVENTS_LIMIT, PNL_EVENTS_PREFETCH_BATCH_SIZE
+from rotkehlchen.accounting.cost_basis.parallel import can_defer_cost_basis
 from rotkehlchen.accounting.export.csv import CSVExporter
 from rotkehlchen.accounting.mixins.event import AccountingEventMixin
 from rotkehlchen.accounting.pot import AccountingPot
-from rotkehlchen.accounting.structures.types import ActionType
-from rotkehlchen.accounting.types import MissingPrice
+from rotkehlchen.accounting.structures.processed_event import ProcessedAccountingEvent
+from rotkehlchen.accounting.types import IgnoredEntries, MissingPrice
+from rotkehlchen.assets.asset import Asset
+from rotkehlchen.db.filtering import ReportDataFilterQuery
 from rotkehlchen.db.reports import DBAccountingReports
 from rotkehlchen.db.settings import DBSettings
 from rotkehlchen.errors.asset import UnknownAsset, UnprocessableTradePair, UnsupportedAsset
-from rotkehlchen.errors.misc import RemoteError
+from rotkehlchen.errors.misc import InputError, RemoteError
 from rotkehlchen.errors.price import NoPriceForGivenTimestamp, PriceQueryUnsupportedAsset
+from rotkehlchen.errors.serialization import DeserializationError
+from rotkehlchen.history.events import HistorySource, MergedHistory
+from rotkehlchen.history.price import PriceHistorian
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.premium.premium import Premium
 from rotkehlchen.types import Timestamp
@@ -23,6 +36,7 @@ from rotkehlchen.user_messages import MessagesAggregator
 if TYPE_CHECKING:
     from rotkehlchen.chain.evm.accounting.aggregator import EVMAccountingAggregators
     from rotkehlchen.db.dbhandler import DBHandler
+    from rotkehlchen.db.drivers.gevent import DBCursor
 
 
 logger = logging.getLogger(__name__)
@@ -37,7 +51,10 @@ class Accountant():
             msg_aggregator: MessagesAggregator,
             evm_accounting_aggregators: 'EVMAccountingAggregators',
             premium: Optional[Premium],
+            cost_basis_processes: int = 0,
     ) -> None:
+        """If cost_basis_processes is not zero the cost basis of reports is computed
+        in up to that many worker processes when the report settings allow it"""
         self.db = db
         self.msg_aggregator = msg_aggregator
         self.csvexporter = CSVExporter(database=db)
@@ -51,8 +68,10 @@ class Accountant():
         ]
 
         self.currently_processing_timestamp = Timestamp(-1)
+        self.currently_processing_event: Optional[AccountingEventMixin] = None
         self.first_processed_timestamp = Timestamp(-1)
         self.premium = premium
+        self.cost_basis_processes = cost_basis_processes
 
     def activate_premium_status(self, premium: Premium) -> None:
         self.premium = premium
@@ -68,14 +87,26 @@ class Accountant():
     def query_end_ts(self) -> Timestamp:
         return self.pots[0].query_end_ts
 
+    def _snapshot_ignored_entries(self, cursor: 'DBCursor') -> IgnoredEntries:
+        version = self.db.ignored_entries_version
+        ignored_ids_mapping = self.db.get_ignored_action_ids(cursor=cursor, action_type=None)
+        return IgnoredEntries(
+            assets=frozenset(self.db.get_ignored_assets(cursor)),
+            action_ids={
+                action_type: frozenset(identifiers)
+                for action_type, identifiers in ignored_ids_mapping.items()
+            },
+            version=version,
+        )
+
     def _process_skipping_exception(
             self,
             exception: Exception,
-            events: list[AccountingEventMixin],
             count: int,
             reason: str,
     ) -> int:
-        event = events[count]
+        event = self.currently_processing_event
+        assert event is not None, 'Should only be called for an exception while processing an event'  # noqa: E501
         ts = event.get_timestamp()
         identifier = event.get_identifier()
         self.msg_aggregator.add_error(
@@ -94,17 +125,20 @@ class Accountant():
             self,
             start_ts: Timestamp,
             end_ts: Timestamp,
-            events: list[AccountingEventMixin],
+            events: Iterable[AccountingEventMixin],
     ) -> int:
         """Processes the entire history of cryptoworld actions in order to determine
         the price and time at which every asset was obtained and also
         the general and taxable profit/loss.
 
         The events history is already expected to be sorted when passed to this function.
+        It is consumed only once, so it can be a stream of events that are read as needed.
 
         start_ts here is the timestamp at which to start taking trades and other
         taxable events into account. Not where processing starts from. Processing
-        always starts from the very first event we find in the history.
+        always starts from the very first event we find in the history, or from the
+        latest saved checkpoint if past cost basis is calculated and the events
+        before the checkpoint have not changed since it was saved.
 
         Returns the id of the generated report
         """
@@ -116,50 +150,183 @@ class Accountant():
             active_premium=active_premium,
         )
         events_limit = -1 if active_premium else FREE_PNL_EVENTS_LIMIT
+        dbpnl = DBAccountingReports(self.db)
         # Ask the DB for the settings once at the start of processing so we got the
         # same settings through the entire task
         with self.db.conn.read_ctx() as cursor:
             db_settings = self.db.get_settings(cursor)
-            # Create a new pnl report in the DB to be used to save each event generated
-            dbpnl = DBAccountingReports(self.db)
-            first_ts = Timestamp(0) if len(events) == 0 else events[0].get_timestamp()
-            report_id = dbpnl.add_report(
-                first_processed_timestamp=first_ts,
-                start_ts=start_ts,
-                end_ts=end_ts,
-                settings=db_settings,
-            )
-            self.pots[0].reset(settings=db_settings, start_ts=start_ts, end_ts=end_ts, report_id=report_id)  # noqa: E501
-            self.end_ts = end_ts
-            self.csvexporter.reset(start_ts=start_ts, end_ts=end_ts)
-
-            # The first ts is the ts of the first action we have in history or 0 for empty history
-            self.currently_processing_timestamp = first_ts
-            self.first_processed_timestamp = first_ts
+            ignored_entries = self._snapshot_ignored_entries(cursor)
+
+        cost_basis_processes = 0
+        if self.cost_basis_processes != 0 and can_defer_cost_basis(db_settings):
+            cost_basis_processes = self.cost_basis_processes
+
+        # Checkpoints keep the cost basis built by past events, so they are only
+        # needed if past events are processed. A deferred cost basis is only known
+        # at the end of the report so no checkpoints can be saved from it.
+        fingerprint = None
+        if db_settings.calculate_past_cost_basis is True and cost_basis_processes == 0:
+            fingerprint = settings_fingerprint(db_settings, ignored_entries)
+        history: Optional[MergedHistory] = None
+        if isinstance(events, MergedHistory):
+            history = events
+        elif isinstance(events, Sequence):
+            history = MergedHistory([HistorySource.from_events(events)])
+        checkpoint = None
+        if fingerprint is not None and history is not None:
+            # the events can be read again if the checkpoint turns out to be outdated
+            checkpoint = dbpnl.get_checkpoint(fingerprint=fingerprint, start_ts=start_ts, end_ts=end_ts)  # noqa: E501
+            if checkpoint is not None and not (active_premium or checkpoint.processed_actions < FREE_PNL_EVENTS_LIMIT):  # noqa: E501
+                checkpoint = None
+            if checkpoint is not None and self._is_checkpoint_outdated(
+                    history=history,
+                    checkpoint=checkpoint,
+                    fingerprint=fingerprint,
+            ):
+                checkpoint = None
+
+        if checkpoint is not None:
+            events_iter = history.iterate(from_ts=checkpoint.timestamp)  # type: ignore[union-attr]  # history exists if checkpoint exists  # noqa: E501
+            first_ts = checkpoint.first_processed_timestamp
+        else:
+            events_iter, first_ts = self._peek_first_timestamp(iter(events))
+
+        # Create a new pnl report in the DB to be used to save each event generated
+        report_id = dbpnl.add_report(
+            first_processed_timestamp=first_ts,
+            start_ts=start_ts,
+            end_ts=end_ts,
+            settings=db_settings,
+        )
+        self.pots[0].reset(
+            settings=db_settings,
+            start_ts=start_ts,
+            end_ts=end_ts,
+            report_id=report_id,
+            cost_basis_processes=cost_basis_processes,
+        )
+        if checkpoint is not None:
+            log.debug(f'Restoring the PnL report checkpoint at {checkpoint.timestamp}')
+            try:
+                self.pots[0].restore_state(checkpoint.state)
+            except DeserializationError as e:
+                log.error(
+                    f'Could not restore the PnL report checkpoint at {checkpoint.timestamp} '
+                    f'due to {str(e)}. Processing the report from the first event instead',
+                )
+                dbpnl.delete_checkpoints(fingerprint=fingerprint, from_ts=Timestamp(0))  # type: ignore  # fingerprint exists if checkpoint exists  # noqa: E501
+                # The events are read again, which is possible since a checkpoint is
+                # only used for events that can be, and the partially restored state
+                # is discarded. Nothing was written in the report yet.
+                checkpoint = None
+                events_iter, first_ts = self._peek_first_timestamp(iter(events))
+                dbpnl.set_first_processed_timestamp(report_id=report_id, timestamp=first_ts)
+                self.pots[0].reset(
+                    settings=db_settings,
+                    start_ts=start_ts,
+                    end_ts=end_ts,
+                    report_id=report_id,
+                    cost_basis_processes=cost_basis_processes,
+                )
+            else:
+                # the report gets the events processed before the checkpoint, same as
+                # if it processed them itself
+                dbpnl.copy_checkpoint_events(checkpoint=checkpoint, report_id=report_id)
+        self.end_ts = end_ts
+        self.csvexporter.reset(start_ts=start_ts, end_ts=end_ts)
+
+        # The first ts is the ts of the first action we have in history or 0 for empty history
+        self.currently_processing_timestamp = first_ts
+        self.first_processed_timestamp = first_ts
+
+        count = 0
+        next_checkpoint_ts = next_checkpoint_timestamp(first_ts)
+        if checkpoint is not None:
+            count = checkpoint.processed_actions
+            next_checkpoint_ts = next_checkpoint_timestamp(checkpoint.timestamp)
+        prev_time = last_event_ts = Timestamp(0)
+        # (event, timestamp) of the next checkpoint to save once the event is reached
+        # by processing
+        pending_checkpoint: Optional[tuple[AccountingEventMixin, Timestamp]] = None
+
+        # non premium users only get the events up to the limit processed
+        prefetch_batch_size = PNL_EVENTS_PREFETCH_BATCH_SIZE if active_premium else FREE_PNL_EVENTS_LIMIT  # noqa: E501
+        events_prefetched = 0
+        prices_not_found: list[NoPriceForGivenTimestamp] = []
+
+        def prefetched_events() -> Iterator[AccountingEventMixin]:
+            """Reads the events in batches and prefetches the prices of each batch
+            before it gets processed, so that only one batch is kept in memory"""
+            nonlocal events_prefetched
+            while len(batch := list(itertools.islice(events_iter, prefetch_batch_size))) != 0:  # noqa: E501
+                events_prefetched += len(batch)
+                prices_not_found.extend(self._prefetch_prices(
+                    events=batch,
+                    start_ts=start_ts,
+                    end_ts=end_ts,
+                    db_settings=db_settings,
+                    ignored_entries=ignored_entries,
+                ))
+                yield from batch
+
+        def checkpointed_events() -> Iterator[AccountingEventMixin]:
+            """Finds where checkpoints are reached by the events read so far"""
+            nonlocal next_checkpoint_ts, pending_checkpoint
+            for event in prefetched_events():
+                if fingerprint is not None and (timestamp := event.get_timestamp()) >= next_checkpoint_ts:  # noqa: E501
+                    # Only checkpoints up to the start of the report are saved, since the
+                    # events before them have no pnl counted. Reports that resume from
+                    # them get a copy of these events, which have to be the same as if
+                    # they processed them.
+                    if history is not None and next_checkpoint_ts <= min(start_ts, end_ts):
+                        pending_checkpoint = (event, next_checkpoint_ts)
+                    next_checkpoint_ts = next_checkpoint_timestamp(timestamp)
+                yield event
+
+        processing_iter = checkpointed_events()
+        while True:
+            if ignored_entries.version != self.db.ignored_entries_version:
+                # the user edited the ignored assets/actions while the report is running
+                # and the state is no longer the one of the settings fingerprint
+                fingerprint = None
+                with self.db.conn.read_ctx() as cursor:
+                    ignored_entries = self._snapshot_ignored_entries(cursor)
+
+            event = next(processing_iter, None)
+            if event is None:
+                break
 
-            count = 0
-            actions_length = len(events)
-            prev_time = last_event_ts = Timestamp(0)
-            ignored_ids_mapping = self.db.get_ignored_action_ids(cursor=cursor, action_type=None)
+            if pending_checkpoint is not None:
+                # The checkpoint can only be saved if the event is not consumed in
+                # the middle of processing another one, so that the state contains
+                # exactly the events before it
+                if pending_checkpoint[0] is event and fingerprint is not None:
+                    self._save_checkpoint(
+                        history=history,  # type: ignore[arg-type]  # checkpoints are only pending for a history  # noqa: E501
+                        timestamp=pending_checkpoint[1],
+                        fingerprint=fingerprint,
+                        report_id=report_id,
+                        first_ts=first_ts,
+                        processed_actions=count,
+                    )
+                pending_checkpoint = None
 
-        events_iter = iter(events)
-        while True:
             try:
                 (
                     processed_events_num,
                     prev_time,
                 ) = self._process_event(
-                    events_iterator=events_iter,
+                    event=event,
+                    events_iterator=processing_iter,
                     start_ts=start_ts,
                     end_ts=end_ts,
                     prev_time=prev_time,
                     db_settings=db_settings,
-                    ignored_ids_mapping=ignored_ids_mapping,
+                    ignored_entries=ignored_entries,
                 )
             except PriceQueryUnsupportedAsset as e:
                 count = self._process_skipping_exception(
                     exception=e,
-                    events=events,
                     count=count,
                     reason='not being able to find price for an unsupported asset',
                 )
@@ -177,7 +344,6 @@ class Accountant():
             except RemoteError as e:
                 count = self._process_skipping_exception(
                     exception=e,
-                    events=events,
                     count=count,
                     reason='inability to reach an external service at that point in time',
                 )
@@ -197,29 +363,171 @@ class Accountant():
                 log.debug(
                     f'PnL reports event processing has hit the event limit of {events_limit}. '
                     f'Processing stopped and the results will not '
-                    f'take into account subsequent events. Total events were {len(events)}',
+                    'take into account subsequent events.',
                 )
                 break
 
+        self.pots[0].compute_deferred_cost_basis()
+        self._warn_missing_prices(prices_not_found)
+        # events after the end of the report or the limit still count towards the total
+        if history is not None:
+            actions_length = history.count()
+        else:
+            actions_length = events_prefetched + sum(1 for _ in events_iter)
         dbpnl.add_report_overview(
             report_id=report_id,
             last_processed_timestamp=last_event_ts,
             processed_actions=count,
             total_actions=actions_length,
             pnls=self.pots[0].pnls,
+            report_data=self.pots[0].report_data,
         )
+        if (price_cache := self.pots[0].price_cache) is not None:
+            log.debug(
+                f'PnL report price cache had {price_cache.hits} hits and '
+                f'{price_cache.misses} misses',
+            )
+            price_cache.clear()
         return report_id
 
+    @staticmethod
+    def _peek_first_timestamp(
+            events_iter: Iterator[AccountingEventMixin],
+    ) -> tuple[Iterator[AccountingEventMixin], Timestamp]:
+        """Returns an iterator over the same events and the timestamp of the first
+        event, or 0 if there are no events"""
+        first_event = next(events_iter, None)
+        if first_event is None:
+            return events_iter, Timestamp(0)
+
+        return itertools.chain((first_event,), events_iter), first_event.get_timestamp()
+
+    def _is_checkpoint_outdated(
+            self,
+            history: MergedHistory,
+            checkpoint: PnlCheckpoint,
+            fingerprint: str,
+    ) -> bool:
+        """Checks that the events and manual prices before the checkpoint are the same
+        as when the checkpoint was saved, without reading the events.
+
+        If they are not the outdated checkpoints are deleted and True is returned.
+        """
+        events_num, checkpoint_history = history_fingerprint(history, checkpoint.timestamp)
+        if events_num == checkpoint.events_num and checkpoint_history == checkpoint.history_fingerprint:  # noqa: E501
+            return False
+
+        log.debug(
+            f'Events before the PnL report checkpoint at {checkpoint.timestamp} have '
+            f'changed. Deleting it and all checkpoints after it.',
+        )
+        DBAccountingReports(self.db).delete_checkpoints(
+            fingerprint=fingerprint,
+            from_ts=checkpoint.timestamp,
+        )
+        return True
+
+    def _save_checkpoint(
+            self,
+            history: MergedHistory,
+            timestamp: Timestamp,
+            fingerprint: str,
+            report_id: int,
+            first_ts: Timestamp,
+            processed_actions: int,
+    ) -> None:
+        """Saves the state of the pot after processing all events before the timestamp.
+        The processed events so far are written first, since reports that resume from
+        the checkpoint copy them."""
+        pot = self.pots[0]
+        assert pot.report_data is not None, 'pot should have been reset before processing'
+        try:
+            pot.report_data.flush()
+        except InputError as e:
+            log.error(
+                f'Not saving the PnL report checkpoint at {timestamp} since the events '
+                f'before it could not be written: {str(e)}',
+            )
+            return
+
+        events_num, checkpoint_history = history_fingerprint(history, timestamp)
+        DBAccountingReports(self.db).add_checkpoint(fingerprint=fingerprint, checkpoint=PnlCheckpoint(  # noqa: E501
+            timestamp=timestamp,
+            report_id=report_id,
+            first_processed_timestamp=first_ts,
+            events_num=events_num,
+            history_fingerprint=checkpoint_history,
+            processed_actions=processed_actions,
+            state=pot.serialize_state(),
+        ))
+
+    def _prefetch_prices(
+            self,
+            events: Iterable[AccountingEventMixin],
+            start_ts: Timestamp,
+            end_ts: Timestamp,
+            db_settings: DBSettings,
+            ignored_entries: IgnoredEntries,
+    ) -> list[NoPriceForGivenTimestamp]:
+        """Queries the prices of the assets of all the given events in bulk before
+        they are processed, instead of one by one as each event needs them.
+
+        Returns the prices that could not be found.
+        """
+        pot = self.pots[0]
+        assert pot.price_cache is not None, 'pot should have been reset before prefetching'
+
+        def price_queries() -> Iterator[tuple[Asset, Asset, Timestamp]]:
+            for event in events:
+                timestamp = event.get_timestamp()
+                if timestamp > end_ts:
+                    break
+                if not db_settings.calculate_past_cost_basis and timestamp < start_ts:
+                    continue
+
+                try:
+                    event_assets = event.get_assets()
+                except (UnknownAsset, UnsupportedAsset, UnprocessableTradePair):
+                    continue  # will be reported when the event is processed
+
+                if any(x in ignored_entries.assets for x in event_assets):
+                    continue
+
+                yield from ((asset, pot.profit_currency, timestamp) for asset in event_assets)
+
+        return PriceHistorian().prefetch_historical_prices(
+            queries=price_queries(),
+            series_cache=pot.price_cache,
+        )
+
+    def _warn_missing_prices(self, not_found: list[NoPriceForGivenTimestamp]) -> None:
+        """Shows the user the prices that could not be prefetched in one warning"""
+        if len(not_found) != 0:
+            # not every event uses the price of all its assets. So they are added to the
+            # missing prices of the report only if needed while processing, where the
+            # lookups now fail immediately since the series cache remembers them.
+            pairs = sorted({f'{x.from_asset.identifier} -> {x.to_asset.identifier}' for x in not_found})  # noqa: E501
+            self.msg_aggregator.add_warning(
+                f'Could not find {len(not_found)} historical prices that may be needed '
+                f'for the PnL report, for {", ".join(pairs)}',
+            )
+            log.debug(
+                f'Historical prices not found for the PnL report: '
+                f'{", ".join(f"{x.from_asset.identifier}->{x.to_asset.identifier} at {x.time}" for x in not_found)}',  # noqa: E501
+            )
+
     def _process_event(
             self,
+            event: AccountingEventMixin,
             events_iterator: Iterator[AccountingEventMixin],
             start_ts: Timestamp,
             end_ts: Timestamp,
             prev_time: Timestamp,
             db_settings: DBSettings,
-            ignored_ids_mapping: dict[ActionType, list[str]],
+            ignored_entries: IgnoredEntries,
     ) -> tuple[int, Timestamp]:
-        """Processes each individual event and returns a tuple with processing information:
+        """Processes the given event, pulling more events from the iterator if needed,
+        and returns a tuple with processing information:
         - How many events were consumed (0 to indicate we finished processing)
         - last event timestamp
 
@@ -230,12 +538,6 @@ class Accountant():
         - RemoteError if there is a problem reaching the price oracle server
         or with reading the response returned by the server
         """
-        with self.db.conn.read_ctx() as cursor:
-            ignored_assets = self.db.get_ignored_assets(cursor)
-        event = next(events_iterator, None)
-        if event is None:
-            return 0, prev_time
-
         # Assert we are sorted in ascending time order.
         timestamp = event.get_timestamp()
         prev_time = timestamp
@@ -248,6 +550,7 @@ class Accountant():
             return 0, prev_time
 
         self.currently_processing_timestamp = timestamp
+        self.currently_processing_event = event
         try:
             event_assets = event.get_assets()
         except UnknownAsset as e:
@@ -269,7 +572,7 @@ class Accountant():
             )
             return 1, prev_time
 
-        if any(x in ignored_assets for x in event_assets):
+        if any(x in ignored_entries.assets for x in event_assets):
             log.debug(
                 'Ignoring event with ignored asset',
                 event_type=event.get_accounting_event_type(),
@@ -277,7 +580,7 @@ class Accountant():
             )
             return 1, prev_time
 
-        if event.should_ignore(ignored_ids_mapping):
+        if event.should_ignore(ignored_entries.action_ids):
             log.info(
                 f'Ignoring event with identifier {event.get_identifier()} '
                 f'at {timestamp} since the user asked to ignore it',
@@ -292,18 +595,34 @@ class Accountant():
 
         If a directory is given, it simply exports all event.csv in the given directory.
         If no directory is given it returns the path to a zip to export
+
+        The events are read from the DB, where the report has all of them, including
+        the ones copied from a checkpoint it resumed from.
         """
-        if len(self.pots[0].processed_events) == 0:
+        events: list[ProcessedAccountingEvent] = []
+        if (report_id := self.pots[0].report_id) is not None:
+            try:
+                events, _ = DBAccountingReports(self.db).get_report_data(
+                    filter_=ReportDataFilterQuery.make(
+                        report_id=report_id,
+                        order_by_rules=[('identifier', True)],  # in the order of their index
+                    ),
+                    with_limit=False,
+                )
+            except InputError as e:
+                return False, str(e)
+
+        if len(events) == 0:
             return False, 'No history processed in order to perform an export'
 
         if directory_path is None:
             return self.csvexporter.create_zip(
-                events=self.pots[0].processed_events,
+                events=events,
                 pnls=self.pots[0].pnls,
             )
 
         return self.csvexporter.export(
-            events=self.pots[0].processed_events,
+            events=events,
             pnls=self.pots[0].pnls,
             directory=directory_path,
         )
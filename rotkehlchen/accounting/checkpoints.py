@@ -0,0 +1,96 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from rotkehlchen.globaldb.handler import GlobalDBHandler
+from rotkehlchen.types import Timestamp
+from rotkehlchen.utils.serialization import RKLEncoder, rlk_jsondumps
+
+if TYPE_CHECKING:
+    from rotkehlchen.accounting.mixins.event import AccountingEventMixin
+    from rotkehlchen.accounting.types import IgnoredEntries
+    from rotkehlchen.db.settings import DBSettings
+    from rotkehlchen.history.events import MergedHistory
+
+# Should be increased whenever the saved state or the way events are processed
+# changes so that checkpoints saved by older versions are not used
+PNL_CHECKPOINT_VERSION = 3
+# The settings that affect how history is processed
+PNL_CHECKPOINT_SETTINGS = (
+    'main_currency',
+    'taxfree_after_period',
+    'include_crypto2crypto',
+    'include_gas_costs',
+    'account_for_assets_movements',
+    'calculate_past_cost_basis',
+    'cost_basis_method',
+    'treat_eth2_as_eth',
+    'eth_staking_taxable_after_withdrawal_enabled',
+    'taxable_ledger_actions',
+    'historical_price_oracles',
+)
+EMPTY_EVENTS_DIGEST = bytes(32)
+
+
+class PnlCheckpoint(NamedTuple):
+    """The state of the accounting pot after processing all events before timestamp"""
+    timestamp: Timestamp
+    # report that saved the checkpoint. Its processed events before timestamp are
+    # copied to the reports that resume from it.
+    report_id: int
+    first_processed_timestamp: Timestamp
+    events_num: int  # number of events before timestamp
+    history_fingerprint: str  # see history_fingerprint
+    processed_actions: int
+    state: dict[str, Any]
+
+
+def settings_fingerprint(settings: 'DBSettings', ignored_entries: 'IgnoredEntries') -> str:
+    """Identifies the settings and ignored entries a checkpoint was saved with. Only
+    reports with the same fingerprint can use it."""
+    serialized_settings = settings.serialize()
+    data = {
+        'version': PNL_CHECKPOINT_VERSION,
+        'settings': {name: serialized_settings[name] for name in PNL_CHECKPOINT_SETTINGS},
+        'ignored_assets': sorted(asset.identifier for asset in ignored_entries.assets),
+        'ignored_action_ids': {
+            action_type.serialize(): sorted(identifiers)
+            for action_type, identifiers in ignored_entries.action_ids.items()
+        },
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True, cls=RKLEncoder).encode()).hexdigest()
+
+
+def history_fingerprint(history: 'MergedHistory', timestamp: Timestamp) -> tuple[int, str]:
+    """Returns the number of events before the timestamp and a fingerprint of them
+    along with the manual prices before the timestamp, without reading the events.
+
+    Events before a checkpoint being added or removed or manual prices before it
+    changing changes the fingerprint at the checkpoint. Events edited in place
+    delete the checkpoints after them instead. See DBAccountingReports.
+    """
+    summaries = history.summarize(before_ts=timestamp)
+    manual_prices = sorted(
+        (x['from_asset'], x['to_asset'], x['timestamp'], x['price'])
+        for x in GlobalDBHandler.get_manual_prices(from_asset=None, to_asset=None)
+        if int(x['timestamp']) < timestamp
+    )
+    data = {'events': [marker for _, marker in summaries], 'manual_prices': manual_prices}
+    fingerprint = hashlib.sha256(json.dumps(data, cls=RKLEncoder).encode()).hexdigest()
+    return sum(events_num for events_num, _ in summaries), fingerprint
+
+
+def digest_event(digest: bytes, event: 'AccountingEventMixin') -> bytes:
+    """Chains the event to the digest of all events before it. Any event being edited,
+    added or removed changes the digest of the events after it."""
+    return hashlib.sha256(
+        digest + rlk_jsondumps(event.serialize_for_debug_import()).encode(),
+    ).digest()
+
+
+def next_checkpoint_timestamp(timestamp: Timestamp) -> Timestamp:
+    """Checkpoints are saved at the start of each year in UTC. Returns the first
+    checkpoint timestamp after the given timestamp"""
+    year = datetime.fromtimestamp(timestamp, tz=timezone.utc).year
+    return Timestamp(int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp()))
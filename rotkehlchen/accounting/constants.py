@@ -1,2 +1,6 @@
 FREE_PNL_EVENTS_LIMIT = 1000
 FREE_REPORTS_LOOKUP_LIMIT = 20
+# How many processed events of a PnL report to buffer before writing them to the DB
+PNL_EVENTS_WRITE_BATCH_SIZE = 500
+# How many history events to read ahead of processing to prefetch their prices together
+PNL_EVENTS_PREFETCH_BATCH_SIZE = 5000
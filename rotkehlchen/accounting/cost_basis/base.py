@@ -1,13 +1,14 @@
 import heapq
 import logging
 from abc import ABCMeta, abstractmethod
-from collections import defaultdict
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
     DefaultDict,
+    Iterable,
     Iterator,
     Literal,
     NamedTuple,
@@ -29,6 +30,7 @@ from rotkehlchen.user_messages import MessagesAggregator
 from rotkehlchen.utils.mixins.customizable_date import CustomizableDateMixin
 
 if TYPE_CHECKING:
+    from rotkehlchen.accounting.cost_basis.parallel import AssetCostBasisResult
     from rotkehlchen.accounting.structures.processed_event import ProcessedAccountingEvent
     from rotkehlchen.db.dbhandler import DBHandler
 
@@ -82,6 +84,36 @@ class AssetAcquisitionEvent:
             'index': self.index,
         }
 
+    def serialize_state(self) -> dict[str, Any]:
+        """Serializes the acquisition along with its remaining amount"""
+        data = self.serialize()
+        data['remaining_amount'] = str(self.remaining_amount)
+        return data
+
+    @classmethod
+    def deserialize_state(cls: type['AssetAcquisitionEvent'], data: dict[str, Any]) -> 'AssetAcquisitionEvent':  # noqa: E501
+        """Restores an acquisition saved with serialize_state in a PnL report checkpoint.
+        Its processed event is copied to the report that restores it, at the same index.
+
+        May raise DeserializationError"""
+        location = 'pnl report checkpoint'
+        try:
+            acquisition = cls(
+                amount=deserialize_fval(data['full_amount'], name='amount', location=location),
+                timestamp=Timestamp(data['timestamp']),
+                rate=Price(deserialize_fval(data['rate'], name='rate', location=location)),
+                index=data['index'],
+            )
+            acquisition.remaining_amount = deserialize_fval(
+                value=data['remaining_amount'],
+                name='remaining_amount',
+                location=location,
+            )
+        except KeyError as e:
+            raise DeserializationError(f'Missing key {str(e)}') from e
+
+        return acquisition
+
     def __gt__(self, other: Any) -> bool:
         if not isinstance(other, AssetAcquisitionEvent):
             raise NotImplementedError
@@ -109,6 +141,29 @@ class AssetSpendEvent:
         )
 
 
+def get_cost_basis_asset(asset: Asset) -> Asset:
+    """Returns the asset whose cost basis is used for the given asset"""
+    if asset == A_WETH:
+        return A_ETH
+
+    return asset
+
+
+class CostBasisOperation(NamedTuple):
+    """An acquisition, spend or reduction of an asset that is recorded while processing
+    the events of a report, so that the cost basis of each asset can be computed
+    afterwards in worker processes. See rotkehlchen.accounting.cost_basis.parallel"""
+    sequence: int  # position of the operation among the operations of all assets
+    type: Literal['acquisition', 'taxable_spend', 'spend', 'reduction']
+    asset: Asset  # the asset as given and not the one whose cost basis it shares
+    timestamp: Timestamp
+    amount: FVal
+    rate: FVal = ZERO  # rate of acquisitions and spends
+    event_index: int = 0  # index of the processed event of acquisitions
+    location: Location = Location.EXTERNAL  # location of spends
+    is_fiat: bool = False  # missing acquisitions are not recorded when reducing fiat
+
+
 class AssetAcquisitionHeapElement(NamedTuple):
     """
     https://docs.python.org/3/library/heapq.html#basic-examples
@@ -151,6 +206,45 @@ class BaseCostBasisMethod(metaclass=ABCMeta):
         while len(self._acquisitions_heap) > 0:
             yield self._acquisitions_heap[0].acquisition_event
 
+    def serialize_state(self) -> dict[str, Any]:
+        """Serializes the acquisitions heap to be saved in a PnL report checkpoint"""
+        return {'acquisitions': [
+            (str(entry.priority), entry.acquisition_event.serialize_state())
+            for entry in self._acquisitions_heap
+        ]}
+
+    def restore_state(
+            self,
+            state: dict[str, Any],
+            acquisitions: Optional[dict[int, AssetAcquisitionEvent]] = None,
+    ) -> None:
+        """Restores the acquisitions heap saved with serialize_state. The heap
+        invariant holds since the entries are restored in the same order.
+
+        If acquisitions are given the saved acquisitions are taken from them by their
+        index and only get their remaining amount restored.
+
+        May raise:
+        - DeserializationError if the state is invalid
+        """
+        location = 'pnl report checkpoint'
+        try:
+            heap = []
+            for priority, data in state['acquisitions']:
+                if acquisitions is None:
+                    acquisition = AssetAcquisitionEvent.deserialize_state(data)
+                else:
+                    acquisition = acquisitions[data['index']]
+                    acquisition.remaining_amount = deserialize_fval(data['remaining_amount'], name='remaining_amount', location=location)  # noqa: E501
+                heap.append(AssetAcquisitionHeapElement(
+                    priority=deserialize_fval(priority, name='priority', location=location),
+                    acquisition_event=acquisition,
+                ))
+        except (KeyError, ValueError, TypeError) as e:
+            raise DeserializationError(f'Invalid acquisitions state: {str(e)}') from e
+
+        self._acquisitions_heap = heap
+
     def get_acquisitions(self) -> tuple[AssetAcquisitionEvent, ...]:
         """Returns read-only _acquisitions"""
         return tuple(entry.acquisition_event for entry in self._acquisitions_heap)
@@ -172,6 +266,24 @@ class BaseCostBasisMethod(metaclass=ABCMeta):
         if self._acquisitions_heap[0].acquisition_event.remaining_amount == ZERO:
             heapq.heappop(self._acquisitions_heap)
 
+    def reduce_amount(self, amount: FVal) -> FVal:
+        """Consumes acquisitions for the given amount without calculating any cost.
+
+        Returns the amount for which there were not enough acquisitions.
+        """
+        remaining_amount = amount
+        for acquisition_event in self.processing_iterator():
+            if remaining_amount < acquisition_event.remaining_amount:
+                self.consume_result(remaining_amount)
+                remaining_amount = ZERO
+                # stop iterating since we found all acquisitions to satisfy reduction
+                break
+
+            remaining_amount -= acquisition_event.remaining_amount
+            self.consume_result(acquisition_event.remaining_amount)
+
+        return remaining_amount
+
     def calculate_spend_cost_basis(
             self,
             spending_amount: FVal,
@@ -308,6 +420,22 @@ class FIFOCostBasisMethod(BaseCostBasisMethod):
         heapq.heappush(self._acquisitions_heap, AssetAcquisitionHeapElement(self._count, acquisition))  # noqa: E501
         self._count += 1
 
+    def serialize_state(self) -> dict[str, Any]:
+        state = super().serialize_state()
+        state['count'] = str(self._count)
+        return state
+
+    def restore_state(
+            self,
+            state: dict[str, Any],
+            acquisitions: Optional[dict[int, AssetAcquisitionEvent]] = None,
+    ) -> None:
+        super().restore_state(state, acquisitions)
+        try:
+            self._count = deserialize_fval(state['count'], name='count', location='pnl report checkpoint')  # noqa: E501
+        except KeyError as e:
+            raise DeserializationError(f'Invalid acquisitions count: {str(e)}') from e
+
 
 class LIFOCostBasisMethod(BaseCostBasisMethod):
     """
@@ -323,6 +451,22 @@ class LIFOCostBasisMethod(BaseCostBasisMethod):
         heapq.heappush(self._acquisitions_heap, AssetAcquisitionHeapElement(-self._count, acquisition))  # noqa: E501
         self._count += 1
 
+    def serialize_state(self) -> dict[str, Any]:
+        state = super().serialize_state()
+        state['count'] = str(self._count)
+        return state
+
+    def restore_state(
+            self,
+            state: dict[str, Any],
+            acquisitions: Optional[dict[int, AssetAcquisitionEvent]] = None,
+    ) -> None:
+        super().restore_state(state, acquisitions)
+        try:
+            self._count = deserialize_fval(state['count'], name='count', location='pnl report checkpoint')  # noqa: E501
+        except KeyError as e:
+            raise DeserializationError(f'Invalid acquisitions count: {str(e)}') from e
+
 
 class HIFOCostBasisMethod(BaseCostBasisMethod):
     """
@@ -341,10 +485,14 @@ class AverageCostBasisMethod(BaseCostBasisMethod):
     """
     Accounting in Average Cost Basis(ACB) method.
     https://www.investopedia.com/terms/a/averagecostbasismethod.asp
+
+    The cost basis only depends on the running amount and cost of the asset. The
+    acquisitions are only needed for the matched acquisitions of the spends which use
+    them up in the order they were seen, so they are kept in a deque instead of a heap.
     """
     def __init__(self) -> None:
         super().__init__()
-        self._count = ZERO
+        self._acquisitions: deque[AssetAcquisitionEvent] = deque()
         # keeps track of the amount of the asset remaining after every acquisition or spend
         self.remaining_amount = ZERO
         # the average cost basis of last event(buy/sell) that occurred
@@ -352,7 +500,7 @@ class AverageCostBasisMethod(BaseCostBasisMethod):
 
     def add_acquisition(self, acquisition: AssetAcquisitionEvent) -> None:
         """
-        Adds an acquisition to the `_acquisitions_heap` in order of time seen.
+        Adds an acquisition to the `_acquisitions` in order of time seen.
 
         It also calculates the average cost basis of that acquisition with respect to the
         previous average cost basis.
@@ -360,18 +508,58 @@ class AverageCostBasisMethod(BaseCostBasisMethod):
         The formula used to calculate the average cost basis of an acquisition is:
         [Previous Total ACB] + [Cost of New Shares] + [Transaction Costs]
         """
-        heapq.heappush(
-            self._acquisitions_heap,
-            AssetAcquisitionHeapElement(self._count, acquisition),
-        )
+        self._acquisitions.append(acquisition)
         self.current_average_cost_basis += (acquisition.rate * acquisition.amount)
         self.remaining_amount += acquisition.amount
-        self._count += 1
+
+    def processing_iterator(self) -> Iterator[AssetAcquisitionEvent]:
+        while len(self._acquisitions) > 0:
+            yield self._acquisitions[0]
+
+    def serialize_state(self) -> dict[str, Any]:
+        return {
+            'acquisitions': [x.serialize_state() for x in self._acquisitions],
+            'remaining_amount': str(self.remaining_amount),
+            'current_average_cost_basis': str(self.current_average_cost_basis),
+        }
+
+    def restore_state(
+            self,
+            state: dict[str, Any],
+            acquisitions: Optional[dict[int, AssetAcquisitionEvent]] = None,
+    ) -> None:
+        location = 'pnl report checkpoint'
+        try:
+            restored_acquisitions: deque[AssetAcquisitionEvent] = deque()
+            for data in state['acquisitions']:
+                if acquisitions is None:
+                    acquisition = AssetAcquisitionEvent.deserialize_state(data)
+                else:
+                    acquisition = acquisitions[data['index']]
+                    acquisition.remaining_amount = deserialize_fval(data['remaining_amount'], name='remaining_amount', location=location)  # noqa: E501
+                restored_acquisitions.append(acquisition)
+            self.remaining_amount = deserialize_fval(state['remaining_amount'], name='remaining_amount', location=location)  # noqa: E501
+            self.current_average_cost_basis = deserialize_fval(state['current_average_cost_basis'], name='current_average_cost_basis', location=location)  # noqa: E501
+        except (KeyError, ValueError, TypeError) as e:
+            raise DeserializationError(f'Invalid acquisitions state: {str(e)}') from e
+
+        self._acquisitions = restored_acquisitions
+
+    def get_acquisitions(self) -> tuple[AssetAcquisitionEvent, ...]:
+        return tuple(self._acquisitions)
 
     def consume_result(self, used_amount: FVal) -> None:
-        """Same as its parent function but also deducts `used_amount` from `remaining_amount`."""
+        """Same as its parent function but also deducts `used_amount` from `remaining_amount`.
+
+        May raise:
+        - IndexError if the method was called when acquisitions were empty
+        """
+        acquisition = self._acquisitions[0]
+        assert ZERO <= used_amount <= acquisition.remaining_amount, f'Used amount must be in the interval [0, {acquisition.remaining_amount}] but it was {used_amount}'  # noqa: E501
         self.remaining_amount -= used_amount
-        super().consume_result(used_amount)
+        acquisition.remaining_amount -= used_amount
+        if acquisition.remaining_amount == ZERO:
+            self._acquisitions.popleft()
 
     def calculate_spend_cost_basis(
             self,
@@ -420,6 +608,9 @@ class AverageCostBasisMethod(BaseCostBasisMethod):
             average_cost_basis=self.current_average_cost_basis,
         )
 
+    def __len__(self) -> int:
+        return len(self._acquisitions)
+
 
 class CostBasisEvents:
     def __init__(self, cost_basis_method: CostBasisMethod) -> None:
@@ -560,19 +751,135 @@ class CostBasisCalculator(CustomizableDateMixin):
         self.msg_aggregator = msg_aggregator
         self.reset(self.settings)
 
-    def reset(self, settings: DBSettings) -> None:
+    def reset(self, settings: DBSettings, defer_operations: bool = False) -> None:
         self.settings = settings
         self.profit_currency = settings.main_currency
         self._events: DefaultDict[Asset, CostBasisEvents] = defaultdict(lambda: CostBasisEvents(settings.cost_basis_method))  # noqa: E501
         self.missing_acquisitions: list[MissingAcquisition] = []
         self.missing_prices: set[MissingPrice] = set()
+        # If set, the acquisitions and spends are recorded here instead of being applied
+        # so that the cost basis is computed at the end of the report in worker processes
+        self.deferred_operations: Optional[list[CostBasisOperation]] = [] if defer_operations else None  # noqa: E501
+        # id of the placeholder cost basis of each deferred taxable spend -> (sequence, placeholder)  # noqa: E501
+        self._deferred_spends: dict[int, tuple[int, CostBasisInfo]] = {}
+
+    def _defer_operation(self, **kwargs: Any) -> int:
+        """Records an operation with the given fields and returns its sequence"""
+        operations = self.deferred_operations
+        assert operations is not None, 'should only be called if operations are deferred'
+        operations.append(CostBasisOperation(sequence=len(operations), **kwargs))
+        return len(operations) - 1
+
+    def resolve_deferred_operations(
+            self,
+            results: Optional[Iterable['AssetCostBasisResult']],
+    ) -> dict[int, CostBasisInfo]:
+        """Applies the cost basis computed for the deferred operations of each asset,
+        or applies the operations themselves in order if no results are given.
+        The calculator then has the same state as if the operations were never deferred.
+
+        Returns the actual cost basis of each deferred taxable spend keyed by the id()
+        of the placeholder cost basis returned by spend_asset.
+        """
+        operations = self.deferred_operations
+        assert operations is not None, 'should only be called if operations are deferred'
+        self.deferred_operations = None
+        spend_costs: dict[int, CostBasisInfo] = {}
+        if results is None:
+            for operation in operations:
+                if (cost_basis := self._apply_operation(operation)) is not None:
+                    spend_costs[operation.sequence] = cost_basis
+        else:
+            missing_acquisitions: list[tuple[int, MissingAcquisition]] = []
+            for result in results:
+                self._events[result.asset] = result.events
+                spend_costs.update(result.spend_costs)
+                missing_acquisitions.extend(result.missing_acquisitions)
+
+            missing_acquisitions.sort(key=lambda x: x[0])
+            self.missing_acquisitions.extend(x[1] for x in missing_acquisitions)
+
+        resolved = {
+            placeholder_id: spend_costs[sequence]
+            for placeholder_id, (sequence, _) in self._deferred_spends.items()
+        }
+        self._deferred_spends = {}
+        return resolved
+
+    def _apply_operation(self, operation: CostBasisOperation) -> Optional[CostBasisInfo]:
+        """Applies a deferred operation the same way as when it was recorded.
+        Returns the cost basis of a taxable spend."""
+        if operation.type == 'acquisition':
+            self.get_events(operation.asset).acquisitions_manager.add_acquisition(
+                AssetAcquisitionEvent(
+                    amount=operation.amount,
+                    timestamp=operation.timestamp,
+                    rate=Price(operation.rate),
+                    index=operation.event_index,
+                ),
+            )
+            return None
+
+        if operation.type == 'reduction':
+            self.reduce_asset_amount(
+                asset=operation.asset,
+                amount=operation.amount,
+                timestamp=operation.timestamp,
+            )
+            return None
+
+        return self.spend_asset(
+            location=operation.location,
+            timestamp=operation.timestamp,
+            asset=operation.asset,
+            amount=operation.amount,
+            rate=operation.rate,
+            taxable_spend=operation.type == 'taxable_spend',
+        )
+
+    def serialize_state(self) -> dict[str, Any]:
+        """Serializes the acquisitions of each asset and the missing acquisitions and
+        prices found so far, to be saved in a PnL report checkpoint"""
+        return {
+            'acquisitions': {
+                asset.identifier: events.acquisitions_manager.serialize_state()
+                for asset, events in self._events.items()
+                if len(events.acquisitions_manager) != 0
+            },
+            'missing_acquisitions': [x.serialize() for x in self.missing_acquisitions],
+            'missing_prices': [x.serialize() for x in self.missing_prices],
+        }
+
+    def restore_state(self, state: dict[str, Any]) -> None:
+        """Restores the state saved with serialize_state. Should be called after reset().
+
+        Only the acquisitions are restored and not the spends of each asset.
+
+        May raise:
+        - DeserializationError if the state is invalid
+        """
+        location = 'pnl report checkpoint'
+        try:
+            for identifier, manager_state in state['acquisitions'].items():
+                self._events[Asset(identifier)].acquisitions_manager.restore_state(manager_state)
+            self.missing_acquisitions = [MissingAcquisition(
+                asset=Asset(entry['asset']),
+                time=Timestamp(entry['time']),
+                found_amount=deserialize_fval(entry['found_amount'], name='found_amount', location=location),  # noqa: E501
+                missing_amount=deserialize_fval(entry['missing_amount'], name='missing_amount', location=location),  # noqa: E501
+            ) for entry in state['missing_acquisitions']]
+            self.missing_prices = {MissingPrice(
+                from_asset=Asset(entry['from_asset']),
+                to_asset=Asset(entry['to_asset']),
+                time=Timestamp(entry['time']),
+                rate_limited=entry['rate_limited'],
+            ) for entry in state['missing_prices']}
+        except (KeyError, TypeError) as e:
+            raise DeserializationError(f'Invalid cost basis state: {str(e)}') from e
 
     def get_events(self, asset: Asset) -> CostBasisEvents:
         """Custom getter for events so that we have common cost basis for some assets"""
-        if asset == A_WETH:
-            asset = A_ETH
-
-        return self._events[asset]
+        return self._events[get_cost_basis_asset(asset)]
 
     def reduce_asset_amount(self, asset: Asset, amount: FVal, timestamp: Timestamp) -> bool:
         """Searches all acquisition events for asset and reduces them by amount.
@@ -582,22 +889,24 @@ class CostBasisCalculator(CustomizableDateMixin):
 
         This function does the same as calculate_spend_cost_basis as far as consuming
         acquisitions is concerned but does not calculate bought cost.
+
+        If operations are deferred the reduction is only recorded and True is returned.
         """
+        if self.deferred_operations is not None:
+            self._defer_operation(
+                type='reduction',
+                asset=asset,
+                timestamp=timestamp,
+                amount=amount,
+                is_fiat=asset.is_fiat(),
+            )
+            return True
+
         asset_events = self.get_events(asset)
         if len(asset_events.acquisitions_manager) == 0:
             return False
 
-        remaining_amount = amount
-        for acquisition_event in asset_events.acquisitions_manager.processing_iterator():
-            if remaining_amount < acquisition_event.remaining_amount:
-                asset_events.acquisitions_manager.consume_result(remaining_amount)
-                remaining_amount = ZERO
-                # stop iterating since we found all acquisitions to satisfy reduction
-                break
-
-            remaining_amount -= acquisition_event.remaining_amount
-            asset_events.acquisitions_manager.consume_result(acquisition_event.remaining_amount)
-
+        remaining_amount = asset_events.acquisitions_manager.reduce_amount(amount)
         if remaining_amount != ZERO:
             if not asset.is_fiat():
                 self.missing_acquisitions.append(
@@ -618,6 +927,17 @@ class CostBasisCalculator(CustomizableDateMixin):
     ) -> None:
         """Adds an acquisition event for an asset"""
         asset_event = AssetAcquisitionEvent.from_processed_event(event=event)
+        if self.deferred_operations is not None:
+            self._defer_operation(
+                type='acquisition',
+                asset=event.asset,
+                timestamp=asset_event.timestamp,
+                amount=asset_event.amount,
+                rate=asset_event.rate,
+                event_index=asset_event.index,
+            )
+            return
+
         asset_events = self.get_events(event.asset)
         asset_events.acquisitions_manager.add_acquisition(asset_event)
 
@@ -673,7 +993,37 @@ class CostBasisCalculator(CustomizableDateMixin):
         This is important for customization of accounting for some events such as swapping
         ETH for aETH, locking GNO for LockedGNO. In many jurisdictions in this case
         it can be considered as locking/depositing instead of swapping.
+
+        If operations are deferred the spend is only recorded and a taxable spend returns
+        a placeholder CostBasisInfo. Its taxable amount is the entire spend amount, which
+        is what the actual cost basis has too when the cost basis can be deferred.
+        The actual one is given by resolve_deferred_operations.
         """
+        if self.deferred_operations is not None:
+            is_fiat = asset.is_fiat()
+            is_taxable = taxable_spend and not is_fiat
+            sequence = self._defer_operation(
+                type='taxable_spend' if is_taxable else 'spend',
+                asset=asset,
+                timestamp=timestamp,
+                amount=amount,
+                rate=rate,
+                location=location,
+                is_fiat=is_fiat,
+            )
+            if not is_taxable:
+                return None
+
+            placeholder = CostBasisInfo(
+                taxable_amount=amount,
+                taxable_bought_cost=ZERO,
+                taxfree_bought_cost=ZERO,
+                matched_acquisitions=[],
+                is_complete=True,
+            )
+            self._deferred_spends[id(placeholder)] = (sequence, placeholder)
+            return placeholder
+
         event = AssetSpendEvent(
             location=location,
             timestamp=timestamp,
@@ -0,0 +1,284 @@
+"""Computes the cost basis of the events of a PnL report in worker processes.
+
+Once the events are ordered the cost basis of each asset only depends on the acquisitions
+and spends of that asset. So while processing the events of a report the pot can record
+them as CostBasisOperations, partition them by asset and compute the cost basis of each
+asset in a separate process at the end of the report.
+See AccountingPot.compute_deferred_cost_basis
+
+Pickling FVals and the accounting structures is slower than computing the cost basis
+itself, so the operations and the results are sent to and from the worker processes as
+tuples of strings that refer to the operations by their sequence.
+"""
+import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, NamedTuple, Optional
+
+from rotkehlchen.accounting.cost_basis.base import (
+    AssetAcquisitionEvent,
+    AssetSpendEvent,
+    CostBasisEvents,
+    CostBasisInfo,
+    CostBasisOperation,
+    MatchedAcquisition,
+    get_cost_basis_asset,
+)
+from rotkehlchen.accounting.types import MissingAcquisition
+from rotkehlchen.assets.asset import Asset
+from rotkehlchen.constants.misc import ZERO
+from rotkehlchen.db.settings import DBSettings
+from rotkehlchen.fval import FVal
+from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.types import CostBasisMethod, Price, Timestamp
+
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
+# Below this number of operations per process the cost of starting the processes
+# and sending the operations to them is higher than what is gained
+MIN_OPERATIONS_PER_PROCESS = 50000
+
+# An operation's sequence, type, timestamp, amount, rate and is_fiat
+EncodedOperation = tuple[int, str, Timestamp, str, str, bool]
+# A spend's sequence, taxable amount, taxable and taxfree bought cost, is_complete and
+# the sequence, amount and taxable of each matched acquisition
+EncodedSpendCost = tuple[int, str, str, str, bool, list[tuple[int, str, bool]]]
+
+
+class EncodedAssetResult(NamedTuple):
+    spend_costs: list[EncodedSpendCost]
+    missing_acquisitions: list[tuple[int, str, str]]  # (sequence, found amount, missing amount)  # noqa: E501
+    used_acquisitions: list[int]  # sequences of the used acquisitions
+    acquisitions_state: dict[str, Any]  # acquisitions manager state. Indices are sequences
+
+
+class AssetCostBasisResult(NamedTuple):
+    asset: Asset  # the asset whose cost basis was computed
+    events: CostBasisEvents  # the acquisitions and spends left after all operations
+    spend_costs: list[tuple[int, CostBasisInfo]]  # (sequence, cost basis) of taxable spends
+    missing_acquisitions: list[tuple[int, MissingAcquisition]]  # (sequence, missing acquisition)  # noqa: E501
+
+
+def can_defer_cost_basis(settings: DBSettings) -> bool:
+    """The cost basis can only be computed after all events are processed if processing
+    does not depend on it. It does if the taxable amount of a spend depends on the
+    acquisitions it is matched with, which is the case with a tax free period or
+    with the average cost basis method."""
+    return (
+        settings.taxfree_after_period is None and
+        settings.cost_basis_method != CostBasisMethod.ACB
+    )
+
+
+def process_encoded_operations(
+        settings: DBSettings,
+        assets_operations: list[tuple[str, list[EncodedOperation]]],
+) -> list[EncodedAssetResult]:
+    """Applies the ordered operations of each asset the same way CostBasisCalculator does.
+    This is what runs in the worker processes. Acquisitions get their operation's
+    sequence as index so that the results can refer to them."""
+    results = []
+    for identifier, operations in assets_operations:
+        asset = Asset(identifier)
+        events = CostBasisEvents(settings.cost_basis_method)
+        acquisitions_manager = events.acquisitions_manager
+        spend_costs: list[EncodedSpendCost] = []
+        missing_acquisitions: list[tuple[int, str, str]] = []
+        for sequence, operation_type, timestamp, amount, rate, is_fiat in operations:
+            if operation_type == 'acquisition':
+                acquisitions_manager.add_acquisition(AssetAcquisitionEvent(
+                    amount=FVal(amount),
+                    timestamp=timestamp,
+                    rate=Price(FVal(rate)),
+                    index=sequence,
+                ))
+                continue
+
+            if operation_type == 'taxable_spend':
+                missing: list[MissingAcquisition] = []
+                cost_basis = acquisitions_manager.calculate_spend_cost_basis(
+                    spending_amount=FVal(amount),
+                    spending_asset=asset,
+                    timestamp=timestamp,
+                    missing_acquisitions=missing,
+                    used_acquisitions=events.used_acquisitions,
+                    settings=settings,
+                    timestamp_to_date=str,
+                )
+                spend_costs.append((
+                    sequence,
+                    str(cost_basis.taxable_amount),
+                    str(cost_basis.taxable_bought_cost),
+                    str(cost_basis.taxfree_bought_cost),
+                    cost_basis.is_complete,
+                    [(x.event.index, str(x.amount), x.taxable) for x in cost_basis.matched_acquisitions],  # noqa: E501
+                ))
+                missing_acquisitions.extend(
+                    (sequence, str(x.found_amount), str(x.missing_amount)) for x in missing
+                )
+                continue
+
+            # a spend that is not taxable or a reduction
+            if len(acquisitions_manager) == 0:
+                continue
+
+            remaining_amount = acquisitions_manager.reduce_amount(FVal(amount))
+            if remaining_amount != ZERO and not is_fiat:
+                missing_acquisitions.append((
+                    sequence,
+                    str(FVal(amount) - remaining_amount),
+                    str(remaining_amount),
+                ))
+
+        results.append(EncodedAssetResult(
+            spend_costs=spend_costs,
+            missing_acquisitions=missing_acquisitions,
+            used_acquisitions=[x.index for x in events.used_acquisitions],
+            acquisitions_state=acquisitions_manager.serialize_state(),
+        ))
+
+    return results
+
+
+def _decode_asset_result(
+        asset: Asset,
+        operations: list[CostBasisOperation],
+        result: EncodedAssetResult,
+        cost_basis_method: CostBasisMethod,
+) -> AssetCostBasisResult:
+    """Rebuilds the result of an asset from the operations recorded for it.
+
+    May raise:
+    - DeserializationError if the acquisitions state can't be restored
+    """
+    events = CostBasisEvents(cost_basis_method)
+    acquisitions: dict[int, AssetAcquisitionEvent] = {}
+    operations_by_sequence = {}
+    for operation in operations:
+        operations_by_sequence[operation.sequence] = operation
+        if operation.type == 'acquisition':
+            acquisition = AssetAcquisitionEvent(
+                amount=operation.amount,
+                timestamp=operation.timestamp,
+                rate=Price(operation.rate),
+                index=operation.event_index,
+            )
+            acquisition.remaining_amount = ZERO  # all used unless they are left in the heap
+            acquisitions[operation.sequence] = acquisition
+        elif operation.type != 'reduction':
+            events.spends.append(AssetSpendEvent(
+                location=operation.location,
+                timestamp=operation.timestamp,
+                amount=operation.amount,
+                rate=operation.rate,
+            ))
+
+    events.acquisitions_manager.restore_state(result.acquisitions_state, acquisitions)
+    events.used_acquisitions = [acquisitions[x] for x in result.used_acquisitions]
+    spend_costs = []
+    for sequence, taxable_amount, taxable_bought_cost, taxfree_bought_cost, is_complete, matched in result.spend_costs:  # noqa: E501
+        spend_costs.append((sequence, CostBasisInfo(
+            taxable_amount=FVal(taxable_amount),
+            taxable_bought_cost=FVal(taxable_bought_cost),
+            taxfree_bought_cost=FVal(taxfree_bought_cost),
+            matched_acquisitions=[
+                MatchedAcquisition(amount=FVal(amount), event=acquisitions[acquisition_sequence], taxable=taxable)  # noqa: E501
+                for acquisition_sequence, amount, taxable in matched
+            ],
+            is_complete=is_complete,
+        )))
+
+    missing_acquisitions = []
+    for sequence, found_amount, missing_amount in result.missing_acquisitions:
+        operation = operations_by_sequence[sequence]
+        missing_acquisitions.append((sequence, MissingAcquisition(
+            asset=operation.asset,
+            time=operation.timestamp,
+            found_amount=FVal(found_amount),
+            missing_amount=FVal(missing_amount),
+        )))
+
+    return AssetCostBasisResult(
+        asset=asset,
+        events=events,
+        spend_costs=spend_costs,
+        missing_acquisitions=missing_acquisitions,
+    )
+
+
+def compute_cost_basis(
+        operations: list[CostBasisOperation],
+        settings: DBSettings,
+        processes: int,
+) -> Optional[list[AssetCostBasisResult]]:
+    """Partitions the operations by asset and computes the cost basis of each asset
+    in up to `processes` worker processes.
+
+    The results are the same no matter the number of processes. Each result refers to the
+    operations by their sequence so they can be merged back in the order of processing.
+    Returns None if the operations are too few to gain anything from worker processes
+    or if the processes failed, in which case they should be applied in this process.
+
+    May raise:
+    - DeserializationError if the result of a worker process can't be decoded
+    """
+    assets_operations: defaultdict[Asset, list[CostBasisOperation]] = defaultdict(list)
+    for operation in operations:
+        assets_operations[get_cost_basis_asset(operation.asset)].append(operation)
+
+    processes = min(
+        processes,
+        len(assets_operations),
+        len(operations) // MIN_OPERATIONS_PER_PROCESS,
+    )
+    if processes <= 1:
+        return None
+
+    # Give the assets with the most operations first, each to the least loaded chunk
+    chunks: list[list[tuple[str, list[EncodedOperation]]]] = [[] for _ in range(processes)]
+    chunk_sizes = [0] * len(chunks)
+    chunk_assets: list[list[Asset]] = [[] for _ in range(len(chunks))]
+    for asset, asset_operations in sorted(assets_operations.items(), key=lambda x: len(x[1]), reverse=True):  # noqa: E501
+        idx = chunk_sizes.index(min(chunk_sizes))
+        chunks[idx].append((asset.identifier, [
+            (x.sequence, x.type, x.timestamp, str(x.amount), str(x.rate), x.is_fiat)
+            for x in asset_operations
+        ]))
+        chunk_sizes[idx] += len(asset_operations)
+        chunk_assets[idx].append(asset)
+
+    log.debug(
+        f'Computing the cost basis of {len(operations)} operations of '
+        f'{len(assets_operations)} assets in {processes} processes',
+    )
+    try:
+        # spawn since forking a process with running greenlets and open DB connections is unsafe  # noqa: E501
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as executor:
+            encoded_results = list(executor.map(
+                process_encoded_operations,
+                [settings] * processes,
+                chunks,
+            ))
+    except BrokenProcessPool as e:
+        log.error(
+            f'Cost basis worker processes failed due to {str(e)}. '
+            f'Computing the cost basis in the main process instead',
+        )
+        return None
+
+    return [
+        _decode_asset_result(
+            asset=asset,
+            operations=assets_operations[asset],
+            result=result,
+            cost_basis_method=settings.cost_basis_method,
+        )
+        for assets, chunk_results in zip(chunk_assets, encoded_results)
+        for asset, result in zip(assets, chunk_results)
+    ]
@@ -1,6 +1,6 @@
 import logging
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Iterator, Optional
+from typing import TYPE_CHECKING, Any, Collection, Iterator, Mapping, Optional
 
 from rotkehlchen.accounting.mixins.event import AccountingEventMixin, AccountingEventType
 from rotkehlchen.accounting.structures.base import ActionType
@@ -186,7 +186,7 @@ class LedgerAction(AccountingEventMixin):
     def get_identifier(self) -> str:
         return str(self.identifier)
 
-    def should_ignore(self, ignored_ids_mapping: dict[ActionType, list[str]]) -> bool:
+    def should_ignore(self, ignored_ids_mapping: Mapping[ActionType, Collection[str]]) -> bool:
         return self.get_identifier() in ignored_ids_mapping.get(ActionType.LEDGER_ACTION, [])
 
     def get_assets(self) -> list[Asset]:
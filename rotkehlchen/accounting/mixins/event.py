@@ -1,6 +1,6 @@
 from abc import ABCMeta, abstractmethod
 from enum import auto
-from typing import TYPE_CHECKING, Any, Iterator
+from typing import TYPE_CHECKING, Any, Collection, Iterator, Mapping
 
 from rotkehlchen.assets.asset import Asset
 from rotkehlchen.types import Timestamp
@@ -46,7 +46,7 @@ class AccountingEventMixin(metaclass=ABCMeta):
         ...
 
     @abstractmethod
-    def should_ignore(self, ignored_ids_mapping: dict['ActionType', list[str]]) -> bool:
+    def should_ignore(self, ignored_ids_mapping: Mapping['ActionType', Collection[str]]) -> bool:
         """Returns whether this event should be ignored due to user settings"""
         ...
 
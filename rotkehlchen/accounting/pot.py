@@ -2,6 +2,7 @@ import logging
 from typing import TYPE_CHECKING, Any, Literal, Optional
 
 from rotkehlchen.accounting.cost_basis import CostBasisCalculator
+from rotkehlchen.accounting.cost_basis.parallel import compute_cost_basis
 from rotkehlchen.accounting.cost_basis.prefork import (
     handle_prefork_asset_acquisitions,
     handle_prefork_asset_spends,
@@ -13,13 +14,14 @@ from rotkehlchen.accounting.transactions import TransactionsAccountant
 from rotkehlchen.assets.asset import Asset
 from rotkehlchen.constants.assets import A_KFEE
 from rotkehlchen.constants.misc import ONE, ZERO
-from rotkehlchen.db.reports import DBAccountingReports
+from rotkehlchen.db.reports import DBAccountingReports, DBReportDataWriter
 from rotkehlchen.db.settings import DBSettings
 from rotkehlchen.errors.misc import InputError, RemoteError
 from rotkehlchen.errors.price import NoPriceForGivenTimestamp, PriceQueryUnsupportedAsset
 from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.fval import FVal
 from rotkehlchen.history.price import PriceHistorian
+from rotkehlchen.history.price_cache import PriceSeriesCache
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.types import Location, Price, Timestamp
 from rotkehlchen.user_messages import MessagesAggregator
@@ -46,26 +48,47 @@ class AccountingPot(CustomizableDateMixin):
             msg_aggregator: MessagesAggregator,
     ) -> None:
         super().__init__(database=database)
+        self.msg_aggregator = msg_aggregator
         self.profit_currency = self.settings.main_currency.resolve_to_asset_with_oracles()
         self.cost_basis = CostBasisCalculator(
             database=database,
             msg_aggregator=msg_aggregator,
         )
         self.pnls = PnlTotals()
-        self.processed_events: list[ProcessedAccountingEvent] = []
+        # number of processed events so far, including the ones copied from a checkpoint.
+        # The events themselves are only kept in the report data of the DB.
+        self.processed_events_num = 0
         self.transactions = TransactionsAccountant(
             evm_accounting_aggregators=evm_accounting_aggregators,
             pot=self,
         )
         self.query_start_ts = self.query_end_ts = Timestamp(0)
         self.report_id: Optional[int] = None
+        self.report_data: Optional[DBReportDataWriter] = None
+        self.price_cache: Optional[PriceSeriesCache] = None
+        self.cost_basis_processes = 0
+        # The events processed while the cost basis is deferred. They are saved in order
+        # once it is computed, so they are all kept in memory until the end of the report.
+        self._deferred_events: list[ProcessedAccountingEvent] = []
+        # (event, count_entire_amount_spend, count_cost_basis_pnl) of the events whose PnL
+        # is counted once their deferred cost basis is computed
+        self._deferred_pnls: list[tuple[ProcessedAccountingEvent, bool, bool]] = []
 
     def _add_processed_event(self, event: ProcessedAccountingEvent) -> None:
-        dbpnl = DBAccountingReports(self.database)
-        self.processed_events.append(event)
+        self.processed_events_num += 1
+        if self.cost_basis.deferred_operations is not None:
+            self._deferred_events.append(event)
+            return  # saved once its cost basis is computed
+
+        self._save_processed_event(event)
+
+    def _save_processed_event(self, event: ProcessedAccountingEvent) -> None:
+        if self.report_data is None:
+            log.error(f'Tried to save {event} without a PnL report being set up for the pot')
+            return
+
         try:
-            dbpnl.add_report_data(
-                report_id=self.report_id,  # type: ignore # report id is initialized by now
+            self.report_data.add(
                 time=event.timestamp,
                 ts_converter=self.timestamp_to_date,
                 event=event,
@@ -76,6 +99,62 @@ class AccountingPot(CustomizableDateMixin):
 
         log.debug(event.to_string(self.timestamp_to_date))
 
+    def _count_pnl(
+            self,
+            event: ProcessedAccountingEvent,
+            count_entire_amount_spend: bool,
+            count_cost_basis_pnl: bool,
+    ) -> None:
+        """Counts the PnL of the event. If the cost basis is deferred it is counted
+        once the cost basis is computed."""
+        if self.cost_basis.deferred_operations is not None:
+            self._deferred_pnls.append((event, count_entire_amount_spend, count_cost_basis_pnl))  # noqa: E501
+            return
+
+        self.pnls[event.type] += event.calculate_pnl(
+            count_entire_amount_spend=count_entire_amount_spend,
+            count_cost_basis_pnl=count_cost_basis_pnl,
+        )
+
+    def compute_deferred_cost_basis(self) -> None:
+        """If the cost basis of the report was deferred, computes it in worker processes.
+        Then counts the PnL of the processed events and saves them in the order
+        they were processed, giving the same report as computing it while processing.
+
+        If the worker processes can't be used or their results can't be read the cost
+        basis is computed in this process instead."""
+        if (operations := self.cost_basis.deferred_operations) is None:
+            return
+
+        try:
+            results = compute_cost_basis(
+                operations=operations,
+                settings=self.settings,
+                processes=self.cost_basis_processes,
+            )
+        except DeserializationError as e:
+            log.error(f'Could not read the cost basis computed in worker processes: {str(e)}')
+            self.msg_aggregator.add_warning(
+                f'Could not use the cost basis of the PnL report computed in worker processes '
+                f'due to {str(e)}. It was computed in the main process instead.',
+            )
+            results = None
+
+        spend_costs = self.cost_basis.resolve_deferred_operations(results)
+        for event in self._deferred_events:
+            if event.cost_basis is not None:
+                event.cost_basis = spend_costs.get(id(event.cost_basis), event.cost_basis)
+
+        for event, count_entire_amount_spend, count_cost_basis_pnl in self._deferred_pnls:
+            self.pnls[event.type] += event.calculate_pnl(
+                count_entire_amount_spend=count_entire_amount_spend,
+                count_cost_basis_pnl=count_cost_basis_pnl,
+            )
+        self._deferred_pnls = []
+        deferred_events, self._deferred_events = self._deferred_events, []
+        for event in deferred_events:
+            self._save_processed_event(event)
+
     def get_rate_in_profit_currency(self, asset: Asset, timestamp: Timestamp) -> Price:
         """Get the profit_currency price of asset in the given timestamp
 
@@ -93,6 +172,7 @@ class AccountingPot(CustomizableDateMixin):
                 from_asset=asset,
                 to_asset=self.profit_currency,
                 timestamp=timestamp,
+                series_cache=self.price_cache,
             )
         return rate
 
@@ -102,16 +182,54 @@ class AccountingPot(CustomizableDateMixin):
             start_ts: Timestamp,
             end_ts: Timestamp,
             report_id: int,
+            cost_basis_processes: int = 0,
     ) -> None:
+        """Resets the pot for a new report. If cost_basis_processes is not zero the cost
+        basis is computed in that many worker processes after all events are processed.
+        It should only be given if can_defer_cost_basis() is True for the settings."""
         self.settings = settings
         self.report_id = report_id
+        if self.report_data is not None:
+            self.report_data.discard()
+        self.report_data = DBAccountingReports(self.database).report_data_writer(report_id)
+        # prices saved in the DB are cached only for the duration of a single report
+        self.price_cache = PriceSeriesCache()
         self.profit_currency = self.settings.main_currency.resolve_to_asset_with_oracles()
         self.query_start_ts = start_ts
         self.query_end_ts = end_ts
         self.pnls.reset()
-        self.cost_basis.reset(settings)
+        self.cost_basis_processes = cost_basis_processes
+        self.cost_basis.reset(settings, defer_operations=cost_basis_processes != 0)
+        self._deferred_events = []
+        self._deferred_pnls = []
         self.transactions.reset()
-        self.processed_events = []
+        self.processed_events_num = 0
+
+    def serialize_state(self) -> dict[str, Any]:
+        """Serializes the state built by the events processed so far, so that it can
+        be saved in a PnL report checkpoint.
+
+        The pnl totals are not part of it, since reports only resume from checkpoints
+        taken before their start, when there is no pnl counted yet.
+        """
+        return {
+            'processed_events_num': self.processed_events_num,
+            'cost_basis': self.cost_basis.serialize_state(),
+            'transactions': self.transactions.serialize_state(),
+        }
+
+    def restore_state(self, state: dict[str, Any]) -> None:
+        """Restores the state saved with serialize_state. Should be called after reset().
+
+        May raise:
+        - DeserializationError if the state is invalid
+        """
+        try:
+            self.processed_events_num = int(state['processed_events_num'])
+            self.cost_basis.restore_state(state['cost_basis'])
+            self.transactions.restore_state(state['transactions'])
+        except (KeyError, AttributeError, TypeError, ValueError) as e:
+            raise DeserializationError(f'Invalid accounting pot state: {str(e)}') from e
 
     def add_acquisition(
             self,  # pylint: disable=unused-argument
@@ -154,7 +272,7 @@ class AccountingPot(CustomizableDateMixin):
             asset=asset,
             amount=amount,
             price=price,
-            starting_index=len(self.processed_events),
+            starting_index=self.processed_events_num,
         )
         for prefork_event in prefork_events:
             self._add_processed_event(prefork_event)
@@ -176,17 +294,14 @@ class AccountingPot(CustomizableDateMixin):
             price=price,
             pnl=PNL(),  # filled out later
             cost_basis=None,
-            index=len(self.processed_events),
+            index=self.processed_events_num,
         )
         if extra_data:
             event.extra_data = extra_data
         self.cost_basis.obtain_asset(event)
         # count profit/losses if we are inside the query period
         if timestamp >= self.query_start_ts and taxable:
-            self.pnls[event_type] += event.calculate_pnl(
-                count_entire_amount_spend=False,
-                count_cost_basis_pnl=True,
-            )
+            self._count_pnl(event, count_entire_amount_spend=False, count_cost_basis_pnl=True)
 
         self._add_processed_event(event)
 
@@ -272,13 +387,14 @@ class AccountingPot(CustomizableDateMixin):
             price=price,
             pnl=PNL(),  # filled out later
             cost_basis=spend_cost,
-            index=len(self.processed_events),
+            index=self.processed_events_num,
         )
         if extra_data:
             spend_event.extra_data = extra_data
         # count profit/losses if we are inside the query period
         if timestamp >= self.query_start_ts and taxable:
-            self.pnls[event_type] += spend_event.calculate_pnl(
+            self._count_pnl(
+                event=spend_event,
                 count_entire_amount_spend=count_entire_amount_spend,
                 count_cost_basis_pnl=count_cost_basis_pnl,
             )
@@ -1,7 +1,7 @@
 import json
 import logging
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Iterator, Optional
+from typing import TYPE_CHECKING, Any, Collection, Iterator, Mapping, Optional
 
 from rotkehlchen.accounting.mixins.event import AccountingEventMixin, AccountingEventType
 from rotkehlchen.accounting.structures.types import (
@@ -273,7 +273,7 @@ class HistoryBaseEntry(AccountingEventMixin):
     def get_accounting_event_type() -> AccountingEventType:
         return AccountingEventType.HISTORY_BASE_ENTRY
 
-    def should_ignore(self, ignored_ids_mapping: dict[ActionType, list[str]]) -> bool:
+    def should_ignore(self, ignored_ids_mapping: Mapping[ActionType, Collection[str]]) -> bool:
         if not self.serialized_event_identifier.startswith('0x'):
             return False
 
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
+from typing import TYPE_CHECKING, Any, Callable, Collection, Iterator, Mapping, Optional
 
 from rotkehlchen.accounting.mixins.event import AccountingEventMixin, AccountingEventType
 from rotkehlchen.assets.asset import Asset, CryptoAsset
@@ -103,7 +103,7 @@ class DefiEvent(AccountingEventMixin):
         """DefiEvent should be eventually deleted. Will not be called from accounting"""
         raise AssertionError('Should never be called')
 
-    def should_ignore(self, ignored_ids_mapping: dict['ActionType', list[str]]) -> bool:
+    def should_ignore(self, ignored_ids_mapping: Mapping['ActionType', Collection[str]]) -> bool:
         """DefiEvent should be eventually deleted. Will not be called from accounting"""
         raise AssertionError('Should never be called')
 
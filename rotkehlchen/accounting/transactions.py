@@ -1,5 +1,5 @@
 import logging
-from typing import TYPE_CHECKING, Iterator
+from typing import TYPE_CHECKING, Any, Iterator
 
 from rotkehlchen.accounting.mixins.event import AccountingEventMixin, AccountingEventType
 from rotkehlchen.accounting.structures.base import HistoryBaseEntry
@@ -30,6 +30,14 @@ class TransactionsAccountant():
         self.evm_accounting_aggregators.reset()
         self.tx_event_settings = self.evm_accounting_aggregators.get_accounting_settings(self.pot)
 
+    def serialize_state(self) -> list[dict[str, dict[str, Any]]]:
+        """Get the state the module accountants keep between events"""
+        return self.evm_accounting_aggregators.serialize_state()
+
+    def restore_state(self, state: list[dict[str, dict[str, Any]]]) -> None:
+        """May raise DeserializationError if the state is invalid"""
+        self.evm_accounting_aggregators.restore_state(state)
+
     def process(
             self,
             event: HistoryBaseEntry,
@@ -1,5 +1,5 @@
 import json
-from typing import Any, NamedTuple, Union
+from typing import TYPE_CHECKING, Any, NamedTuple, Union
 
 import jsonschema
 
@@ -10,6 +10,9 @@ from rotkehlchen.types import Timestamp
 from rotkehlchen.utils.mixins.dbenum import DBEnumMixIn
 from rotkehlchen.utils.serialization import rlk_jsondumps
 
+if TYPE_CHECKING:
+    from rotkehlchen.accounting.structures.types import ActionType
+
 
 class SchemaEventType(DBEnumMixIn):
     """Supported Event Type schemas
@@ -134,3 +137,15 @@ class MissingPrice(NamedTuple):
             'time': self.time,
             'rate_limited': self.rate_limited,
         }
+
+
+class IgnoredEntries(NamedTuple):
+    """Snapshot of the user's ignored assets and action identifiers taken at the
+    start of history processing so that each event can be checked with hash lookups.
+
+    version is the DB's ignored entries version at the time the snapshot was
+    taken and is used to tell when the snapshot is stale.
+    """
+    assets: frozenset[Asset]
+    action_ids: dict['ActionType', frozenset[str]]
+    version: int
@@ -509,6 +509,18 @@ class RestAPI():
             status_code=HTTPStatus.OK,
         )
 
+    def get_exchanges_stats(self) -> Response:
+        result = [
+            {
+                'location': str(exchange.location),
+                'name': exchange.name,
+                **exchange.request_scheduler.serialize(),
+            }
+            for exchanges in self.rotkehlchen.exchange_manager.connected_exchanges.values()
+            for exchange in exchanges
+        ]
+        return api_response(_wrap_in_ok_result(result), status_code=HTTPStatus.OK)
+
     def setup_exchange(
             self,
             name: str,
@@ -2762,6 +2774,14 @@ class RestAPI():
         result_dict = _wrap_in_ok_result(process_result_list(list(nodes)))
         return api_response(result_dict, status_code=HTTPStatus.OK)
 
+    def get_rpc_nodes_stats(self, blockchain: SupportedBlockchain) -> Response:
+        manager = self.rotkehlchen.chains_aggregator.get_chain_manager(blockchain)  # type: ignore
+        result = [
+            {**node.serialize(), **stats.serialize()}
+            for node, stats in manager.node_inquirer.node_stats.items()
+        ]
+        return api_response(_wrap_in_ok_result(process_result_list(result)), status_code=HTTPStatus.OK)  # noqa: E501
+
     def add_rpc_node(self, node: WeightedNode) -> Response:
         try:
             self.rotkehlchen.data.db.add_rpc_node(node)
@@ -76,6 +76,7 @@ from rotkehlchen.api.v1.resources import (
     ExchangeRatesResource,
     ExchangesDataResource,
     ExchangesResource,
+    ExchangesStatsResource,
     ExternalServicesResource,
     HistoricalAssetsPriceResource,
     HistoryActionableItemsResource,
@@ -115,6 +116,7 @@ from rotkehlchen.api.v1.resources import (
     QueriedAddressesResource,
     ReverseEnsResource,
     RpcNodesResource,
+    RpcNodesStatsResource,
     SettingsResource,
     StakingResource,
     StatisticsAssetBalanceResource,
@@ -185,6 +187,7 @@ URLS_V1: URLS = [
     ('/exchanges/binance/pairs', BinanceAvailableMarkets),
     ('/exchanges/binance/pairs/<string:name>', BinanceUserMarkets),
     ('/exchanges/data', ExchangesDataResource),
+    ('/exchanges/stats', ExchangesStatsResource),
     ('/exchanges/data/<string:location>', ExchangesDataResource, 'named_exchanges_data_resource'),
     ('/balances/blockchains', BlockchainBalancesResource),
     (
@@ -263,6 +266,7 @@ URLS_V1: URLS = [
     ('/blockchains/evm/accounts', EvmAccountsResource),
     ('/blockchains/<string:blockchain>/accounts', BlockchainsAccountsResource),
     ('/blockchains/<string:blockchain>/nodes', RpcNodesResource),
+    ('/blockchains/<string:blockchain>/nodes/stats', RpcNodesStatsResource),
     ('/blockchains/<string:blockchain>/tokens/detect', DetectTokensResource),
     ('/blockchains/<string:blockchain>/xpub', BTCXpubResource),
     ('/blockchains/AVAX/transactions', AvalancheTransactionsResource),
@@ -115,6 +115,7 @@ from rotkehlchen.api.v1.schemas import (
     RpcNodeEditSchema,
     RpcNodeListDeleteSchema,
     RpcNodeSchema,
+    RpcNodeStatsSchema,
     SingleAssetIdentifierSchema,
     SingleAssetWithOraclesIdentifierSchema,
     SingleFileSchema,
@@ -453,6 +454,13 @@ class ExchangesResource(BaseMethodView):
         return self.rest_api.remove_exchange(name=name, location=location)
 
 
+class ExchangesStatsResource(BaseMethodView):
+
+    @require_loggedin_user()
+    def get(self) -> Response:
+        return self.rest_api.get_exchanges_stats()
+
+
 class ExchangesDataResource(BaseMethodView):
 
     delete_schema = ExchangesDataResourceSchema()
@@ -606,6 +614,16 @@ class RpcNodesResource(BaseMethodView):
         return self.rest_api.delete_rpc_node(identifier=identifier, blockchain=blockchain)
 
 
+class RpcNodesStatsResource(BaseMethodView):
+
+    get_schema = RpcNodeStatsSchema()
+
+    @require_loggedin_user()
+    @use_kwargs(get_schema, location='view_args')
+    def get(self, blockchain: SupportedBlockchain) -> Response:
+        return self.rest_api.get_rpc_nodes_stats(blockchain=blockchain)
+
+
 class ExternalServicesResource(BaseMethodView):
 
     put_schema = ExternalServicesResourceAddSchema()
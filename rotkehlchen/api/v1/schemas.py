@@ -2651,6 +2651,13 @@ class RpcNodeSchema(Schema):
     blockchain = BlockchainField(required=True, exclude_types=(SupportedBlockchain.ETHEREUM_BEACONCHAIN,))  # noqa: E501
 
 
+class RpcNodeStatsSchema(Schema):
+    blockchain = BlockchainField(
+        required=True,
+        exclude_types=[x for x in SupportedBlockchain if x not in (SupportedBlockchain.ETHEREUM, SupportedBlockchain.OPTIMISM)],  # noqa: E501
+    )
+
+
 class RpcAddNodeSchema(Schema):
     blockchain = BlockchainField(required=True, exclude_types=(SupportedBlockchain.ETHEREUM_BEACONCHAIN,))  # noqa: E501
     name = fields.String(
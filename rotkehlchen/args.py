@@ -130,6 +130,15 @@ def app_args(prog: str, description: str) -> argparse.ArgumentParser:
         default=DEFAULT_SQL_VM_INSTRUCTIONS_CB,
         type=_positive_int_or_zero,
     )
+    p.add_argument(
+        '--accounting-processes',
+        help=(
+            'Number of worker processes used to compute the cost basis of PnL reports. '
+            'Zero to compute it while processing the events.'
+        ),
+        default=0,
+        type=_positive_int_or_zero,
+    )
     p.add_argument(
         'version',
         help='Shows the rotkehlchen version',
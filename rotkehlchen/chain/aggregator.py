@@ -1,4 +1,5 @@
 import logging
+import time
 from collections import defaultdict
 from importlib import import_module
 from pathlib import Path
@@ -17,6 +18,7 @@ from typing import (
 )
 
 from gevent.lock import Semaphore
+from gevent.pool import Pool
 from web3.exceptions import BadFunctionCallOutput
 
 from rotkehlchen.accounting.structures.balance import Balance, BalanceSheet
@@ -115,6 +117,10 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
+# Chains whose balances are queried at the same time when querying all of them.
+# Setting it to 1 queries them one after the other.
+CHAINS_QUERY_CONCURRENCY = len(SupportedBlockchain)
+
 
 def _module_name_to_class(module_name: ModuleName) -> type[EthereumModule]:
     class_name = ''.join(word.title() for word in module_name.split('_'))
@@ -458,20 +464,49 @@ class ChainsAggregator(CacheableMixIn, LockableQueryMixIn):
         """
         xpub_manager = XpubManager(chains_aggregator=self)
         if blockchain is not None:
-            query_method = f'query_{blockchain.get_key()}_balances'
-            getattr(self, query_method)(ignore_cache=ignore_cache)
-            if ignore_cache is True and blockchain.is_bitcoin():
-                xpub_manager.check_for_new_xpub_addresses(blockchain=blockchain)  # type: ignore # is checked in the if  # noqa: E501
-        else:  # all chains
-            for chain in SupportedBlockchain:
-                query_method = f'query_{chain.get_key()}_balances'
-                getattr(self, query_method)(ignore_cache=ignore_cache)
-                if ignore_cache is True and chain.is_bitcoin():
-                    xpub_manager.check_for_new_xpub_addresses(blockchain=chain)  # type: ignore # is checked in the if  # noqa: E501
+            self._query_chain_balances(
+                chain=blockchain,
+                ignore_cache=ignore_cache,
+                xpub_manager=xpub_manager,
+            )
+        else:  # all chains. They use different remotes so query them at the same time
+            pool = Pool(size=CHAINS_QUERY_CONCURRENCY)
+            greenlets = [pool.spawn(
+                self._query_chain_balances,
+                chain=chain,
+                ignore_cache=ignore_cache,
+                xpub_manager=xpub_manager,
+            ) for chain in SupportedBlockchain]
+            try:
+                pool.join()
+            finally:  # don't leave queries running if this greenlet gets killed
+                pool.kill()
+            for greenlet in greenlets:  # raise the first error after all chains are queried
+                greenlet.get()
 
         self.totals = self.balances.recalculate_totals()
         return self.get_balances_update(blockchain)
 
+    def _query_chain_balances(
+            self,
+            chain: SupportedBlockchain,
+            ignore_cache: bool,
+            xpub_manager: XpubManager,
+    ) -> None:
+        """Queries the balances of a single chain and logs how long it took
+
+        May raise the same errors as query_balances
+        """
+        start = time.monotonic()
+        getattr(self, f'query_{chain.get_key()}_balances')(ignore_cache=ignore_cache)
+        if ignore_cache is True and chain.is_bitcoin():
+            xpub_manager.check_for_new_xpub_addresses(blockchain=chain)  # type: ignore # is checked in the if  # noqa: E501
+        log.debug(
+            f'Queried {chain.value} balances',
+            seconds=round(time.monotonic() - start, 3),
+            ignore_cache=ignore_cache,
+        )
+
     @protect_with_lock()
     @cache_response_timewise()
     def query_btc_balances(
@@ -51,8 +51,8 @@ class EthereumTransactionDecoder(EVMTransactionDecoder):
             transactions=transactions,
             value_asset=A_ETH.resolve_to_asset_with_oracles(),
             event_rules=[  # rules to try for all tx receipt logs decoding
-                self._maybe_decode_governance,
-                self._maybe_enrich_transfers,
+                ((GOVERNORALPHA_PROPOSE,), self._maybe_decode_governance),
+                ((GTC_CLAIM, ONEINCH_CLAIM, GNOSIS_CHAIN_BRIDGE_RECEIVE), self._maybe_enrich_transfers),  # noqa: E501
             ],
             misc_counterparties=[CPT_GNOSIS_CHAIN],
         )
@@ -1,5 +1,5 @@
 from collections import defaultdict
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from rotkehlchen.accounting.mixins.event import AccountingEventType
 from rotkehlchen.accounting.structures.base import HistoryBaseEntry, get_tx_event_type_identifier
@@ -9,7 +9,9 @@ from rotkehlchen.chain.evm.accounting.interfaces import ModuleAccountantInterfac
 from rotkehlchen.chain.evm.accounting.structures import TxEventSettings
 from rotkehlchen.chain.evm.types import string_to_evm_address
 from rotkehlchen.constants.misc import ZERO
+from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.fval import FVal
+from rotkehlchen.serialization.deserialize import deserialize_fval
 from rotkehlchen.types import ChecksumEvmAddress
 
 from ..constants import CPT_AAVE_V2
@@ -24,6 +26,27 @@ class Aavev2Accountant(ModuleAccountantInterface):
         self.assets_borrowed: dict[tuple[ChecksumEvmAddress, Asset], FVal] = defaultdict(FVal)
         self.assets_supplied: dict[tuple[ChecksumEvmAddress, Asset], FVal] = defaultdict(FVal)
 
+    def serialize_state(self) -> dict[str, Any]:
+        return {
+            'assets_borrowed': [
+                (address, asset.identifier, str(amount))
+                for (address, asset), amount in self.assets_borrowed.items()
+            ],
+            'assets_supplied': [
+                (address, asset.identifier, str(amount))
+                for (address, asset), amount in self.assets_supplied.items()
+            ],
+        }
+
+    def restore_state(self, state: dict[str, Any]) -> None:
+        try:
+            for address, identifier, amount in state['assets_borrowed']:
+                self.assets_borrowed[(string_to_evm_address(address), Asset(identifier))] = deserialize_fval(amount, name='borrowed amount', location='aave v2 accountant')  # noqa: E501
+            for address, identifier, amount in state['assets_supplied']:
+                self.assets_supplied[(string_to_evm_address(address), Asset(identifier))] = deserialize_fval(amount, name='supplied amount', location='aave v2 accountant')  # noqa: E501
+        except (KeyError, ValueError, TypeError) as e:
+            raise DeserializationError(f'Invalid aave v2 accountant state: {str(e)}') from e
+
     def _process_borrow(
             self,
             pot: 'AccountingPot',  # pylint: disable=unused-argument
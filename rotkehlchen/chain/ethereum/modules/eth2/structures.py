@@ -1,6 +1,6 @@
 import decimal
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Iterator, Literal, NamedTuple, Optional
+from typing import TYPE_CHECKING, Any, Collection, Iterator, Literal, Mapping, NamedTuple, Optional
 
 from rotkehlchen.accounting.mixins.event import AccountingEventMixin, AccountingEventType
 from rotkehlchen.accounting.structures.balance import Balance
@@ -264,7 +264,7 @@ class ValidatorDailyStats(AccountingEventMixin):
     def get_assets(self) -> list['Asset']:
         return [A_ETH, A_ETH2]
 
-    def should_ignore(self, ignored_ids_mapping: dict[ActionType, list[str]]) -> bool:
+    def should_ignore(self, ignored_ids_mapping: Mapping[ActionType, Collection[str]]) -> bool:
         return False
 
     def process(
@@ -1,5 +1,5 @@
 from collections import defaultdict
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Any, cast
 
 from rotkehlchen.accounting.mixins.event import AccountingEventType
 from rotkehlchen.accounting.structures.base import HistoryBaseEntry, get_tx_event_type_identifier
@@ -8,7 +8,9 @@ from rotkehlchen.chain.evm.accounting.interfaces import ModuleAccountantInterfac
 from rotkehlchen.chain.evm.accounting.structures import TxEventSettings, TxMultitakeTreatment
 from rotkehlchen.constants import ZERO
 from rotkehlchen.constants.assets import A_DAI
+from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.fval import FVal
+from rotkehlchen.serialization.deserialize import deserialize_fval
 from rotkehlchen.types import ChecksumEvmAddress
 
 from .constants import CPT_DSR, CPT_MIGRATION, CPT_VAULT
@@ -23,6 +25,21 @@ class MakerdaoAccountant(ModuleAccountantInterface):
         self.vault_balances: dict[str, FVal] = defaultdict(FVal)
         self.dsr_balances: dict[ChecksumEvmAddress, FVal] = defaultdict(FVal)
 
+    def serialize_state(self) -> dict[str, Any]:
+        return {
+            'vault_balances': {k: str(v) for k, v in self.vault_balances.items()},
+            'dsr_balances': {k: str(v) for k, v in self.dsr_balances.items()},
+        }
+
+    def restore_state(self, state: dict[str, Any]) -> None:
+        try:
+            for cdp_id, amount in state['vault_balances'].items():
+                self.vault_balances[cdp_id] = deserialize_fval(amount, name='vault balance', location='makerdao accountant')  # noqa: E501
+            for address, amount in state['dsr_balances'].items():
+                self.dsr_balances[address] = deserialize_fval(amount, name='dsr balance', location='makerdao accountant')  # noqa: E501
+        except (KeyError, AttributeError) as e:
+            raise DeserializationError(f'Invalid makerdao accountant state: {str(e)}') from e
+
     def _process_vault_dai_generation(
             self,
             pot: 'AccountingPot',  # pylint: disable=unused-argument
@@ -10,7 +10,7 @@ from rotkehlchen.chain.ethereum.modules.uniswap.v2.common import (
     decode_uniswap_v2_like_swap,
     enrich_uniswap_v2_like_lp_tokens_transfers,
 )
-from rotkehlchen.chain.evm.decoding.interfaces import DecoderInterface
+from rotkehlchen.chain.evm.decoding.interfaces import DecoderInterface, DecodingRule
 from rotkehlchen.chain.evm.decoding.structures import ActionItem
 from rotkehlchen.chain.evm.structures import EvmTxReceiptLog
 from rotkehlchen.chain.evm.types import string_to_evm_address
@@ -165,10 +165,10 @@ class Uniswapv2Decoder(DecoderInterface):
 
     # -- DecoderInterface methods
 
-    def decoding_rules(self) -> list[Callable]:
+    def decoding_rules(self) -> list[DecodingRule]:
         return [
-            self._maybe_decode_v2_swap,
-            self._maybe_decode_v2_liquidity_addition_and_removal,
+            ((SWAP_SIGNATURE,), self._maybe_decode_v2_swap),
+            ((MINT_SIGNATURE, BURN_SIGNATURE), self._maybe_decode_v2_liquidity_addition_and_removal),  # noqa: E501
         ]
 
     def enricher_rules(self) -> list[Callable]:
@@ -10,7 +10,7 @@ from rotkehlchen.chain.ethereum.modules.uniswap.utils import decode_basic_uniswa
 from rotkehlchen.chain.ethereum.utils import asset_normalized_value
 from rotkehlchen.chain.evm.constants import ZERO_ADDRESS
 from rotkehlchen.chain.evm.decoding.constants import CPT_GAS
-from rotkehlchen.chain.evm.decoding.interfaces import DecoderInterface
+from rotkehlchen.chain.evm.decoding.interfaces import DecoderInterface, DecodingRule
 from rotkehlchen.chain.evm.decoding.structures import ActionItem
 from rotkehlchen.chain.evm.structures import EvmTxReceiptLog
 from rotkehlchen.chain.evm.types import string_to_evm_address
@@ -543,9 +543,9 @@ class Uniswapv3Decoder(DecoderInterface):
         return False
     # -- DecoderInterface methods
 
-    def decoding_rules(self) -> list[Callable]:
+    def decoding_rules(self) -> list[DecodingRule]:
         return [
-            self._maybe_decode_v3_swap,
+            ((SWAP_SIGNATURE,), self._maybe_decode_v3_swap),
         ]
 
     def addresses_to_decoders(self) -> dict[ChecksumEvmAddress, tuple[Any, ...]]:
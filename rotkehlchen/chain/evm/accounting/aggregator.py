@@ -2,13 +2,14 @@ import importlib
 import logging
 import pkgutil
 from types import ModuleType
-from typing import TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, Any, Union
 from rotkehlchen.accounting.ledger_actions import LedgerActionType
 
 from rotkehlchen.accounting.structures.types import HistoryEventSubType, HistoryEventType
 from rotkehlchen.chain.ethereum.constants import MODULES_PACKAGE, MODULES_PREFIX_LENGTH
 from rotkehlchen.chain.evm.decoding.constants import CPT_GAS
 from rotkehlchen.errors.misc import ModuleLoadingError
+from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.user_messages import MessagesAggregator
 
@@ -96,6 +97,25 @@ class EVMAccountingAggregator():
         for accountant in self.accountants.values():
             accountant.reset()
 
+    def serialize_state(self) -> dict[str, dict[str, Any]]:
+        """Get the state of all submodule accountants that keep any"""
+        result = {}
+        for name, accountant in self.accountants.items():
+            if len(state := accountant.serialize_state()) != 0:
+                result[name] = state
+
+        return result
+
+    def restore_state(self, state: dict[str, dict[str, Any]]) -> None:
+        """Restore the state of the submodule accountants saved with serialize_state
+
+        May raise:
+        - DeserializationError if the state of an accountant is invalid
+        """
+        for name, accountant_state in state.items():
+            if (accountant := self.accountants.get(name)) is not None:
+                accountant.restore_state(accountant_state)
+
 
 class EVMAccountingAggregators():
     """
@@ -227,3 +247,21 @@ class EVMAccountingAggregators():
         """Reset the state of all initialized submodule accountants"""
         for aggregator in self.aggregators:
             aggregator.reset()
+
+    def serialize_state(self) -> list[dict[str, dict[str, Any]]]:
+        """Get the state of the submodule accountants of each aggregator"""
+        return [aggregator.serialize_state() for aggregator in self.aggregators]
+
+    def restore_state(self, state: list[dict[str, dict[str, Any]]]) -> None:
+        """Restore the state saved with serialize_state
+
+        May raise:
+        - DeserializationError if the state is invalid
+        """
+        if len(state) != len(self.aggregators):
+            raise DeserializationError(
+                f'Got state for {len(state)} accounting aggregators '
+                f'but {len(self.aggregators)} exist',
+            )
+        for aggregator, aggregator_state in zip(self.aggregators, state):
+            aggregator.restore_state(aggregator_state)
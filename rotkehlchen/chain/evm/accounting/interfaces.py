@@ -1,5 +1,5 @@
 from abc import ABCMeta, abstractmethod
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
     from rotkehlchen.accounting.pot import AccountingPot
@@ -36,3 +36,17 @@ class ModuleAccountantInterface(metaclass=ABCMeta):
     def reset(self) -> None:  # pylint: disable=no-self-use
         """Subclasses may implement this to reset state between accounting runs"""
         return None
+
+    def serialize_state(self) -> dict[str, Any]:  # pylint: disable=no-self-use
+        """Subclasses that keep state between events implement this to save it
+        in PnL report checkpoints"""
+        return {}
+
+    def restore_state(self, state: dict[str, Any]) -> None:  # pylint: disable=no-self-use
+        """Subclasses that keep state between events implement this to restore it
+        from a PnL report checkpoint. Called after reset().
+
+        May raise:
+        - DeserializationError if the given state is invalid
+        """
+        return None
@@ -1,12 +1,15 @@
 import importlib
 import logging
 import pkgutil
+import time
 from abc import ABCMeta, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from types import ModuleType
 from typing import TYPE_CHECKING, Any, Callable, Optional, Protocol, Union
 
+import gevent
 from gevent.lock import Semaphore
+from gevent.queue import Queue
 
 from rotkehlchen.accounting.structures.balance import Balance
 from rotkehlchen.accounting.structures.base import HistoryBaseEntry
@@ -14,10 +17,10 @@ from rotkehlchen.accounting.structures.types import HistoryEventSubType, History
 from rotkehlchen.assets.asset import AssetWithOracles, EvmToken
 from rotkehlchen.assets.utils import TokenSeenAt, get_or_create_evm_token
 from rotkehlchen.chain.ethereum.utils import token_normalized_value
-from rotkehlchen.chain.evm.decoding.interfaces import ReloadableDecoderMixin
+from rotkehlchen.chain.evm.decoding.interfaces import DecodingRule, ReloadableDecoderMixin
 from rotkehlchen.chain.evm.structures import EvmTxReceipt, EvmTxReceiptLog
 from rotkehlchen.constants import ZERO
-from rotkehlchen.db.constants import HISTORY_MAPPING_STATE_DECODED
+from rotkehlchen.db.constants import HISTORY_MAPPING_STATE_DECODED, SQL_VARIABLES_LIMIT
 from rotkehlchen.db.evmtx import DBEvmTx
 from rotkehlchen.db.filtering import EvmTransactionsFilterQuery, HistoryEventFilterQuery
 from rotkehlchen.db.history_events import DBHistoryEvents
@@ -37,6 +40,7 @@ from rotkehlchen.types import (
 )
 from rotkehlchen.utils.misc import (
     from_wei,
+    get_chunks,
     hex_or_bytes_to_address,
     hex_or_bytes_to_int,
     ts_sec_to_ms,
@@ -45,7 +49,7 @@ from rotkehlchen.utils.mixins.customizable_date import CustomizableDateMixin
 
 from .base import BaseDecoderTools
 from .constants import CPT_GAS, ERC20_APPROVE, ERC20_OR_ERC721_TRANSFER, OUTGOING_EVENT_TYPES
-from .structures import ActionItem
+from .structures import ActionItem, DecodingPipelineStats
 from .utils import maybe_reshuffle_events
 
 if TYPE_CHECKING:
@@ -59,6 +63,9 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
+DECODING_QUEUE_SIZE = 100  # loaded transactions waiting to be decoded
+WRITE_BATCH_SIZE = 50  # decoded transactions whose events are written in one DB transaction
+
 
 class EventDecoderFunction(Protocol):
 
@@ -77,10 +84,14 @@ class EventDecoderFunction(Protocol):
 @dataclass(init=True, repr=True, eq=True, order=False, unsafe_hash=False, frozen=True)
 class DecodingRules():
     address_mappings: dict[ChecksumEvmAddress, tuple[Any, ...]]
-    event_rules: list[EventDecoderFunction]
+    event_rules: list[DecodingRule]
     token_enricher_rules: list[Callable]  # enrichers to run for token transfers
     post_decoding_rules: list[tuple[int, Callable]]  # rules to run after the main decoding loop
     all_counterparties: set[str]
+    # the event rules to try for each topic0 and for logs of any other topic0.
+    # Populated by index_event_rules()
+    event_rules_by_topic: dict[bytes, list[EventDecoderFunction]] = field(default_factory=dict)
+    wildcard_event_rules: list[EventDecoderFunction] = field(default_factory=list)
 
     def __add__(self, other: 'DecodingRules') -> 'DecodingRules':
         if not isinstance(other, DecodingRules):
@@ -95,6 +106,35 @@ class DecodingRules():
             all_counterparties=self.all_counterparties | other.all_counterparties,
         )
 
+    def index_event_rules(self) -> None:
+        """Indexes the event rules by the topic0 signatures they were given with.
+
+        The rules of a topic0 are the ones given with it along with the rules given without
+        any signatures, in the order of event_rules. Logs of any other topic0 only
+        need to go through the rules given without any signatures.
+        """
+        self.event_rules_by_topic.clear()
+        self.wildcard_event_rules.clear()
+        for rule in self.event_rules:
+            if isinstance(rule, tuple):
+                self.event_rules_by_topic.update((topic, []) for topic in rule[0])
+
+        for rule in self.event_rules:
+            if isinstance(rule, tuple):
+                topics, function = rule
+                for topic in dict.fromkeys(topics):
+                    self.event_rules_by_topic[topic].append(function)
+            else:
+                self.wildcard_event_rules.append(rule)
+                for topic_rules in self.event_rules_by_topic.values():
+                    topic_rules.append(rule)
+
+    def get_event_rules(self, tx_log: EvmTxReceiptLog) -> list[EventDecoderFunction]:
+        """Returns the event rules to try for the given log. Needs index_event_rules()"""
+        if len(tx_log.topics) == 0:
+            return self.wildcard_event_rules
+        return self.event_rules_by_topic.get(tx_log.topics[0], self.wildcard_event_rules)
+
 
 class EVMTransactionDecoder(metaclass=ABCMeta):
 
@@ -104,7 +144,7 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
             evm_inquirer: 'EvmNodeInquirer',
             transactions: 'EvmTransactions',
             value_asset: AssetWithOracles,
-            event_rules: list[EventDecoderFunction],
+            event_rules: list[DecodingRule],
             misc_counterparties: list[str],
     ):
         """
@@ -113,8 +153,8 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
         `value_asset` is the asset that is normally transferred at value transfers
         and the one that is spent for gas in this chain
 
-        `event_rules` is a list of callables to act as decoding rules for all tx
-        receipt logs decoding for the particular chain
+        `event_rules` is a list of decoding rules for all tx receipt logs decoding for the
+        particular chain. Same as the ones of DecoderInterface.decoding_rules()
 
         `misc_counterparties` is a list of counterparties not associated with any specific
         decoder that should be included for this decoder modules.
@@ -137,8 +177,8 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
         self.rules = DecodingRules(
             address_mappings={},
             event_rules=[
-                self._maybe_decode_erc20_approve,
-                self._maybe_decode_erc20_721_transfer,
+                ((ERC20_APPROVE,), self._maybe_decode_erc20_approve),
+                ((ERC20_OR_ERC721_TRANSFER,), self._maybe_decode_erc20_721_transfer),
             ],
             token_enricher_rules=[],
             post_decoding_rules=[],
@@ -152,7 +192,9 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
         self.rules += rules
         # Sort post decoding rules by priority (which is the first element of the tuple)
         self.rules.post_decoding_rules.sort(key=lambda x: x[0], reverse=True)
+        self.rules.index_event_rules()
         self.undecoded_tx_query_lock = Semaphore()
+        self.decoding_stats: Optional[DecodingPipelineStats] = None  # of the last pipeline run
 
     def _recursively_initialize_decoders(
             self,
@@ -231,7 +273,7 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
             action_items: list[ActionItem],
             all_logs: list[EvmTxReceiptLog],
     ) -> tuple[Optional[HistoryBaseEntry], list[ActionItem]]:
-        for rule in self.rules.event_rules:
+        for rule in self.rules.get_event_rules(tx_log):
             event, new_action_items = rule(token=token, tx_log=tx_log, transaction=transaction, decoded_events=decoded_events, action_items=action_items, all_logs=all_logs)  # noqa: E501
             if event is not None or len(new_action_items) > 0:
                 return event, new_action_items
@@ -294,6 +336,24 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
             tx_receipt: EvmTxReceipt,
     ) -> list[HistoryBaseEntry]:
         """Decodes an evm transaction and its receipt and saves result in the DB"""
+        events = self._decode_transaction(transaction=transaction, tx_receipt=tx_receipt)
+        with self.database.user_write() as write_cursor:
+            self._write_decoded_events(
+                write_cursor=write_cursor,
+                transaction=transaction,
+                events=events,
+            )
+
+        return events
+
+    def _decode_transaction(
+            self,
+            transaction: EvmTransaction,
+            tx_receipt: EvmTxReceipt,
+    ) -> list[HistoryBaseEntry]:
+        """Decodes an evm transaction and its receipt without touching the decoded events
+        in the DB. Decoders keep state for the transaction being decoded so only one
+        transaction can be decoded at a time."""
         self.base.reset_sequence_counter()
         # check if any eth transfer happened in the transaction, including in internal transactions
         events = self._maybe_decode_simple_transactions(transaction, tx_receipt)
@@ -307,6 +367,9 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
                 events.append(event)
                 continue
 
+            if len(self.rules.get_event_rules(tx_log)) == 0:
+                continue  # no rule decodes logs with this topic0
+
             token = GlobalDBHandler.get_evm_token(
                 address=tx_log.address,
                 chain_id=self.evm_inquirer.chain_id,
@@ -332,19 +395,43 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
         if len(events) == 0 and (eth_event := self._get_eth_transfer_event(transaction)) is not None:  # noqa: E501
             events = [eth_event]
 
-        with self.database.user_write() as write_cursor:
-            self.dbevents.add_history_events(
-                write_cursor=write_cursor,
-                history=events,
-                chain_id=self.evm_inquirer.chain_id,
-            )
-            write_cursor.execute(
-                'INSERT OR IGNORE INTO evm_tx_mappings(tx_hash, chain_id, value) VALUES(?, ?, ?)',
-                (transaction.tx_hash, self.evm_inquirer.chain_id.serialize_for_db(), HISTORY_MAPPING_STATE_DECODED),  # noqa: E501
-            )
-
         return sorted(events, key=lambda x: x.sequence_index, reverse=False)
 
+    def _write_decoded_events(
+            self,
+            write_cursor: 'DBCursor',
+            transaction: EvmTransaction,
+            events: list[HistoryBaseEntry],
+    ) -> None:
+        """Saves the decoded events of a transaction and marks it as decoded"""
+        self.dbevents.add_history_events(
+            write_cursor=write_cursor,
+            history=events,
+            chain_id=self.evm_inquirer.chain_id,
+        )
+        write_cursor.execute(
+            'INSERT OR IGNORE INTO evm_tx_mappings(tx_hash, chain_id, value) VALUES(?, ?, ?)',
+            (transaction.tx_hash, self.evm_inquirer.chain_id.serialize_for_db(), HISTORY_MAPPING_STATE_DECODED),  # noqa: E501
+        )
+
+    def _delete_decoded_events(
+            self,
+            write_cursor: 'DBCursor',
+            tx_hashes: list[EVMTxHash],
+    ) -> None:
+        """Deletes the decoded events of the given transactions except the customized ones
+        and marks the transactions as not decoded"""
+        self.dbevents.delete_events_by_tx_hash(
+            write_cursor=write_cursor,
+            tx_hashes=tx_hashes,
+            chain_id=self.evm_inquirer.chain_id,
+        )
+        serialized_chain_id = self.evm_inquirer.chain_id.serialize_for_db()
+        write_cursor.executemany(
+            'DELETE from evm_tx_mappings WHERE tx_hash=? AND chain_id=? AND value=?',
+            [(tx_hash, serialized_chain_id, HISTORY_MAPPING_STATE_DECODED) for tx_hash in tx_hashes],  # noqa: E501
+        )
+
     def get_and_decode_undecoded_transactions(
             self,
             limit: Optional[int] = None,
@@ -377,7 +464,6 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
         - RemoteError if there is a problem with contacting a remote to get receipts
         - InputError if the transaction hash is not found in the DB
         """
-        events = []
         with self.database.conn.read_ctx() as cursor:
             self.reload_data(cursor)
             # If no transaction hashes are passed, decode all transactions.
@@ -386,26 +472,196 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
                 for entry in cursor.execute('SELECT tx_hash FROM evm_transactions'):
                     tx_hashes.append(EVMTxHash(entry[0]))
 
+        # The transactions are loaded, decoded and written in a pipeline. A greenlet
+        # loads them in bulk and another one writes their events in batches, while
+        # they are decoded here one after the other.
+        stats = self.decoding_stats = DecodingPipelineStats()
+        decode_queue: Queue = Queue(maxsize=DECODING_QUEUE_SIZE)
+        write_queue: Queue = Queue()  # the returned events are kept in memory anyway
+        loader = gevent.spawn(self._load_transactions_to_decode, tx_hashes, ignore_cache, decode_queue, stats)  # noqa: E501
+        writer = gevent.spawn(self._write_decoded_transactions, ignore_cache, write_queue, stats)
+        events = []
+        try:
+            while (entry := decode_queue.get()) is not None:
+                if isinstance(entry, Exception):
+                    raise entry
+
+                transaction, tx_receipt, cached_events = entry
+                if cached_events is not None:
+                    events.extend(cached_events)
+                    continue
+
+                start = time.monotonic()
+                decoded_events = self._decode_transaction(transaction=transaction, tx_receipt=tx_receipt)  # noqa: E501
+                stats.decoding_seconds += time.monotonic() - start
+                stats.decoded_transactions += 1
+                events.extend(decoded_events)
+                if writer.dead:
+                    writer.get()  # raises the error the writer stopped with
+                write_queue.put((transaction, decoded_events))
+                stats.max_write_queue_depth = max(stats.max_write_queue_depth, write_queue.qsize())  # noqa: E501
+        except Exception as e:
+            # write what was decoded before the error but raise the error itself
+            write_queue.put(None)
+            writer.join()
+            if writer.exception is not None and writer.exception is not e:
+                log.error(f'Failed to write the decoded transactions due to {str(writer.exception)}')  # noqa: E501
+            raise
+        else:
+            write_queue.put(None)
+            writer.get()  # raises the error the writer stopped with
+        finally:
+            loader.kill()
+            writer.kill()  # only still running if decoding was killed
+            stats.end = time.monotonic()
+            tokens_cache = GlobalDBHandler().evm_tokens_cache
+            log.debug(
+                f'{self.evm_inquirer.chain_name} transactions decoding pipeline finished with '
+                f'{stats.serialize()}. EVM tokens cache hits: {tokens_cache.hits} '
+                f'misses: {tokens_cache.misses}',
+            )
+
+        return events
+
+    def _load_transactions_to_decode(
+            self,
+            tx_hashes: list[EVMTxHash],
+            ignore_cache: bool,
+            decode_queue: Queue,
+            stats: DecodingPipelineStats,
+    ) -> None:
+        """Loads the transactions and receipts of the given hashes from the DB in bulk
+        and puts them in the decode queue, along with the events already in the DB if
+        the transaction is already decoded and ignore_cache is False.
+
+        Receipts missing from the DB are queried in bulk. None is put in the queue after
+        the last transaction, or the error that stopped the loading.
+        """
+        serialized_chain_id = self.evm_inquirer.chain_id.serialize_for_db()
+        try:
+            # one batch of hashes fits in a single query of each of the receipt tables
+            for tx_hashes_batch in get_chunks(tx_hashes, n=SQL_VARIABLES_LIMIT - 2):
+                try:  # also adds the transactions that are not in the DB
+                    receipts = self.transactions.get_or_query_transaction_receipts(tx_hashes_batch)  # noqa: E501
+                except RemoteError as e:
+                    log.debug(f'Failed to query the receipts of a batch of {len(tx_hashes_batch)} transactions due to {str(e)}. Querying them one by one')  # noqa: E501
+                    receipts = self._get_or_query_receipts_one_by_one(tx_hashes_batch)
+
+                decoded_tx_hashes = set()
+                if ignore_cache is False:
+                    with self.database.conn.read_ctx() as cursor:
+                        cursor.execute(
+                            f'SELECT tx_hash FROM evm_tx_mappings WHERE chain_id=? AND value=? '
+                            f'AND tx_hash IN ({",".join("?" * len(tx_hashes_batch))})',
+                            (serialized_chain_id, HISTORY_MAPPING_STATE_DECODED, *tx_hashes_batch),  # noqa: E501
+                        )
+                        decoded_tx_hashes = {x[0] for x in cursor}
+
+                with self.database.conn.read_ctx() as cursor:
+                    transactions = {x.tx_hash: x for x in self.dbevmtx.get_evm_transactions(
+                        cursor=cursor,
+                        filter_=EvmTransactionsFilterQuery.make(tx_hashes=tx_hashes_batch, chain_id=self.evm_inquirer.chain_id),  # noqa: E501
+                        has_premium=True,  # ignore limiting here
+                    )}
+
+                for tx_hash in tx_hashes_batch:
+                    cached_events = None
+                    if tx_hash in decoded_tx_hashes:  # already decoded and in the DB
+                        with self.database.conn.read_ctx() as cursor:
+                            cached_events = self.dbevents.get_history_events(
+                                cursor=cursor,
+                                filter_query=HistoryEventFilterQuery.make(
+                                    event_identifiers=[tx_hash],
+                                ),
+                                has_premium=True,  # for this function we don't limit anything
+                            )
+                        stats.cached_transactions += 1
+
+                    decode_queue.put((transactions[tx_hash], receipts[tx_hash], cached_events))
+                    stats.loaded_transactions += 1
+                    stats.max_decode_queue_depth = max(stats.max_decode_queue_depth, decode_queue.qsize())  # noqa: E501
+        except Exception as e:  # pylint: disable=broad-except  # raised by the decoding loop
+            decode_queue.put(e)
+        else:
+            decode_queue.put(None)
+
+    def _get_or_query_receipts_one_by_one(
+            self,
+            tx_hashes: list[EVMTxHash],
+    ) -> dict[EVMTxHash, EvmTxReceipt]:
+        """Gets the receipts of the given hashes querying the missing ones one by one.
+        Used when querying them in bulk failed, so that an error of one hash does not
+        fail the whole batch and only a hash that can't be found is reported as such.
+
+        May raise:
+        - DeserializationError if there is a problem with contacting a remote to get receipts
+        - RemoteError if the receipt of a transaction that is in the DB can't be queried
+        - InputError if the transaction hash is not found in the DB or the nodes
+        """
+        with self.database.conn.read_ctx() as cursor:
+            receipts = self.dbevmtx.get_receipts(
+                cursor=cursor,
+                tx_hashes=tx_hashes,
+                chain_id=self.evm_inquirer.chain_id,
+            )
+
         for tx_hash in tx_hashes:
+            if tx_hash in receipts:
+                continue
+
             try:
-                receipt = self.transactions.get_or_query_transaction_receipt(tx_hash)
+                receipts[tx_hash] = self.transactions.get_or_query_transaction_receipt(tx_hash)
             except RemoteError as e:
+                with self.database.conn.read_ctx() as cursor:
+                    transactions = self.dbevmtx.get_evm_transactions(
+                        cursor=cursor,
+                        filter_=EvmTransactionsFilterQuery.make(tx_hash=tx_hash, chain_id=self.evm_inquirer.chain_id),  # noqa: E501
+                        has_premium=True,  # ignore limiting here
+                    )
+                if len(transactions) != 0:  # the transaction exists, so the nodes failed
+                    raise
+
                 raise InputError(f'{self.evm_inquirer.chain_name} hash {tx_hash.hex()} does not correspond to a transaction') from e  # noqa: E501
 
-            # TODO: Change this if transaction filter query can accept multiple hashes
-            with self.database.conn.read_ctx() as cursor:
-                txs = self.dbevmtx.get_evm_transactions(
-                    cursor=cursor,
-                    filter_=EvmTransactionsFilterQuery.make(tx_hash=tx_hash, chain_id=self.evm_inquirer.chain_id),  # noqa: E501
-                    has_premium=True,  # ignore limiting here
-                )
-            events.extend(self.get_or_decode_transaction_events(
-                transaction=txs[0],
-                tx_receipt=receipt,
-                ignore_cache=ignore_cache,
-            ))
+        return receipts
 
-        return events
+    def _write_decoded_transactions(
+            self,
+            ignore_cache: bool,
+            write_queue: Queue,
+            stats: DecodingPipelineStats,
+    ) -> None:
+        """Writes the events of the decoded transactions of the write queue in batches of
+        WRITE_BATCH_SIZE transactions, each batch in a single DB transaction, until None
+        is put in the queue. If ignore_cache is True the previously decoded events of the
+        transactions are deleted first."""
+        batch: list[tuple[EvmTransaction, list[HistoryBaseEntry]]] = []
+        while True:
+            entry = write_queue.get()
+            if entry is not None:
+                batch.append(entry)
+                if len(batch) < WRITE_BATCH_SIZE:
+                    continue
+            if len(batch) != 0:
+                start = time.monotonic()
+                with self.database.user_write() as write_cursor:
+                    if ignore_cache is True:
+                        self._delete_decoded_events(
+                            write_cursor=write_cursor,
+                            tx_hashes=[transaction.tx_hash for transaction, _ in batch],
+                        )
+                    for transaction, events in batch:
+                        self._write_decoded_events(
+                            write_cursor=write_cursor,
+                            transaction=transaction,
+                            events=events,
+                        )
+                        stats.written_events += len(events)
+                stats.writing_seconds += time.monotonic() - start
+                stats.write_batches += 1
+                batch = []
+            if entry is None:
+                return
 
     def get_or_decode_transaction_events(
             self,
@@ -417,14 +673,9 @@ class EVMTransactionDecoder(metaclass=ABCMeta):
         serialized_chain_id = self.evm_inquirer.chain_id.serialize_for_db()
         if ignore_cache is True:  # delete all decoded events
             with self.database.user_write() as write_cursor:
-                self.dbevents.delete_events_by_tx_hash(
+                self._delete_decoded_events(
                     write_cursor=write_cursor,
                     tx_hashes=[transaction.tx_hash],
-                    chain_id=self.evm_inquirer.chain_id,
-                )
-                write_cursor.execute(
-                    'DELETE from evm_tx_mappings WHERE tx_hash=? AND chain_id=? AND value=?',
-                    (transaction.tx_hash, serialized_chain_id, HISTORY_MAPPING_STATE_DECODED),
                 )
         else:  # see if events are already decoded and return them
             with self.database.conn.read_ctx() as cursor:
@@ -1,5 +1,5 @@
 from abc import ABCMeta, abstractmethod
-from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional, Union
 
 from rotkehlchen.types import ChecksumEvmAddress
 
@@ -10,6 +10,10 @@ if TYPE_CHECKING:
 
     from .base import BaseDecoderTools
 
+# A decoding rule is either a function that is tried for all receipt logs or a tuple of
+# the topic0 signatures of the receipt logs it decodes and the function
+DecodingRule = Union[Callable, tuple[tuple[bytes, ...], Callable]]
+
 
 class DecoderInterface(metaclass=ABCMeta):
 
@@ -39,10 +43,13 @@ class DecoderInterface(metaclass=ABCMeta):
         """
         ...
 
-    def decoding_rules(self) -> list[Callable]:  # pylint: disable=no-self-use
+    def decoding_rules(self) -> list[DecodingRule]:  # pylint: disable=no-self-use
         """
         Subclasses may implement this to add new generic decoding rules to be attempted
-        by the decoding process
+        by the decoding process.
+
+        Rules that only decode logs with specific topic0 signatures should be given
+        along with them so that they are not called for any other log.
         """
         return []
 
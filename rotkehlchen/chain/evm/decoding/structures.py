@@ -1,4 +1,6 @@
-from typing import Literal, NamedTuple, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Any, Literal, NamedTuple, Optional
 
 from rotkehlchen.accounting.structures.base import HistoryBaseEntry
 from rotkehlchen.accounting.structures.types import HistoryEventSubType, HistoryEventType
@@ -22,3 +24,46 @@ class ActionItem(NamedTuple):
     # Optional event data that pairs it with the event of the action item
     # Contains a tuple with the paired event and whether it's an out event (True) or in event
     paired_event_data: Optional[tuple[HistoryBaseEntry, bool]] = None
+
+
+@dataclass(init=True, repr=True, eq=False, order=False, unsafe_hash=False, frozen=False)
+class DecodingPipelineStats:
+    """Counters of a run of the transaction decoding pipeline, used to tune its sizes
+
+    The queue depths are the maximum number of transactions that waited in each queue.
+    If the decoding queue is often full, decoding is the bottleneck. If it stays empty,
+    loading from the DB or querying missing receipts is.
+    """
+    loaded_transactions: int = 0
+    cached_transactions: int = 0  # already decoded and read from the DB instead
+    decoded_transactions: int = 0
+    written_events: int = 0
+    write_batches: int = 0
+    max_decode_queue_depth: int = 0
+    max_write_queue_depth: int = 0
+    decoding_seconds: float = 0.0
+    writing_seconds: float = 0.0
+    start: float = field(default_factory=time.monotonic)
+    end: Optional[float] = None
+
+    def duration(self) -> float:
+        return (time.monotonic() if self.end is None else self.end) - self.start
+
+    def transactions_per_second(self) -> float:
+        duration = self.duration()
+        return self.loaded_transactions / duration if duration != 0 else 0.0
+
+    def serialize(self) -> dict[str, Any]:
+        return {
+            'loaded_transactions': self.loaded_transactions,
+            'cached_transactions': self.cached_transactions,
+            'decoded_transactions': self.decoded_transactions,
+            'written_events': self.written_events,
+            'write_batches': self.write_batches,
+            'max_decode_queue_depth': self.max_decode_queue_depth,
+            'max_write_queue_depth': self.max_write_queue_depth,
+            'decoding_seconds': self.decoding_seconds,
+            'writing_seconds': self.writing_seconds,
+            'duration': self.duration(),
+            'transactions_per_second': self.transactions_per_second(),
+        }
@@ -1,10 +1,13 @@
 import json
 import logging
 import random
+import time
 from abc import ABCMeta, abstractmethod
-from typing import TYPE_CHECKING, Any, Callable, Literal, Optional, Sequence, Union
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Callable, Literal, Optional, Sequence, Union, cast
 from urllib.parse import urlparse
 
+import gevent
 import requests
 from ens import ENS
 from eth_abi.exceptions import InsufficientDataBytes
@@ -13,6 +16,7 @@ from web3 import HTTPProvider, Web3
 from web3._utils.abi import get_abi_output_types
 from web3._utils.contracts import find_matching_event_abi
 from web3._utils.filters import construct_event_filter_params
+from web3._utils.request import make_post_request
 from web3.datastructures import MutableAttributeDict
 from web3.exceptions import (
     BadFunctionCallOutput,
@@ -27,6 +31,7 @@ from rotkehlchen.chain.constants import DEFAULT_EVM_RPC_TIMEOUT
 from rotkehlchen.chain.ethereum.constants import DEFAULT_TOKEN_DECIMALS
 from rotkehlchen.chain.ethereum.utils import MULTICALL_CHUNKS
 from rotkehlchen.chain.evm.contracts import EvmContract, EvmContracts
+from rotkehlchen.chain.evm.node_stats import NodeStats
 from rotkehlchen.chain.evm.proxies_inquirer import EvmProxiesInquirer
 from rotkehlchen.chain.evm.types import NodeName, WeightedNode
 from rotkehlchen.constants import ONE
@@ -81,7 +86,58 @@ def _is_synchronized(current_block: int, latest_block: int) -> tuple[bool, str]:
     return True, message
 
 
+def _deserialize_raw_transaction_receipt(
+        tx_receipt: dict[str, Any],
+        location: str,
+) -> dict[str, Any]:
+    """Turns the hex numbers of a transaction receipt as returned by the JSON-RPC API
+    to ints, as web3 does for the receipts it returns
+
+    May raise:
+    - RemoteError if the receipt can't be deserialized
+    """
+    try:
+        block_number = int(tx_receipt['blockNumber'], 16)
+        tx_receipt['blockNumber'] = block_number
+        tx_receipt['cumulativeGasUsed'] = int(tx_receipt['cumulativeGasUsed'], 16)
+        tx_receipt['gasUsed'] = int(tx_receipt['gasUsed'], 16)
+        tx_receipt['status'] = int(tx_receipt.get('status', '0x1'), 16)
+        tx_index = int(tx_receipt['transactionIndex'], 16)
+        tx_receipt['transactionIndex'] = tx_index
+        for receipt_log in tx_receipt['logs']:
+            receipt_log['blockNumber'] = block_number
+            receipt_log['logIndex'] = deserialize_int_from_hex(
+                symbol=receipt_log['logIndex'],
+                location=f'{location} tx receipt',
+            )
+            receipt_log['transactionIndex'] = tx_index
+    except (DeserializationError, ValueError, KeyError) as e:
+        msg = str(e)
+        if isinstance(e, KeyError):
+            msg = f'missing key {msg}'
+        log.error(
+            f'Couldnt deserialize transaction receipt {tx_receipt} data from '
+            f'{location} due to {msg}',
+        )
+        raise RemoteError(
+            f'Couldnt deserialize transaction receipt data from {location} '
+            f'due to {msg}. Check logs for details',
+        ) from e
+
+    return tx_receipt
+
+
 WEB3_LOGQUERY_BLOCK_RANGE = 250000
+# Errors of a node query after which the next node is tried
+NODE_QUERY_ERRORS = (
+    RemoteError,
+    requests.exceptions.RequestException,
+    BlockchainQueryError,
+    TransactionNotFound,
+    BlockNotFound,
+    BadResponseFormat,
+    ValueError,  # Yabir saw this happen with mew node for unavailable method at node. Since it's generic we should replace if web3 implements https://github.com/ethereum/web3.py/issues/2448  # noqa: E501
+)
 
 
 def _query_web3_get_logs(
@@ -196,6 +252,10 @@ class EvmNodeInquirer(metaclass=ABCMeta):
         self.contract_multicall = self.contracts.contract('MULTICALL2')
         self.queried_archive_connection = False
         self.archive_connection = False
+        # latency and errors of the queries to each node. They order the nodes in
+        # default_call_order and decide when a slow node is hedged in _query
+        self.node_stats: defaultdict[NodeName, NodeStats] = defaultdict(NodeStats)
+        self.hedge_requests = True
 
         log.debug(f'Initializing {self.chain_name} inquirer. Nodes to connect {connect_at_start}')
 
@@ -238,6 +298,9 @@ class EvmNodeInquirer(metaclass=ABCMeta):
         - Without weights
         ===> Runs: 66, 82, 72, 58, 72 seconds
         ---> Average: 70 seconds
+
+        The weight of each node is multiplied by the score of its stats so that nodes
+        that have been slow or failing lately are picked later.
         """
         open_nodes = self.database.get_rpc_nodes(blockchain=self.blockchain, only_active=True)  # noqa: E501
         if skip_etherscan:
@@ -249,7 +312,8 @@ class EvmNodeInquirer(metaclass=ABCMeta):
         while len(selection) != 0:
             weights = []
             for entry in selection:
-                weights.append(float(entry.weight))
+                stats = self.node_stats.get(entry.node_info)
+                weights.append(float(entry.weight) * (stats.score() if stats is not None else 1))  # noqa: E501
             node = random.choices(selection, weights, k=1)
             ordered_list.append(node[0])
             selection.remove(node[0])
@@ -439,29 +503,51 @@ class EvmNodeInquirer(metaclass=ABCMeta):
 
         The first node in the call order that gets a successful response returns.
         If none get a result then RemoteError is raised
+
+        The methods only read data, so if a node takes longer than it usually does (its
+        p95 latency) the next node of the call order is queried too and the first of
+        the two to respond successfully is used. This is a hedged request.
         """
+        nodes = []
         for weighted_node in call_order:
             node = weighted_node.node_info
             web3 = self.web3_mapping.get(node, None)
             if web3 is None and node.name != self.etherscan_node_name:
                 continue
-
-            try:
-                result = method(web3, **kwargs)
-            except (
-                RemoteError,
-                requests.exceptions.RequestException,
-                BlockchainQueryError,
-                TransactionNotFound,
-                BlockNotFound,
-                BadResponseFormat,
-                ValueError,  # Yabir saw this happen with mew node for unavailable method at node. Since it's generic we should replace if web3 implements https://github.com/ethereum/web3.py/issues/2448  # noqa: E501
-            ) as e:
-                log.warning(f'Failed to query {node} for {str(method)} due to {str(e)}')
-                # Catch all possible errors here and just try next node call
+            nodes.append((node, web3))
+
+        idx = 0
+        while idx < len(nodes):
+            node, web3 = nodes[idx]
+            idx += 1
+            hedge_delay = self._get_hedge_delay(
+                node=node,
+                method=method,
+                hedge_web3=nodes[idx][1] if idx < len(nodes) else None,
+            )
+            if hedge_delay is None:
+                success, result = self._query_node(node, web3, method, **kwargs)
+                if success is True:
+                    return result
                 continue
 
-            return result
+            greenlets = [gevent.spawn(self._query_node, node, web3, method, **kwargs)]
+            try:
+                if len(gevent.wait(greenlets, timeout=hedge_delay)) == 0:
+                    hedge_node, hedge_web3 = nodes[idx]
+                    idx += 1
+                    log.debug(f'{node} is slower than {hedge_delay} seconds for {str(method)}. Querying {hedge_node} too')  # noqa: E501
+                    self.node_stats[node].hedged += 1
+                    greenlets.append(gevent.spawn(self._query_node, hedge_node, hedge_web3, method, **kwargs))  # noqa: E501
+
+                while len(greenlets) != 0:
+                    ready = gevent.wait(greenlets, count=1)[0]
+                    greenlets.remove(ready)
+                    success, result = ready.get()  # reraises any unexpected error of the query
+                    if success is True:
+                        return result
+            finally:  # the slower query is not needed once one of them returned
+                gevent.killall(greenlets, block=False)
 
         # no node in the call order list was succesfully queried
         raise RemoteError(
@@ -469,6 +555,56 @@ class EvmNodeInquirer(metaclass=ABCMeta):
             f'nodes: {[str(x) for x in call_order]}. Check logs for details.',
         )
 
+    def _get_hedge_delay(
+            self,
+            node: NodeName,
+            method: Callable,
+            hedge_web3: Optional[Web3],
+    ) -> Optional[float]:
+        """Returns the seconds after which the query of the method to the node should be
+        hedged by querying the next node or None if it should not be hedged. The delay is
+        the node's p95 latency for that method, since methods like getting logs take much
+        longer than the rest. Only web3 nodes are used for hedging since the etherscan
+        queries are rate limited."""
+        if self.hedge_requests is False or hedge_web3 is None:
+            return None
+
+        if (stats := self.node_stats.get(node)) is None:
+            return None
+
+        return stats.p95_latency(method=method.__name__)
+
+    def _query_node(
+            self,
+            node: NodeName,
+            web3: Optional[Web3],
+            method: Callable,
+            **kwargs: Any,
+    ) -> tuple[bool, Any]:
+        """Queries the method at a single node recording the latency and errors in its
+        stats. Returns whether the query succeeded and its result"""
+        start = time.monotonic()
+        try:
+            result = method(web3, **kwargs)
+        except gevent.GreenletExit:  # killed since a hedged query responded first
+            self.node_stats[node].record_censored(
+                latency=time.monotonic() - start,
+                method=method.__name__,
+            )
+            raise
+        except NODE_QUERY_ERRORS as e:
+            self.node_stats[node].record(latency=time.monotonic() - start, success=False)
+            log.warning(f'Failed to query {node} for {str(method)} due to {str(e)}')
+            # Catch all possible errors here and just try next node call
+            return False, None
+
+        self.node_stats[node].record(
+            latency=time.monotonic() - start,
+            success=True,
+            method=method.__name__,
+        )
+        return True, result
+
     def _get_latest_block_number(self, web3: Optional[Web3]) -> int:
         if web3 is not None:
             return web3.eth.block_number
@@ -631,35 +767,9 @@ class EvmNodeInquirer(metaclass=ABCMeta):
     ) -> dict[str, Any]:
         if web3 is None:
             tx_receipt = self.etherscan.get_transaction_receipt(tx_hash)
-            try:
-                # Turn hex numbers to int
-                block_number = int(tx_receipt['blockNumber'], 16)
-                tx_receipt['blockNumber'] = block_number
-                tx_receipt['cumulativeGasUsed'] = int(tx_receipt['cumulativeGasUsed'], 16)
-                tx_receipt['gasUsed'] = int(tx_receipt['gasUsed'], 16)
-                tx_receipt['status'] = int(tx_receipt.get('status', '0x1'), 16)
-                tx_index = int(tx_receipt['transactionIndex'], 16)
-                tx_receipt['transactionIndex'] = tx_index
-                for receipt_log in tx_receipt['logs']:
-                    receipt_log['blockNumber'] = block_number
-                    receipt_log['logIndex'] = deserialize_int_from_hex(
-                        symbol=receipt_log['logIndex'],
-                        location='etherscan tx receipt',
-                    )
-                    receipt_log['transactionIndex'] = tx_index
-            except (DeserializationError, ValueError, KeyError) as e:
-                msg = str(e)
-                if isinstance(e, KeyError):
-                    msg = f'missing key {msg}'
-                log.error(
-                    f'Couldnt deserialize transaction receipt {tx_receipt} data from '
-                    f'etherscan due to {msg}',
-                )
-                raise RemoteError(
-                    f'Couldnt deserialize transaction receipt data from etherscan '
-                    f'due to {msg}. Check logs for details',
-                ) from e
-            return tx_receipt
+            if tx_receipt is None:
+                raise RemoteError(f'Etherscan could not find the receipt of {tx_hash.hex()}')
+            return _deserialize_raw_transaction_receipt(tx_receipt, location='etherscan')
 
         # Can raise TransactionNotFound if the user's node is pruned and transaction is old
         tx_receipt = web3.eth.get_transaction_receipt(tx_hash)  # type: ignore
@@ -676,6 +786,89 @@ class EvmNodeInquirer(metaclass=ABCMeta):
             tx_hash=tx_hash,
         )
 
+    def _get_transaction_receipts(
+            self,
+            web3: Optional[Web3],
+            tx_hashes: list[EVMTxHash],
+    ) -> dict[EVMTxHash, dict[str, Any]]:
+        """Queries the receipts of the given transactions from a node with a single JSON-RPC
+        batch request or from etherscan one after the other
+
+        Web3 has no batch requests so the batch is posted to the node's endpoint with the
+        session, headers and timeout of its provider.
+
+        May raise:
+        - RemoteError if the node does not support batch requests or if a receipt
+        can't be deserialized
+        - requests.exceptions.RequestException if the node can't be reached
+        - ValueError if the response is not json
+        """
+        receipts = {}
+        if web3 is None:
+            for tx_hash in tx_hashes:
+                tx_receipt = self.etherscan.get_transaction_receipt(tx_hash)
+                if tx_receipt is not None:
+                    receipts[tx_hash] = _deserialize_raw_transaction_receipt(tx_receipt, location='etherscan')  # noqa: E501
+            return receipts
+
+        provider = cast(HTTPProvider, web3.provider)  # all nodes are HTTPProviders
+        response = make_post_request(
+            provider.endpoint_uri,
+            json.dumps([{
+                'jsonrpc': '2.0',
+                'id': idx,
+                'method': 'eth_getTransactionReceipt',
+                'params': [tx_hash.hex()],
+            } for idx, tx_hash in enumerate(tx_hashes)]).encode(),
+            **provider.get_request_kwargs(),
+        )
+        results = json.loads(response)
+        if not isinstance(results, list):  # some nodes answer batches with a single error
+            raise RemoteError(f'Node does not support JSON-RPC batch requests. Response: {results}')  # noqa: E501
+
+        for entry in results:
+            if entry.get('result') is None:  # not found, or not available in a pruned node
+                log.debug(f'Could not get receipt of {self.chain_name} transaction {tx_hashes[entry["id"]].hex()}: {entry.get("error")}')  # noqa: E501
+                continue
+            receipts[tx_hashes[entry['id']]] = _deserialize_raw_transaction_receipt(entry['result'], location='node')  # noqa: E501
+
+        return receipts
+
+    def get_transaction_receipts(
+            self,
+            tx_hashes: list[EVMTxHash],
+            call_order: Optional[Sequence[WeightedNode]] = None,
+    ) -> dict[EVMTxHash, dict[str, Any]]:
+        """Gets the receipts of many transactions in the format of get_transaction_receipt,
+        with one request for all of them to the first node that answers it. Etherscan,
+        having no batch requests, is asked for them one by one if it's the node queried.
+
+        A node that does not have some of the receipts, like a pruned node, answers the
+        batch without them. They are then queried one by one from all the nodes, which
+        move on to the next node if it does not have the receipt either. Receipts that
+        are not found in any node are missing from the result.
+
+        May raise:
+        - RemoteError if no node could be queried
+        """
+        if call_order is None:
+            call_order = self.default_call_order()
+        receipts = self._query(
+            method=self._get_transaction_receipts,
+            call_order=call_order,
+            tx_hashes=tx_hashes,
+        )
+        for tx_hash in tx_hashes:
+            if tx_hash in receipts:
+                continue
+
+            try:
+                receipts[tx_hash] = self.get_transaction_receipt(tx_hash=tx_hash, call_order=call_order)  # noqa: E501
+            except RemoteError as e:
+                log.debug(f'Could not get receipt of {self.chain_name} transaction {tx_hash.hex()} from any node: {str(e)}')  # noqa: E501
+
+        return receipts
+
     def _get_transaction_by_hash(
             self,
             web3: Optional[Web3],
@@ -0,0 +1,85 @@
+from collections import defaultdict, deque
+from typing import Any, Optional
+
+# Weight of the newest query in the moving averages of the latency and the error rate
+NODE_STATS_ALPHA = 0.2
+# Number of latest successful queries of which the latency percentiles are computed
+NODE_STATS_LATENCY_SAMPLES = 100
+# Successful queries of a method needed before the latency of a node for that method
+# is trusted for hedging
+NODE_STATS_MIN_HEDGE_SAMPLES = 20
+# Lowest factor by which the weight of a node is multiplied, so that a node that only
+# errored recently still gets a chance to be picked and show that it works again
+NODE_STATS_MIN_SCORE = 0.01
+
+
+class NodeStats:
+    """Latency and error statistics of the queries made to an evm node
+
+    The latency and the error rate are exponentially weighted moving averages so that
+    they follow the current state of the node and not its whole history. The latencies
+    are also kept per queried method, since some methods like getting logs or many
+    receipts take much longer than the rest.
+    """
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.errors = 0
+        self.hedged = 0  # queries for which another node was also asked since this was slow
+        self.latency: Optional[float] = None  # in seconds, of the successful queries
+        self.error_rate = 0.0
+        self.latencies: deque[float] = deque(maxlen=NODE_STATS_LATENCY_SAMPLES)
+        self.method_latencies: defaultdict[str, deque[float]] = defaultdict(
+            lambda: deque(maxlen=NODE_STATS_LATENCY_SAMPLES),
+        )
+
+    def record(self, latency: float, success: bool, method: Optional[str] = None) -> None:
+        self.queries += 1
+        self.error_rate += NODE_STATS_ALPHA * ((0.0 if success else 1.0) - self.error_rate)
+        if success is False:
+            self.errors += 1
+            return
+
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += NODE_STATS_ALPHA * (latency - self.latency)
+        self.latencies.append(latency)
+        if method is not None:
+            self.method_latencies[method].append(latency)
+
+    def record_censored(self, latency: float, method: Optional[str] = None) -> None:
+        """Records a query that was stopped after `latency` seconds since another node
+        responded first. Its latency is at least that, so it is kept for the percentiles.
+        Otherwise only the queries faster than the p95 latency would be recorded while
+        hedging and the p95 latency would keep dropping."""
+        self.latencies.append(latency)
+        if method is not None:
+            self.method_latencies[method].append(latency)
+
+    def p95_latency(self, method: Optional[str] = None) -> Optional[float]:
+        """The 95th percentile of the latency of the latest successful queries, of the
+        given method if any, or None if there are not enough of them to tell"""
+        latencies = self.latencies if method is None else self.method_latencies.get(method, ())  # noqa: E501
+        if len(latencies) < NODE_STATS_MIN_HEDGE_SAMPLES:
+            return None
+
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def score(self) -> float:
+        """Factor in (0, 1] by which the weight of the node is multiplied when picking
+        the order in which the nodes are queried. Slow and failing nodes get lower."""
+        latency = self.latency if self.latency is not None else 0.0
+        return max(1 - self.error_rate, NODE_STATS_MIN_SCORE) / (1 + latency)
+
+    def serialize(self) -> dict[str, Any]:
+        return {
+            'queries': self.queries,
+            'errors': self.errors,
+            'hedged': self.hedged,
+            'latency': self.latency,
+            'p95_latency': self.p95_latency(),
+            'error_rate': self.error_rate,
+            'score': self.score(),
+        }
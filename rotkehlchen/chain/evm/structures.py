@@ -1,8 +1,17 @@
 import dataclasses
+import struct
 from typing import Optional
 
+from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.types import ChainID, ChecksumEvmAddress, EVMTxHash
 
+# Header of each log packed in the logs blob of a receipt: log index, checksummed address
+# without the 0x prefix, removed, number of topics and length of the data.
+# The address is kept checksummed since computing the checksum when reading costs more
+# than the 20 bytes it would save.
+RECEIPT_LOG_HEADER = struct.Struct('>I40s?BI')
+TOPIC_LENGTH = 32
+
 
 @dataclasses.dataclass(init=True, repr=True, eq=True, order=False, unsafe_hash=False, frozen=False)
 class EvmTxReceiptLog:
@@ -21,3 +30,68 @@ class EvmTxReceipt:
     status: bool
     type: int
     logs: list[EvmTxReceiptLog] = dataclasses.field(default_factory=list)
+
+
+def serialize_receipt_logs(logs: list[EvmTxReceiptLog]) -> bytes:
+    """Packs the logs of a receipt into the blob that is stored in the DB. Each log is
+    a RECEIPT_LOG_HEADER followed by its topics and then its data.
+
+    May raise:
+    - DeserializationError if a topic is not 32 bytes or a log does not fit in the header
+    """
+    parts = []
+    for tx_log in logs:
+        try:
+            parts.append(RECEIPT_LOG_HEADER.pack(
+                tx_log.log_index,
+                tx_log.address[2:].encode(),
+                tx_log.removed,
+                len(tx_log.topics),
+                len(tx_log.data),
+            ))
+        except struct.error as e:
+            raise DeserializationError(f'Could not pack receipt log {tx_log}: {str(e)}') from e
+
+        for topic in tx_log.topics:
+            if len(topic) != TOPIC_LENGTH:
+                raise DeserializationError(
+                    f'Receipt log {tx_log.log_index} has a topic of {len(topic)} bytes',
+                )
+            parts.append(topic)
+        parts.append(tx_log.data)
+
+    return b''.join(parts)
+
+
+def deserialize_receipt_logs(blob: bytes) -> list[EvmTxReceiptLog]:
+    """Unpacks the logs of a receipt from a blob made by serialize_receipt_logs
+
+    May raise:
+    - DeserializationError if the blob is not properly formatted
+    """
+    logs = []
+    offset = 0
+    try:
+        while offset < len(blob):
+            log_index, address, removed, topics_num, data_length = RECEIPT_LOG_HEADER.unpack_from(blob, offset)  # noqa: E501
+            offset += RECEIPT_LOG_HEADER.size
+            topics = [
+                blob[topic_offset:topic_offset + TOPIC_LENGTH]
+                for topic_offset in range(offset, offset + topics_num * TOPIC_LENGTH, TOPIC_LENGTH)  # noqa: E501
+            ]
+            offset += topics_num * TOPIC_LENGTH
+            logs.append(EvmTxReceiptLog(
+                log_index=log_index,
+                data=blob[offset:offset + data_length],
+                address=ChecksumEvmAddress('0x' + address.decode()),
+                removed=removed,
+                topics=topics,
+            ))
+            offset += data_length
+    except (struct.error, UnicodeDecodeError) as e:
+        raise DeserializationError(f'Could not unpack receipt logs: {str(e)}') from e
+
+    if offset != len(blob):
+        raise DeserializationError(f'Receipt logs blob has {len(blob)} bytes instead of {offset}')  # noqa: E501
+
+    return logs
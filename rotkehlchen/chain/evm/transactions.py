@@ -5,6 +5,7 @@ from contextlib import contextmanager
 from typing import TYPE_CHECKING, Iterator, Optional
 
 from gevent.lock import Semaphore
+from gevent.pool import Pool
 from pysqlcipher3 import dbapi2 as sqlcipher
 
 from rotkehlchen.api.websockets.typedefs import TransactionStatusStep, WSMessageType
@@ -16,7 +17,7 @@ from rotkehlchen.db.ranges import DBQueryRanges
 from rotkehlchen.errors.misc import RemoteError
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.types import ChecksumEvmAddress, EVMTxHash, Timestamp, deserialize_evm_tx_hash
-from rotkehlchen.utils.misc import ts_now
+from rotkehlchen.utils.misc import get_chunks, ts_now
 
 if TYPE_CHECKING:
     from rotkehlchen.chain.evm.structures import EvmTxReceipt
@@ -28,6 +29,11 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
+RECEIPTS_BATCH_SIZE = 100  # receipts queried and written together
+# Addresses whose transactions are queried at the same time. How fast the queries go
+# is up to the rate limiter of the chain's etherscan
+ADDRESSES_QUERY_CONCURRENCY = 8
+
 
 class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
 
@@ -110,7 +116,7 @@ class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
         of an evm address or of all addresses. Will query for only the time requested
         in the filter and the part of that time that has not yet been queried.
 
-        Saves the results in the database.
+        The addresses are queried concurrently and the results saved in the database.
 
         May raise:
         - RemoteError if etherscan is used and there is a problem with reaching it or
@@ -131,12 +137,19 @@ class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
         f_to_ts = filter_query.to_ts
         from_ts = Timestamp(0) if f_from_ts is None else f_from_ts
         to_ts = ts_now() if f_to_ts is None else f_to_ts
-        for address in accounts:
-            self.single_address_query_transactions(
-                address=address,
-                start_ts=from_ts,
-                end_ts=to_ts,
-            )
+        pool = Pool(size=ADDRESSES_QUERY_CONCURRENCY)
+        greenlets = [pool.spawn(
+            self.single_address_query_transactions,
+            address=address,
+            start_ts=from_ts,
+            end_ts=to_ts,
+        ) for address in accounts]
+        try:
+            pool.join()
+        finally:  # don't leave queries running if this greenlet gets killed
+            pool.kill()
+        for greenlet in greenlets:  # raise the first error after all addresses are queried
+            greenlet.get()
 
     def _query_and_save_transactions_for_range(
             self,
@@ -161,16 +174,17 @@ class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
                     evm_transactions=new_transactions,
                     relevant_address=address,
                 )
-            if period.range_type == 'timestamps':
-                assert location_string, 'should always be given for timestamps'
-                with self.database.user_write() as write_cursor:
-                    # update last queried time for the address
+                if period.range_type == 'timestamps':
+                    assert location_string, 'should always be given for timestamps'
+                    # update last queried time for the address together with the
+                    # transactions so that an interrupted query continues from here
                     self.dbranges.update_used_query_range(
                         write_cursor=write_cursor,
                         location_string=location_string,
                         queried_ranges=[(period.from_value, new_transactions[-1].timestamp)],  # type: ignore  # noqa: E501
                     )
 
+            if period.range_type == 'timestamps':
                 self.msg_aggregator.add_message(
                     message_type=WSMessageType.EVM_TRANSACTION_STATUS,
                     data={
@@ -250,6 +264,7 @@ class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
             if len(new_internal_txs) == 0:
                 continue
 
+            timestamp = None
             for internal_tx in new_internal_txs:
                 if internal_tx.value == 0:
                     continue  # Only reason we need internal is for ether transfer. Ignore 0
@@ -281,27 +296,30 @@ class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
                         transactions=[internal_tx],
                         relevant_address=None,  # no need to re-associate address
                     )
-                if period.range_type == 'timestamps':
-                    assert location_string, 'should always be given for timestamps'
-                    log.debug(f'Internal {self.evm_inquirer.chain_name} transactions for {address} -> update range {period.from_value} - {timestamp}')  # noqa: E501
-                    with self.database.conn.write_ctx() as write_cursor:
-                        # update last queried time for address
-                        self.dbranges.update_used_query_range(
-                            write_cursor=write_cursor,
-                            location_string=location_string,
-                            queried_ranges=[(period.from_value, timestamp)],  # type: ignore
-                        )
 
-                    self.msg_aggregator.add_message(
-                        message_type=WSMessageType.EVM_TRANSACTION_STATUS,
-                        data={
-                            'address': address,
-                            'evm_chain': self.evm_inquirer.chain_id.to_name(),
-                            'period': [period.from_value, timestamp],
-                            'status': str(TransactionStatusStep.QUERYING_INTERNAL_TRANSACTIONS),  # noqa: E501
-                        },
+            # the batches end between different timestamps so the range up to the last
+            # one is now queried and an interrupted query can continue from there
+            if period.range_type == 'timestamps' and timestamp is not None:
+                assert location_string, 'should always be given for timestamps'
+                log.debug(f'Internal {self.evm_inquirer.chain_name} transactions for {address} -> update range {period.from_value} - {timestamp}')  # noqa: E501
+                with self.database.conn.write_ctx() as write_cursor:
+                    # update last queried time for address
+                    self.dbranges.update_used_query_range(
+                        write_cursor=write_cursor,
+                        location_string=location_string,
+                        queried_ranges=[(period.from_value, timestamp)],  # type: ignore
                     )
 
+                self.msg_aggregator.add_message(
+                    message_type=WSMessageType.EVM_TRANSACTION_STATUS,
+                    data={
+                        'address': address,
+                        'evm_chain': self.evm_inquirer.chain_id.to_name(),
+                        'period': [period.from_value, timestamp],
+                        'status': str(TransactionStatusStep.QUERYING_INTERNAL_TRANSACTIONS),  # noqa: E501
+                    },
+                )
+
     def _get_internal_transactions_for_ranges(
             self,
             address: ChecksumEvmAddress,
@@ -378,6 +396,9 @@ class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
                     from_ts=query_start_ts,
                     to_ts=query_end_ts,
                 ):
+                    if len(erc20_tx_hashes) == 0:
+                        continue
+
                     for tx_hash in erc20_tx_hashes:
                         tx_hash_bytes = deserialize_evm_tx_hash(tx_hash)
                         with self.database.conn.read_ctx() as cursor:
@@ -398,24 +419,26 @@ class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
                         else:
                             timestamp = result[0].timestamp
 
-                        log.debug(f'{self.evm_inquirer.chain_name} ERC20 Transfers for {address} -> update range {query_start_ts} - {timestamp}')  # noqa: E501
-                        with self.database.user_write() as write_cursor:
-                            # update last queried time for the address
-                            self.dbranges.update_used_query_range(
-                                write_cursor=write_cursor,
-                                location_string=location_string,
-                                queried_ranges=[(query_start_ts, timestamp)],
-                            )
-
-                        self.msg_aggregator.add_message(
-                            message_type=WSMessageType.EVM_TRANSACTION_STATUS,
-                            data={
-                                'address': address,
-                                'evm_chain': self.evm_inquirer.chain_id.to_name(),
-                                'period': [query_start_ts, timestamp],
-                                'status': str(TransactionStatusStep.QUERYING_EVM_TOKENS_TRANSACTIONS),  # noqa: E501
-                            },
+                    # batches end between different timestamps so the range up to the last
+                    # transaction is queried and an interrupted query can continue from there
+                    log.debug(f'{self.evm_inquirer.chain_name} ERC20 Transfers for {address} -> update range {query_start_ts} - {timestamp}')  # noqa: E501
+                    with self.database.user_write() as write_cursor:
+                        # update last queried time for the address
+                        self.dbranges.update_used_query_range(
+                            write_cursor=write_cursor,
+                            location_string=location_string,
+                            queried_ranges=[(query_start_ts, timestamp)],
                         )
+
+                    self.msg_aggregator.add_message(
+                        message_type=WSMessageType.EVM_TRANSACTION_STATUS,
+                        data={
+                            'address': address,
+                            'evm_chain': self.evm_inquirer.chain_id.to_name(),
+                            'period': [query_start_ts, timestamp],
+                            'status': str(TransactionStatusStep.QUERYING_EVM_TOKENS_TRANSACTIONS),  # noqa: E501
+                        },
+                    )
             except RemoteError as e:
                 self.msg_aggregator.add_error(
                     f'Got error "{str(e)}" while querying {self.evm_inquirer.chain_name} '
@@ -445,59 +468,77 @@ class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
         - DeserializationError
         - RemoteError if the transaction hash can't be found in any of the connected nodes
         """
-        dbevmtx = DBEvmTx(self.database)
-        with self.database.conn.read_ctx() as cursor:
-            # If the transaction is not in the DB then query it and add it
-            result = dbevmtx.get_evm_transactions(
-                cursor=cursor,
-                filter_=EvmTransactionsFilterQuery.make(tx_hash=tx_hash, chain_id=self.evm_inquirer.chain_id),  # noqa: E501
-                has_premium=True,  # we don't need any limiting here
-            )
+        return self.get_or_query_transaction_receipts([tx_hash])[tx_hash]
 
-        if len(result) == 0:
-            transaction = self.evm_inquirer.get_transaction_by_hash(tx_hash)
-            with self.database.user_write() as write_cursor:
-                dbevmtx.add_evm_transactions(write_cursor, [transaction], relevant_address=None)
-            period = TimestampOrBlockRange(
-                range_type='blocks',
-                from_value=transaction.block_number,
-                to_value=transaction.block_number,
-            )
-            if transaction.to_address is not None:  # internal transactions only through contracts
-                self._query_and_save_internal_transactions_for_range(
-                    address=None,  # get all internal transactions for the parent hash
-                    period=period,
-                )
+    def get_or_query_transaction_receipts(
+            self,
+            tx_hashes: list[EVMTxHash],
+    ) -> dict[EVMTxHash, 'EvmTxReceipt']:
+        """
+        Same as get_or_query_transaction_receipt for many transaction hashes. The receipts
+        and transactions that are already in the DB are read in bulk and only the missing
+        ones are queried from the chain.
+
+        May raise:
 
+        - DeserializationError
+        - RemoteError if a transaction hash can't be found in any of the connected nodes
+        """
+        dbevmtx = DBEvmTx(self.database)
         with self.database.conn.read_ctx() as cursor:
-            tx_receipt = dbevmtx.get_receipt(
+            receipts = dbevmtx.get_receipts(
                 cursor=cursor,
-                tx_hash=tx_hash,
+                tx_hashes=tx_hashes,
                 chain_id=self.evm_inquirer.chain_id,
             )
-        if tx_receipt is not None:
-            return tx_receipt
+            missing_hashes = [x for x in tx_hashes if x not in receipts]
+            if len(missing_hashes) == 0:
+                return receipts
 
-        # not in the DB, so we need to query the chain for it
-        tx_receipt_data = self.evm_inquirer.get_transaction_receipt(tx_hash=tx_hash)
-        try:
-            with self.database.user_write() as write_cursor:
-                dbevmtx.add_receipt_data(
-                    write_cursor=write_cursor,
-                    chain_id=self.evm_inquirer.chain_id,
-                    data=tx_receipt_data,
+            # a receipt can only be in the DB if its transaction is
+            existing_hashes = {x.tx_hash for x in dbevmtx.get_evm_transactions(
+                cursor=cursor,
+                filter_=EvmTransactionsFilterQuery.make(tx_hashes=missing_hashes, chain_id=self.evm_inquirer.chain_id),  # noqa: E501
+                has_premium=True,  # we don't need any limiting here
+            )}
+
+        for tx_hash in missing_hashes:
+            if tx_hash not in existing_hashes:  # query the transaction and add it
+                transaction = self.evm_inquirer.get_transaction_by_hash(tx_hash)
+                with self.database.user_write() as write_cursor:
+                    dbevmtx.add_evm_transactions(write_cursor, [transaction], relevant_address=None)  # noqa: E501
+                period = TimestampOrBlockRange(
+                    range_type='blocks',
+                    from_value=transaction.block_number,
+                    to_value=transaction.block_number,
                 )
-        except sqlcipher.IntegrityError as e:  # pylint: disable=no-member
-            if 'UNIQUE constraint failed: evmtx_receipts.tx_hash' not in str(e):
-                raise  # otherwise something else added the receipt before so we just continue
+                if transaction.to_address is not None:  # internal transactions only through contracts  # noqa: E501
+                    self._query_and_save_internal_transactions_for_range(
+                        address=None,  # get all internal transactions for the parent hash
+                        period=period,
+                    )
+
+            # not in the DB, so we need to query the chain for it
+            tx_receipt_data = self.evm_inquirer.get_transaction_receipt(tx_hash=tx_hash)
+            try:
+                with self.database.user_write() as write_cursor:
+                    dbevmtx.add_receipt_data(
+                        write_cursor=write_cursor,
+                        chain_id=self.evm_inquirer.chain_id,
+                        data=tx_receipt_data,
+                    )
+            except sqlcipher.IntegrityError as e:  # pylint: disable=no-member
+                if 'UNIQUE constraint failed: evmtx_receipts.tx_hash' not in str(e):
+                    raise  # otherwise something else added the receipt before so we just continue
+
         with self.database.conn.read_ctx() as cursor:
-            tx_receipt = dbevmtx.get_receipt(
+            receipts.update(dbevmtx.get_receipts(
                 cursor=cursor,
-                tx_hash=tx_hash,
+                tx_hashes=missing_hashes,
                 chain_id=self.evm_inquirer.chain_id,
-            )
+            ))
 
-        return tx_receipt  # type: ignore  # tx_receipt was just added in the DB so should be there  # noqa: E501
+        return receipts
 
     def get_receipts_for_transactions_missing_them(
             self,
@@ -534,21 +575,24 @@ class EvmTransactions(metaclass=ABCMeta):  # noqa: B024
             if len(hash_results) == 0:
                 return  # nothing to do
 
-            for entry in hash_results:
+            for tx_hashes in get_chunks(hash_results, n=RECEIPTS_BATCH_SIZE):
                 try:
-                    tx_receipt_data = self.evm_inquirer.get_transaction_receipt(tx_hash=entry)
+                    receipts_data = self.evm_inquirer.get_transaction_receipts(tx_hashes=tx_hashes)  # noqa: E501
                 except RemoteError as e:
-                    self.msg_aggregator.add_warning(f'Failed to query information for {self.evm_inquirer.chain_name} transaction {entry.hex()} due to {str(e)}. Skipping...')  # noqa: E501
+                    self.msg_aggregator.add_warning(f'Failed to query information for {len(tx_hashes)} {self.evm_inquirer.chain_name} transactions due to {str(e)}. Skipping...')  # noqa: E501
                     continue
 
+                for tx_hash in tx_hashes:
+                    if tx_hash not in receipts_data:
+                        self.msg_aggregator.add_warning(f'Failed to query information for {self.evm_inquirer.chain_name} transaction {tx_hash.hex()} since its receipt was not found. Skipping...')  # noqa: E501
+
                 try:
                     with self.database.user_write() as write_cursor:
-                        dbevmtx.add_receipt_data(
+                        dbevmtx.add_receipts_data(  # ignores receipts added by other greenlets
                             write_cursor=write_cursor,
                             chain_id=self.evm_inquirer.chain_id,
-                            data=tx_receipt_data,
+                            receipts_data=list(receipts_data.values()),
                         )
                 except sqlcipher.IntegrityError as e:  # pylint: disable=no-member
-                    if 'UNIQUE constraint failed: evmtx_receipts.tx_hash' not in str(e):
-                        log.error(f'Failed to store transaction {entry.hex()} receipt due to {str(e)}')  # noqa: E501
-                        raise  # if receipt is already added by other greenlet it's fine
+                    log.error(f'Failed to store {self.evm_inquirer.chain_name} transaction receipts due to {str(e)}')  # noqa: E501
+                    raise
@@ -0,0 +1,84 @@
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Optional
+
+from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.types import Timestamp
+from rotkehlchen.utils.mixins.cacheable import ResultsStore
+
+if TYPE_CHECKING:
+    from rotkehlchen.db.dbhandler import DBHandler
+    from rotkehlchen.db.drivers.gevent import DBCursor
+
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
+# Total size of the saved results of all objects. The oldest are deleted first.
+CACHED_RESULTS_MAX_BYTES = 16 * 1024 * 1024
+
+
+class DBCachedResults(ResultsStore):
+    """Saves the cached results of an object in the transient user DB, which is
+    encrypted like the user DB. Each object uses its own namespace."""
+
+    def __init__(self, database: 'DBHandler', namespace: str) -> None:
+        self.db = database
+        self.namespace = namespace
+
+    def get(self, key: str) -> Optional[tuple[Timestamp, Any]]:
+        with self.db.conn_transient.read_ctx() as cursor:
+            result = cursor.execute(
+                'SELECT timestamp, value FROM cached_results WHERE namespace=? AND key=?',
+                (self.namespace, key),
+            ).fetchone()
+
+        if result is None:
+            return None
+
+        try:
+            value = json.loads(result[1])
+        except json.JSONDecodeError as e:
+            log.error(f'Could not decode the saved result {key} of {self.namespace}: {str(e)}')
+            return None
+
+        return Timestamp(result[0]), value
+
+    def set(self, key: str, timestamp: Timestamp, value: Any) -> None:
+        data = json.dumps(value, separators=(',', ':'))
+        with self.db.transient_write() as cursor:
+            cursor.execute(
+                'INSERT OR REPLACE INTO cached_results(namespace, key, timestamp, size, value) '
+                'VALUES(?, ?, ?, ?, ?)',
+                (self.namespace, key, timestamp, len(data), data),
+            )
+            self._evict(cursor)
+
+    def delete(self, key: str) -> None:
+        with self.db.transient_write() as cursor:
+            cursor.execute(
+                'DELETE FROM cached_results WHERE namespace=? AND key=?',
+                (self.namespace, key),
+            )
+
+    def clear(self) -> None:
+        with self.db.transient_write() as cursor:
+            cursor.execute('DELETE FROM cached_results WHERE namespace=?', (self.namespace,))
+
+    @staticmethod
+    def _evict(write_cursor: 'DBCursor') -> None:
+        """Deletes the oldest saved results until they all fit in CACHED_RESULTS_MAX_BYTES"""
+        total_size = write_cursor.execute('SELECT SUM(size) FROM cached_results').fetchone()[0]
+        if total_size is None or total_size <= CACHED_RESULTS_MAX_BYTES:
+            return
+
+        to_delete = []
+        kept_size = 0
+        for rowid, size in write_cursor.execute(
+                'SELECT rowid, size FROM cached_results ORDER BY timestamp DESC, rowid DESC',
+        ).fetchall():
+            kept_size += size
+            if kept_size > CACHED_RESULTS_MAX_BYTES:
+                to_delete.append((rowid,))
+
+        write_cursor.executemany('DELETE FROM cached_results WHERE rowid=?', to_delete)
+        log.debug(f'Deleted {len(to_delete)} saved results to stay within the size limit')
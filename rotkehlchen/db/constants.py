@@ -12,3 +12,5 @@ HISTORY_MAPPING_STATE_DECODED = 0
 HISTORY_MAPPING_STATE_CUSTOMIZED = 1
 EVM_ACCOUNTS_DETAILS_LAST_QUERIED_TS = 'last_queried_timestamp'
 EVM_ACCOUNTS_DETAILS_TOKENS = 'tokens'
+# Max number of parameters of an SQL query. SQLite versions before 3.32.0 only allow 999.
+SQL_VARIABLES_LIMIT = 999
@@ -64,6 +64,7 @@ from rotkehlchen.db.filtering import (
 )
 from rotkehlchen.db.loopring import DBLoopring
 from rotkehlchen.db.misc import detect_sqlcipher_version
+from rotkehlchen.db.reports import DBAccountingReports
 from rotkehlchen.db.schema import DB_SCRIPT_CREATE_TABLES
 from rotkehlchen.db.schema_transient import DB_SCRIPT_CREATE_TRANSIENT_TABLES
 from rotkehlchen.db.settings import (
@@ -208,6 +209,9 @@ class DBHandler:
         self.conn_transient: DBConnection = None  # type: ignore
         # Lock to make sure that 2 callers of get_or_create_evm_token do not go in at the same time
         self.get_or_create_evm_token_lock = Semaphore()
+        # Bumped every time the ignored assets or actions change so that
+        # snapshots of them taken by long running tasks know to refresh
+        self.ignored_entries_version = 0
         self._connect(password)
         self._check_unfinished_upgrades(password)
         self._run_actions_after_first_connection(password)
@@ -626,20 +630,25 @@ class DBHandler:
             # There can only be 1 result, since name is the primary key of the table
             return ExternalServiceApiCredentials(service=service_name, api_key=result[0])
 
-    # pylint: disable=no-self-use
     @need_writable_cursor('user_write')
     def add_to_ignored_assets(self, write_cursor: 'DBCursor', asset: Asset) -> None:
         write_cursor.execute(
             'INSERT INTO multisettings(name, value) VALUES(?, ?)',
             ('ignored_asset', asset.identifier),
         )
+        write_cursor.connection.call_after_commit(self._increase_ignored_entries_version)
 
-    # pylint: disable=no-self-use
     def remove_from_ignored_assets(self, write_cursor: 'DBCursor', asset: Asset) -> None:
         write_cursor.execute(
             'DELETE FROM multisettings WHERE name="ignored_asset" AND value=?;',
             (asset.identifier,),
         )
+        write_cursor.connection.call_after_commit(self._increase_ignored_entries_version)
+
+    def _increase_ignored_entries_version(self) -> None:
+        """Marks the ignored assets and actions as changed once the change is committed,
+        so that nothing sees the new version with the old entries"""
+        self.ignored_entries_version += 1
 
     def get_ignored_assets(self, cursor: 'DBCursor', only_nfts: bool = False) -> list[Asset]:
         """
@@ -692,6 +701,7 @@ class DBHandler:
             )
         except sqlcipher.IntegrityError as e:  # pylint: disable=no-member
             raise InputError('One of the given action ids already exists in the dataase') from e  # noqa: E501
+        write_cursor.connection.call_after_commit(self._increase_ignored_entries_version)
 
     def remove_from_ignored_action_ids(
             self,
@@ -714,6 +724,7 @@ class DBHandler:
                 f'Tried to remove {len(identifiers) - affected_rows} '
                 f'ignored actions that do not exist',
             )
+        write_cursor.connection.call_after_commit(self._increase_ignored_entries_version)
 
     # pylint: disable=no-self-use
     def get_ignored_action_ids(
@@ -1022,6 +1033,10 @@ class DBHandler:
 
     def purge_exchange_data(self, write_cursor: 'DBCursor', location: Location) -> None:
         self.delete_used_query_range_for_exchange(write_cursor=write_cursor, location=location)
+        write_cursor.execute(
+            'DELETE FROM binance_trade_cursors WHERE location = ?;',
+            (location.serialize_for_db(),),
+        )
         write_cursor.execute(
             'DELETE FROM trades WHERE location = ?;',
             (location.serialize_for_db(),),
@@ -1638,12 +1653,20 @@ class DBHandler:
                     for entry_type in entry_types
                 ],
             )
+            write_cursor.execute(
+                'UPDATE binance_trade_cursors SET exchange_name=? WHERE exchange_name=? AND location=?',  # noqa: E501
+                (new_name, name, location.serialize_for_db()),
+            )
 
     def remove_exchange(self, write_cursor: 'DBCursor', name: str, location: Location) -> None:
         write_cursor.execute(
             'DELETE FROM user_credentials WHERE name=? AND location=?',
             (name, location.serialize_for_db()),
         )
+        write_cursor.execute(
+            'DELETE FROM binance_trade_cursors WHERE exchange_name=? AND location=?',
+            (name, location.serialize_for_db()),
+        )
 
     def get_exchange_credentials(
             self,
@@ -1976,6 +1999,20 @@ class DBHandler:
 
         Returned list is ordered according to the passed filter query
         """
+        return list(self.iterate_asset_movements(
+            cursor=cursor,
+            filter_query=filter_query,
+            has_premium=has_premium,
+        ))
+
+    def iterate_asset_movements(
+            self,
+            cursor: 'DBCursor',
+            filter_query: AssetMovementsFilterQuery,
+            has_premium: bool,
+    ) -> Iterator[AssetMovement]:
+        """Same as get_asset_movements but yields the asset movements as they are
+        read from the DB cursor"""
         query, bindings = filter_query.prepare()
         if has_premium:
             query = 'SELECT * from asset_movements ' + query
@@ -1984,7 +2021,6 @@ class DBHandler:
             query = 'SELECT * FROM (SELECT * from asset_movements ORDER BY timestamp DESC LIMIT ?) ' + query  # noqa: E501
             results = cursor.execute(query, [FREE_ASSET_MOVEMENTS_LIMIT] + bindings)
 
-        asset_movements = []
         for result in results:
             try:
                 movement = AssetMovement.deserialize_from_db(result)
@@ -2000,9 +2036,7 @@ class DBHandler:
                     f'Unknown asset {e.identifier} found',
                 )
                 continue
-            asset_movements.append(movement)
-
-        return asset_movements
+            yield movement
 
     # pylint: disable=no-self-use
     def get_entries_count(
@@ -2107,6 +2141,13 @@ class DBHandler:
             old_trade_id: str,
             trade: Trade,
     ) -> tuple[bool, str]:
+        result = write_cursor.execute(
+            'SELECT timestamp FROM trades WHERE id=?',
+            (old_trade_id,),
+        ).fetchone()
+        if result is None:
+            return False, 'Tried to edit non existing trade id'
+
         write_cursor.execute(
             'UPDATE trades SET '
             '  id=?, '
@@ -2141,6 +2182,10 @@ class DBHandler:
         if write_cursor.rowcount == 0:
             return False, 'Tried to edit non existing trade id'
 
+        DBAccountingReports(self).delete_checkpoints_after_commit(
+            write_cursor=write_cursor,
+            timestamp=min(Timestamp(result[0]), trade.timestamp),
+        )
         return True, ''
 
     def get_trades_and_limit_info(
@@ -2163,6 +2208,15 @@ class DBHandler:
         """Returns a list of trades optionally filtered by various filters.
 
         The returned list is ordered according to the passed filter query"""
+        return list(self.iterate_trades(cursor=cursor, filter_query=filter_query, has_premium=has_premium))  # noqa: E501
+
+    def iterate_trades(
+            self,
+            cursor: 'DBCursor',
+            filter_query: TradesFilterQuery,
+            has_premium: bool,
+    ) -> Iterator[Trade]:
+        """Same as get_trades but yields the trades as they are read from the DB cursor"""
         query, bindings = filter_query.prepare()
         if has_premium:
             query = 'SELECT * from trades ' + query
@@ -2171,7 +2225,6 @@ class DBHandler:
             query = 'SELECT * FROM (SELECT * from trades ORDER BY timestamp DESC LIMIT ?) ' + query  # noqa: E501
             results = cursor.execute(query, [FREE_TRADES_LIMIT] + bindings)
 
-        trades = []
         for result in results:
             try:
                 trade = Trade.deserialize_from_db(result)
@@ -2186,9 +2239,7 @@ class DBHandler:
                     f'Unknown asset {e.identifier} found',
                 )
                 continue
-            trades.append(trade)
-
-        return trades
+            yield trade
 
     def delete_trades(self, write_cursor: 'DBCursor', trades_ids: list[str]) -> None:
         """Removes trades from the database using their `trade_id`.
@@ -9,7 +9,7 @@ from contextlib import contextmanager
 from enum import Enum, auto
 from pathlib import Path
 from types import TracebackType
-from typing import TYPE_CHECKING, Any, Generator, Literal, Optional, Sequence, Union
+from typing import TYPE_CHECKING, Any, Callable, Generator, Literal, Optional, Sequence, Union
 from uuid import uuid4
 
 import gevent
@@ -252,6 +252,8 @@ class DBConnection:
         # https://www.gevent.org/api/gevent.greenlet.html#gevent.Greenlet.minimal_ident
         self.savepoint_greenlet_id: Optional[str] = None
         self.write_greenlet_id: Optional[str] = None
+        # called once the open write transaction is committed
+        self.post_commit_callbacks: list[Callable[[], None]] = []
         if connection_type == DBConnectionType.GLOBAL:
             self._conn = sqlite3.connect(
                 database=path,
@@ -321,6 +323,21 @@ class DBConnection:
     def cursor(self) -> DBCursor:
         return DBCursor(connection=self, cursor=self._conn.cursor())
 
+    def call_after_commit(self, callback: Callable[[], None]) -> None:
+        """Calls the callback once the open write transaction is committed. If the
+        transaction is rolled back the callback is dropped. If no transaction is open
+        the callback is called right away."""
+        if self._conn.in_transaction is False:
+            callback()
+            return
+
+        self.post_commit_callbacks.append(callback)
+
+    def _run_post_commit_callbacks(self) -> None:
+        callbacks, self.post_commit_callbacks = self.post_commit_callbacks, []
+        for callback in callbacks:
+            callback()
+
     def close(self) -> None:
         self._conn.close()
         CONNECTION_MAP.pop(self.connection_type, None)
@@ -370,7 +387,9 @@ class DBConnection:
                         ('last_write_ts', str(ts_now())),
                     )
                 self._conn.commit()
+                self._run_post_commit_callbacks()
             finally:
+                self.post_commit_callbacks = []  # of a transaction that was rolled back
                 cursor.close()
                 self.write_greenlet_id = None
 
@@ -384,15 +403,19 @@ class DBConnection:
         rolls back this savepoint, otherwise releases it (aka forgets it -- this is not commited to the DB).
         Savepoints work like nested transactions, more information here: https://www.sqlite.org/lang_savepoint.html
         """    # noqa: E501
+        callbacks_num = len(self.post_commit_callbacks)
         cursor, savepoint_name = self._enter_savepoint(savepoint_name)
         try:
             yield cursor
         except Exception:
             self.rollback_savepoint(savepoint_name)
+            del self.post_commit_callbacks[callbacks_num:]  # registered in the savepoint
             raise
         finally:
             self.release_savepoint(savepoint_name)
             cursor.close()
+            if self._conn.in_transaction is False:  # released the outermost savepoint
+                self._run_post_commit_callbacks()
 
     def _enter_savepoint(self, savepoint_name: Optional[str] = None) -> tuple['DBCursor', str]:
         """
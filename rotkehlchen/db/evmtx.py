@@ -1,12 +1,17 @@
 import logging
-from typing import TYPE_CHECKING, Any, Optional, get_args
+from typing import TYPE_CHECKING, Any, Literal, Optional, get_args
 
 from rotkehlchen.chain.ethereum.constants import ETHEREUM_BEGIN
 from rotkehlchen.chain.evm.constants import GENESIS_HASH, ZERO_ADDRESS
-from rotkehlchen.chain.evm.structures import EvmTxReceipt, EvmTxReceiptLog
+from rotkehlchen.chain.evm.structures import (
+    EvmTxReceipt,
+    EvmTxReceiptLog,
+    deserialize_receipt_logs,
+    serialize_receipt_logs,
+)
 from rotkehlchen.chain.evm.types import EvmAccount
 from rotkehlchen.chain.optimism.constants import OPTIMISM_BEGIN
-from rotkehlchen.db.constants import HISTORY_MAPPING_STATE_DECODED
+from rotkehlchen.db.constants import HISTORY_MAPPING_STATE_DECODED, SQL_VARIABLES_LIMIT
 from rotkehlchen.db.filtering import EvmTransactionsFilterQuery, TransactionsNotDecodedFilterQuery
 from rotkehlchen.db.history_events import DBHistoryEvents
 from rotkehlchen.errors.serialization import DeserializationError
@@ -26,7 +31,7 @@ from rotkehlchen.types import (
     make_evm_tx_hash,
 )
 from rotkehlchen.utils.hexbytes import hexstring_to_bytes
-from rotkehlchen.utils.misc import hexstr_to_int
+from rotkehlchen.utils.misc import get_chunks, hexstr_to_int
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
@@ -37,6 +42,9 @@ if TYPE_CHECKING:
 
 from rotkehlchen.constants.limits import FREE_ETH_TX_LIMIT
 
+# the other variables of a transactions query by hash are the chain id and the free limit
+TX_HASHES_PER_QUERY = SQL_VARIABLES_LIMIT - 2
+
 TRANSACTIONS_MISSING_DECODING_QUERY = (
     'evmtx_receipts AS A LEFT OUTER JOIN evm_tx_mappings AS B ON A.tx_hash=B.tx_hash '
     'AND A.chain_id=B.chain_ID LEFT JOIN evm_transactions AS C on '
@@ -174,10 +182,26 @@ class DBEvmTx():
         """Returns a list of evm transactions optionally filtered by
         the given filter query
 
+        If the filter query is for more transaction hashes than fit in a single SQL query
+        then it's split in queries for chunks of the hashes and the transactions are
+        returned in the filter's order within each chunk. Any pagination of the filter
+        then applies to the transactions of all the chunks.
+
         This function can raise:
         - pysqlcipher3.dbapi2.OperationalError if the SQL query fails due to invalid
         filtering arguments.
         """
+        tx_hashes = filter_.tx_hashes
+        if tx_hashes is not None and len(tx_hashes) > TX_HASHES_PER_QUERY:
+            transactions = [
+                tx for chunk_filter in filter_.split_tx_hashes(TX_HASHES_PER_QUERY)
+                for tx in self.get_evm_transactions(cursor=cursor, filter_=chunk_filter, has_premium=has_premium)  # noqa: E501
+            ]
+            if filter_.pagination is not None:
+                offset = filter_.pagination.offset
+                return transactions[offset:offset + filter_.pagination.limit]
+            return transactions
+
         query, bindings = filter_.prepare()
         if has_premium:
             query = 'SELECT DISTINCT evm_transactions.tx_hash, evm_transactions.chain_id, timestamp, block_number, from_address, to_address, value, gas, gas_price, gas_used, input_data, nonce FROM evm_transactions ' + query  # noqa: E501
@@ -328,7 +352,7 @@ class DBEvmTx():
             cursor.execute(querystr, bindings)
             return cursor.fetchone()[0]
 
-    def add_receipt_data(  # pylint: disable=no-self-use
+    def add_receipt_data(
             self,
             write_cursor: 'DBCursor',
             chain_id: ChainID,
@@ -348,103 +372,134 @@ class DBEvmTx():
         If the receipt already exists in the DB:
         pysqlcipher3.dbapi2.IntegrityError: UNIQUE constraint failed: evmtx_receipts.tx_hash
         """
-        tx_hash_b = hexstring_to_bytes(data['transactionHash'])
-        # some nodes miss the type field for older non EIP1559 transactions. So assume legacy (0)
-        tx_type = hexstr_to_int(data.get('type', '0x0'))
-        status = data.get('status', 1)  # status may be missing for older txs. Assume 1.
-        serialized_chain_id = chain_id.serialize_for_db()
-        if status is None:
-            status = 1
-        contract_address = deserialize_evm_address(data['contractAddress']) if data['contractAddress'] else None  # noqa: E501
-        write_cursor.execute(
-            'INSERT INTO evmtx_receipts (tx_hash, chain_id, contract_address, status, type) '
-            'VALUES(?, ?, ?, ?, ?) ',
-            (tx_hash_b, serialized_chain_id, contract_address, status, tx_type),
-        )
+        self._add_receipts_data(write_cursor=write_cursor, chain_id=chain_id, receipts_data=[data], insert='INSERT')  # noqa: E501
 
-        log_tuples = []
-        topic_tuples = []
-        for log_entry in data['logs']:
-            log_index = log_entry['logIndex']
-            log_tuples.append((
-                tx_hash_b,
-                serialized_chain_id,
-                log_index,
-                hexstring_to_bytes(log_entry['data']),
-                deserialize_evm_address(log_entry['address']),
-                int(log_entry['removed']),
-            ))
+    def add_receipts_data(
+            self,
+            write_cursor: 'DBCursor',
+            chain_id: ChainID,
+            receipts_data: list[dict[str, Any]],
+    ) -> None:
+        """Same as add_receipt_data for many receipts, written with one query per table.
+        Receipts that are already in the DB are ignored.
+
+        May raise:
+        - Key Error if any of the expected fields are missing
+        - DeserializationError if there is a problem deserializing a value
+        - pysqlcipher3.dbapi2.IntegrityError if a transaction hash is not in the DB:
+        pysqlcipher3.dbapi2.IntegrityError: FOREIGN KEY constraint failed
+        """
+        self._add_receipts_data(write_cursor=write_cursor, chain_id=chain_id, receipts_data=receipts_data, insert='INSERT OR IGNORE')  # noqa: E501
+
+    def _add_receipts_data(  # pylint: disable=no-self-use
+            self,
+            write_cursor: 'DBCursor',
+            chain_id: ChainID,
+            receipts_data: list[dict[str, Any]],
+            insert: Literal['INSERT', 'INSERT OR IGNORE'],
+    ) -> None:
+        serialized_chain_id = chain_id.serialize_for_db()
+        receipt_tuples = []
+        address_topic0_tuples: list[tuple[bytes, int, ChecksumEvmAddress, bytes]] = []
+        for data in receipts_data:
+            tx_hash_b = hexstring_to_bytes(data['transactionHash'])
+            # some nodes miss the type field for older non EIP1559 transactions. Assume legacy (0)
+            tx_type = hexstr_to_int(data.get('type', '0x0'))
+            status = data.get('status', 1)  # status may be missing for older txs. Assume 1.
+            if status is None:
+                status = 1
+            contract_address = deserialize_evm_address(data['contractAddress']) if data['contractAddress'] else None  # noqa: E501
+            logs = []
+            address_topic0_pairs: set[tuple[ChecksumEvmAddress, bytes]] = set()
+            for log_entry in data['logs']:
+                tx_log = EvmTxReceiptLog(
+                    log_index=log_entry['logIndex'],
+                    data=hexstring_to_bytes(log_entry['data']),
+                    address=deserialize_evm_address(log_entry['address']),
+                    removed=bool(log_entry['removed']),
+                    topics=[hexstring_to_bytes(topic) for topic in log_entry['topics']],
+                )
+                logs.append(tx_log)
+                if len(tx_log.topics) != 0:
+                    address_topic0_pairs.add((tx_log.address, tx_log.topics[0]))
 
-            for idx, topic in enumerate(log_entry['topics']):
-                topic_tuples.append((
-                    tx_hash_b,
-                    serialized_chain_id,
-                    log_index,
-                    hexstring_to_bytes(topic),
-                    idx,
-                ))
+            logs.sort(key=lambda x: x.log_index)  # so that they are read in order
+            receipt_tuples.append((tx_hash_b, serialized_chain_id, contract_address, status, tx_type, serialize_receipt_logs(logs)))  # noqa: E501
+            address_topic0_tuples.extend((tx_hash_b, serialized_chain_id, *entry) for entry in address_topic0_pairs)  # noqa: E501
 
-        if len(log_tuples) != 0:
+        write_cursor.executemany(
+            f'{insert} INTO evmtx_receipts (tx_hash, chain_id, contract_address, status, type, logs) '  # noqa: E501
+            'VALUES(?, ?, ?, ?, ?, ?) ',
+            receipt_tuples,
+        )
+        if len(address_topic0_tuples) != 0:
             write_cursor.executemany(
-                'INSERT INTO evmtx_receipt_logs (tx_hash, chain_id, log_index, data, address, removed) '  # noqa: E501
-                'VALUES(? ,? ,? ,? ,?, ?)',
-                log_tuples,
+                f'{insert} INTO evmtx_receipt_log_index (tx_hash, chain_id, address, topic0) '
+                'VALUES(?, ?, ?, ?)',
+                address_topic0_tuples,
             )
 
-            if len(topic_tuples) != 0:
-                write_cursor.executemany(
-                    'INSERT INTO evmtx_receipt_log_topics (tx_hash, chain_id, log_index, topic, topic_index) '  # noqa: E501
-                    'VALUES(? ,? ,?, ?, ?)',
-                    topic_tuples,
-                )
-
-    def get_receipt(  # pylint: disable=no-self-use
+    def get_receipt(
             self,
             cursor: 'DBCursor',
             tx_hash: EVMTxHash,
             chain_id: ChainID,
     ) -> Optional[EvmTxReceipt]:
         """Get the evm receipt for the given tx_hash and chain id"""
-        chain_id_serialized = chain_id.serialize_for_db()
-        cursor.execute(
-            'SELECT contract_address, status, type from evmtx_receipts WHERE tx_hash=? AND chain_id=?',  # noqa: E501
-            (tx_hash, chain_id_serialized))
-        result = cursor.fetchone()
-        if result is None:
-            return None
-
-        tx_receipt = EvmTxReceipt(
-            tx_hash=tx_hash,
-            chain_id=chain_id,
-            contract_address=result[0],
-            status=bool(result[1]),  # works since value is either 0 or 1
-            type=result[2],
-        )
+        return self.get_receipts(cursor=cursor, tx_hashes=[tx_hash], chain_id=chain_id).get(tx_hash)  # noqa: E501
+
+    def get_receipts(  # pylint: disable=no-self-use
+            self,
+            cursor: 'DBCursor',
+            tx_hashes: list[EVMTxHash],
+            chain_id: ChainID,
+    ) -> dict[EVMTxHash, EvmTxReceipt]:
+        """Get the evm receipts of the given tx_hashes and chain id that are in the DB
+
+        The receipts are read with one query per chunk of hashes and their logs are
+        unpacked from the logs blob of each receipt.
 
-        cursor.execute(
-            'SELECT log_index, data, address, removed from evmtx_receipt_logs WHERE tx_hash=? AND chain_id=?',  # noqa: E501
-            (tx_hash, chain_id_serialized))
-        with self.db.conn.read_ctx() as other_cursor:
+        May raise:
+        - DeserializationError if the logs blob of a receipt is not properly formatted
+        """
+        chain_id_serialized = chain_id.serialize_for_db()
+        receipts: dict[EVMTxHash, EvmTxReceipt] = {}
+        for chunk in get_chunks(tx_hashes, n=SQL_VARIABLES_LIMIT - 1):
+            questionmarks = ','.join('?' * len(chunk))
+            cursor.execute(
+                f'SELECT tx_hash, contract_address, status, type, logs from evmtx_receipts '
+                f'WHERE chain_id=? AND tx_hash IN ({questionmarks})',
+                (chain_id_serialized, *chunk),
+            )
             for result in cursor:
-                log_index = result[0]
-                tx_receipt_log = EvmTxReceiptLog(
-                    log_index=log_index,
-                    data=result[1],
-                    address=result[2],
-                    removed=bool(result[3]),  # works since value is either 0 or 1
-                )
-                other_cursor.execute(
-                    'SELECT topic from evmtx_receipt_log_topics '
-                    'WHERE tx_hash=? AND log_index=? AND chain_id=?'
-                    'ORDER BY topic_index ASC',
-                    (tx_hash, log_index, chain_id_serialized),
+                tx_hash = make_evm_tx_hash(result[0])
+                receipts[tx_hash] = EvmTxReceipt(
+                    tx_hash=tx_hash,
+                    chain_id=chain_id,
+                    contract_address=result[1],
+                    status=bool(result[2]),  # works since value is either 0 or 1
+                    type=result[3],
+                    logs=deserialize_receipt_logs(result[4]),
                 )
-                for topic_result in other_cursor:
-                    tx_receipt_log.topics.append(topic_result[0])
 
-                tx_receipt.logs.append(tx_receipt_log)
+        return receipts
 
-        return tx_receipt
+    def get_tx_hashes_with_logs(  # pylint: disable=no-self-use
+            self,
+            cursor: 'DBCursor',
+            chain_id: ChainID,
+            address: ChecksumEvmAddress,
+            topic0: Optional[bytes] = None,
+    ) -> list[EVMTxHash]:
+        """Get the hashes of the transactions of the given chain whose receipt has logs
+        emitted by the given address and, if given, with the given first topic.
+        Logs without topics are not indexed so they are not taken into account."""
+        querystr = 'SELECT DISTINCT tx_hash FROM evmtx_receipt_log_index WHERE chain_id=? AND address=?'  # noqa: E501
+        bindings: tuple = (chain_id.serialize_for_db(), address)
+        if topic0 is not None:
+            querystr += ' AND topic0=?'
+            bindings = (*bindings, topic0)
+        return [make_evm_tx_hash(entry[0]) for entry in cursor.execute(querystr, bindings)]
 
     def delete_transactions(
             self,
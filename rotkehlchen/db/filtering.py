@@ -1,6 +1,6 @@
 import logging
 from dataclasses import dataclass
-from typing import Any, Generic, Literal, NamedTuple, Optional, TypeVar, Union, cast
+from typing import Any, Generic, Iterator, Literal, NamedTuple, Optional, TypeVar, Union, cast
 
 from rotkehlchen.accounting.ledger_actions import LedgerActionType
 from rotkehlchen.accounting.structures.types import HistoryEventSubType, HistoryEventType
@@ -22,7 +22,7 @@ from rotkehlchen.types import (
     Timestamp,
     TradeType,
 )
-from rotkehlchen.utils.misc import ts_now
+from rotkehlchen.utils.misc import get_chunks, ts_now
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
@@ -204,8 +204,13 @@ class DBTransactionsPendingDecodingFilter(DBFilter):
 @dataclass(init=True, repr=True, eq=True, order=False, unsafe_hash=False, frozen=False)
 class DBEvmTransactionHashFilter(DBFilter):
     tx_hash: Optional[EVMTxHash] = None
+    tx_hashes: Optional[list[EVMTxHash]] = None
 
     def prepare(self) -> tuple[list[str], list[Any]]:
+        if self.tx_hashes is not None:
+            questionmarks = ','.join('?' * len(self.tx_hashes))
+            return [f'tx_hash IN ({questionmarks})'], list(self.tx_hashes)
+
         if self.tx_hash is None:
             return [], []
 
@@ -411,6 +416,30 @@ class EvmTransactionsFilterQuery(DBFilterQuery, FilterWithTimestamp):
             return self.filters[-1].chain_id
         return None
 
+    @property
+    def tx_hashes(self) -> Optional[list[EVMTxHash]]:
+        if len(self.filters) != 0 and isinstance(self.filters[0], DBEvmTransactionHashFilter):
+            return self.filters[0].tx_hashes
+        return None
+
+    def split_tx_hashes(self, n: int) -> Iterator['EvmTransactionsFilterQuery']:
+        """Yields copies of this filter query for successive n-sized chunks of its tx_hashes
+        so that each query fits under the limit of variables of an SQL query.
+
+        The chunks have no pagination, since it applies to the results of all of them."""
+        tx_hashes = self.tx_hashes
+        assert tx_hashes is not None, 'should only be called for a tx_hashes filter query'
+        for chunk in get_chunks(tx_hashes, n=n):
+            filter_query = EvmTransactionsFilterQuery(
+                and_op=self.and_op,
+                filters=[DBEvmTransactionHashFilter(and_op=True, tx_hashes=chunk), *self.filters[1:]],  # noqa: E501
+                join_clause=self.join_clause,
+                order_by=self.order_by,
+                pagination=None,
+            )
+            filter_query.timestamp_filter = self.timestamp_filter
+            yield filter_query
+
     @classmethod
     def make(
             cls,
@@ -422,6 +451,7 @@ class EvmTransactionsFilterQuery(DBFilterQuery, FilterWithTimestamp):
             from_ts: Optional[Timestamp] = None,
             to_ts: Optional[Timestamp] = None,
             tx_hash: Optional[EVMTxHash] = None,
+            tx_hashes: Optional[list[EVMTxHash]] = None,
             chain_id: Optional[SUPPORTED_CHAIN_IDS] = None,
             protocols: Optional[list[str]] = None,
             asset: Optional[EvmToken] = None,
@@ -446,8 +476,8 @@ class EvmTransactionsFilterQuery(DBFilterQuery, FilterWithTimestamp):
             to_ts=to_ts,
         )
         filters: list[DBFilter] = []
-        if tx_hash is not None:  # tx_hash means single result so make it as single filter
-            filters.append(DBEvmTransactionHashFilter(and_op=True, tx_hash=tx_hash))
+        if tx_hash is not None or tx_hashes is not None:  # hashes identify the transactions
+            filters.append(DBEvmTransactionHashFilter(and_op=True, tx_hash=tx_hash, tx_hashes=tx_hashes))  # noqa: E501
             if chain_id is not None:  # keep it as last (see chain_id property of this filter)
                 filters.append(DBEvmChainIDFilter(and_op=True, chain_id=chain_id))
 
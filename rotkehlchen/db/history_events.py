@@ -1,5 +1,5 @@
 import logging
-from typing import TYPE_CHECKING, Optional, Sequence
+from typing import TYPE_CHECKING, Iterator, Optional, Sequence
 
 from pysqlcipher3 import dbapi2 as sqlcipher
 
@@ -13,6 +13,7 @@ from rotkehlchen.db.constants import (
     HISTORY_MAPPING_STATE_CUSTOMIZED,
 )
 from rotkehlchen.db.filtering import HistoryEventFilterQuery
+from rotkehlchen.db.reports import DBAccountingReports
 from rotkehlchen.errors.asset import UnknownAsset
 from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.fval import FVal
@@ -97,6 +98,10 @@ class DBHistoryEvents():
     def edit_history_event(self, event: HistoryBaseEntry) -> tuple[bool, str]:
         """Edit a history entry to the DB. Returns the edited entry"""
         with self.db.user_write() as cursor:
+            result = cursor.execute(
+                'SELECT timestamp FROM history_events WHERE identifier=?',
+                (event.identifier,),
+            ).fetchone()
             try:
                 cursor.execute(
                     'UPDATE history_events SET event_identifier=?, sequence_index=?, timestamp=?, '
@@ -121,6 +126,10 @@ class DBHistoryEvents():
                 'VALUES(?, ?, ?)',
                 (event.identifier, HISTORY_MAPPING_KEY_STATE, HISTORY_MAPPING_STATE_CUSTOMIZED),
             )
+            DBAccountingReports(self.db).delete_checkpoints_after_commit(
+                write_cursor=cursor,
+                timestamp=ts_ms_to_sec(min(TimestampMS(result[0]), event.timestamp)),
+            )
 
         return True, ''
 
@@ -227,6 +236,19 @@ class DBHistoryEvents():
         """
         Get history events using the provided query filter
         """
+        return list(self.iterate_history_events(
+            cursor=cursor,
+            filter_query=filter_query,
+            has_premium=has_premium,
+        ))
+
+    def iterate_history_events(
+            self,
+            cursor: 'DBCursor',
+            filter_query: HistoryEventFilterQuery,
+            has_premium: bool,
+    ) -> Iterator[HistoryBaseEntry]:
+        """Same as get_history_events but yields the events as they are read from the DB cursor"""  # noqa: E501
         query, bindings = filter_query.prepare()
 
         if has_premium:
@@ -236,7 +258,6 @@ class DBHistoryEvents():
             query = 'SELECT * FROM (SELECT * from history_events ORDER BY timestamp DESC, sequence_index ASC LIMIT ?) ' + query  # noqa: E501
             cursor.execute(query, [FREE_HISTORY_EVENTS_LIMIT] + bindings)
 
-        output = []
         for entry in cursor:
             try:
                 deserialized = HistoryBaseEntry.deserialize_from_db(entry)
@@ -244,9 +265,7 @@ class DBHistoryEvents():
                 log.debug(f'Failed to deserialize history event {entry} due to {str(e)}')
                 continue
 
-            output.append(deserialized)
-
-        return output
+            yield deserialized
 
     def get_history_events_and_limit_info(
             self,
@@ -1,15 +1,17 @@
 import logging
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Iterator, Optional
 
 from pysqlcipher3 import dbapi2 as sqlcipher
 
 from rotkehlchen.accounting.ledger_actions import LedgerAction
 from rotkehlchen.constants.limits import FREE_LEDGER_ACTIONS_LIMIT
 from rotkehlchen.db.filtering import LedgerActionsFilterQuery
+from rotkehlchen.db.reports import DBAccountingReports
 from rotkehlchen.errors.asset import UnknownAsset
 from rotkehlchen.errors.misc import InputError
 from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.types import Timestamp
 from rotkehlchen.user_messages import MessagesAggregator
 
 logger = logging.getLogger(__name__)
@@ -52,6 +54,20 @@ class DBLedgerActions():
 
         Returned list is ordered according to the passed filter query
         """
+        return list(self.iterate_ledger_actions(
+            cursor=cursor,
+            filter_query=filter_query,
+            has_premium=has_premium,
+        ))
+
+    def iterate_ledger_actions(
+            self,
+            cursor: 'DBCursor',
+            filter_query: LedgerActionsFilterQuery,
+            has_premium: bool,
+    ) -> Iterator[LedgerAction]:
+        """Same as get_ledger_actions but yields the ledger actions as they are
+        read from the DB cursor"""
         query_filter, bindings = filter_query.prepare()
         if has_premium:
             query = 'SELECT * from ledger_actions ' + query_filter
@@ -60,7 +76,6 @@ class DBLedgerActions():
             query = 'SELECT * FROM (SELECT * from ledger_actions ORDER BY timestamp DESC LIMIT ?) ' + query_filter  # noqa: E501
             results = cursor.execute(query, [FREE_LEDGER_ACTIONS_LIMIT] + bindings)
 
-        actions = []
         for result in results:
             try:
                 action = LedgerAction.deserialize_from_db(result)
@@ -77,9 +92,7 @@ class DBLedgerActions():
                 )
                 continue
 
-            actions.append(action)
-
-        return actions
+            yield action
 
     def add_ledger_action(self, write_cursor: 'DBCursor', action: LedgerAction) -> int:  # pylint: disable=no-self-use  # noqa: E501
         """Adds a new ledger action to the DB and returns its identifier for success
@@ -136,11 +149,20 @@ class DBLedgerActions():
         asset=?, rate=?, rate_asset=?, link=?, notes=? WHERE identifier=?"""
         db_action_tuple = action.serialize_for_db()
         with self.db.user_write() as cursor:
+            result = cursor.execute(
+                'SELECT timestamp FROM ledger_actions WHERE identifier=?',
+                (action.identifier,),
+            ).fetchone()
             cursor.execute(query, (*db_action_tuple, action.identifier))
             if cursor.rowcount != 1:
                 error_msg = (
                     f'Tried to edit ledger action with identifier {action.identifier} '
                     f'but it was not found in the DB'
                 )
+            else:
+                DBAccountingReports(self.db).delete_checkpoints_after_commit(
+                    write_cursor=cursor,
+                    timestamp=min(Timestamp(result[0]), action.timestamp),
+                )
 
         return error_msg
@@ -18,9 +18,8 @@ MINIMIZED_USER_DB_SCHEMA = {
     'trades': 'idTEXTPRIMARYKEYNOTNULL,timestampINTEGERNOTNULL,locationCHAR(1)NOTNULLDEFAULT("A")REFERENCESlocation(location),base_assetTEXTNOTNULL,quote_assetTEXTNOTNULL,typeCHAR(1)NOTNULLDEFAULT("A")REFERENCEStrade_type(type),amountTEXTNOTNULL,rateTEXTNOTNULL,feeTEXT,fee_currencyTEXT,linkTEXT,notesTEXT,FOREIGNKEY(base_asset)REFERENCESassets(identifier)ONUPDATECASCADE,FOREIGNKEY(quote_asset)REFERENCESassets(identifier)ONUPDATECASCADE,FOREIGNKEY(fee_currency)REFERENCESassets(identifier)ONUPDATECASCADE',
     'evm_transactions': 'tx_hashBLOBNOTNULL,chain_idINTEGERNOTNULL,timestampINTEGERNOTNULL,block_numberINTEGERNOTNULL,from_addressTEXTNOTNULL,to_addressTEXT,valueTEXTNOTNULL,gasTEXTNOTNULL,gas_priceTEXTNOTNULL,gas_usedTEXTNOTNULL,input_dataBLOBNOTNULL,nonceINTEGERNOTNULL,PRIMARYKEY(tx_hash,chain_id)',
     'evm_internal_transactions': 'parent_tx_hashBLOBNOTNULL,chain_idINTEGERNOTNULL,trace_idINTEGERNOTNULL,timestampINTEGERNOTNULL,block_numberINTEGERNOTNULL,from_addressTEXTNOTNULL,to_addressTEXT,valueTEXTNOTNULL,FOREIGNKEY(parent_tx_hash,chain_id)REFERENCESevm_transactions(tx_hash,chain_id)ONDELETECASCADEONUPDATECASCADE,PRIMARYKEY(parent_tx_hash,chain_id,trace_id,from_address,to_address,value)',
-    'evmtx_receipts': 'tx_hashBLOBNOTNULL,chain_idINTEGERNOTNULL,contract_addressTEXT,/*canbenull*/statusINTEGERNOTNULLCHECK(statusIN(0,1)),typeINTEGERNOTNULL,FOREIGNKEY(tx_hash,chain_id)REFERENCESevm_transactions(tx_hash,chain_id)ONDELETECASCADEONUPDATECASCADE,PRIMARYKEY(tx_hash,chain_id)',
-    'evmtx_receipt_logs': 'tx_hashBLOBNOTNULL,chain_idINTEGERNOTNULL,log_indexINTEGERNOTNULL,dataBLOBNOTNULL,addressTEXTNOTNULL,removedINTEGERNOTNULLCHECK(removedIN(0,1)),FOREIGNKEY(tx_hash,chain_id)REFERENCESevmtx_receipts(tx_hash,chain_id)ONDELETECASCADEONUPDATECASCADE,PRIMARYKEY(tx_hash,chain_id,log_index)',
-    'evmtx_receipt_log_topics': 'tx_hashBLOBNOTNULL,chain_idINTEGERNOTNULL,log_indexINTEGERNOTNULL,topicBLOBNOTNULL,topic_indexINTEGERNOTNULL,FOREIGNKEY(tx_hash,chain_id,log_index)REFERENCESevmtx_receipt_logs(tx_hash,chain_id,log_index)ONDELETECASCADEONUPDATECASCADE,PRIMARYKEY(tx_hash,chain_id,log_index,topic_index)',
+    'evmtx_receipts': 'tx_hashBLOBNOTNULL,chain_idINTEGERNOTNULL,contract_addressTEXT,/*canbenull*/statusINTEGERNOTNULLCHECK(statusIN(0,1)),typeINTEGERNOTNULL,logsBLOBNOTNULL,/*alllogsandtopicspackedbyserialize_receipt_logs*/FOREIGNKEY(tx_hash,chain_id)REFERENCESevm_transactions(tx_hash,chain_id)ONDELETECASCADEONUPDATECASCADE,PRIMARYKEY(tx_hash,chain_id)',
+    'evmtx_receipt_log_index': 'tx_hashBLOBNOTNULL,chain_idINTEGERNOTNULL,addressTEXTNOTNULL,topic0BLOBNOTNULL,FOREIGNKEY(tx_hash,chain_id)REFERENCESevmtx_receipts(tx_hash,chain_id)ONDELETECASCADEONUPDATECASCADE,PRIMARYKEY(tx_hash,chain_id,address,topic0)',
     'evmtx_address_mappings': 'addressTEXTNOTNULL,tx_hashBLOBNOTNULL,chain_idINTEGERNOTNULL,blockchainTEXTNOTNULL,FOREIGNKEY(blockchain,address)REFERENCESblockchain_accounts(blockchain,account)ONDELETECASCADE,FOREIGNKEY(tx_hash,chain_id)referencesevm_transactions(tx_hash,chain_id)ONUPDATECASCADEONDELETECASCADE,PRIMARYKEY(address,tx_hash,chain_id)',
     'margin_positions': 'idTEXTPRIMARYKEY,locationCHAR(1)NOTNULLDEFAULT("A")REFERENCESlocation(location),open_timeINTEGER,close_timeINTEGER,profit_lossTEXT,pl_currencyTEXTNOTNULL,feeTEXT,fee_currencyTEXT,linkTEXT,notesTEXT,FOREIGNKEY(pl_currency)REFERENCESassets(identifier)ONUPDATECASCADE,FOREIGNKEY(fee_currency)REFERENCESassets(identifier)ONUPDATECASCADE',
     'asset_movements': 'idTEXTPRIMARYKEY,locationCHAR(1)NOTNULLDEFAULT("A")REFERENCESlocation(location),categoryCHAR(1)NOTNULLDEFAULT("A")REFERENCESasset_movement_category(category),addressTEXT,transaction_idTEXT,timestampINTEGER,assetTEXTNOTNULL,amountTEXT,fee_assetTEXT,feeTEXT,linkTEXT,FOREIGNKEY(asset)REFERENCESassets(identifier)ONUPDATECASCADE,FOREIGNKEY(fee_asset)REFERENCESassets(identifier)ONUPDATECASCADE',
@@ -1,10 +1,16 @@
+import json
 import logging
 from copy import deepcopy
 from typing import TYPE_CHECKING, Any, Callable, Literal, Optional, Union, overload
 
 from pysqlcipher3 import dbapi2 as sqlcipher
 
-from rotkehlchen.accounting.constants import FREE_PNL_EVENTS_LIMIT, FREE_REPORTS_LOOKUP_LIMIT
+from rotkehlchen.accounting.checkpoints import PnlCheckpoint
+from rotkehlchen.accounting.constants import (
+    FREE_PNL_EVENTS_LIMIT,
+    FREE_REPORTS_LOOKUP_LIMIT,
+    PNL_EVENTS_WRITE_BATCH_SIZE,
+)
 from rotkehlchen.accounting.pnl import PnlTotals
 from rotkehlchen.accounting.structures.processed_event import ProcessedAccountingEvent
 from rotkehlchen.db.settings import DBSettings
@@ -13,6 +19,7 @@ from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.types import Timestamp
 from rotkehlchen.utils.misc import ts_now
+from rotkehlchen.utils.serialization import rlk_jsondumps
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
@@ -104,6 +111,15 @@ class DBAccountingReports():
 
         return report_id
 
+    def set_first_processed_timestamp(self, report_id: int, timestamp: Timestamp) -> None:
+        """Sets the first processed timestamp of a report whose processing started
+        over from another event than the one it was created with"""
+        with self.db.transient_write() as cursor:
+            cursor.execute(
+                'UPDATE pnl_reports SET first_processed_timestamp=? WHERE identifier=?',
+                (timestamp, report_id),
+            )
+
     def add_report_overview(
             self,
             report_id: int,
@@ -111,13 +127,20 @@ class DBAccountingReports():
             processed_actions: int,
             total_actions: int,
             pnls: PnlTotals,
+            report_data: Optional['DBReportDataWriter'] = None,
     ) -> None:
         """Inserts the report overview data
 
+        If a report data writer is given then any events still buffered in it are
+        written in the same transaction as the overview.
+
         May raise:
-        - InputError if the given report id does not exist
+        - InputError if the given report id does not exist or the buffered events
+        could not be written
         """
         with self.db.transient_write() as cursor:
+            if report_data is not None:
+                report_data.write_pending(cursor)
             cursor.execute(
                 'UPDATE pnl_reports SET last_processed_timestamp=?,'
                 ' processed_actions=?, total_actions=? WHERE identifier=?',
@@ -262,6 +285,117 @@ class DBAccountingReports():
                     f'Probably report {report_id} does not exist?',
                 ) from e
 
+    def report_data_writer(
+            self,
+            report_id: int,
+            batch_size: int = PNL_EVENTS_WRITE_BATCH_SIZE,
+    ) -> 'DBReportDataWriter':
+        """Returns a buffered writer for the events of the given report.
+
+        Prefer this over add_report_data when writing many events"""
+        return DBReportDataWriter(database=self.db, report_id=report_id, batch_size=batch_size)
+
+    def add_checkpoint(self, fingerprint: str, checkpoint: PnlCheckpoint) -> None:
+        """Saves a checkpoint of history processing, replacing any existing one for
+        the same settings fingerprint and timestamp"""
+        with self.db.transient_write() as cursor:
+            cursor.execute(
+                'INSERT OR REPLACE INTO pnl_checkpoints(fingerprint, timestamp, report_id, '
+                'first_processed_timestamp, events_num, history_fingerprint, '
+                'processed_actions, state) VALUES(?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    fingerprint,
+                    checkpoint.timestamp,
+                    checkpoint.report_id,
+                    checkpoint.first_processed_timestamp,
+                    checkpoint.events_num,
+                    checkpoint.history_fingerprint,
+                    checkpoint.processed_actions,
+                    rlk_jsondumps(checkpoint.state),
+                ),
+            )
+
+    def get_checkpoint(
+            self,
+            fingerprint: str,
+            start_ts: Timestamp,
+            end_ts: Timestamp,
+    ) -> Optional[PnlCheckpoint]:
+        """Returns the latest checkpoint with the given settings fingerprint that a
+        report for the given range can start processing from.
+
+        The checkpoint has to be at or before the start of the range, so that all the
+        events of the range are processed and written in the report.
+        """
+        with self.db.conn_transient.read_ctx() as cursor:
+            result = cursor.execute(
+                'SELECT timestamp, report_id, first_processed_timestamp, events_num, '
+                'history_fingerprint, processed_actions, state FROM pnl_checkpoints '
+                'WHERE fingerprint=? AND timestamp<=? ORDER BY timestamp DESC LIMIT 1',
+                (fingerprint, min(start_ts, end_ts)),
+            ).fetchone()
+
+        if result is None:
+            return None
+
+        try:
+            state = json.loads(result[6])
+        except json.JSONDecodeError as e:
+            log.error(f'Could not decode the state of the PnL checkpoint at {result[0]}: {str(e)}')  # noqa: E501
+            return None
+
+        return PnlCheckpoint(
+            timestamp=Timestamp(result[0]),
+            report_id=result[1],
+            first_processed_timestamp=Timestamp(result[2]),
+            events_num=result[3],
+            history_fingerprint=result[4],
+            processed_actions=result[5],
+            state=state,
+        )
+
+    def delete_checkpoints(self, fingerprint: str, from_ts: Timestamp) -> None:
+        """Deletes the checkpoints with the given settings fingerprint from the given
+        timestamp onwards"""
+        with self.db.transient_write() as cursor:
+            cursor.execute(
+                'DELETE FROM pnl_checkpoints WHERE fingerprint=? AND timestamp>=?',
+                (fingerprint, from_ts),
+            )
+
+    def delete_checkpoints_after_commit(
+            self,
+            write_cursor: 'DBCursor',
+            timestamp: Timestamp,
+    ) -> None:
+        """Deletes the checkpoints of any settings that are after the given timestamp,
+        once the user DB transaction of the cursor commits.
+
+        To be called when an event is edited in place, with the earliest of its old and
+        new timestamps, since that does not change the history fingerprint of the
+        checkpoints after it.
+        """
+        def delete_checkpoints() -> None:
+            with self.db.transient_write() as cursor:
+                cursor.execute(
+                    'DELETE FROM pnl_checkpoints WHERE timestamp>?',
+                    (timestamp,),
+                )
+
+        write_cursor.connection.call_after_commit(delete_checkpoints)
+
+    def copy_checkpoint_events(self, checkpoint: PnlCheckpoint, report_id: int) -> None:
+        """Copies the processed events before the checkpoint from the report that saved
+        it to the given report, so that it has all the events it would have if it
+        processed the events before the checkpoint itself"""
+        with self.db.transient_write() as cursor:
+            cursor.execute(
+                'INSERT INTO pnl_events(report_id, timestamp, data) '
+                'SELECT ?, timestamp, data FROM pnl_events WHERE report_id=? AND timestamp<? '
+                'ORDER BY identifier',
+                (report_id, checkpoint.report_id, checkpoint.timestamp),
+            )
+
     def get_report_data(
             self,
             filter_: 'ReportDataFilterQuery',
@@ -316,3 +450,78 @@ class DBAccountingReports():
             entries=records,
             with_limit=with_limit,
         )
+
+
+class DBReportDataWriter():
+    """Buffers the processed events of a PnL report and writes them to the DB
+    in batches, using a single transaction per batch.
+
+    Events that are still buffered when processing aborts are never written and are
+    dropped at the next reset. A batch that fails to be written is rolled back as a whole.
+    """
+
+    def __init__(
+            self,
+            database: 'DBHandler',
+            report_id: int,
+            batch_size: int = PNL_EVENTS_WRITE_BATCH_SIZE,
+    ) -> None:
+        self.db = database
+        self.report_id = report_id
+        self.batch_size = batch_size
+        self.pending: list[tuple[int, Timestamp, str]] = []
+
+    def add(
+            self,
+            time: Timestamp,
+            ts_converter: Callable[[Timestamp], str],
+            event: ProcessedAccountingEvent,
+    ) -> None:
+        """Buffers a new event and writes the buffer to the DB if it is full
+
+        May raise:
+        - DeserializationError if there is a conflict at serialization of the event
+        - InputError if the buffered events can not be written to the DB.
+        """
+        data = event.serialize_for_db(ts_converter)
+        self.pending.append((self.report_id, time, data))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all buffered events to the DB in one transaction
+
+        May raise:
+        - InputError if the events can not be written to the DB.
+        """
+        if len(self.pending) == 0:
+            return
+
+        with self.db.transient_write() as cursor:
+            self.write_pending(cursor)
+
+    def write_pending(self, cursor: 'DBCursor') -> None:
+        """Writes all buffered events using the given cursor. The caller is
+        responsible for the transaction. The buffer is emptied even if the write fails.
+
+        May raise:
+        - InputError if the events can not be written to the DB.
+        """
+        pending, self.pending = self.pending, []
+        if len(pending) == 0:
+            return
+
+        try:
+            cursor.executemany(
+                'INSERT INTO pnl_events(report_id, timestamp, data) VALUES(?, ?, ?)',
+                pending,
+            )
+        except sqlcipher.IntegrityError as e:  # pylint: disable=no-member
+            raise InputError(
+                f'Could not write {len(pending)} events to the DB due to {str(e)}. '
+                f'Probably report {self.report_id} does not exist?',
+            ) from e
+
+    def discard(self) -> None:
+        """Drops all buffered events without writing them"""
+        self.pending = []
@@ -217,6 +217,19 @@ CREATE TABLE IF NOT EXISTS user_credentials_mappings (
 );
 """  # noqa: E501
 
+# The id of the next trade to query and the time of the last seen trade of each market
+# of a binance exchange. Renamed and deleted together with the exchange by the DBHandler.
+DB_CREATE_BINANCE_TRADE_CURSORS = """
+CREATE TABLE IF NOT EXISTS binance_trade_cursors (
+    exchange_name TEXT NOT NULL,
+    location CHAR(1) NOT NULL REFERENCES location(location),
+    market TEXT NOT NULL,
+    next_trade_id INTEGER NOT NULL,
+    last_trade_ts INTEGER NOT NULL,
+    PRIMARY KEY (exchange_name, location, market)
+);
+"""
+
 DB_CREATE_AAVE_EVENTS = """
 CREATE TABLE IF NOT EXISTS aave_events (
     address VARCHAR[42] NOT NULL,
@@ -476,34 +489,24 @@ CREATE TABLE IF NOT EXISTS evmtx_receipts (
     contract_address TEXT, /* can be null */
     status INTEGER NOT NULL CHECK (status IN (0, 1)),
     type INTEGER NOT NULL,
+    logs BLOB NOT NULL, /* all logs and topics packed by serialize_receipt_logs */
     FOREIGN KEY(tx_hash, chain_id) REFERENCES evm_transactions(tx_hash, chain_id) ON DELETE CASCADE ON UPDATE CASCADE,
     PRIMARY KEY(tx_hash, chain_id)
 );
 """  # noqa: E501
 
-DB_CREATE_EVMTX_RECEIPT_LOGS = """
-CREATE TABLE IF NOT EXISTS evmtx_receipt_logs (
+# The distinct address and first topic pairs of the logs of each receipt, to find logs without
+# unpacking the receipts. Logs without topics are not indexed.
+DB_CREATE_EVMTX_RECEIPT_LOG_INDEX = """
+CREATE TABLE IF NOT EXISTS evmtx_receipt_log_index (
     tx_hash BLOB NOT NULL,
     chain_id INTEGER NOT NULL,
-    log_index INTEGER NOT NULL,
-    data BLOB NOT NULL,
     address TEXT NOT NULL,
-    removed INTEGER NOT NULL CHECK (removed IN (0, 1)),
+    topic0 BLOB NOT NULL,
     FOREIGN KEY(tx_hash, chain_id) REFERENCES evmtx_receipts(tx_hash, chain_id) ON DELETE CASCADE ON UPDATE CASCADE,
-    PRIMARY KEY(tx_hash, chain_id, log_index)
-);
-"""  # noqa: E501
-
-DB_CREATE_EVMTX_RECEIPT_LOG_TOPICS = """
-CREATE TABLE IF NOT EXISTS evmtx_receipt_log_topics (
-    tx_hash BLOB NOT NULL,
-    chain_id INTEGER NOT NULL,
-    log_index INTEGER NOT NULL,
-    topic BLOB NOT NULL,
-    topic_index INTEGER NOT NULL,
-    FOREIGN KEY(tx_hash, chain_id, log_index) REFERENCES evmtx_receipt_logs(tx_hash, chain_id, log_index) ON DELETE CASCADE ON UPDATE CASCADE,
-    PRIMARY KEY(tx_hash, chain_id, log_index, topic_index)
+    PRIMARY KEY(tx_hash, chain_id, address, topic0)
 );
+CREATE INDEX IF NOT EXISTS idx_evmtx_receipt_log_index_address_topic0 ON evmtx_receipt_log_index(address, topic0);
 """  # noqa: E501
 
 # TODO: This here shows a weakness of using both chain_id and blockchain to identify
@@ -738,6 +741,7 @@ BEGIN TRANSACTION;
 {DB_CREATE_TIMED_LOCATION_DATA}
 {DB_CREATE_USER_CREDENTIALS}
 {DB_CREATE_USER_CREDENTIALS_MAPPINGS}
+{DB_CREATE_BINANCE_TRADE_CURSORS}
 {DB_CREATE_EXTERNAL_SERVICE_CREDENTIALS}
 {DB_CREATE_BLOCKCHAIN_ACCOUNTS}
 {DB_CREATE_EVM_ACCOUNTS_DETAILS}
@@ -747,8 +751,7 @@ BEGIN TRANSACTION;
 {DB_CREATE_EVM_TRANSACTIONS}
 {DB_CREATE_EVM_INTERNAL_TRANSACTIONS}
 {DB_CREATE_EVMTX_RECEIPTS}
-{DB_CREATE_EVMTX_RECEIPT_LOGS}
-{DB_CREATE_EVMTX_RECEIPT_LOG_TOPICS}
+{DB_CREATE_EVMTX_RECEIPT_LOG_INDEX}
 {DB_CREATE_EVMTX_ADDRESS_MAPPINGS}
 {DB_CREATE_MARGIN}
 {DB_CREATE_ASSET_MOVEMENTS}
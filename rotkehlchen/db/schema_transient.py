@@ -47,6 +47,37 @@ CREATE TABLE IF NOT EXISTS pnl_events (
 );
 """
 
+# State of the accounting pot saved while processing history for a PnL report, so that
+# later reports with the same settings can start processing from it. Reports that do
+# copy the events processed before it from the report that saved it.
+DB_CREATE_PNL_CHECKPOINTS = """
+CREATE TABLE IF NOT EXISTS pnl_checkpoints (
+    fingerprint TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    report_id INTEGER NOT NULL,
+    first_processed_timestamp INTEGER NOT NULL,
+    events_num INTEGER NOT NULL,
+    history_fingerprint TEXT NOT NULL,
+    processed_actions INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    FOREIGN KEY (report_id) REFERENCES pnl_reports(identifier) ON DELETE CASCADE ON UPDATE CASCADE,
+    PRIMARY KEY(fingerprint, timestamp)
+);
+"""
+
+# Cached results of remote queries, such as exchange balances, so that they are
+# available right after a restart. See rotkehlchen.db.cached_results
+DB_CREATE_CACHED_RESULTS = """
+CREATE TABLE IF NOT EXISTS cached_results (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY(namespace, key)
+);
+"""
+
 DB_CREATE_SETTINGS = """
 CREATE TABLE IF NOT EXISTS settings (
     name VARCHAR[24] NOT NULL PRIMARY KEY,
@@ -61,6 +92,8 @@ BEGIN TRANSACTION;
 {DB_CREATE_REPORT_SETTINGS}
 {DB_CREATE_REPORT_TOTALS}
 {DB_CREATE_PNL_EVENTS}
+{DB_CREATE_PNL_CHECKPOINTS}
+{DB_CREATE_CACHED_RESULTS}
 {DB_CREATE_SETTINGS}
 COMMIT;
 PRAGMA foreign_keys=on;
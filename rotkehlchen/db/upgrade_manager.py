@@ -18,6 +18,7 @@ from rotkehlchen.db.upgrades.v32_v33 import upgrade_v32_to_v33
 from rotkehlchen.db.upgrades.v33_v34 import upgrade_v33_to_v34
 from rotkehlchen.db.upgrades.v34_v35 import upgrade_v34_to_v35
 from rotkehlchen.db.upgrades.v35_v36 import upgrade_v35_to_v36
+from rotkehlchen.db.upgrades.v36_v37 import upgrade_v36_to_v37
 from rotkehlchen.errors.misc import DBUpgradeError
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.utils.interfaces import ProgressUpdater
@@ -74,6 +75,10 @@ UPGRADES_LIST = [
         from_version=35,
         function=upgrade_v35_to_v36,
     ),
+    UpgradeRecord(
+        from_version=36,
+        function=upgrade_v36_to_v37,
+    ),
 ]
 
 
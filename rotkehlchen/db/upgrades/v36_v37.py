@@ -0,0 +1,172 @@
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from rotkehlchen.chain.evm.structures import EvmTxReceiptLog, serialize_receipt_logs
+from rotkehlchen.db.utils import table_exists
+from rotkehlchen.errors.serialization import DeserializationError
+from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.types import ChecksumEvmAddress
+
+if TYPE_CHECKING:
+    from rotkehlchen.db.dbhandler import DBHandler
+    from rotkehlchen.db.drivers.gevent import DBCursor
+    from rotkehlchen.db.upgrade_manager import DBUpgradeProgressHandler
+
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
+# Receipts written at once while packing their logs
+RECEIPTS_CHUNK_SIZE = 1000
+
+
+def _pack_receipt_logs(write_cursor: 'DBCursor') -> None:
+    """Move the receipt logs and topics from one row per log and per topic to one blob
+    per receipt and create the index table of the logs' address and first topic.
+
+    The receipts are read in order with all their logs and topics, one receipt at a
+    time, and written in chunks so that the tables are never loaded in memory. A receipt
+    whose logs can't be packed is dropped, so that it's queried again.
+    """
+    log.debug('Enter _pack_receipt_logs')
+    if table_exists(write_cursor, 'evmtx_receipt_logs') is False:
+        log.debug('Exit _pack_receipt_logs')
+        return
+
+    write_cursor.execute("""
+    CREATE TABLE evmtx_receipts_new (
+        tx_hash BLOB NOT NULL,
+        chain_id INTEGER NOT NULL,
+        contract_address TEXT, /* can be null */
+        status INTEGER NOT NULL CHECK (status IN (0, 1)),
+        type INTEGER NOT NULL,
+        logs BLOB NOT NULL, /* all logs and topics packed by serialize_receipt_logs */
+        FOREIGN KEY(tx_hash, chain_id) REFERENCES evm_transactions(tx_hash, chain_id) ON DELETE CASCADE ON UPDATE CASCADE,
+        PRIMARY KEY(tx_hash, chain_id)
+    );""")  # noqa: E501
+    # The index can only be filled once evmtx_receipts is replaced, since it references it
+    write_cursor.execute(
+        'CREATE TEMP TABLE evmtx_receipt_log_index_upgrade('
+        'tx_hash BLOB, chain_id INTEGER, address TEXT, topic0 BLOB)',
+    )
+
+    receipts: list[tuple] = []
+    index_entries: list[tuple[bytes, int, str, bytes]] = []
+
+    def write_chunk() -> None:
+        write_cursor.executemany(
+            'INSERT INTO evmtx_receipts_new(tx_hash, chain_id, contract_address, status, type, logs) '  # noqa: E501
+            'VALUES(?, ?, ?, ?, ?, ?)',
+            receipts,
+        )
+        write_cursor.executemany(
+            'INSERT INTO evmtx_receipt_log_index_upgrade(tx_hash, chain_id, address, topic0) '
+            'VALUES(?, ?, ?, ?)',
+            index_entries,
+        )
+        receipts.clear()
+        index_entries.clear()
+
+    def add_receipt(receipt: tuple, logs: list[EvmTxReceiptLog]) -> None:
+        try:
+            packed_logs = serialize_receipt_logs(logs)
+        except DeserializationError as e:
+            log.warning(
+                f'Could not pack the logs of the receipt of {receipt[0].hex()} on chain '
+                f'{receipt[1]} due to {str(e)}. Dropping it so that it is queried again',
+            )
+            return
+
+        receipts.append((*receipt, packed_logs))
+        index_entries.extend(
+            (receipt[0], receipt[1], tx_log.address, tx_log.topics[0])
+            for tx_log in logs if len(tx_log.topics) != 0
+        )
+        if len(receipts) >= RECEIPTS_CHUNK_SIZE:
+            write_chunk()
+
+    # a separate cursor reads the rows while the write cursor writes the chunks
+    read_cursor = write_cursor.connection.cursor()
+    read_cursor.execute(
+        'SELECT A.tx_hash, A.chain_id, A.contract_address, A.status, A.type, B.log_index, '
+        'B.data, B.address, B.removed, C.topic FROM evmtx_receipts A '
+        'LEFT JOIN evmtx_receipt_logs B ON A.tx_hash=B.tx_hash AND A.chain_id=B.chain_id '
+        'LEFT JOIN evmtx_receipt_log_topics C ON B.tx_hash=C.tx_hash AND '
+        'B.chain_id=C.chain_id AND B.log_index=C.log_index '
+        'ORDER BY A.tx_hash, A.chain_id, B.log_index, C.topic_index',
+    )
+    receipt: Optional[tuple] = None
+    logs: list[EvmTxReceiptLog] = []
+    for entry in read_cursor:
+        if receipt is None or entry[:2] != receipt[:2]:
+            if receipt is not None:
+                add_receipt(receipt, logs)
+            receipt, logs = entry[:5], []
+        if entry[5] is None:  # receipt without logs
+            continue
+        if len(logs) == 0 or logs[-1].log_index != entry[5]:
+            logs.append(EvmTxReceiptLog(
+                log_index=entry[5],
+                data=entry[6],
+                address=ChecksumEvmAddress(entry[7]),
+                removed=bool(entry[8]),
+            ))
+        if entry[9] is not None:
+            logs[-1].topics.append(entry[9])
+    if receipt is not None:
+        add_receipt(receipt, logs)
+    read_cursor.close()
+    write_chunk()
+
+    write_cursor.execute('DROP TABLE evmtx_receipt_log_topics')
+    write_cursor.execute('DROP TABLE evmtx_receipt_logs')
+    write_cursor.execute('DROP TABLE evmtx_receipts')
+    write_cursor.execute('ALTER TABLE evmtx_receipts_new RENAME TO evmtx_receipts')
+    write_cursor.execute("""
+    CREATE TABLE IF NOT EXISTS evmtx_receipt_log_index (
+        tx_hash BLOB NOT NULL,
+        chain_id INTEGER NOT NULL,
+        address TEXT NOT NULL,
+        topic0 BLOB NOT NULL,
+        FOREIGN KEY(tx_hash, chain_id) REFERENCES evmtx_receipts(tx_hash, chain_id) ON DELETE CASCADE ON UPDATE CASCADE,
+        PRIMARY KEY(tx_hash, chain_id, address, topic0)
+    );""")  # noqa: E501
+    write_cursor.execute('CREATE INDEX IF NOT EXISTS idx_evmtx_receipt_log_index_address_topic0 ON evmtx_receipt_log_index(address, topic0);')  # noqa: E501
+    write_cursor.execute(
+        'INSERT OR IGNORE INTO evmtx_receipt_log_index(tx_hash, chain_id, address, topic0) '
+        'SELECT tx_hash, chain_id, address, topic0 FROM evmtx_receipt_log_index_upgrade',
+    )
+    write_cursor.execute('DROP TABLE evmtx_receipt_log_index_upgrade')
+    log.debug('Exit _pack_receipt_logs')
+
+
+def _create_binance_trade_cursors(write_cursor: 'DBCursor') -> None:
+    """Create the table of the trade cursors of each market of the binance exchanges"""
+    log.debug('Enter _create_binance_trade_cursors')
+    write_cursor.execute("""
+    CREATE TABLE IF NOT EXISTS binance_trade_cursors (
+        exchange_name TEXT NOT NULL,
+        location CHAR(1) NOT NULL REFERENCES location(location),
+        market TEXT NOT NULL,
+        next_trade_id INTEGER NOT NULL,
+        last_trade_ts INTEGER NOT NULL,
+        PRIMARY KEY (exchange_name, location, market)
+    );""")
+    log.debug('Exit _create_binance_trade_cursors')
+
+
+def upgrade_v36_to_v37(db: 'DBHandler', progress_handler: 'DBUpgradeProgressHandler') -> None:
+    """Upgrades the DB from v36 to v37
+
+        - Pack the logs and topics of each receipt into one blob and index the logs
+          by address and first topic
+        - Create the table of the binance markets' trade cursors
+    """
+    log.debug('Entered userdb v36->v37 upgrade')
+    progress_handler.set_total_steps(2)
+    with db.user_write() as write_cursor:
+        _pack_receipt_logs(write_cursor)
+        progress_handler.new_step()
+        _create_binance_trade_cursors(write_cursor)
+        progress_handler.new_step()
+
+    log.debug('Finished userdb v36->v37 upgrade')
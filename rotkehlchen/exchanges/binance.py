@@ -8,8 +8,8 @@ from json.decoder import JSONDecodeError
 from typing import TYPE_CHECKING, Any, DefaultDict, Literal, Optional, Union
 from urllib.parse import urlencode
 
-import gevent
 import requests
+from gevent.pool import Pool
 
 from rotkehlchen.accounting.ledger_actions import LedgerAction
 from rotkehlchen.accounting.structures.balance import Balance
@@ -17,7 +17,7 @@ from rotkehlchen.assets.asset import AssetWithOracles
 from rotkehlchen.assets.converters import asset_from_binance
 from rotkehlchen.constants.misc import ZERO
 from rotkehlchen.constants.timing import DEFAULT_TIMEOUT_TUPLE
-from rotkehlchen.db.constants import BINANCE_MARKETS_KEY
+from rotkehlchen.db.constants import BINANCE_MARKETS_KEY, SQL_VARIABLES_LIMIT
 from rotkehlchen.errors.asset import UnknownAsset, UnsupportedAsset
 from rotkehlchen.errors.misc import InputError, RemoteError
 from rotkehlchen.errors.serialization import DeserializationError
@@ -42,17 +42,19 @@ from rotkehlchen.serialization.deserialize import (
     deserialize_asset_amount,
     deserialize_asset_amount_force_positive,
     deserialize_fee,
+    deserialize_int_from_str,
     deserialize_timestamp_from_date,
     deserialize_timestamp_from_intms,
 )
 from rotkehlchen.types import ApiKey, ApiSecret, AssetMovementCategory, Fee, Location, Timestamp
 from rotkehlchen.user_messages import MessagesAggregator
-from rotkehlchen.utils.misc import ts_now_in_ms
+from rotkehlchen.utils.misc import get_chunks, ts_now_in_ms
 from rotkehlchen.utils.mixins.cacheable import cache_response_timewise
 from rotkehlchen.utils.mixins.lockable import protect_with_lock
 
 if TYPE_CHECKING:
     from rotkehlchen.db.dbhandler import DBHandler
+    from rotkehlchen.db.drivers.gevent import DBCursor
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
@@ -72,6 +74,13 @@ V3_METHODS = (
 PUBLIC_METHODS = ('exchangeInfo', 'time')
 
 RETRY_AFTER_LIMIT = 60
+# The api endpoints allow a request weight of 1200 per minute. Most weigh 1. The
+# requests of the other api types are counted in the same budget, far below their limits.
+# https://binance-docs.github.io/apidocs/spot/en/#limits
+API_REQUEST_WEIGHT_PER_MINUTE = 1200
+API_METHOD_WEIGHTS: dict[str, float] = {'account': 10, 'myTrades': 10}
+# Markets whose trades are queried at the same time within the request weight limit
+MARKETS_QUERY_CONCURRENCY = 8
 # Binance api error codes we check for (all below apis seem to have the same)
 # https://binance-docs.github.io/apidocs/spot/en/#error-codes-2
 # https://binance-docs.github.io/apidocs/futures/en/#error-codes-2
@@ -202,6 +211,13 @@ class Binance(ExchangeInterface):
         self.msg_aggregator = msg_aggregator
         self.offset_ms = 0
         self.selected_pairs = binance_selected_trade_pairs
+        # Binance counts the weight per minute so at most the capacity plus a minute
+        # worth of tokens can be used in any minute
+        self.request_scheduler.register_limit(
+            rate=API_REQUEST_WEIGHT_PER_MINUTE * 0.8 / 60,
+            capacity=API_REQUEST_WEIGHT_PER_MINUTE * 0.2,
+            weights=API_METHOD_WEIGHTS,
+        )
 
     def first_connection(self) -> None:
         if self.first_connection_made:
@@ -301,6 +317,9 @@ class Binance(ExchangeInterface):
         call_options = options.copy() if options else {}
 
         while True:
+            # wait before signing since the request is rejected if it is made long
+            # after its timestamp
+            self.request_scheduler.acquire(method)
             if 'signature' in call_options:
                 del call_options['signature']
 
@@ -406,7 +425,8 @@ class Binance(ExchangeInterface):
                             RETRY_AFTER_LIMIT,
                         ))
 
-                gevent.sleep(retry_after)
+                # hold back the other queries too since the limits are per IP
+                self.request_scheduler.pause(retry_after)
                 continue
 
             # else success
@@ -838,12 +858,72 @@ class Binance(ExchangeInterface):
         )
         return dict(returned_balances), ''
 
+    def _get_trade_cursors(
+            self,
+            cursor: 'DBCursor',
+            symbols: list[str],
+    ) -> dict[str, tuple[int, Timestamp]]:
+        """Returns the id of the next trade to query and the time of the last seen trade
+        of each market that has trades"""
+        trade_cursors = {}
+        for chunk in get_chunks(symbols, n=SQL_VARIABLES_LIMIT - 2):
+            cursor.execute(
+                f'SELECT market, next_trade_id, last_trade_ts FROM binance_trade_cursors '
+                f'WHERE exchange_name=? AND location=? AND market IN ({",".join(["?"] * len(chunk))})',  # noqa: E501
+                (self.name, self.location.serialize_for_db(), *chunk),
+            )
+            for market, next_trade_id, last_trade_ts in cursor:
+                trade_cursors[market] = (next_trade_id, Timestamp(last_trade_ts))
+
+        return trade_cursors
+
+    def _query_market_trades(self, symbol: str, from_id: int) -> list[dict[str, Any]]:
+        """Queries all the trades of a market starting from the trade with the given id
+
+        May raise:
+        - RemoteError
+        - BinancePermissionError
+        """
+        raw_data = []
+        # Limit of results to return. 1000 is max limit according to docs
+        limit = 1000
+        len_result = limit
+        while len_result == limit:
+            # We know that myTrades returns a list from the api docs
+            result = self.api_query_list(
+                'api',
+                'myTrades',
+                options={
+                    'symbol': symbol,
+                    'fromId': from_id,
+                    'limit': limit,
+                    # Not specifying them since binance does not seem to
+                    # respect them and always return all trades
+                })
+            if result:
+                try:
+                    from_id = int(result[-1]['id']) + 1
+                except (ValueError, KeyError, IndexError) as e:
+                    raise RemoteError(
+                        f'Could not parse id from Binance myTrades api query result: {result}',
+                    ) from e
+
+            len_result = len(result)
+            log.debug(f'{self.name} myTrades query result', symbol=symbol, results_num=len_result)  # noqa: E501
+            for r in result:
+                r['symbol'] = symbol
+            raw_data.extend(result)
+
+        return raw_data
+
     def query_online_trade_history(
             self,
             start_ts: Timestamp,
             end_ts: Timestamp,
     ) -> tuple[list[Trade], tuple[Timestamp, Timestamp]]:
-        """
+        """Queries the trades of all markets concurrently. Each market is queried from
+        the trade after the last one seen in it, if that was before start_ts, so that
+        later syncs only query the new trades.
 
         May raise due to api query and unexpected id:
         - RemoteError
@@ -855,41 +935,33 @@ class Binance(ExchangeInterface):
         else:
             iter_markets = list(self._symbols_to_pair.keys())
 
-        raw_data = []
-        # Limit of results to return. 1000 is max limit according to docs
-        limit = 1000
-        for symbol in iter_markets:
-            last_trade_id = 0
-            len_result = limit
-            while len_result == limit:
-                # We know that myTrades returns a list from the api docs
-                result = self.api_query_list(
-                    'api',
-                    'myTrades',
-                    options={
-                        'symbol': symbol,
-                        'fromId': last_trade_id,
-                        'limit': limit,
-                        # Not specifying them since binance does not seem to
-                        # respect them and always return all trades
-                    })
-                if result:
-                    try:
-                        last_trade_id = int(result[-1]['id']) + 1
-                    except (ValueError, KeyError, IndexError) as e:
-                        raise RemoteError(
-                            f'Could not parse id from Binance myTrades api query result: {result}',
-                        ) from e
+        with self.db.conn.read_ctx() as cursor:
+            trade_cursors = self._get_trade_cursors(cursor=cursor, symbols=iter_markets)
 
-                len_result = len(result)
-                log.debug(f'{self.name} myTrades query result', results_num=len_result)
-                for r in result:
-                    r['symbol'] = symbol
-                raw_data.extend(result)
+        pool = Pool(size=MARKETS_QUERY_CONCURRENCY)
+        greenlets = []
+        for symbol in iter_markets:
+            # The trades before the cursor were seen. If the range starts before the last
+            # of them they may not have been saved, so query the market from the start.
+            next_trade_id, last_trade_ts = trade_cursors.get(symbol, (0, Timestamp(0)))
+            greenlets.append(pool.spawn(
+                self._query_market_trades,
+                symbol=symbol,
+                from_id=next_trade_id if start_ts > last_trade_ts else 0,
+            ))
+        try:
+            pool.join()
+        finally:  # don't leave queries running if this greenlet gets killed
+            pool.kill()
 
-            raw_data.sort(key=lambda x: x['time'])
+        raw_data = []
+        for greenlet in greenlets:  # raise the first error after all markets are queried
+            raw_data.extend(greenlet.get())
+        # The trades of each market are in order so sorting them once merges the markets
+        raw_data.sort(key=lambda x: x['time'])
 
         trades = []
+        new_trade_cursors = {}
         for raw_trade in raw_data:
             try:
                 trade = trade_from_binance(
@@ -897,6 +969,7 @@ class Binance(ExchangeInterface):
                     binance_symbols_to_pair=self.symbols_to_pair,
                     location=self.location,
                 )
+                trade_id = deserialize_int_from_str(str(raw_trade['id']), f'{self.name} trade')
             except UnknownAsset as e:
                 self.msg_aggregator.add_warning(
                     f'Found {self.name} trade with unknown asset '
@@ -924,15 +997,26 @@ class Binance(ExchangeInterface):
                 )
                 continue
 
+            if trade.timestamp > end_ts:
+                break
+
+            new_trade_cursors[raw_trade['symbol']] = (trade_id + 1, trade.timestamp)
             # Since binance does not respect the given timestamp range, limit the range here
             if trade.timestamp < start_ts:
                 continue
 
-            if trade.timestamp > end_ts:
-                break
-
             trades.append(trade)
 
+        with self.db.user_write() as write_cursor:
+            write_cursor.executemany(
+                'INSERT OR REPLACE INTO binance_trade_cursors(exchange_name, location, market, '
+                'next_trade_id, last_trade_ts) VALUES (?, ?, ?, ?, ?)',
+                [
+                    (self.name, self.location.serialize_for_db(), symbol, next_trade_id, last_trade_ts)  # noqa: E501
+                    for symbol, (next_trade_id, last_trade_ts) in new_trade_cursors.items()
+                ],
+            )
+
         fiat_payments = self._query_online_fiat_payments(start_ts=start_ts, end_ts=end_ts)
         if fiat_payments:
             trades += fiat_payments
@@ -1,7 +1,7 @@
 import datetime
 import logging
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Iterator, NamedTuple, Optional
+from typing import TYPE_CHECKING, Any, Collection, Iterator, Mapping, NamedTuple, Optional
 
 from rotkehlchen.accounting.mixins.event import AccountingEventMixin, AccountingEventType
 from rotkehlchen.accounting.structures.types import ActionType
@@ -172,7 +172,7 @@ class AssetMovement(AccountingEventMixin):
     def get_assets(self) -> list[Asset]:
         return [self.asset, self.fee_asset]
 
-    def should_ignore(self, ignored_ids_mapping: dict[ActionType, list[str]]) -> bool:
+    def should_ignore(self, ignored_ids_mapping: Mapping[ActionType, Collection[str]]) -> bool:
         return self.identifier in ignored_ids_mapping.get(ActionType.ASSET_MOVEMENT, [])
 
     def process(
@@ -342,7 +342,7 @@ class Trade(AccountingEventMixin):
     def get_assets(self) -> list[Asset]:
         return [self.base_asset, self.quote_asset]
 
-    def should_ignore(self, ignored_ids_mapping: dict[ActionType, list[str]]) -> bool:
+    def should_ignore(self, ignored_ids_mapping: Mapping[ActionType, Collection[str]]) -> bool:
         return self.identifier in ignored_ids_mapping.get(ActionType.TRADE, [])
 
     def process(
@@ -565,7 +565,7 @@ class MarginPosition(AccountingEventMixin):
     def get_assets(self) -> list[Asset]:
         return [self.pl_currency]
 
-    def should_ignore(self, ignored_ids_mapping: dict[ActionType, list[str]]) -> bool:
+    def should_ignore(self, ignored_ids_mapping: Mapping[ActionType, Collection[str]]) -> bool:
         return False
 
     def process(
@@ -657,7 +657,7 @@ class Loan(AccountingEventMixin):
     def get_identifier(self) -> str:
         return 'loan_' + str(self.close_time)
 
-    def should_ignore(self, ignored_ids_mapping: dict[ActionType, list[str]]) -> bool:
+    def should_ignore(self, ignored_ids_mapping: Mapping[ActionType, Collection[str]]) -> bool:
         return False
 
     def get_assets(self) -> list[Asset]:
@@ -5,7 +5,8 @@ import requests
 
 from rotkehlchen.accounting.ledger_actions import LedgerAction
 from rotkehlchen.accounting.structures.balance import Balance
-from rotkehlchen.assets.asset import AssetWithOracles
+from rotkehlchen.assets.asset import Asset, AssetWithOracles
+from rotkehlchen.db.cached_results import DBCachedResults
 from rotkehlchen.db.filtering import (
     AssetMovementsFilterQuery,
     LedgerActionsFilterQuery,
@@ -13,9 +14,12 @@ from rotkehlchen.db.filtering import (
 )
 from rotkehlchen.db.ledger_actions import DBLedgerActions
 from rotkehlchen.db.ranges import DBQueryRanges
+from rotkehlchen.errors.asset import UnknownAsset, WrongAssetType
 from rotkehlchen.errors.misc import RemoteError
+from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.exchanges.data_structures import AssetMovement, MarginPosition, Trade
 from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.serialization.deserialize import deserialize_asset_amount, deserialize_fval
 from rotkehlchen.types import (
     ApiKey,
     ApiSecret,
@@ -26,8 +30,9 @@ from rotkehlchen.types import (
     Timestamp,
 )
 from rotkehlchen.utils.misc import set_user_agent
-from rotkehlchen.utils.mixins.cacheable import CacheableMixIn
+from rotkehlchen.utils.mixins.cacheable import CacheableMixIn, ResultSerializer
 from rotkehlchen.utils.mixins.lockable import LockableQueryMixIn, protect_with_lock
+from rotkehlchen.utils.ratelimit import RequestScheduler
 
 if TYPE_CHECKING:
     from rotkehlchen.db.dbhandler import DBHandler
@@ -42,8 +47,43 @@ ExchangeHistoryFailCallback = Callable[[str], None]
 ExchangeHistoryNewStepCallback = Callable[[str], None]
 
 
+def _serialize_balances(result: ExchangeQueryBalances) -> Optional[dict[str, dict[str, str]]]:
+    balances, _ = result
+    if balances is None:  # don't save errors
+        return None
+
+    return {asset.identifier: balance.serialize() for asset, balance in balances.items()}
+
+
+def _deserialize_balances(value: dict[str, dict[str, str]]) -> ExchangeQueryBalances:
+    """May raise DeserializationError"""
+    balances = {}
+    try:
+        for identifier, entry in value.items():
+            balances[Asset(identifier).resolve_to_asset_with_oracles()] = Balance(
+                amount=deserialize_asset_amount(entry['amount']),
+                usd_value=deserialize_fval(
+                    value=entry['usd_value'],
+                    name='usd_value',
+                    location='saved exchange balances',
+                ),
+            )
+    except (UnknownAsset, WrongAssetType, KeyError, AttributeError) as e:
+        raise DeserializationError(f'Invalid saved exchange balances: {str(e)}') from e
+
+    return balances, ''
+
+
 class ExchangeInterface(CacheableMixIn, LockableQueryMixIn):
 
+    # the balances are saved so that they are available right after a restart
+    persisted_results = {
+        'query_balances': ResultSerializer(
+            serialize=_serialize_balances,
+            deserialize=_deserialize_balances,
+        ),
+    }
+
     def __init__(
             self,
             name: str,
@@ -67,12 +107,19 @@ class ExchangeInterface(CacheableMixIn, LockableQueryMixIn):
         self.first_connection_made = False
         self.session = requests.session()
         set_user_agent(self.session)
+        # Subclasses register the rate limits of their api here and acquire from it
+        # before each request so that their greenlets can query concurrently
+        self.request_scheduler = RequestScheduler()
+        self.results_store = self._make_results_store()
         log.info(f'Initialized {str(location)} exchange {name}')
 
     def location_id(self) -> ExchangeLocationID:
         """Returns unique location identifier for this exchange object (name + location)"""
         return ExchangeLocationID(name=self.name, location=self.location)
 
+    def _make_results_store(self) -> DBCachedResults:
+        return DBCachedResults(database=self.db, namespace=f'{self.location!s}_{self.name}')
+
     def edit_exchange_credentials(
             self,
             api_key: Optional[ApiKey],
@@ -133,8 +180,11 @@ class ExchangeInterface(CacheableMixIn, LockableQueryMixIn):
                 self.edit_exchange_credentials(old_api_key, old_api_secret, old_passphrase)
                 return False, message
 
+        if changed is True or name is not None:  # the results are of the old account or name
+            self.clear_cache()
         if name is not None:
             self.name = name
+            self.results_store = self._make_results_store()
 
         return True, ''
 
@@ -57,7 +57,7 @@ from rotkehlchen.types import (
     TradeType,
 )
 from rotkehlchen.user_messages import MessagesAggregator
-from rotkehlchen.utils.misc import pairwise, ts_ms_to_sec, ts_now
+from rotkehlchen.utils.misc import pairwise, ts_ms_to_sec
 from rotkehlchen.utils.mixins.cacheable import cache_response_timewise
 from rotkehlchen.utils.mixins.lockable import protect_with_lock
 from rotkehlchen.utils.mixins.serializableenum import SerializableEnumMixin
@@ -75,7 +75,9 @@ KRAKEN_DELISTED = ('XDAO', 'XXVN', 'ZKRW', 'XNMC', 'BSV', 'XICN')
 KRAKEN_PUBLIC_METHODS = ('AssetPairs', 'Assets')
 KRAKEN_QUERY_TRIES = 8
 KRAKEN_BACKOFF_DIVIDEND = 15
-MAX_CALL_COUNTER_INCREASE = 2  # Trades and Ledger produce the max increase
+# Increase of the api call counter per method. The rest increase it by 1.
+# https://docs.kraken.com/rest/#section/Rate-Limits/REST-API-Rate-Limits
+KRAKEN_METHOD_WEIGHTS: dict[str, float] = {'Ledgers': 2, 'TradesHistory': 2}
 
 
 def kraken_ledger_entry_type_to_ours(value: str) -> HistoryEventType:
@@ -284,8 +286,6 @@ class Kraken(ExchangeInterface):
         self.msg_aggregator = msg_aggregator
         self.session.headers.update({'API-Key': self.api_key})
         self.set_account_type(kraken_account_type)
-        self.call_counter = 0
-        self.last_query_ts = 0
         self.history_events_db = DBHistoryEvents(self.db)
 
     def set_account_type(self, account_type: Optional[KrakenAccountType]) -> None:
@@ -303,6 +303,14 @@ class Kraken(ExchangeInterface):
             self.call_limit = 20
             self.reduction_every_secs = 1
 
+        # The call counter goes down by one every reduction_every_secs and the calls
+        # are rejected when it would go above the limit
+        self.request_scheduler.register_limit(
+            rate=1 / self.reduction_every_secs,
+            capacity=self.call_limit,
+            weights=KRAKEN_METHOD_WEIGHTS,
+        )
+
     def edit_exchange_credentials(
             self,
             api_key: Optional[ApiKey],
@@ -397,13 +405,6 @@ class Kraken(ExchangeInterface):
     def first_connection(self) -> None:
         self.first_connection_made = True
 
-    def _manage_call_counter(self, method: str) -> None:
-        self.last_query_ts = ts_now()
-        if method in ('Ledgers', 'TradesHistory'):
-            self.call_counter += 2
-        else:
-            self.call_counter += 1
-
     def _query_public(self, method: str, req: Optional[dict] = None) -> Union[dict, str]:
         """API queries that do not require a valid key/secret pair.
 
@@ -419,7 +420,6 @@ class Kraken(ExchangeInterface):
         except requests.exceptions.RequestException as e:
             raise RemoteError(f'Kraken API request failed due to {str(e)}') from e
 
-        self._manage_call_counter(method)
         return _check_and_get_response(response, method)
 
     def api_query(self, method: str, req: Optional[dict] = None) -> dict:
@@ -428,31 +428,12 @@ class Kraken(ExchangeInterface):
             self._query_public if method in KRAKEN_PUBLIC_METHODS else self._query_private
         )
         while tries > 0:
-            if self.call_counter + MAX_CALL_COUNTER_INCREASE > self.call_limit:
-                # If we are close to the limit, check how much our call counter reduced
-                # https://www.kraken.com/features/api#api-call-rate-limit
-                secs_since_last_call = ts_now() - self.last_query_ts
-                self.call_counter = max(
-                    0,
-                    self.call_counter - int(secs_since_last_call / self.reduction_every_secs),
-                )
-                # If still at limit, sleep for an amount big enough for smallest tier reduction
-                if self.call_counter + MAX_CALL_COUNTER_INCREASE > self.call_limit:
-                    backoff_in_seconds = self.reduction_every_secs * 2
-                    log.debug(
-                        f'Doing a Kraken API call would now exceed our call counter limit. '
-                        f'Backing off for {backoff_in_seconds} seconds',
-                        call_counter=self.call_counter,
-                    )
-                    tries -= 1
-                    gevent.sleep(backoff_in_seconds)
-                    continue
-
+            waited = self.request_scheduler.acquire(method)
             log.debug(
                 'Kraken API query',
                 method=method,
                 data=req,
-                call_counter=self.call_counter,
+                waited_seconds=waited,
             )
             result = query_method(method, req)
             if isinstance(result, str):
@@ -506,7 +487,6 @@ class Kraken(ExchangeInterface):
             )
         except requests.exceptions.RequestException as e:
             raise RemoteError(f'Kraken API request failed due to {str(e)}') from e
-        self._manage_call_counter(method)
 
         return _check_and_get_response(response, method)
 
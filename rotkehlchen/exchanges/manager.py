@@ -22,6 +22,10 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
+# Exchanges whose balances or history are queried at the same time. Each exchange has
+# its own remote and rate limits so this only bounds the open connections.
+EXCHANGES_QUERY_CONCURRENCY = 8
+
 
 class ExchangeManager():
 
@@ -1,4 +1,6 @@
+import codecs
 import logging
+import re
 from abc import ABCMeta
 from json.decoder import JSONDecodeError
 from typing import TYPE_CHECKING, Any, Iterator, Literal, Optional, Sequence, Union, overload
@@ -35,13 +37,24 @@ from rotkehlchen.types import (
 )
 from rotkehlchen.user_messages import MessagesAggregator
 from rotkehlchen.utils.misc import hex_or_bytes_to_int, set_user_agent
-from rotkehlchen.utils.serialization import jsonloads_dict
+from rotkehlchen.utils.ratelimit import TokenBucket
+from rotkehlchen.utils.serialization import jsonloads_array_items, jsonloads_dict
 
 if TYPE_CHECKING:
     from rotkehlchen.db.dbhandler import DBHandler
 
 ETHERSCAN_TX_QUERY_LIMIT = 10000
+# The start of a successful response of the endpoints that return pages of entries, after
+# which the entries are parsed one by one as they arrive
+ETHERSCAN_LIST_RESULT_START = re.compile(r'\s*\{\s*"status"\s*:\s*"1"\s*,\s*"message"\s*:\s*"[^"]*"\s*,\s*"result"\s*:\s*\[')  # noqa: E501
+ETHERSCAN_LIST_RESULT_START_MAX_LENGTH = 512
+STREAM_CHUNK_SIZE = 65536
 TRANSACTIONS_BATCH_NUM = 10
+# The calls per second etherscan allows with a free tier API key and without an API key.
+# Without a key the queries are only throttled once etherscan responds that the limit
+# was reached, since it lets a few queries through before that.
+ETHERSCAN_CALLS_PER_SECOND_WITH_KEY = 5
+ETHERSCAN_CALLS_PER_SECOND_WITHOUT_KEY = 0.2
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
@@ -72,8 +85,156 @@ class Etherscan(ExternalServiceWithApiKey, metaclass=ABCMeta):
         self.base_url = base_url
         self.session = requests.session()
         self.warning_given = False
+        # shared by all greenlets querying this etherscan so that they stay within its limits
+        self.rate_limiter = TokenBucket(rate=ETHERSCAN_CALLS_PER_SECOND_WITH_KEY)
+        self.keyless_limit_reached = False  # if etherscan refused a query without a key
         set_user_agent(self.session)
 
+    def _query_str(self, module: str, action: str, options: Optional[dict[str, Any]]) -> str:
+        """Makes the url of a query and sets the rate limit for the API key"""
+        query_str = f'https://{self.prefix_url}{self.base_url}/api?module={module}&action={action}'
+        if options:
+            for name, value in options.items():
+                query_str += f'&{name}={value}'
+
+        api_key = self._get_api_key()
+        if api_key is None:
+            if not self.warning_given:
+                self.msg_aggregator.add_warning(
+                    f'You do not have an {self.chain} Etherscan API key configured. rotki '
+                    f'etherscan queries will still work but will be very slow. '
+                    f'If you are not using your own ethereum node, it is recommended '
+                    f'to go to https://{self.base_url}/register, create an API '
+                    f'key and then input it in the external service credentials setting of rotki',
+                )
+                self.warning_given = True
+            if self.keyless_limit_reached:
+                self.rate_limiter.set_rate(ETHERSCAN_CALLS_PER_SECOND_WITHOUT_KEY)
+            else:
+                self.rate_limiter.set_rate(ETHERSCAN_CALLS_PER_SECOND_WITH_KEY)
+        else:
+            query_str += f'&apikey={api_key}'
+            self.rate_limiter.set_rate(ETHERSCAN_CALLS_PER_SECOND_WITH_KEY)
+
+        return query_str
+
+    def _request(
+            self,
+            query_str: str,
+            timeout: Optional[tuple[int, int]] = None,
+            stream: bool = False,
+    ) -> requests.Response:
+        """Makes a request to etherscan within its rate limit, backing off if etherscan
+        refuses more connections
+
+        May raise:
+        - RemoteError if there are any problems with reaching Etherscan or the
+        response has an error status code
+        """
+        backoff = 1
+        backoff_limit = 33
+        while True:
+            self.rate_limiter.acquire()
+            log.debug(f'Querying {self.chain} etherscan: {query_str}')
+            try:
+                if stream is True:
+                    response = self.session.get(
+                        query_str,
+                        timeout=timeout if timeout else DEFAULT_TIMEOUT_TUPLE,
+                        stream=True,
+                    )
+                else:
+                    response = self.session.get(
+                        query_str,
+                        timeout=timeout if timeout else DEFAULT_TIMEOUT_TUPLE,
+                    )
+            except requests.exceptions.RequestException as e:
+                if 'Max retries exceeded with url' in str(e):
+                    log.debug(
+                        f'Got max retries exceeded from {self.chain} etherscan. Will '
+                        f'backoff for {backoff} seconds.',
+                    )
+                    gevent.sleep(backoff)
+                    backoff = backoff * 2
+                    if backoff >= backoff_limit:
+                        raise RemoteError(
+                            f'Getting {self.chain} Etherscan max connections error even '
+                            f'after we incrementally backed off',
+                        ) from e
+                    continue
+
+                raise RemoteError(f'{self.chain} Etherscan API request failed due to {str(e)}') from e  # noqa: E501
+
+            if response.status_code != 200:
+                raise RemoteError(
+                    f'{self.chain} Etherscan API request {response.url} failed '
+                    f'with HTTP status code {response.status_code} and text '
+                    f'{response.text}',
+                )
+
+            return response
+
+    def _process_response(
+            self,
+            url: str,
+            text: str,
+            action: str,
+    ) -> Optional[Union[list[dict[str, Any]], str, dict[str, Any]]]:
+        """Gets the result of an etherscan response. Returns None if etherscan's rate
+        limit was reached and the query has to be made again.
+
+        May raise:
+        - RemoteError if the response is not in the expected format or has an error
+        """
+        try:
+            json_ret = jsonloads_dict(text)
+        except JSONDecodeError as e:
+            raise RemoteError(
+                f'{self.chain} Etherscan API request {url} returned invalid '
+                f'JSON response: {text}',
+            ) from e
+
+        try:
+            result = json_ret.get('result', None)
+            if result is None:
+                raise RemoteError(
+                    f'Unexpected format of {self.chain} Etherscan response for request {url}. '  # noqa: E501
+                    f'Missing a result in response. Response was: {text}',
+                )
+
+            # sucessful proxy calls do not include a status
+            status = int(json_ret.get('status', 1))
+
+            if status != 1:
+                if status == 0 and 'rate limit reached' in result:
+                    if self.keyless_limit_reached is False and self._get_api_key() is None:
+                        self.keyless_limit_reached = True
+                        self.rate_limiter.set_rate(ETHERSCAN_CALLS_PER_SECOND_WITHOUT_KEY)
+                    return None
+
+                transaction_endpoint_and_none_found = (
+                    status == 0 and
+                    json_ret['message'] == 'No transactions found' and
+                    action in ('txlist', 'txlistinternal', 'tokentx')
+                )
+                logs_endpoint_and_none_found = (
+                    status == 0 and
+                    json_ret['message'] == 'No records found' and
+                    'getLogs' in action
+                )
+                if transaction_endpoint_and_none_found or logs_endpoint_and_none_found:
+                    return []
+
+                # else
+                raise RemoteError(f'{self.chain} Etherscan returned error response: {json_ret}')  # noqa: E501
+        except KeyError as e:
+            raise RemoteError(
+                f'Unexpected format of {self.chain} Etherscan response for request {url}. '  # noqa: E501
+                f'Missing key entry for {str(e)}. Response was: {text}',
+            ) from e
+
+        return result
+
     @overload
     def _query(  # pylint: disable=no-self-use
             self,
@@ -134,114 +295,103 @@ class Etherscan(ExternalServiceWithApiKey, metaclass=ABCMeta):
         - RemoteError if there are any problems with reaching Etherscan or if
         an unexpected response is returned
         """
-        query_str = f'https://{self.prefix_url}{self.base_url}/api?module={module}&action={action}'
-        if options:
-            for name, value in options.items():
-                query_str += f'&{name}={value}'
-
-        api_key = self._get_api_key()
-        if api_key is None:  # noqa: SIM102  # https://github.com/charliermarsh/ruff/issues/2094
-            if not self.warning_given:
-                self.msg_aggregator.add_warning(
-                    f'You do not have an {self.chain} Etherscan API key configured. rotki '
-                    f'etherscan queries will still work but will be very slow. '
-                    f'If you are not using your own ethereum node, it is recommended '
-                    f'to go to https://{self.base_url}/register, create an API '
-                    f'key and then input it in the external service credentials setting of rotki',
-                )
-                self.warning_given = True
-        else:
-            query_str += f'&apikey={api_key}'
+        query_str = self._query_str(module=module, action=action, options=options)
+        backoff = 1
+        backoff_limit = 33
+        while True:
+            response = self._request(query_str=query_str, timeout=timeout)
+            result = self._process_response(url=response.url, text=response.text, action=action)  # noqa: E501
+            if result is not None:
+                return result
+
+            log.debug(
+                f'Got response: {response.text} from {self.chain} etherscan.'
+                f' Will backoff for {backoff} seconds.',
+            )
+            gevent.sleep(backoff)
+            # Continue increasing backoff until limit is reached.
+            # If limit is reached then keep sleeping with the limit.
+            # Etherscan will let the query go through eventually
+            if backoff * 2 < backoff_limit:
+                backoff = backoff * 2
+
+    def _query_list(
+            self,
+            module: str,
+            action: Literal['txlist', 'txlistinternal', 'tokentx'],
+            options: dict[str, Any],
+    ) -> Iterator[dict[str, Any]]:
+        """Like _query for the endpoints that return a page of entries but the entries
+        are parsed while the response is downloaded and are yielded one by one. That way
+        a page of results is never in memory at once and the caller can process the
+        first entries while the rest of the page arrives.
 
+        May raise:
+        - RemoteError if there are any problems with reaching Etherscan, if the
+        response is cut or if an unexpected response is returned
+        """
+        query_str = self._query_str(module=module, action=action, options=options)
         backoff = 1
         backoff_limit = 33
-        while backoff < backoff_limit:
-            log.debug(f'Querying {self.chain} etherscan: {query_str}')
+        while True:
+            response = self._request(query_str=query_str, stream=True)
             try:
-                response = self.session.get(query_str, timeout=timeout if timeout else DEFAULT_TIMEOUT_TUPLE)  # noqa: E501
-            except requests.exceptions.RequestException as e:
-                if 'Max retries exceeded with url' in str(e):
-                    log.debug(
-                        f'Got max retries exceeded from {self.chain} etherscan. Will '
-                        f'backoff for {backoff} seconds.',
-                    )
-                    gevent.sleep(backoff)
-                    backoff = backoff * 2
-                    if backoff >= backoff_limit:
+                text_chunks = self._iterate_response_text(response)
+                text, match = '', None
+                for chunk in text_chunks:  # read until it's known if it's a page of entries
+                    text += chunk
+                    if (match := ETHERSCAN_LIST_RESULT_START.match(text)) is not None or len(text) > ETHERSCAN_LIST_RESULT_START_MAX_LENGTH:  # noqa: E501
+                        break
+
+                if match is not None:
+                    try:
+                        yield from jsonloads_array_items(text_chunks=text_chunks, text=text, position=match.end())  # noqa: E501
+                    except JSONDecodeError as e:
                         raise RemoteError(
-                            f'Getting {self.chain} Etherscan max connections error even '
-                            f'after we incrementally backed off',
+                            f'{self.chain} Etherscan API request {response.url} returned '
+                            f'invalid JSON response: {str(e)}',
                         ) from e
-                    continue
+                    return
 
-                raise RemoteError(f'{self.chain} Etherscan API request failed due to {str(e)}') from e  # noqa: E501
+                # errors and empty results are small so they are processed as in _query
+                text += ''.join(text_chunks)
+            finally:
+                response.close()
 
-            if response.status_code != 200:
-                raise RemoteError(
-                    f'{self.chain} Etherscan API request {response.url} failed '
-                    f'with HTTP status code {response.status_code} and text '
-                    f'{response.text}',
-                )
-
-            try:
-                json_ret = jsonloads_dict(response.text)
-            except JSONDecodeError as e:
-                raise RemoteError(
-                    f'{self.chain} Etherscan API request {response.url} returned invalid '
-                    f'JSON response: {response.text}',
-                ) from e
-
-            try:
-                result = json_ret.get('result', None)
-                if result is None:
+            result = self._process_response(url=response.url, text=text, action=action)
+            if result is not None:
+                if not isinstance(result, list):
                     raise RemoteError(
-                        f'Unexpected format of {self.chain} Etherscan response for request {response.url}. '  # noqa: E501
-                        f'Missing a result in response. Response was: {response.text}',
+                        f'{self.chain} Etherscan API request {response.url} returned '
+                        f'a non list result: {text}',
                     )
+                yield from result
+                return
 
-                # sucessful proxy calls do not include a status
-                status = int(json_ret.get('status', 1))
+            log.debug(
+                f'Got response: {text} from {self.chain} etherscan.'
+                f' Will backoff for {backoff} seconds.',
+            )
+            gevent.sleep(backoff)
+            if backoff * 2 < backoff_limit:
+                backoff = backoff * 2
 
-                if status != 1:
-                    if status == 0 and 'rate limit reached' in result:
-                        log.debug(
-                            f'Got response: {response.text} from {self.chain} etherscan.'
-                            f' Will backoff for {backoff} seconds.',
-                        )
-                        gevent.sleep(backoff)
-                        # Continue increasing backoff until limit is reached.
-                        # If limit is reached then keep sleeping with the limit.
-                        # Etherscan will let the query go through eventually
-                        if backoff * 2 < backoff_limit:
-                            backoff = backoff * 2
-                        continue
-
-                    transaction_endpoint_and_none_found = (
-                        status == 0 and
-                        json_ret['message'] == 'No transactions found' and
-                        action in ('txlist', 'txlistinternal', 'tokentx')
-                    )
-                    logs_endpoint_and_none_found = (
-                        status == 0 and
-                        json_ret['message'] == 'No records found' and
-                        'getLogs' in action
-                    )
-                    if transaction_endpoint_and_none_found or logs_endpoint_and_none_found:
-                        # Can't realize that result is always a list here so we ignore mypy warning
-                        return []  # type: ignore
+    def _iterate_response_text(self, response: requests.Response) -> Iterator[str]:
+        """Yields the text of a streamed response as it arrives
 
-                    # else
-                    raise RemoteError(f'{self.chain} Etherscan returned error response: {json_ret}')  # noqa: E501
-            except KeyError as e:
-                raise RemoteError(
-                    f'Unexpected format of {self.chain} Etherscan response for request {response.url}. '  # noqa: E501
-                    f'Missing key entry for {str(e)}. Response was: {response.text}',
-                ) from e
-
-            # success, break out of the loop and return result
-            return result
-
-        return result
+        May raise:
+        - RemoteError if the connection fails while reading the response
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                yield decoder.decode(chunk)
+            yield decoder.decode(b'', final=True)
+        except (requests.exceptions.RequestException, UnicodeDecodeError) as e:
+            raise RemoteError(
+                f'{self.chain} Etherscan API request {response.url} failed while reading '
+                f'the response due to {str(e)}',
+            ) from e
 
     @overload
     def get_transactions(
@@ -293,9 +443,10 @@ class Etherscan(ExternalServiceWithApiKey, metaclass=ABCMeta):
         is_internal = action == 'txlistinternal'
         chain_id = self.chain.to_chain_id()
         while True:
-            result = self._query(module='account', action=action, options=options)
-            last_ts = deserialize_timestamp(result[0]['timeStamp']) if len(result) != 0 else None  # noqa: E501 pylint: disable=unsubscriptable-object
-            for entry in result:
+            entries_num, last_block = 0, '0'
+            for entry in self._query_list(module='account', action=action, options=options):
+                entries_num += 1
+                last_block = entry['blockNumber']
                 gevent.sleep(0)
                 try:
                     # Handle genesis block transactions
@@ -333,19 +484,19 @@ class Etherscan(ExternalServiceWithApiKey, metaclass=ABCMeta):
                     self.msg_aggregator.add_warning(f'{str(e)}. Skipping transaction')
                     continue
 
-                if tx.timestamp > last_ts and len(transactions) >= TRANSACTIONS_BATCH_NUM:
+                # yield only between transactions of different timestamps so that the
+                # queried range that the caller saves after each batch is complete
+                if len(transactions) >= TRANSACTIONS_BATCH_NUM and tx.timestamp > transactions[-1].timestamp:  # noqa: E501
                     yield transactions
-                    last_ts = tx.timestamp
                     transactions = []
                 transactions.append(tx)  # type: ignore
 
-            if len(result) != ETHERSCAN_TX_QUERY_LIMIT:
+            if entries_num != ETHERSCAN_TX_QUERY_LIMIT:
                 break
             # else we hit the limit. Query once more with startBlock being the last
             # block we got. There may be duplicate entries if there are more than one
             # transactions for that last block but they should be filtered
             # out when we input all of these in the DB
-            last_block = result[-1]['blockNumber']  # pylint: disable=unsubscriptable-object
             options['startBlock'] = last_block
 
         yield transactions
@@ -365,25 +516,28 @@ class Etherscan(ExternalServiceWithApiKey, metaclass=ABCMeta):
             options['endBlock'] = str(to_block)
 
         hashes: set[tuple[str, Timestamp]] = set()
+        last_ts = None
         while True:
-            result = self._query(module='account', action='tokentx', options=options)
-            last_ts = deserialize_timestamp(result[0]['timeStamp']) if len(result) != 0 else None  # noqa: E501 pylint: disable=unsubscriptable-object
-            for entry in result:
+            entries_num, last_block = 0, '0'
+            for entry in self._query_list(module='account', action='tokentx', options=options):
+                entries_num += 1
+                last_block = entry['blockNumber']
                 gevent.sleep(0)
                 timestamp = deserialize_timestamp(entry['timeStamp'])
-                if timestamp > last_ts and len(hashes) >= TRANSACTIONS_BATCH_NUM:  # type: ignore
+                # yield only between transfers of different timestamps so that the
+                # queried range that the caller saves after each batch is complete
+                if len(hashes) >= TRANSACTIONS_BATCH_NUM and timestamp > last_ts:  # type: ignore
                     yield _hashes_tuple_to_list(hashes)
                     hashes = set()
-                    last_ts = timestamp
                 hashes.add((entry['hash'], timestamp))
+                last_ts = timestamp
 
-            if len(result) != ETHERSCAN_TX_QUERY_LIMIT:
+            if entries_num != ETHERSCAN_TX_QUERY_LIMIT:
                 break
             # else we hit the limit. Query once more with startBlock being the last
             # block we got. There may be duplicate entries if there are more than one
             # transactions for that last block but they should be filtered
             # out when we input all of these in the DB
-            last_block = result[-1]['blockNumber']  # pylint: disable=unsubscriptable-object
             options['startBlock'] = last_block
 
         yield _hashes_tuple_to_list(hashes)
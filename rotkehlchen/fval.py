@@ -19,23 +19,27 @@ class FVal():
     """
 
     __slots__ = ('num',)
+    num: Decimal
 
     def __init__(self, data: AcceptableFValInitInput = 0):
 
         try:
-            if isinstance(data, float):
-                self.num = Decimal(str(data))
-            elif isinstance(data, bytes):
-                # assume it's an ascii string and try to decode the bytes to one
-                self.num = Decimal(data.decode())
+            # The most common inputs are checked first since FVals are created all the time
+            if isinstance(data, FVal):
+                self.num = data.num
+            elif isinstance(data, (Decimal, str)):
+                self.num = Decimal(data)
             elif isinstance(data, bool):
                 # This elif has to come before the isinstance(int) check due to
                 # https://stackoverflow.com/questions/37888620/comparing-boolean-and-int-using-isinstance
                 raise ValueError('Invalid type bool for data given to FVal constructor')
-            elif isinstance(data, (Decimal, int, str)):
+            elif isinstance(data, int):
                 self.num = Decimal(data)
-            elif isinstance(data, FVal):
-                self.num = data.num
+            elif isinstance(data, float):
+                self.num = Decimal(str(data))
+            elif isinstance(data, bytes):
+                # assume it's an ascii string and try to decode the bytes to one
+                self.num = Decimal(data.decode())
             else:
                 raise ValueError(f'Invalid type {type(data)} of data given to FVal constructor')
 
@@ -51,21 +55,29 @@ class FVal():
     def __repr__(self) -> str:
         return f'FVal({str(self.num)})'
 
+    # Comparisons and arithmetic are in the hot path of accounting so the FVal operand
+    # case is handled inline and the results are created with _from_decimal.
+    # Decimal comparisons raise InvalidOperation for NaNs same as compare_signal does.
+
     def __gt__(self, other: AcceptableFValOtherInput) -> bool:
-        evaluated_other = _evaluate_input(other)
-        return self.num.compare_signal(evaluated_other) == Decimal('1')
+        if isinstance(other, FVal):
+            return self.num > other.num
+        return self.num > _evaluate_input(other)
 
     def __lt__(self, other: AcceptableFValOtherInput) -> bool:
-        evaluated_other = _evaluate_input(other)
-        return self.num.compare_signal(evaluated_other) == Decimal('-1')
+        if isinstance(other, FVal):
+            return self.num < other.num
+        return self.num < _evaluate_input(other)
 
     def __le__(self, other: AcceptableFValOtherInput) -> bool:
-        evaluated_other = _evaluate_input(other)
-        return self.num.compare_signal(evaluated_other) in (Decimal('-1'), Decimal('0'))
+        if isinstance(other, FVal):
+            return self.num <= other.num
+        return self.num <= _evaluate_input(other)
 
     def __ge__(self, other: AcceptableFValOtherInput) -> bool:
-        evaluated_other = _evaluate_input(other)
-        return self.num.compare_signal(evaluated_other) in (Decimal('1'), Decimal('0'))
+        if isinstance(other, FVal):
+            return self.num >= other.num
+        return self.num >= _evaluate_input(other)
 
     def __eq__(self, other: object) -> bool:
         evaluated_other: Union[Decimal, int]
@@ -76,59 +88,58 @@ class FVal():
         else:
             evaluated_other = other
 
-        return self.num.compare_signal(evaluated_other) == Decimal('0')
+        if self.num == evaluated_other:
+            return True
+        if self.num.is_nan() or (isinstance(evaluated_other, Decimal) and evaluated_other.is_nan()):  # noqa: E501
+            self.num.compare_signal(evaluated_other)  # raises InvalidOperation like before
+        return False
 
     def __add__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__add__(evaluated_other))
+        if isinstance(other, FVal):
+            return _from_decimal(self.num + other.num)
+        return _from_decimal(self.num + _evaluate_input(other))
 
     def __sub__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__sub__(evaluated_other))
+        if isinstance(other, FVal):
+            return _from_decimal(self.num - other.num)
+        return _from_decimal(self.num - _evaluate_input(other))
 
     def __mul__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__mul__(evaluated_other))
+        if isinstance(other, FVal):
+            return _from_decimal(self.num * other.num)
+        return _from_decimal(self.num * _evaluate_input(other))
 
     def __truediv__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__truediv__(evaluated_other))
+        if isinstance(other, FVal):
+            return _from_decimal(self.num / other.num)
+        return _from_decimal(self.num / _evaluate_input(other))
 
     def __floordiv__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__floordiv__(evaluated_other))
+        return _from_decimal(self.num // _evaluate_input(other))
 
     def __pow__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__pow__(evaluated_other))
+        return _from_decimal(self.num ** _evaluate_input(other))
 
     def __radd__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__radd__(evaluated_other))
+        return _from_decimal(_evaluate_input(other) + self.num)
 
     def __rsub__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__rsub__(evaluated_other))
+        return _from_decimal(_evaluate_input(other) - self.num)
 
     def __rmul__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__rmul__(evaluated_other))
+        return _from_decimal(_evaluate_input(other) * self.num)
 
     def __rtruediv__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__rtruediv__(evaluated_other))
+        return _from_decimal(_evaluate_input(other) / self.num)
 
     def __rfloordiv__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__rfloordiv__(evaluated_other))
+        return _from_decimal(_evaluate_input(other) // self.num)
 
     def __mod__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__mod__(evaluated_other))
+        return _from_decimal(self.num % _evaluate_input(other))
 
     def __rmod__(self, other: AcceptableFValOtherInput) -> 'FVal':
-        evaluated_other = _evaluate_input(other)
-        return FVal(self.num.__rmod__(evaluated_other))
+        return _from_decimal(_evaluate_input(other) % self.num)
 
     def __float__(self) -> float:
         return float(self.num)
@@ -136,10 +147,10 @@ class FVal():
     # --- Unary operands
 
     def __neg__(self) -> 'FVal':
-        return FVal(self.num.__neg__())
+        return _from_decimal(-self.num)
 
     def __abs__(self) -> 'FVal':
-        return FVal(self.num.copy_abs())
+        return _from_decimal(self.num.copy_abs())
 
     # --- Other operations
 
@@ -150,7 +161,7 @@ class FVal():
         """
         evaluated_other = _evaluate_input(other)
         evaluated_third = _evaluate_input(third)
-        return FVal(self.num.fma(evaluated_other, evaluated_third))
+        return _from_decimal(self.num.fma(evaluated_other, evaluated_third))
 
     def to_percentage(self, precision: int = 4, with_perc_sign: bool = True) -> str:
         return f'{self.num*100:.{precision}f}{"%" if with_perc_sign else ""}'
@@ -185,3 +196,14 @@ def _evaluate_input(other: Any) -> Union[Decimal, int]:
         raise NotImplementedError(f'Expected either FVal or int. Got {type(other)}: {other}')
     # else
     return other
+
+
+_new_fval = object.__new__
+
+
+def _from_decimal(num: Decimal) -> FVal:
+    """Create an FVal out of the Decimal result of an operation. This skips the input
+    checks of FVal.__init__ as the result is always a Decimal"""
+    value = _new_fval(FVal)
+    value.num = num
+    return value
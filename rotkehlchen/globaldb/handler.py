@@ -33,6 +33,7 @@ from rotkehlchen.types import (
     Price,
     Timestamp,
 )
+from rotkehlchen.utils.data_structures import LRUCacheWithRemove
 from rotkehlchen.utils.misc import timestamp_to_date, ts_now
 from rotkehlchen.utils.serialization import (
     deserialize_asset_with_oracles_from_db,
@@ -50,6 +51,8 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
+EVM_TOKENS_CACHE_SIZE = 1024
+
 
 _ALL_ASSETS_TABLES_JOINS = """
 FROM assets LEFT JOIN common_asset_details on assets.identifier=common_asset_details.identifier
@@ -205,6 +208,9 @@ class GlobalDBHandler():
     _packaged_db_conn: Optional[DBConnection] = None
     conn: DBConnection
     used_backup: bool  # specifies if the global DB was restored from a backup
+    # A cache of get_evm_token so that the DB is not hit for every log being decoded. Maps
+    # chain and address to the token, or to False if there is no such token in the DB
+    evm_tokens_cache: LRUCacheWithRemove[Union[EvmToken, Literal[False]]]
 
     def __new__(
             cls,
@@ -226,6 +232,7 @@ class GlobalDBHandler():
         GlobalDBHandler.__instance = object.__new__(cls)
         GlobalDBHandler.__instance._data_directory = data_dir
         GlobalDBHandler.__instance.conn, GlobalDBHandler.__instance.used_backup = _initialize_global_db_directory(data_dir, sql_vm_instructions_cb)  # noqa: E501
+        GlobalDBHandler.__instance.evm_tokens_cache = LRUCacheWithRemove(maxsize=EVM_TOKENS_CACHE_SIZE)  # noqa: E501
         return GlobalDBHandler.__instance
 
     @staticmethod
@@ -793,12 +800,30 @@ class GlobalDBHandler():
 
         return [x[0] for x in result]
 
+    @staticmethod
+    def clean_evm_tokens_cache(
+            address: Optional[ChecksumEvmAddress] = None,
+            chain_id: Optional[ChainID] = None,
+    ) -> None:
+        """Clean the memory cache of get_evm_token of either a single or all tokens.
+        Has to be called whenever the data of an evm token may change in the DB."""
+        if address is not None and chain_id is not None:
+            GlobalDBHandler().evm_tokens_cache.remove(f'{chain_id.serialize_for_db()}{address}')
+        else:
+            GlobalDBHandler().evm_tokens_cache.clear()
+
     @staticmethod
     def get_evm_token(address: ChecksumEvmAddress, chain_id: ChainID) -> Optional[EvmToken]:
         """Gets all details for an evm token by its address
 
-        If no token for the given address can be found None is returned.
+        If no token for the given address can be found None is returned. Both tokens
+        and addresses that are not tokens are kept in memory by evm_tokens_cache.
         """
+        cache_key = f'{chain_id.serialize_for_db()}{address}'
+        cached_token = GlobalDBHandler().evm_tokens_cache.get(cache_key)
+        if cached_token is not None:
+            return None if cached_token is False else cached_token
+
         with GlobalDBHandler().conn.read_ctx() as cursor:
             cursor.execute(
                 'SELECT A.identifier, B.address, B.chain, B.token_kind, B.decimals, C.name, '
@@ -810,13 +835,14 @@ class GlobalDBHandler():
             )
             results = cursor.fetchall()
             if len(results) == 0:
+                GlobalDBHandler().evm_tokens_cache.set(cache_key, False)
                 return None
 
             token_data = results[0]
             underlying_tokens = GlobalDBHandler().fetch_underlying_tokens(cursor, token_data[0])
 
         try:
-            return EvmToken.deserialize_from_db(
+            token = EvmToken.deserialize_from_db(
                 entry=token_data,
                 underlying_tokens=underlying_tokens,
             )
@@ -827,6 +853,9 @@ class GlobalDBHandler():
             )
             return None
 
+        GlobalDBHandler().evm_tokens_cache.set(cache_key, token)
+        return token
+
     @staticmethod
     def get_evm_tokens(
             chain_id: ChainID,
@@ -928,6 +957,7 @@ class GlobalDBHandler():
                 msg = f'Ethereum token with identifier {entry.identifier} already exists in the DB'  # noqa: E501
             raise InputError(msg) from e
 
+        GlobalDBHandler().clean_evm_tokens_cache(entry.evm_address, entry.chain_id)
         if entry.underlying_tokens is not None:
             GlobalDBHandler()._add_underlying_tokens(
                 write_cursor=write_cursor,
@@ -935,6 +965,8 @@ class GlobalDBHandler():
                 underlying_tokens=entry.underlying_tokens,
                 chain_id=entry.chain_id,
             )
+            for underlying_token in entry.underlying_tokens:  # they may have just been added
+                GlobalDBHandler().clean_evm_tokens_cache(underlying_token.address, entry.chain_id)  # noqa: E501
 
     @staticmethod
     def edit_evm_token(entry: EvmToken) -> str:
@@ -1010,6 +1042,8 @@ class GlobalDBHandler():
                 f'Failed to update DB entry for EVM token with address {entry.evm_address} at chain {entry.chain_id}'  # noqa: E501
                 f'due to a constraint being hit. Make sure the new values are valid ',
             ) from e
+        finally:  # the address of the token may have changed so clean all of them
+            GlobalDBHandler().clean_evm_tokens_cache()
 
         return rotki_id
 
@@ -1096,6 +1130,8 @@ class GlobalDBHandler():
                     f'due to a constraint being hit. Make sure the new values are valid.',
                 ) from e
 
+        GlobalDBHandler().clean_evm_tokens_cache()  # the asset may be swapped for by tokens
+
     @staticmethod
     def add_user_owned_assets(assets: list['Asset']) -> None:
         """Make sure all assets in the list are included in the user owned assets
@@ -1128,6 +1164,8 @@ class GlobalDBHandler():
                     f'but it was not found in the DB',
                 )
 
+        GlobalDBHandler().clean_evm_tokens_cache()
+
     @staticmethod
     def get_assets_with_symbol(
             symbol: str,
@@ -1198,28 +1236,64 @@ class GlobalDBHandler():
     ) -> Optional['HistoricalPrice']:
         """Gets the price around a particular timestamp
 
+        The closest price before and the closest price after the timestamp are
+        looked up with two timestamp range queries so that the primary key index
+        of (from_asset, to_asset, source_type, timestamp) can be used. If both are
+        equally close the one before the timestamp is returned.
+
         If no price can be found returns None
         """
         querystr = (
             'SELECT from_asset, to_asset, source_type, timestamp, price FROM price_history '
-            'WHERE from_asset=? AND to_asset=? AND ABS(timestamp - ?) <= ? '
+            'WHERE from_asset=? AND to_asset=? '
         )
-        querylist = [from_asset.identifier, to_asset.identifier, timestamp, max_seconds_distance]
+        querylist: list[Union[str, int]] = [from_asset.identifier, to_asset.identifier]
         if source is not None:
-            querystr += ' AND source_type=?'
+            querystr += 'AND source_type=? '
             querylist.append(source.serialize_for_db())
-
-        querystr += 'ORDER BY ABS(timestamp - ?) ASC LIMIT 1'
-        querylist.append(timestamp)
+        else:  # constrain the source type too or the timestamp can't use the index
+            querystr += f'AND source_type IN ({",".join(["?"] * len(HistoricalPriceOracle))}) '
+            querylist.extend(x.serialize_for_db() for x in HistoricalPriceOracle)
 
         with GlobalDBHandler().conn.read_ctx() as cursor:
-            query = cursor.execute(querystr, tuple(querylist))
-            result = query.fetchone()
-            if result is None:
-                return None
+            before = cursor.execute(
+                querystr + 'AND timestamp BETWEEN ? AND ? ORDER BY timestamp DESC LIMIT 1',
+                (*querylist, timestamp - max_seconds_distance, timestamp),
+            ).fetchone()
+            if before is not None and before[3] == timestamp:
+                return HistoricalPrice.deserialize_from_db(before)
+
+            after = cursor.execute(
+                querystr + 'AND timestamp > ? AND timestamp <= ? ORDER BY timestamp ASC LIMIT 1',
+                (*querylist, timestamp, timestamp + max_seconds_distance),
+            ).fetchone()
+
+        if before is None:
+            result = after
+        elif after is None or timestamp - before[3] <= after[3] - timestamp:
+            result = before
+        else:
+            result = after
+
+        if result is None:
+            return None
 
         return HistoricalPrice.deserialize_from_db(result)
 
+    @staticmethod
+    def get_historical_price_series(
+            from_asset: 'Asset',
+            to_asset: 'Asset',
+    ) -> list[tuple[str, int, str]]:
+        """Gets all historical prices of a pair as (source_type, timestamp, price) rows
+        ordered by source type and timestamp"""
+        with GlobalDBHandler().conn.read_ctx() as cursor:
+            return cursor.execute(
+                'SELECT source_type, timestamp, price FROM price_history '
+                'WHERE from_asset=? AND to_asset=? ORDER BY source_type ASC, timestamp ASC',
+                (from_asset.identifier, to_asset.identifier),
+            ).fetchall()
+
     @staticmethod
     def add_historical_prices(entries: list['HistoricalPrice']) -> None:
         """Adds the given historical price entries in the DB
@@ -1713,6 +1787,7 @@ class GlobalDBHandler():
         with GlobalDBHandler().conn.read_ctx() as read_cursor:
             read_cursor.execute(detach_database)
 
+        GlobalDBHandler().clean_evm_tokens_cache()
         return True, ''
 
     @staticmethod
@@ -1773,6 +1848,8 @@ class GlobalDBHandler():
 
         with GlobalDBHandler().conn.read_ctx() as read_cursor:
             read_cursor.execute(detach_database)
+
+        GlobalDBHandler().clean_evm_tokens_cache()
         return True, ''
 
     @staticmethod
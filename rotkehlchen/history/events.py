@@ -1,11 +1,36 @@
+import heapq
 import logging
+from bisect import bisect_left
+from copy import deepcopy
+from functools import partial
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+import gevent
+from gevent.pool import Pool
 
+from rotkehlchen.accounting.checkpoints import EMPTY_EVENTS_DIGEST, digest_event
 from rotkehlchen.accounting.structures.base import HistoryBaseEntry
+from rotkehlchen.constants.limits import (
+    FREE_ASSET_MOVEMENTS_LIMIT,
+    FREE_HISTORY_EVENTS_LIMIT,
+    FREE_LEDGER_ACTIONS_LIMIT,
+    FREE_TRADES_LIMIT,
+)
 from rotkehlchen.constants.misc import ZERO
 from rotkehlchen.db.filtering import (
     AssetMovementsFilterQuery,
+    DBFilterQuery,
     EvmTransactionsFilterQuery,
     HistoryEventFilterQuery,
     LedgerActionsFilterQuery,
@@ -15,7 +40,11 @@ from rotkehlchen.db.history_events import DBHistoryEvents
 from rotkehlchen.db.ledger_actions import DBLedgerActions
 from rotkehlchen.errors.misc import RemoteError
 from rotkehlchen.exchanges.data_structures import AssetMovement, Trade
-from rotkehlchen.exchanges.manager import SUPPORTED_EXCHANGES, ExchangeManager
+from rotkehlchen.exchanges.manager import (
+    EXCHANGES_QUERY_CONCURRENCY,
+    SUPPORTED_EXCHANGES,
+    ExchangeManager,
+)
 from rotkehlchen.fval import FVal
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.types import EVM_CHAINS_WITH_TRANSACTIONS, Location, Timestamp
@@ -28,6 +57,7 @@ if TYPE_CHECKING:
     from rotkehlchen.chain.aggregator import ChainsAggregator
     from rotkehlchen.db.dbhandler import DBHandler
     from rotkehlchen.db.drivers.gevent import DBCursor
+    from rotkehlchen.exchanges.exchange import ExchangeInterface
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
@@ -46,6 +76,76 @@ log = RotkehlchenLogsAdapter(logger)
 NUM_HISTORY_QUERY_STEPS_EXCL_EXCHANGES = 4 + 3 * len(EVM_CHAINS_WITH_TRANSACTIONS)
 
 
+def history_sort_key(event: 'AccountingEventMixin') -> tuple[int, int]:
+    """Sort events first by timestamp and if history base by sequence index"""
+    return (
+        event.get_timestamp(),
+        event.sequence_index if isinstance(event, HistoryBaseEntry) else 1,
+    )
+
+
+class HistorySource(NamedTuple):
+    """A source of history events sorted by history_sort_key"""
+    # Returns the events from the given timestamp, or all of them if it's None
+    iterate: Callable[[Optional[Timestamp]], Iterable['AccountingEventMixin']]
+    # Returns the number of events before the given timestamp, or of all the events if
+    # it's None, and a marker that changes when any of those events is added or removed
+    summarize: Callable[[Optional[Timestamp]], tuple[int, Any]]
+    # Returns the number of all the events
+    count: Callable[[], int]
+
+    @classmethod
+    def from_events(cls: type['HistorySource'], events: Sequence['AccountingEventMixin']) -> 'HistorySource':  # noqa: E501
+        """Creates a source of events that are already in memory and sorted. Their
+        marker is the digest of the events, since there is no DB to tell if they changed."""
+        timestamps = [event.get_timestamp() for event in events]
+
+        def iterate(from_ts: Optional[Timestamp]) -> Iterable['AccountingEventMixin']:
+            return events if from_ts is None else events[bisect_left(timestamps, from_ts):]
+
+        def summarize(before_ts: Optional[Timestamp]) -> tuple[int, Any]:
+            events_num = len(timestamps) if before_ts is None else bisect_left(timestamps, before_ts)  # noqa: E501
+            events_digest = EMPTY_EVENTS_DIGEST
+            for event in events[:events_num]:
+                events_digest = digest_event(events_digest, event)
+            return events_num, events_digest.hex()
+
+        return cls(iterate=iterate, summarize=summarize, count=lambda: len(events))
+
+
+class MergedHistory():
+    """The events of all history sources merged in the order of history_sort_key.
+
+    Each iteration reads the events of the sources again, so it can be iterated
+    more than once.
+    """
+
+    def __init__(self, sources: list[HistorySource]) -> None:
+        self.sources = sources
+
+    def __iter__(self) -> Iterator['AccountingEventMixin']:
+        return self.iterate()
+
+    def iterate(self, from_ts: Optional[Timestamp] = None) -> Iterator['AccountingEventMixin']:
+        """Returns the events from the given timestamp, or all of them if it's None.
+        The sources skip the earlier events without reading them."""
+        # Each source is already sorted so merge them instead of sorting everything.
+        # For equal keys the merge keeps the order of the sources, same as a stable sort.
+        return iter(heapq.merge(
+            *(source.iterate(from_ts) for source in self.sources),
+            key=history_sort_key,
+        ))
+
+    def summarize(self, before_ts: Optional[Timestamp] = None) -> list[tuple[int, Any]]:
+        """Returns the summary of each source for the events before the given timestamp
+        or for all events if it's None. See HistorySource.summarize"""
+        return [source.summarize(before_ts) for source in self.sources]
+
+    def count(self) -> int:
+        """Returns the number of all events, counted by each source without reading them"""
+        return sum(source.count() for source in self.sources)
+
+
 class EventsHistorian:
 
     def __init__(
@@ -288,10 +388,11 @@ class EventsHistorian:
             start_ts: Timestamp,
             end_ts: Timestamp,
             has_premium: bool,
-    ) -> tuple[str, list['AccountingEventMixin']]:
+    ) -> tuple[str, Iterable['AccountingEventMixin']]:
         """
-        Creates all events history from start_ts to end_ts. Returns it
-        sorted by ascending timestamp.
+        Creates all events history from start_ts to end_ts. Returns it as an
+        iterable sorted by ascending timestamp, which reads the events from the DB
+        as they are consumed.
         """
         self._reset_variables()
         step = 0
@@ -304,8 +405,9 @@ class EventsHistorian:
             start_ts=start_ts,
             end_ts=end_ts,
         )
-        # start creating the all trades history list
-        history: list['AccountingEventMixin'] = []
+        # start creating the sources of the history. Each of them returns the events
+        # sorted by history_sort_key
+        sources: list[HistorySource] = []
         empty_or_error = ''
 
         def fail_history_cb(error_msg: str) -> None:
@@ -319,7 +421,8 @@ class EventsHistorian:
             step = self._increase_progress(step, total_steps)
             self.processing_state_name = state_name
 
-        for exchange in self.exchange_manager.iterate_exchanges():
+        def query_exchange_history(exchange: 'ExchangeInterface') -> None:
+            nonlocal step
             self.processing_state_name = f'Querying {exchange.name} exchange history'
             exchange.query_history_with_callbacks(
                 # We need to have history of exchanges since before the range
@@ -330,70 +433,95 @@ class EventsHistorian:
             )
             step = self._increase_progress(step, total_steps)
 
+        # the exchanges are independent remotes so query them all at once. Their
+        # failures are collected by fail_history_cb
+        pool = Pool(size=EXCHANGES_QUERY_CONCURRENCY)
+        greenlets = [
+            pool.spawn(query_exchange_history, exchange)
+            for exchange in self.exchange_manager.iterate_exchanges()
+        ]
+        try:
+            pool.join()
+        finally:  # don't leave queries running if this greenlet gets killed
+            pool.kill()
+        for greenlet in greenlets:  # raise the first unexpected error
+            greenlet.get()
+
         # Query all trades, asset movements and margin positions from the DB for all
-        # possible locations.
+        # possible locations. Trades and asset movements are read from the DB lazily
+        # while the history is being processed.
         self.processing_state_name = 'Reading trades, asset movements and margin positions from the DB'  # noqa: E501
+        sources.append(self._db_source(
+            self.db.iterate_trades,
+            table='trades',
+            filter_query=TradesFilterQuery.make(),
+            has_premium=True,  # we need all trades for accounting -- limit happens later
+            free_limit=FREE_TRADES_LIMIT,
+        ))
+        sources.append(self._db_source(
+            self.db.iterate_asset_movements,
+            table='asset_movements',
+            filter_query=AssetMovementsFilterQuery.make(),
+            has_premium=True,  # we need all trades for accounting -- limit happens later
+            free_limit=FREE_ASSET_MOVEMENTS_LIMIT,
+        ))
         with self.db.conn.read_ctx() as cursor:
-            # Include all trades
-            trades = self.db.get_trades(
-                cursor,
-                filter_query=TradesFilterQuery.make(),
-                has_premium=True,  # we need all trades for accounting -- limit happens later
-            )
-            history.extend(trades)
-
-            # Include all asset movements
-            asset_movements = self.db.get_asset_movements(
-                cursor,
-                filter_query=AssetMovementsFilterQuery.make(),
-                has_premium=True,  # we need all trades for accounting -- limit happens later
-            )
-            history.extend(asset_movements)
-
             # Include all margin positions
             margin_positions = self.db.get_margin_positions(cursor)
-            history.extend(margin_positions)
+            sources.append(HistorySource.from_events(sorted(margin_positions, key=history_sort_key)))  # noqa: E501
 
         step = self._increase_progress(step, total_steps)
 
         self.processing_state_name = 'Querying ethereum transactions history'
+        # the chains have their own etherscan and rate limits so query them all at once
+        chain_queries = {}
         for blockchain in EVM_CHAINS_WITH_TRANSACTIONS:
-            str_blockchain = str(blockchain)
-            evm_manager = self.chains_aggregator.get_chain_manager(blockchain)
-            tx_filter_query = EvmTransactionsFilterQuery.make(
-                limit=None,
-                offset=None,
-                # We need to have history of transactions since before the range
-                from_ts=Timestamp(0),
-                to_ts=end_ts,
-                chain_id=blockchain.to_chain_id(),  # type: ignore[arg-type]
+            chain_queries[blockchain] = gevent.spawn(
+                self.chains_aggregator.get_chain_manager(blockchain).transactions.query_chain,
+                filter_query=EvmTransactionsFilterQuery.make(
+                    limit=None,
+                    offset=None,
+                    # We need to have history of transactions since before the range
+                    from_ts=Timestamp(0),
+                    to_ts=end_ts,
+                    chain_id=blockchain.to_chain_id(),
+                ),
             )
-            try:
-                evm_manager.transactions.query_chain(filter_query=tx_filter_query)
-            except RemoteError as e:
-                msg = str(e)
-                self.msg_aggregator.add_error(
-                    f'There was an error when querying {str_blockchain} etherscan for transactions: {msg}'  # noqa: E501
-                    f'The final history result will not include {str_blockchain} transactions',
-                )
-                empty_or_error += '\n' + msg
-            step = self._increase_progress(step, total_steps)
 
-            self.processing_state_name = f'Querying {str_blockchain} transaction receipts'
-            evm_manager.transactions.get_receipts_for_transactions_missing_them()
-            step = self._increase_progress(step, total_steps)
+        try:
+            for blockchain, chain_query in chain_queries.items():
+                str_blockchain = str(blockchain)
+                evm_manager = self.chains_aggregator.get_chain_manager(blockchain)
+                try:
+                    chain_query.get()
+                except RemoteError as e:
+                    msg = str(e)
+                    self.msg_aggregator.add_error(
+                        f'There was an error when querying {str_blockchain} etherscan for transactions: {msg}'  # noqa: E501
+                        f'The final history result will not include {str_blockchain} transactions',
+                    )
+                    empty_or_error += '\n' + msg
+                step = self._increase_progress(step, total_steps)
 
-            self.processing_state_name = f'Decoding {str_blockchain} raw transactions'
-            evm_manager.transactions_decoder.get_and_decode_undecoded_transactions(limit=None)
-            step = self._increase_progress(step, total_steps)
+                self.processing_state_name = f'Querying {str_blockchain} transaction receipts'
+                evm_manager.transactions.get_receipts_for_transactions_missing_them()
+                step = self._increase_progress(step, total_steps)
+
+                self.processing_state_name = f'Decoding {str_blockchain} raw transactions'
+                evm_manager.transactions_decoder.get_and_decode_undecoded_transactions(limit=None)
+                step = self._increase_progress(step, total_steps)
+        finally:  # stop querying the other chains if one of them failed
+            gevent.killall(list(chain_queries.values()), block=False)
 
         # include all ledger actions
         self.processing_state_name = 'Querying ledger actions history'
-        ledger_actions, _ = self.query_ledger_actions(
+        sources.append(self._db_source(
+            DBLedgerActions(self.db, self.msg_aggregator).iterate_ledger_actions,
+            table='ledger_actions',
             filter_query=LedgerActionsFilterQuery.make(),
-            only_cache=True,
-        )
-        history.extend(ledger_actions)
+            has_premium=self.chains_aggregator.premium is not None,
+            free_limit=FREE_LEDGER_ACTIONS_LIMIT,
+        ))
         step = self._increase_progress(step, total_steps)
 
         # include eth2 staking events
@@ -405,7 +533,7 @@ class EventsHistorian:
                     from_timestamp=Timestamp(0),
                     to_timestamp=end_ts,
                 )
-                history.extend(eth2_events)
+                sources.append(HistorySource.from_events(sorted(eth2_events, key=history_sort_key)))  # noqa: E501
             except RemoteError as e:
                 self.msg_aggregator.add_error(
                     f'Eth2 events are not included in the PnL report due to {str(e)}',
@@ -414,24 +542,92 @@ class EventsHistorian:
         step = self._increase_progress(step, total_steps)
 
         # Include base history entries
-        history_events_db = DBHistoryEvents(self.db)
-        with self.db.conn.read_ctx() as cursor:
-            base_entries, _ = history_events_db.get_history_events_and_limit_info(
-                cursor=cursor,
-                filter_query=HistoryEventFilterQuery.make(
-                    # We need to have history since before the range
-                    from_ts=Timestamp(0),
-                    to_ts=end_ts,
-                ),
-                has_premium=True,  # ignore limits here. Limit applied at processing
-            )
-        history.extend(base_entries)
+        sources.append(self._db_source(
+            DBHistoryEvents(self.db).iterate_history_events,
+            table='history_events',
+            filter_query=HistoryEventFilterQuery.make(
+                # We need to have history since before the range
+                from_ts=Timestamp(0),
+                to_ts=end_ts,
+                # same order as history_sort_key. Timestamps are in milliseconds in the DB
+                order_by_rules=[('timestamp / 1000', True), ('sequence_index', True), ('timestamp', True)],  # noqa: E501
+            ),
+            has_premium=True,  # ignore limits here. Limit applied at processing
+            free_limit=FREE_HISTORY_EVENTS_LIMIT,
+        ))
         self._increase_progress(step, total_steps)
 
-        history.sort(  # sort events first by timestamp and if history base by sequence index
-            key=lambda x: (
-                x.get_timestamp(),
-                x.sequence_index if isinstance(x, HistoryBaseEntry) else 1,
+        # Each source is already sorted so merge them instead of sorting everything.
+        return empty_or_error, MergedHistory(sources)
+
+    def _iterate_db_events(
+            self,
+            from_ts: Optional[Timestamp],
+            iterate_method: Callable[..., Iterator['AccountingEventMixin']],
+            filter_query: DBFilterQuery,
+            **kwargs: Any,
+    ) -> Iterator['AccountingEventMixin']:
+        """Yields the events of the given DB iterate method from the given timestamp
+        using its own read cursor, so that they are only read when consumed"""
+        if from_ts is not None:
+            filter_query = deepcopy(filter_query)
+            filter_query.from_ts = from_ts  # type: ignore[attr-defined]  # all history filters have timestamps  # noqa: E501
+        with self.db.conn.read_ctx() as cursor:
+            yield from iterate_method(cursor=cursor, filter_query=filter_query, **kwargs)
+
+    def _summarize_db_events(
+            self,
+            before_ts: Optional[Timestamp],
+            table: Literal['trades', 'asset_movements', 'ledger_actions', 'history_events'],
+            filter_query: DBFilterQuery,
+            free_limit: Optional[int],
+    ) -> tuple[int, Any]:
+        """Returns the number of events of the table that the filter query selects before
+        the given timestamp, or all of them if it's None, and their highest rowid.
+
+        Removing an event changes the number and adding one gives it a higher rowid.
+        If free_limit is given only the latest events up to it are selected, same as
+        the iterate methods do for non premium users.
+        """
+        query, bindings = filter_query.prepare(with_pagination=False, with_order=False)
+        if free_limit is None:
+            query = f'SELECT rowid AS row_id, timestamp FROM {table} ' + query
+        else:
+            query = f'SELECT row_id, timestamp FROM (SELECT rowid AS row_id, * FROM {table} ORDER BY timestamp DESC LIMIT ?) ' + query  # noqa: E501
+            bindings = [free_limit] + bindings
+        query = f'SELECT COUNT(*), MAX(row_id) FROM ({query})'
+        if before_ts is not None:
+            query += ' WHERE timestamp < ?'
+            # history events timestamps are in milliseconds in the DB
+            bindings.append(before_ts * 1000 if table == 'history_events' else before_ts)
+
+        with self.db.conn.read_ctx() as cursor:
+            events_num, last_rowid = cursor.execute(query, bindings).fetchone()
+        return events_num, last_rowid
+
+    def _db_source(
+            self,
+            iterate_method: Callable[..., Iterator['AccountingEventMixin']],
+            table: Literal['trades', 'asset_movements', 'ledger_actions', 'history_events'],
+            filter_query: DBFilterQuery,
+            has_premium: bool,
+            free_limit: int,
+    ) -> HistorySource:
+        """Creates a source of the events the filter query selects from a DB table.
+        They are read only when consumed and summarized or counted with a single DB query."""
+        summarize = partial(
+            self._summarize_db_events,
+            table=table,
+            filter_query=filter_query,
+            free_limit=None if has_premium else free_limit,
+        )
+        return HistorySource(
+            iterate=partial(
+                self._iterate_db_events,
+                iterate_method=iterate_method,
+                filter_query=filter_query,
+                has_premium=has_premium,
             ),
+            summarize=summarize,
+            count=lambda: summarize(None)[0],
         )
-        return empty_or_error, history
@@ -1,22 +1,28 @@
 import logging
+from collections import defaultdict
 from contextlib import suppress
 from http import HTTPStatus
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from gevent.pool import Pool
 
 from rotkehlchen.assets.asset import Asset
 from rotkehlchen.constants.assets import A_KFEE, A_USD
 from rotkehlchen.constants.misc import ONE, ZERO
-from rotkehlchen.errors.asset import UnknownAsset, WrongAssetType
+from rotkehlchen.constants.timing import HOUR_IN_SECONDS
+from rotkehlchen.errors.asset import UnknownAsset, UnsupportedAsset, WrongAssetType
 from rotkehlchen.errors.misc import RemoteError
 from rotkehlchen.errors.price import NoPriceForGivenTimestamp, PriceQueryUnsupportedAsset
 from rotkehlchen.fval import FVal
+from rotkehlchen.globaldb.handler import GlobalDBHandler
 from rotkehlchen.globaldb.manual_price_oracles import ManualPriceOracle
 from rotkehlchen.inquirer import Inquirer
 from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.types import Price, Timestamp
 from rotkehlchen.user_messages import MessagesAggregator
 
+from .price_cache import PriceSeriesCache
 from .types import HistoricalPriceOracle, HistoricalPriceOracleInstance
 
 if TYPE_CHECKING:
@@ -27,6 +33,9 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
+# How many historical prices are queried from the oracles in parallel when prefetching
+PRICE_PREFETCH_CONCURRENCY = 4
+
 
 def query_usd_price_or_use_default(
         asset: Asset,
@@ -156,6 +165,7 @@ class PriceHistorian():
             from_asset: Asset,
             to_asset: Asset,
             timestamp: Timestamp,
+            series_cache: Optional[PriceSeriesCache] = None,
     ) -> Price:
         """
         Query the historical price on `timestamp` for `from_asset` in `to_asset`.
@@ -167,6 +177,8 @@ class PriceHistorian():
             to_asset: The ticker symbol of the asset against which we want to
                       know the price.
             timestamp: The timestamp at which to query the price
+            series_cache: If given, the prices saved in the DB are looked up in it
+                          before querying each oracle
 
         May raise:
         - NoPriceForGivenTimestamp if we can't find a price for the asset in the given
@@ -209,6 +221,16 @@ class PriceHistorian():
         assert isinstance(oracles, list) and isinstance(oracle_instances, list), (
             'PriceHistorian should never be called before setting the oracles'
         )
+        if series_cache is not None:
+            price = series_cache.get_price(
+                from_asset=from_asset,
+                to_asset=to_asset,
+                timestamp=timestamp,
+                oracles=oracles,
+            )
+            if price is not None:
+                return price
+
         rate_limited = False
         for oracle, oracle_instance in zip(oracles, oracle_instances):
             can_query_history = oracle_instance.can_query_history(
@@ -247,6 +269,13 @@ class PriceHistorian():
                 to_asset=to_asset,
                 timestamp=timestamp,
             )
+            if series_cache is not None:
+                series_cache.add_price(
+                    from_asset=from_asset,
+                    to_asset=to_asset,
+                    timestamp=timestamp,
+                    price=price,
+                )
             return price
 
         raise NoPriceForGivenTimestamp(
@@ -255,3 +284,180 @@ class PriceHistorian():
             time=timestamp,
             rate_limited=rate_limited,
         )
+
+    @staticmethod
+    def _store_cryptocompare_history(
+            from_asset: Asset,
+            to_asset: Asset,
+            timestamps: list[Timestamp],
+    ) -> None:
+        """Saves the hourly cryptocompare prices of the pair that cover the timestamps
+        in the global DB, querying the whole missing range page by page instead of one
+        price per query. Errors are only logged since the prices are queried one by one
+        afterwards anyway."""
+        try:
+            from_asset = from_asset.resolve_to_asset_with_oracles()
+            to_asset = to_asset.resolve_to_asset_with_oracles()
+        except (UnknownAsset, WrongAssetType):
+            return
+
+        cryptocompare = PriceHistorian()._cryptocompare
+        first_ts, last_ts = min(timestamps), max(timestamps)
+        if cryptocompare.can_query_history(from_asset=from_asset, to_asset=to_asset, timestamp=last_ts) is False:  # noqa: E501
+            return
+
+        data_range = GlobalDBHandler().get_historical_price_range(
+            from_asset=from_asset,
+            to_asset=to_asset,
+            source=HistoricalPriceOracle.CRYPTOCOMPARE,
+        )
+        # the saved range can only be extended after its end or before its start
+        range_edges = []
+        if data_range is None or last_ts > data_range[1]:
+            range_edges.append(last_ts)
+        if data_range is not None and first_ts < data_range[0]:
+            range_edges.append(first_ts)
+        for timestamp in range_edges:
+            try:
+                cryptocompare.query_and_store_historical_data(
+                    from_asset=from_asset,
+                    to_asset=to_asset,
+                    timestamp=timestamp,
+                )
+            except (RemoteError, UnsupportedAsset) as e:
+                log.debug(f'Failed to query the cryptocompare history of {from_asset} -> {to_asset}: {str(e)}')  # noqa: E501
+                return
+
+    @staticmethod
+    def prefetch_historical_prices(
+            queries: Iterable[tuple[Asset, Asset, Timestamp]],
+            series_cache: PriceSeriesCache,
+            concurrency: int = PRICE_PREFETCH_CONCURRENCY,
+    ) -> list[NoPriceForGivenTimestamp]:
+        """
+        Makes sure that the historical prices of the given (from_asset, to_asset, timestamp)
+        queries are known before they are needed, so that they can be served by the
+        series cache.
+
+        The prices already saved in the DB are found in the series cache. The rest are
+        grouped per pair and hour and asked from each oracle in order, so that each oracle
+        only gets the prices that the oracles before it could not find. Cryptocompare first
+        saves the hourly history of each pair over the whole range of its timestamps.
+        Up to `concurrency` queries run in parallel.
+
+        The found prices are added to the series cache. The prices that could not be found
+        are remembered as missing in the series cache and returned.
+        """
+        instance = PriceHistorian()
+        oracles = instance._oracles
+        oracle_instances = instance._oracle_instances
+        assert isinstance(oracles, list) and isinstance(oracle_instances, list), (
+            'PriceHistorian should never be called before setting the oracles'
+        )
+        # (from_asset, to_asset, hour) -> timestamps
+        missing: defaultdict[tuple[Asset, Asset, Timestamp], list[Timestamp]] = defaultdict(list)  # noqa: E501
+        for from_asset, to_asset, timestamp in queries:
+            if from_asset == to_asset or from_asset == A_KFEE:
+                continue
+            with suppress(UnknownAsset):
+                if from_asset.is_fiat() and to_asset.is_fiat():
+                    continue  # queried from the forex APIs
+
+            try:
+                price = series_cache.get_price(
+                    from_asset=from_asset,
+                    to_asset=to_asset,
+                    timestamp=timestamp,
+                    oracles=oracles,
+                )
+            except NoPriceForGivenTimestamp:
+                continue  # already known to be missing
+
+            if price is None:
+                hour_ts = Timestamp(timestamp - timestamp % HOUR_IN_SECONDS)
+                missing[(from_asset, to_asset, hour_ts)].append(timestamp)
+
+        if len(missing) == 0:
+            return []
+
+        log.debug(f'Prefetching {len(missing)} historical prices from the price oracles')
+        pool = Pool(size=concurrency)
+        rate_limited: set[tuple[Asset, Asset, Timestamp]] = set()
+        for oracle, oracle_instance in zip(oracles, oracle_instances):
+            if len(missing) == 0:
+                break
+
+            if oracle == HistoricalPriceOracle.CRYPTOCOMPARE:
+                pair_timestamps: defaultdict[tuple[Asset, Asset], list[Timestamp]] = defaultdict(list)  # noqa: E501
+                for (from_asset, to_asset, _), timestamps in missing.items():
+                    pair_timestamps[(from_asset, to_asset)].extend(timestamps)
+                pool.map(
+                    lambda entry: PriceHistorian._store_cryptocompare_history(
+                        from_asset=entry[0][0],
+                        to_asset=entry[0][1],
+                        timestamps=entry[1],
+                    ),
+                    pair_timestamps.items(),
+                )
+
+            def query_price(
+                    query: tuple[Asset, Asset, Timestamp],
+                    oracle_instance: HistoricalPriceOracleInstance = oracle_instance,
+            ) -> tuple[Optional[Price], bool]:
+                """Returns the price the oracle found, if any, and if it was rate limited"""
+                from_asset, to_asset, timestamp = query
+                if oracle_instance.can_query_history(from_asset=from_asset, to_asset=to_asset, timestamp=timestamp) is False:  # noqa: E501
+                    return None, False
+
+                try:
+                    return oracle_instance.query_historical_price(
+                        from_asset=from_asset,
+                        to_asset=to_asset,
+                        timestamp=timestamp,
+                    ), False
+                except (
+                    PriceQueryUnsupportedAsset,
+                    NoPriceForGivenTimestamp,
+                    UnknownAsset,
+                    WrongAssetType,
+                ):
+                    return None, False
+                except RemoteError as e:
+                    return None, e.error_code == HTTPStatus.TOO_MANY_REQUESTS
+
+            keys = list(missing)
+            # each group is queried at its first timestamp
+            group_queries = [(key[0], key[1], timestamps[0]) for key, timestamps in missing.items()]  # noqa: E501
+            for key, (price, was_rate_limited) in zip(keys, pool.imap(query_price, group_queries)):  # noqa: E501
+                if was_rate_limited is True:
+                    rate_limited.add(key)
+                if price is None:
+                    continue
+
+                from_asset, to_asset, _ = key
+                for timestamp in missing.pop(key):
+                    series_cache.add_price(
+                        from_asset=from_asset,
+                        to_asset=to_asset,
+                        timestamp=timestamp,
+                        price=price,
+                    )
+
+        not_found = []
+        for (from_asset, to_asset, hour_ts), timestamps in missing.items():
+            for timestamp in timestamps:
+                not_found.append(NoPriceForGivenTimestamp(
+                    from_asset=from_asset,
+                    to_asset=to_asset,
+                    time=timestamp,
+                    rate_limited=(from_asset, to_asset, hour_ts) in rate_limited,
+                ))
+                if (from_asset, to_asset, hour_ts) not in rate_limited:
+                    # rate limited queries can be retried later
+                    series_cache.add_missing(
+                        from_asset=from_asset,
+                        to_asset=to_asset,
+                        timestamp=timestamp,
+                    )
+
+        return not_found
@@ -0,0 +1,213 @@
+import logging
+import sys
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+from rotkehlchen.constants.misc import ZERO
+from rotkehlchen.constants.timing import DAY_IN_SECONDS, HOUR_IN_SECONDS
+from rotkehlchen.errors.price import NoPriceForGivenTimestamp
+from rotkehlchen.errors.serialization import DeserializationError
+from rotkehlchen.fval import FVal
+from rotkehlchen.globaldb.handler import GlobalDBHandler
+from rotkehlchen.logging import RotkehlchenLogsAdapter
+from rotkehlchen.types import Price, Timestamp
+
+from .types import HistoricalPriceOracle
+
+if TYPE_CHECKING:
+    from rotkehlchen.assets.asset import Asset
+
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
+# Maximum distance each oracle accepts between the requested timestamp and a
+# price it has saved in the global DB. Needs to match the oracles' own DB lookups.
+ORACLE_MAX_SECONDS_DISTANCE = {
+    HistoricalPriceOracle.MANUAL: HOUR_IN_SECONDS,
+    HistoricalPriceOracle.CRYPTOCOMPARE: HOUR_IN_SECONDS,
+    HistoricalPriceOracle.COINGECKO: DAY_IN_SECONDS,
+    HistoricalPriceOracle.DEFILLAMA: DAY_IN_SECONDS,
+}
+DEFAULT_PRICE_SERIES_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Rough size of an entry of PairPrices.extra_prices or PairPrices.missing
+EXTRA_PRICE_ENTRY_SIZE = 200
+
+
+class PriceSeries(NamedTuple):
+    """The saved prices of a single source for a pair, sorted by timestamp"""
+    timestamps: array  # array of signed 64 bit ints
+    prices: list[str]
+
+    def nearest(self, timestamp: Timestamp, max_seconds_distance: int) -> Optional[str]:
+        """Returns the price closest to the timestamp within the given distance.
+
+        Same as GlobalDBHandler.get_historical_price if two prices are equally
+        close the one before the timestamp is returned.
+        """
+        idx = bisect_right(self.timestamps, timestamp)
+        before_distance = timestamp - self.timestamps[idx - 1] if idx != 0 else None
+        after_distance = self.timestamps[idx] - timestamp if idx != len(self.timestamps) else None  # noqa: E501
+        if before_distance is not None and before_distance <= max_seconds_distance and (after_distance is None or before_distance <= after_distance):  # noqa: E501
+            return self.prices[idx - 1]
+        if after_distance is not None and after_distance <= max_seconds_distance:
+            return self.prices[idx]
+
+        return None
+
+
+class PairPrices(NamedTuple):
+    series: dict[HistoricalPriceOracle, PriceSeries]
+    # prices that were not in the DB when the pair was loaded and came from
+    # querying the oracles for the exact timestamp
+    extra_prices: dict[Timestamp, Price]
+    # timestamps for which querying the oracles found no price
+    missing: set[Timestamp]
+    size: int
+
+    def total_size(self) -> int:
+        return self.size + (len(self.extra_prices) + len(self.missing)) * EXTRA_PRICE_ENTRY_SIZE
+
+
+class PriceSeriesCache():
+    """Caches the saved historical prices of each pair queried while generating a report
+
+    Each needed pair is loaded once from the global DB price_history table into sorted
+    arrays per source and lookups are answered with a binary search following the
+    order of the historical price oracles. When the total size of the loaded pairs
+    exceeds max_bytes the least recently used pairs are evicted.
+
+    Should only live as long as a single report is being generated, since prices
+    edited in the global DB in the meantime are not seen.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_PRICE_SERIES_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.pairs: OrderedDict[tuple[str, str], PairPrices] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _load_pair(self, from_asset: 'Asset', to_asset: 'Asset') -> PairPrices:
+        series: dict[HistoricalPriceOracle, PriceSeries] = {}
+        size = 0
+        current_source: Optional[str] = None
+        timestamps = array('q')
+        prices: list[str] = []
+        for source_type, timestamp, price in GlobalDBHandler().get_historical_price_series(
+            from_asset=from_asset,
+            to_asset=to_asset,
+        ):
+            if source_type != current_source:
+                current_source, timestamps, prices = source_type, array('q'), []
+                try:
+                    source = HistoricalPriceOracle.deserialize_from_db(source_type)
+                except DeserializationError as e:
+                    log.error(f'Skipping prices of {from_asset}->{to_asset} in the cache: {str(e)}')  # noqa: E501
+                    continue
+                series[source] = PriceSeries(timestamps=timestamps, prices=prices)
+
+            timestamps.append(timestamp)
+            prices.append(price)
+            size += sys.getsizeof(price)
+
+        for entry in series.values():
+            size += sys.getsizeof(entry.timestamps) + sys.getsizeof(entry.prices)
+
+        return PairPrices(series=series, extra_prices={}, missing=set(), size=size)
+
+    def _get_pair(self, from_asset: 'Asset', to_asset: 'Asset') -> PairPrices:
+        key = (from_asset.identifier, to_asset.identifier)
+        pair_prices = self.pairs.get(key)
+        if pair_prices is not None:
+            self.pairs.move_to_end(key)
+            return pair_prices
+
+        pair_prices = self._load_pair(from_asset=from_asset, to_asset=to_asset)
+        self.pairs[key] = pair_prices
+        self.size += pair_prices.size
+        while self.size > self.max_bytes and len(self.pairs) > 1:
+            evicted_key, evicted = self.pairs.popitem(last=False)
+            self.size -= evicted.total_size()
+            log.debug(f'Evicted prices of {evicted_key} from the price series cache')
+
+        return pair_prices
+
+    def get_price(
+            self,
+            from_asset: 'Asset',
+            to_asset: 'Asset',
+            timestamp: Timestamp,
+            oracles: list[HistoricalPriceOracle],
+    ) -> Optional[Price]:
+        """Finds the price the first oracle that has one saved in the DB would return
+
+        Returns None if an oracle would have to query its remote service before any
+        saved price is found, so that the caller can fall back to querying the oracles.
+
+        May raise:
+        - NoPriceForGivenTimestamp if querying the oracles already found no price
+        for this timestamp
+        """
+        pair_prices = self._get_pair(from_asset=from_asset, to_asset=to_asset)
+        if timestamp in pair_prices.missing:
+            self.hits += 1
+            raise NoPriceForGivenTimestamp(
+                from_asset=from_asset,
+                to_asset=to_asset,
+                time=timestamp,
+            )
+
+        extra_price = pair_prices.extra_prices.get(timestamp)
+        if extra_price is not None:
+            self.hits += 1
+            return extra_price
+
+        for oracle in oracles:
+            max_seconds_distance = ORACLE_MAX_SECONDS_DISTANCE.get(oracle)
+            if max_seconds_distance is None:
+                break
+
+            price = None
+            if (series := pair_prices.series.get(oracle)) is not None:
+                price = series.nearest(timestamp, max_seconds_distance)
+            # a zero cryptocompare price is not used, same as in Cryptocompare
+            if price is not None and (oracle != HistoricalPriceOracle.CRYPTOCOMPARE or FVal(price) != ZERO):  # noqa: E501
+                self.hits += 1
+                return Price(FVal(price))
+            if oracle != HistoricalPriceOracle.MANUAL:
+                break  # the oracle would query its remote service
+
+        self.misses += 1
+        return None
+
+    def add_price(
+            self,
+            from_asset: 'Asset',
+            to_asset: 'Asset',
+            timestamp: Timestamp,
+            price: Price,
+    ) -> None:
+        """Remembers a price that was found by querying the oracles after a miss"""
+        pair_prices = self.pairs.get((from_asset.identifier, to_asset.identifier))
+        if pair_prices is not None and timestamp not in pair_prices.extra_prices:
+            pair_prices.extra_prices[timestamp] = price
+            self.size += EXTRA_PRICE_ENTRY_SIZE
+
+    def add_missing(self, from_asset: 'Asset', to_asset: 'Asset', timestamp: Timestamp) -> None:
+        """Remembers that querying the oracles found no price for the timestamp"""
+        pair_prices = self._get_pair(from_asset=from_asset, to_asset=to_asset)
+        if timestamp not in pair_prices.missing:
+            pair_prices.missing.add(timestamp)
+            self.size += EXTRA_PRICE_ENTRY_SIZE
+
+    def invalidate(self, from_asset: 'Asset', to_asset: 'Asset') -> None:
+        """Drops the prices of a pair so that they are loaded again from the DB"""
+        pair_prices = self.pairs.pop((from_asset.identifier, to_asset.identifier), None)
+        if pair_prices is not None:
+            self.size -= pair_prices.total_size()
+
+    def clear(self) -> None:
+        self.pairs.clear()
+        self.size = 0
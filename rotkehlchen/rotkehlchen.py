@@ -11,6 +11,7 @@ from types import MethodType
 from typing import TYPE_CHECKING, Any, DefaultDict, Literal, Optional, Union, cast, overload
 
 import gevent
+from gevent.pool import Pool
 
 from rotkehlchen.accounting.accountant import Accountant
 from rotkehlchen.accounting.structures.balance import Balance, BalanceType
@@ -50,7 +51,7 @@ from rotkehlchen.db.settings import DBSettings, ModifiableDBSettings
 from rotkehlchen.errors.api import PremiumAuthenticationError
 from rotkehlchen.errors.asset import UnknownAsset
 from rotkehlchen.errors.misc import EthSyncError, InputError, RemoteError, SystemPermissionError
-from rotkehlchen.exchanges.manager import ExchangeManager
+from rotkehlchen.exchanges.manager import EXCHANGES_QUERY_CONCURRENCY, ExchangeManager
 from rotkehlchen.externalapis.beaconchain import BeaconChain
 from rotkehlchen.externalapis.coingecko import Coingecko
 from rotkehlchen.externalapis.covalent import Covalent, chains_id
@@ -406,6 +407,7 @@ class Rotkehlchen():
             msg_aggregator=self.msg_aggregator,
             evm_accounting_aggregators=evm_accounting_aggregators,
             premium=self.premium,
+            cost_basis_processes=self.args.accounting_processes,
         )
         self.events_historian = EventsHistorian(
             user_directory=self.user_directory,
@@ -820,8 +822,25 @@ class Rotkehlchen():
 
         balances: dict[str, dict[Asset, Balance]] = {}
         problem_free = True
-        for exchange in self.exchange_manager.iterate_exchanges():
-            exchange_balances, error_msg = exchange.query_balances(ignore_cache=ignore_cache)
+        with self.data.db.conn.read_ctx() as cursor:
+            allowed_to_save = requested_save_data or self.data.db.should_save_balances(cursor)
+        # the saved balances of an exchange can be from before a restart so they are not
+        # used for a snapshot. Balances queried since the start are.
+        ignore_persisted_cache = allowed_to_save
+        # query the exchanges at the same time and combine their results in order
+        exchanges = list(self.exchange_manager.iterate_exchanges())
+        pool = Pool(size=EXCHANGES_QUERY_CONCURRENCY)
+        try:
+            exchanges_results = list(pool.imap(
+                lambda exchange: exchange.query_balances(
+                    ignore_cache=ignore_cache,
+                    ignore_persisted_cache=ignore_persisted_cache,
+                ),
+                exchanges,
+            ))
+        finally:  # don't leave queries running if this greenlet gets killed
+            pool.kill()
+        for exchange, (exchange_balances, error_msg) in zip(exchanges, exchanges_results):
             # If we got an error, disregard that exchange but make sure we don't save data
             if not isinstance(exchange_balances, dict):
                 problem_free = False
@@ -957,25 +976,23 @@ class Rotkehlchen():
             'location': location_stats,
             'net_usd': net_usd,
         }
-        with self.data.db.conn.read_ctx() as cursor:
-            allowed_to_save = requested_save_data or self.data.db.should_save_balances(cursor)
-            if (problem_free or save_despite_errors) and allowed_to_save:
-                if not timestamp:
-                    timestamp = Timestamp(int(time.time()))
-                with self.data.db.user_write() as write_cursor:
-                    self.data.db.save_balances_data(
-                        write_cursor=write_cursor,
-                        data=result_dict,
-                        timestamp=timestamp,
-                    )
-                log.debug('query_balances data saved')
-            else:
-                log.debug(
-                    'query_balances data not saved',
-                    allowed_to_save=allowed_to_save,
-                    problem_free=problem_free,
-                    save_despite_errors=save_despite_errors,
+        if (problem_free or save_despite_errors) and allowed_to_save:
+            if not timestamp:
+                timestamp = Timestamp(int(time.time()))
+            with self.data.db.user_write() as write_cursor:
+                self.data.db.save_balances_data(
+                    write_cursor=write_cursor,
+                    data=result_dict,
+                    timestamp=timestamp,
                 )
+            log.debug('query_balances data saved')
+        else:
+            log.debug(
+                'query_balances data not saved',
+                allowed_to_save=allowed_to_save,
+                problem_free=problem_free,
+                save_despite_errors=save_despite_errors,
+            )
 
         return result_dict
 
@@ -1051,9 +1068,11 @@ class Rotkehlchen():
         return is_success, msg
 
     def remove_exchange(self, name: str, location: Location) -> tuple[bool, str]:
-        if self.exchange_manager.get_exchange(name=name, location=location) is None:
+        exchange = self.exchange_manager.get_exchange(name=name, location=location)
+        if exchange is None:
             return False, f'{str(location)} exchange {name} is not registered'
 
+        exchange.clear_cache()  # also deletes its saved balances and any being queried
         self.exchange_manager.delete_exchange(name=name, location=location)
         # Success, remove it also from the DB
         with self.data.db.user_write() as write_cursor:
@@ -1,4 +1,5 @@
 import random
+import time
 from contextlib import ExitStack
 from http import HTTPStatus
 from typing import Any
@@ -9,7 +10,7 @@ import pytest
 import requests
 from flaky import flaky
 
-from rotkehlchen.accounting.structures.balance import BalanceType
+from rotkehlchen.accounting.structures.balance import Balance, BalanceType
 from rotkehlchen.balances.manual import ManuallyTrackedBalance
 from rotkehlchen.chain.bitcoin import get_bitcoin_addresses_balances
 from rotkehlchen.constants.assets import A_BTC, A_DAI, A_ETH, A_EUR
@@ -528,6 +529,35 @@ def test_balance_snapshot_error_message(
     assert websocket_connection.messages_num() == 0
 
 
+@pytest.mark.parametrize('number_of_eth_accounts', [0])
+@pytest.mark.parametrize('btc_accounts', [[]])
+@pytest.mark.parametrize('added_exchanges', [(Location.BINANCE, Location.POLONIEX)])
+def test_exchange_balances_queried_concurrently(rotkehlchen_api_server_with_exchanges):
+    """Test that the balances of all exchanges are queried at the same time and that
+    the failure of one of them still returns the balances of the rest"""
+    rotki = rotkehlchen_api_server_with_exchanges.rest_api.rotkehlchen
+    binance = try_get_first_exchange(rotki.exchange_manager, Location.BINANCE)
+    poloniex = try_get_first_exchange(rotki.exchange_manager, Location.POLONIEX)
+
+    def mock_binance_balances(**kwargs):  # pylint: disable=unused-argument
+        gevent.sleep(1)
+        return {A_BTC: Balance(amount=FVal(1), usd_value=FVal(1))}, ''
+
+    def mock_poloniex_balances(**kwargs):  # pylint: disable=unused-argument
+        gevent.sleep(1)
+        return None, 'Made a booboo'
+
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(binance, 'query_balances', side_effect=mock_binance_balances))  # noqa: E501
+        stack.enter_context(patch.object(poloniex, 'query_balances', side_effect=mock_poloniex_balances))  # noqa: E501
+        start = time.monotonic()
+        result = rotki.query_balances(requested_save_data=False)
+
+    assert time.monotonic() - start < 1.8
+    assert result['location'].keys() == {'binance'}
+    assert result['assets'][A_BTC]['amount'] == FVal(1)
+
+
 @pytest.mark.parametrize('number_of_eth_accounts', [2])
 @pytest.mark.parametrize('btc_accounts', [[UNIT_BTC_ADDRESS1, UNIT_BTC_ADDRESS2]])
 @pytest.mark.parametrize('separate_blockchain_calls', [True, False])
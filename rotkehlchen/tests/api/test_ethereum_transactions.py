@@ -179,17 +179,23 @@ def assert_force_redecode_txns_works(api_server: 'APIServer', hashes: Optional[l
         'get_evm_transactions',
         wraps=rotki.chains_aggregator.ethereum.transactions_decoder.dbevmtx.get_evm_transactions,  # noqa: E501
     )
-    get_or_decode_txn_events_patch = patch.object(
+    decode_txn_patch = patch.object(
         rotki.chains_aggregator.ethereum.transactions_decoder,
-        'get_or_decode_transaction_events',
-        wraps=rotki.chains_aggregator.ethereum.transactions_decoder.get_or_decode_transaction_events,  # noqa: E501
+        '_decode_transaction',
+        wraps=rotki.chains_aggregator.ethereum.transactions_decoder._decode_transaction,
     )
     get_or_query_txn_receipt_patch = patch('rotkehlchen.chain.ethereum.transactions.EthereumTransactions.get_or_query_transaction_receipt')  # noqa: 501
+    with rotki.data.db.conn.read_ctx() as cursor:  # receipts in the DB are read in bulk
+        missing_receipts = cursor.execute(
+            'SELECT COUNT(*) FROM evm_transactions AS A LEFT JOIN evmtx_receipts AS B '
+            'ON A.tx_hash=B.tx_hash AND A.chain_id=B.chain_id WHERE B.tx_hash IS NULL' +
+            ('' if hashes is None else f' AND A.tx_hash IN ({",".join("?" * len(hashes))})'),
+            [] if hashes is None else [hexstring_to_bytes(x) for x in hashes],
+        ).fetchone()[0]
     with ExitStack() as stack:
-        function_call_counters = []
-        function_call_counters.append(stack.enter_context(get_or_decode_txn_events_patch))
-        function_call_counters.append(stack.enter_context(get_eth_txns_patch))
-        function_call_counters.append(stack.enter_context(get_or_query_txn_receipt_patch))
+        decode_txn_mock = stack.enter_context(decode_txn_patch)
+        get_eth_txns_mock = stack.enter_context(get_eth_txns_patch)
+        get_or_query_txn_receipt_mock = stack.enter_context(get_or_query_txn_receipt_patch)
 
         response = requests.put(
             api_url_for(
@@ -205,13 +211,9 @@ def assert_force_redecode_txns_works(api_server: 'APIServer', hashes: Optional[l
             },
         )
         assert_proper_response(response)
-        if hashes is None:
-            for fn in function_call_counters:
-                assert fn.call_count == 14
-        else:
-            txn_hashes_len = len(hashes)
-            for fn in function_call_counters:
-                assert fn.call_count == txn_hashes_len
+        assert decode_txn_mock.call_count == (14 if hashes is None else len(hashes))
+        assert get_eth_txns_mock.call_count == 1  # all transactions are read at once
+        assert get_or_query_txn_receipt_mock.call_count == missing_receipts
 
 
 def _write_transactions_to_db(
@@ -1204,7 +1206,7 @@ def test_query_transactions_check_decoded_events(
     with rotki.data.db.conn.read_ctx() as cursor:
         for name, count in (
                 ('evm_transactions', 4), ('evm_internal_transactions', 0),
-                ('evmtx_receipts', 4), ('evmtx_receipt_log_topics', 6),
+                ('evmtx_receipts', 4), ('evmtx_receipt_log_index', 2),
                 ('evmtx_address_mappings', 4), ('evm_tx_mappings', 4),
                 ('history_events_mappings', 9),
         ):
@@ -1219,7 +1221,7 @@ def test_query_transactions_check_decoded_events(
     with rotki.data.db.conn.read_ctx() as cursor:
         for name, count in (
                 ('evm_transactions', 2), ('evm_internal_transactions', 0),
-                ('evmtx_receipts', 2), ('evmtx_receipt_log_topics', 6),
+                ('evmtx_receipts', 2), ('evmtx_receipt_log_index', 2),
                 ('evmtx_address_mappings', 2), ('evm_tx_mappings', 0),
                 ('history_events_mappings', 4),
         ):
@@ -1248,7 +1250,7 @@ def test_query_transactions_check_decoded_events(
     with rotki.data.db.conn.read_ctx() as cursor:
         for name in (
                 'evm_transactions', 'evm_internal_transactions',
-                'evmtx_receipts', 'evmtx_receipt_log_topics',
+                'evmtx_receipts', 'evmtx_receipt_log_index',
                 'evmtx_address_mappings', 'evm_tx_mappings',
                 'history_events_mappings',
         ):
@@ -527,6 +527,38 @@ def test_exchange_query_balances(rotkehlchen_api_server_with_exchanges):
     assert_poloniex_balances_result(result['poloniex'])
 
 
+@pytest.mark.parametrize('number_of_eth_accounts', [0])
+@pytest.mark.parametrize('added_exchanges', [(Location.BINANCE, Location.POLONIEX)])
+def test_exchanges_stats(rotkehlchen_api_server_with_exchanges):
+    """Test that the statistics of the requests made to each exchange are returned"""
+    rotki = rotkehlchen_api_server_with_exchanges.rest_api.rotkehlchen
+    server = rotkehlchen_api_server_with_exchanges
+    binance = try_get_first_exchange(rotki.exchange_manager, Location.BINANCE)
+    with patch_binance_balances_query(binance):
+        response = requests.get(api_url_for(
+            server,
+            'named_exchanges_balances_resource',
+            location='binance',
+        ))
+        assert_proper_response_with_result(response)
+
+    response = requests.get(api_url_for(server, 'exchangesstatsresource'))
+    result = {x['location']: x for x in assert_proper_response_with_result(response)}
+    assert result['binance']['name'] == binance.name
+    assert result['binance']['rate'] == binance.request_scheduler.bucket.rate
+    assert result['binance']['requests'] >= 1
+    assert result['poloniex'] == {
+        'location': 'poloniex',
+        'name': 'poloniex',
+        'rate': None,
+        'capacity': None,
+        'requests': 0,
+        'delayed_requests': 0,
+        'waited_seconds': 0.0,
+        'max_waited_seconds': 0.0,
+    }
+
+
 @pytest.mark.parametrize('number_of_eth_accounts', [0])
 @pytest.mark.parametrize('added_exchanges', [(Location.BINANCE, Location.POLONIEX)])
 def test_exchange_query_balances_ignore_cache(rotkehlchen_api_server_with_exchanges):
@@ -370,6 +370,43 @@ def test_manage_ethereum_nodes(rotkehlchen_api_server):
         assert_proper_response(response)
 
 
+def test_query_nodes_stats(rotkehlchen_api_server):
+    """Test that the stats of the queries to the evm nodes can be queried"""
+    rotki = rotkehlchen_api_server.rest_api.rotkehlchen
+    node_inquirer = rotki.chains_aggregator.ethereum.node_inquirer
+    node_inquirer.node_stats.clear()
+    stats = node_inquirer.node_stats[node_inquirer.etherscan_node.node_info]
+    stats.record(latency=0.5, success=True)
+    stats.record(latency=1.5, success=False)
+
+    response = requests.get(
+        api_url_for(rotkehlchen_api_server, 'rpcnodesstatsresource', blockchain='ETH'),
+    )
+    result = assert_proper_response_with_result(response)
+    assert result == [{
+        'name': ETHEREUM_ETHERSCAN_NODE_NAME,
+        'endpoint': '',
+        'owned': False,
+        'blockchain': 'ETH',
+        'queries': 2,
+        'errors': 1,
+        'hedged': 0,
+        'latency': 0.5,
+        'p95_latency': None,
+        'error_rate': 0.2,
+        'score': 0.8 / 1.5,
+    }]
+
+    response = requests.get(
+        api_url_for(rotkehlchen_api_server, 'rpcnodesstatsresource', blockchain='KSM'),
+    )
+    assert_error_response(
+        response=response,
+        contained_in_msg='is not allowed in this endpoint',
+        status_code=HTTPStatus.BAD_REQUEST,
+    )
+
+
 @pytest.mark.parametrize('max_size_in_mb_all_logs', [659])
 def test_configuration(rotkehlchen_api_server):
     """Test that the configuration endpoint returns the expected information"""
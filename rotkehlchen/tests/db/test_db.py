@@ -16,6 +16,7 @@ from rotkehlchen.constants import ONE, YEAR_IN_SECONDS
 from rotkehlchen.constants.assets import A_1INCH, A_BTC, A_DAI, A_ETH, A_ETH2, A_USD
 from rotkehlchen.constants.misc import ZERO
 from rotkehlchen.data_handler import DataHandler
+from rotkehlchen.db.cached_results import DBCachedResults
 from rotkehlchen.db.dbhandler import DBHandler
 from rotkehlchen.db.filtering import AssetMovementsFilterQuery, TradesFilterQuery
 from rotkehlchen.db.misc import detect_sqlcipher_version
@@ -94,6 +95,7 @@ TABLES_AT_INIT = [
     'external_service_credentials',
     'user_credentials',
     'user_credentials_mappings',
+    'binance_trade_cursors',
     'blockchain_accounts',
     'evm_accounts_details',
     'multisettings',
@@ -101,8 +103,7 @@ TABLES_AT_INIT = [
     'evm_transactions',
     'evm_internal_transactions',
     'evmtx_receipts',
-    'evmtx_receipt_logs',
-    'evmtx_receipt_log_topics',
+    'evmtx_receipt_log_index',
     'evmtx_address_mappings',
     'evm_tx_mappings',
     'manually_tracked_balances',
@@ -1499,6 +1500,55 @@ def test_binance_pairs(user_data_dir, sql_vm_instructions_cb):
     assert query == []
 
 
+def test_binance_trade_cursors_follow_exchange(user_data_dir, sql_vm_instructions_cb):
+    """Test that the trade cursors of the markets of a binance exchange are renamed and
+    deleted together with the exchange"""
+    msg_aggregator = MessagesAggregator()
+    db = DBHandler(user_data_dir, '123', msg_aggregator, None, sql_vm_instructions_cb)
+    db.add_exchange('binance', Location.BINANCE, ApiKey('key1'), ApiSecret(b'secret1'))
+    db.add_exchange('binance2', Location.BINANCE, ApiKey('key2'), ApiSecret(b'secret2'))
+    with db.user_write() as write_cursor:
+        write_cursor.executemany(
+            'INSERT INTO binance_trade_cursors(exchange_name, location, market, '
+            'next_trade_id, last_trade_ts) VALUES (?, ?, ?, ?, ?)',
+            [
+                ('binance', 'E', 'ETHBTC', 5, 1499865549),
+                ('binance', 'E', 'BNBBTC', 28458, 1499865549),
+                ('binance2', 'E', 'ETHBTC', 7, 1499865550),
+            ],
+        )
+        db.edit_exchange(
+            write_cursor,
+            name='binance',
+            location=Location.BINANCE,
+            new_name='renamed',
+            api_key=None,
+            api_secret=None,
+            passphrase=None,
+            kraken_account_type=None,
+            binance_selected_trade_pairs=None,
+            ftx_subaccount=None,
+        )
+
+    def get_cursors():
+        with db.conn.read_ctx() as cursor:
+            return set(cursor.execute(
+                'SELECT exchange_name, market, next_trade_id FROM binance_trade_cursors',
+            ))
+
+    assert get_cursors() == {
+        ('renamed', 'ETHBTC', 5),
+        ('renamed', 'BNBBTC', 28458),
+        ('binance2', 'ETHBTC', 7),
+    }
+    with db.user_write() as write_cursor:
+        db.remove_exchange(write_cursor, 'renamed', Location.BINANCE)
+    assert get_cursors() == {('binance2', 'ETHBTC', 7)}
+    with db.user_write() as write_cursor:
+        db.purge_exchange_data(write_cursor, Location.BINANCE)
+    assert get_cursors() == set()
+
+
 def test_fresh_db_adds_version(user_data_dir, sql_vm_instructions_cb):
     """Test that the DB version gets committed to a fresh DB.
 
@@ -1533,3 +1583,59 @@ def test_db_schema_sanity_check(database):
         cursor.execute('DROP TABLE user_notes;')
         connection.schema_sanity_check()
     assert 'Tables {\'user_notes\'} are missing' in str(exception_info.value)
+
+
+def test_cached_results(database):
+    """Test that the cached results are saved per namespace and that the oldest are
+    deleted when they don't fit in the size limit"""
+    store = DBCachedResults(database=database, namespace='binance_binance1')
+    other_store = DBCachedResults(database=database, namespace='kraken_kraken1')
+    assert store.get('query_balances') is None
+    store.set('query_balances', Timestamp(1), {'BTC': {'amount': '1', 'usd_value': '2'}})
+    other_store.set('query_balances', Timestamp(2), {'ETH': {'amount': '3', 'usd_value': '4'}})
+    assert store.get('query_balances') == (1, {'BTC': {'amount': '1', 'usd_value': '2'}})
+    assert other_store.get('query_balances') == (2, {'ETH': {'amount': '3', 'usd_value': '4'}})
+
+    with patch('rotkehlchen.db.cached_results.CACHED_RESULTS_MAX_BYTES', new=100):
+        store.set('query_trades', Timestamp(3), ['a' * 40])
+    assert store.get('query_balances') is None  # the oldest is deleted
+    assert other_store.get('query_balances') is not None
+    assert store.get('query_trades') == (3, ['a' * 40])
+
+    store.clear()
+    assert store.get('query_trades') is None
+    assert other_store.get('query_balances') is not None
+    other_store.delete('query_balances')
+    assert other_store.get('query_balances') is None
+
+
+def test_ignored_entries_version_changes_after_commit(database):
+    """Test that the version of the ignored entries only changes once an edit of them
+    is committed, and not for edits that fail or are rolled back"""
+    version = database.ignored_entries_version
+    with database.user_write() as write_cursor:
+        database.add_to_ignored_assets(write_cursor=write_cursor, asset=A_DAI)
+        assert database.ignored_entries_version == version
+    assert database.ignored_entries_version == version + 1
+
+    with pytest.raises(InputError), database.user_write() as write_cursor:
+        database.remove_from_ignored_action_ids(
+            write_cursor=write_cursor,
+            action_type=ActionType.TRADE,
+            identifiers=['nonexisting'],
+        )
+    assert database.ignored_entries_version == version + 1
+
+    with pytest.raises(ValueError), database.user_write() as write_cursor:
+        database.remove_from_ignored_assets(write_cursor=write_cursor, asset=A_DAI)
+        raise ValueError('rolls back the write')
+    assert database.ignored_entries_version == version + 1
+
+    with database.conn.savepoint_ctx() as savepoint_cursor:
+        database.add_to_ignored_action_ids(
+            write_cursor=savepoint_cursor,
+            action_type=ActionType.TRADE,
+            identifiers=['foo'],
+        )
+        assert database.ignored_entries_version == version + 1
+    assert database.ignored_entries_version == version + 2
@@ -1,5 +1,6 @@
 import json
 import shutil
+from collections import defaultdict
 from contextlib import ExitStack, contextmanager
 from pathlib import Path
 from unittest.mock import patch
@@ -8,10 +9,12 @@ import pytest
 from pysqlcipher3 import dbapi2 as sqlcipher
 
 from rotkehlchen.accounting.structures.base import HistoryBaseEntry
+from rotkehlchen.chain.evm.structures import EvmTxReceiptLog
 from rotkehlchen.constants.misc import DEFAULT_SQL_VM_INSTRUCTIONS_CB
 from rotkehlchen.data_handler import DataHandler
 from rotkehlchen.db.dbhandler import DBHandler
 from rotkehlchen.db.drivers.gevent import DBConnection, DBConnectionType
+from rotkehlchen.db.evmtx import DBEvmTx
 from rotkehlchen.db.schema import DB_SCRIPT_CREATE_TABLES
 from rotkehlchen.db.settings import ROTKEHLCHEN_DB_VERSION
 from rotkehlchen.db.upgrade_manager import (
@@ -27,7 +30,7 @@ from rotkehlchen.tests.utils.database import (
     mock_dbhandler_add_globaldb_assetids,
     mock_dbhandler_update_owned_assets,
 )
-from rotkehlchen.types import make_evm_tx_hash
+from rotkehlchen.types import ChainID, make_evm_tx_hash
 from rotkehlchen.user_messages import MessagesAggregator
 from rotkehlchen.utils.hexbytes import HexBytes
 from rotkehlchen.utils.misc import ts_now
@@ -1297,6 +1300,81 @@ def test_upgrade_db_35_to_36(user_data_dir):  # pylint: disable=unused-argument
     ]
 
 
+def test_upgrade_db_36_to_37(user_data_dir):  # pylint: disable=unused-argument
+    """Test upgrading the DB from version 36 to version 37
+
+    The transactions DB is upgraded to version 36 first since it has many receipts.
+    A receipt whose logs can't be packed is dropped so that it's queried again.
+    """
+    msg_aggregator = MessagesAggregator()
+    _use_prepared_db(user_data_dir, 'ethtxs.db')
+    db_v36 = _init_db_with_target_version(
+        target_version=36,
+        user_data_dir=user_data_dir,
+        msg_aggregator=msg_aggregator,
+    )
+    cursor = db_v36.conn.cursor()
+    receipts = cursor.execute('SELECT tx_hash, chain_id, contract_address, status, type FROM evmtx_receipts ORDER BY tx_hash, chain_id').fetchall()  # noqa: E501
+    assert len(receipts) == 250
+    logs = cursor.execute(
+        'SELECT tx_hash, chain_id, log_index, data, address, removed FROM evmtx_receipt_logs '
+        'ORDER BY tx_hash, chain_id, log_index',
+    ).fetchall()
+    assert len(logs) == 2990
+    topics: dict[tuple[bytes, int, int], list[bytes]] = defaultdict(list)
+    cursor.execute(
+        'SELECT tx_hash, chain_id, log_index, topic FROM evmtx_receipt_log_topics '
+        'ORDER BY tx_hash, chain_id, log_index, topic_index',
+    )
+    for entry in cursor:
+        topics[(entry[0], entry[1], entry[2])].append(entry[3])
+    assert sum(len(x) for x in topics.values()) == 8310
+    bad_log = next(entry for entry in logs if len(topics[entry[:3]]) != 0)
+    with db_v36.user_write() as write_cursor:
+        write_cursor.execute(
+            'UPDATE evmtx_receipt_log_topics SET topic=? WHERE tx_hash=? AND chain_id=? AND '
+            'log_index=? AND topic=?',
+            (b'\x00' * 31, *bad_log[:3], topics[bad_log[:3]][0]),
+        )
+    receipts = [x for x in receipts if x[:2] != bad_log[:2]]
+    logs = [x for x in logs if x[:2] != bad_log[:2]]
+    db_v36.logout()
+
+    # Execute upgrade
+    db = _init_db_with_target_version(
+        target_version=37,
+        user_data_dir=user_data_dir,
+        msg_aggregator=msg_aggregator,
+    )
+    cursor = db.conn.cursor()
+    assert table_exists(cursor, 'evmtx_receipt_logs') is False
+    assert table_exists(cursor, 'evmtx_receipt_log_topics') is False
+    assert cursor.execute('SELECT tx_hash, chain_id, contract_address, status, type FROM evmtx_receipts ORDER BY tx_hash, chain_id').fetchall() == receipts  # noqa: E501
+    expected_logs: dict[bytes, list[EvmTxReceiptLog]] = defaultdict(list)
+    for entry in logs:
+        expected_logs[entry[0]].append(EvmTxReceiptLog(
+            log_index=entry[2],
+            data=entry[3],
+            address=entry[4],
+            removed=bool(entry[5]),
+            topics=topics[(entry[0], entry[1], entry[2])],
+        ))
+    new_receipts = DBEvmTx(db).get_receipts(
+        cursor=cursor,
+        tx_hashes=[make_evm_tx_hash(entry[0]) for entry in receipts],
+        chain_id=ChainID.ETHEREUM,
+    )
+    assert len(new_receipts) == 249
+    for tx_hash, receipt in new_receipts.items():
+        assert receipt.logs == expected_logs[tx_hash]
+
+    # the address and first topic pairs of the logs of each receipt are in the index table
+    assert set(cursor.execute('SELECT tx_hash, chain_id, address, topic0 FROM evmtx_receipt_log_index')) == {  # noqa: E501
+        (*entry[:2], entry[4], topics[entry[:3]][0])
+        for entry in logs if len(topics[entry[:3]]) != 0
+    }
+
+
 def test_latest_upgrade_adds_remove_tables(user_data_dir):
     """
     This is a test that we can only do for the last upgrade.
@@ -1307,10 +1385,10 @@ def test_latest_upgrade_adds_remove_tables(user_data_dir):
     this is just to reminds us not to forget to add create table statements.
     """
     msg_aggregator = MessagesAggregator()
-    base_database = 'v35_rotkehlchen.db'
+    base_database = 'v34_rotkehlchen.db'
     _use_prepared_db(user_data_dir, base_database)
     last_db = _init_db_with_target_version(
-        target_version=35,
+        target_version=36,
         user_data_dir=user_data_dir,
         msg_aggregator=msg_aggregator,
     )
@@ -1324,7 +1402,7 @@ def test_latest_upgrade_adds_remove_tables(user_data_dir):
 
     # Execute upgrade
     db = _init_db_with_target_version(
-        target_version=36,
+        target_version=37,
         user_data_dir=user_data_dir,
         msg_aggregator=msg_aggregator,
     )
@@ -1341,15 +1419,8 @@ def test_latest_upgrade_adds_remove_tables(user_data_dir):
     views_after_creation = {x[0] for x in result}
 
     removed_tables = {
-        'adex_events',
-        'ethtx_receipt_log_topics',
-        'ethereum_internal_transactions',
-        'ethtx_receipts',
-        'ethereum_transactions',
-        'web3_nodes',
-        'ethtx_address_mappings',
-        'ethtx_receipt_logs',
-        'accounts_details',
+        'evmtx_receipt_logs',
+        'evmtx_receipt_log_topics',
     }
     removed_views = set()
     missing_tables = tables_before - tables_after_upgrade
@@ -1359,16 +1430,7 @@ def test_latest_upgrade_adds_remove_tables(user_data_dir):
     assert tables_after_creation - tables_after_upgrade == set()
     assert views_after_creation - views_after_upgrade == set()
     new_tables = tables_after_upgrade - tables_before
-    assert new_tables == {
-        'evmtx_receipt_log_topics',
-        'evm_internal_transactions',
-        'evmtx_receipts',
-        'evm_transactions',
-        'rpc_nodes',
-        'evmtx_address_mappings',
-        'evmtx_receipt_logs',
-        'evm_accounts_details',
-    }
+    assert new_tables == {'evmtx_receipt_log_index', 'binance_trade_cursors'}
     new_views = views_after_upgrade - views_before
     assert new_views == set()
 
@@ -1,8 +1,19 @@
+from unittest.mock import patch
+
+import pytest
+
 from rotkehlchen.chain.accounts import BlockchainAccountData
+from rotkehlchen.chain.evm.structures import (
+    EvmTxReceipt,
+    EvmTxReceiptLog,
+    deserialize_receipt_logs,
+    serialize_receipt_logs,
+)
 from rotkehlchen.chain.evm.types import EvmAccount
 from rotkehlchen.data_handler import DataHandler
 from rotkehlchen.db.evmtx import DBEvmTx
 from rotkehlchen.db.filtering import EvmTransactionsFilterQuery
+from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.fval import FVal
 from rotkehlchen.tests.utils.constants import (
     ETH_ADDRESS1,
@@ -116,6 +127,19 @@ def test_add_get_evm_transactions(data_dir, username, sql_vm_instructions_cb):
         result = dbevmtx.get_evm_transactions(cursor, EvmTransactionsFilterQuery.make(tx_hash=b'dsadsad', chain_id=ChainID.ETHEREUM), has_premium=True)  # noqa: E501
         assert result == []
 
+        # try transaction query by many hashes, also split in queries for chunks of them
+        tx_hashes = [tx3.tx_hash, make_evm_tx_hash(b'dsadsad'), tx1.tx_hash, tx2_hash]
+        for tx_hashes_per_query in (2, 100):
+            with patch('rotkehlchen.db.evmtx.TX_HASHES_PER_QUERY', new=tx_hashes_per_query):
+                result = dbevmtx.get_evm_transactions(cursor, EvmTransactionsFilterQuery.make(tx_hashes=tx_hashes, chain_id=ChainID.ETHEREUM), has_premium=True)  # noqa: E501
+            assert sorted(result, key=lambda x: x.timestamp) == [tx1, tx2, tx3]
+        # the pagination applies to the transactions of all the chunks
+        with patch('rotkehlchen.db.evmtx.TX_HASHES_PER_QUERY', new=2):
+            result = dbevmtx.get_evm_transactions(cursor, EvmTransactionsFilterQuery.make(tx_hashes=tx_hashes, chain_id=ChainID.ETHEREUM, limit=2, offset=1), has_premium=True)  # noqa: E501
+        assert result == [tx1, tx2]
+        result = dbevmtx.get_evm_transactions(cursor, EvmTransactionsFilterQuery.make(tx_hashes=tx_hashes, chain_id=ChainID.OPTIMISM), has_premium=True)  # noqa: E501
+        assert result == []
+
         # Now try transaction by relevant addresses
         result = dbevmtx.get_evm_transactions(
             cursor=cursor,
@@ -314,3 +338,175 @@ def test_query_also_internal_evm_transactions(data_dir, username, sql_vm_instruc
             has_premium=True,
         )
         assert result == [tx1, tx3, tx4]
+
+
+def test_get_receipts(database):
+    """Test that receipts read in bulk, and in more than one chunk, have all of their
+    logs and topics in order and that only the ones of the given chain are returned"""
+    dbevmtx = DBEvmTx(database)
+    expected_receipts = []
+    with database.user_write() as write_cursor:
+        database.add_blockchain_accounts(
+            write_cursor=write_cursor,
+            account_data=[
+                BlockchainAccountData(chain=SupportedBlockchain.ETHEREUM, address=ETH_ADDRESS1),
+                BlockchainAccountData(chain=SupportedBlockchain.OPTIMISM, address=ETH_ADDRESS1),
+            ],
+        )
+        for idx in range(5):
+            tx_hash = make_evm_tx_hash(bytes([idx]) * 32)
+            for chain_id in (ChainID.ETHEREUM, ChainID.OPTIMISM):
+                dbevmtx.add_evm_transactions(
+                    write_cursor=write_cursor,
+                    evm_transactions=[EvmTransaction(
+                        tx_hash=tx_hash,
+                        chain_id=chain_id,
+                        timestamp=Timestamp(1451606400 + idx),
+                        block_number=idx,
+                        from_address=ETH_ADDRESS1,
+                        to_address=ETH_ADDRESS2,
+                        value=0,
+                        gas=FVal('5000000'),
+                        gas_price=FVal('2000000000'),
+                        gas_used=FVal('25000000'),
+                        input_data=MOCK_INPUT_DATA,
+                        nonce=idx,
+                    )],
+                    relevant_address=ETH_ADDRESS1,
+                )
+            if idx == 3:
+                continue  # a transaction without a receipt
+
+            # every receipt has one log less than the previous and the last has none
+            logs = [EvmTxReceiptLog(
+                log_index=log_index,
+                data=bytes([log_index]),
+                address=ETH_ADDRESS3,
+                removed=False,
+                topics=[bytes([idx, log_index, topic_index, 0]) * 8 for topic_index in range(log_index)],  # noqa: E501
+            ) for log_index in range(4 - idx)]
+            expected_receipts.append(EvmTxReceipt(
+                tx_hash=tx_hash,
+                chain_id=ChainID.ETHEREUM,
+                contract_address=None,
+                status=True,
+                type=0,
+                logs=logs,
+            ))
+            dbevmtx.add_receipt_data(
+                write_cursor=write_cursor,
+                chain_id=ChainID.ETHEREUM,
+                data={
+                    'transactionHash': '0x' + bytes(tx_hash).hex(),
+                    'contractAddress': None,
+                    'logs': [{  # given in reverse order to see that they are read in order
+                        'logIndex': log.log_index,
+                        'data': '0x' + log.data.hex(),
+                        'address': log.address,
+                        'removed': log.removed,
+                        'topics': ['0x' + topic.hex() for topic in log.topics],
+                    } for log in reversed(logs)],
+                },
+            )
+
+    tx_hashes = [make_evm_tx_hash(bytes([idx]) * 32) for idx in reversed(range(6))]
+    with database.conn.read_ctx() as cursor, patch('rotkehlchen.db.evmtx.SQL_VARIABLES_LIMIT', new=3):  # noqa: E501
+        receipts = dbevmtx.get_receipts(cursor=cursor, tx_hashes=tx_hashes, chain_id=ChainID.ETHEREUM)  # noqa: E501
+        assert dbevmtx.get_receipts(cursor=cursor, tx_hashes=tx_hashes, chain_id=ChainID.OPTIMISM) == {}  # noqa: E501
+        for expected_receipt in expected_receipts:
+            assert receipts[expected_receipt.tx_hash] == expected_receipt
+            assert dbevmtx.get_receipt(cursor, expected_receipt.tx_hash, ChainID.ETHEREUM) == expected_receipt  # noqa: E501
+        assert len(receipts) == len(expected_receipts)
+        assert dbevmtx.get_receipt(cursor, tx_hashes[2], ChainID.ETHEREUM) is None
+
+
+def test_add_receipts_data(database):
+    """Test that receipts added together are the same as added one by one and that
+    the ones already in the DB are ignored"""
+    dbevmtx = DBEvmTx(database)
+    tx_hashes = [make_evm_tx_hash(bytes([idx]) * 32) for idx in range(4)]
+    receipts_data = [{
+        'transactionHash': tx_hash.hex(),
+        'contractAddress': ETH_ADDRESS3 if idx == 0 else None,
+        'status': idx % 2,
+        'type': '0x2',
+        'logs': [{
+            'logIndex': log_index,
+            'data': '0x' + bytes([idx, log_index]).hex(),
+            'address': ETH_ADDRESS3,
+            'removed': False,
+            'topics': ['0x' + bytes([idx, log_index, x, 0]).hex() * 8 for x in range(log_index)],
+        } for log_index in range(idx)],
+    } for idx, tx_hash in enumerate(tx_hashes)]
+    with database.user_write() as write_cursor:
+        database.add_blockchain_accounts(
+            write_cursor=write_cursor,
+            account_data=[BlockchainAccountData(chain=SupportedBlockchain.ETHEREUM, address=ETH_ADDRESS1)],  # noqa: E501
+        )
+        dbevmtx.add_evm_transactions(
+            write_cursor=write_cursor,
+            evm_transactions=[EvmTransaction(
+                tx_hash=tx_hash,
+                chain_id=ChainID.ETHEREUM,
+                timestamp=Timestamp(1451606400 + idx),
+                block_number=idx,
+                from_address=ETH_ADDRESS1,
+                to_address=ETH_ADDRESS2,
+                value=0,
+                gas=FVal('5000000'),
+                gas_price=FVal('2000000000'),
+                gas_used=FVal('25000000'),
+                input_data=MOCK_INPUT_DATA,
+                nonce=idx,
+            ) for idx, tx_hash in enumerate(tx_hashes)],
+            relevant_address=ETH_ADDRESS1,
+        )
+        dbevmtx.add_receipt_data(write_cursor=write_cursor, chain_id=ChainID.ETHEREUM, data=receipts_data[1])  # noqa: E501
+        dbevmtx.add_receipts_data(write_cursor=write_cursor, chain_id=ChainID.ETHEREUM, receipts_data=receipts_data)  # noqa: E501
+
+    with database.conn.read_ctx() as cursor:
+        receipts = dbevmtx.get_receipts(cursor=cursor, tx_hashes=tx_hashes, chain_id=ChainID.ETHEREUM)  # noqa: E501
+
+    assert len(receipts) == 4
+    for idx, tx_hash in enumerate(tx_hashes):
+        receipt = receipts[tx_hash]
+        assert receipt.contract_address == (ETH_ADDRESS3 if idx == 0 else None)
+        assert receipt.status is bool(idx % 2)
+        assert receipt.type == 2
+        assert [x.log_index for x in receipt.logs] == list(range(idx))
+        assert [len(x.topics) for x in receipt.logs] == list(range(idx))
+
+    with database.user_write() as write_cursor:
+        write_cursor.execute('DELETE FROM evmtx_receipts')
+        for receipt_data in receipts_data:  # written one by one they are the same
+            dbevmtx.add_receipt_data(write_cursor=write_cursor, chain_id=ChainID.ETHEREUM, data=receipt_data)  # noqa: E501
+
+    with database.conn.read_ctx() as cursor:
+        assert dbevmtx.get_receipts(cursor=cursor, tx_hashes=tx_hashes, chain_id=ChainID.ETHEREUM) == receipts  # noqa: E501
+        # the logs can be found by address and first topic without reading the receipts.
+        # The only log of the second receipt has no topics so it is not indexed
+        assert set(dbevmtx.get_tx_hashes_with_logs(cursor, ChainID.ETHEREUM, ETH_ADDRESS3)) == set(tx_hashes[2:])  # noqa: E501
+        assert dbevmtx.get_tx_hashes_with_logs(cursor, ChainID.ETHEREUM, ETH_ADDRESS3, topic0=bytes([3, 1, 0, 0]) * 8) == [tx_hashes[3]]  # noqa: E501
+        assert dbevmtx.get_tx_hashes_with_logs(cursor, ChainID.ETHEREUM, ETH_ADDRESS2) == []
+        assert dbevmtx.get_tx_hashes_with_logs(cursor, ChainID.OPTIMISM, ETH_ADDRESS3) == []
+
+
+def test_receipt_logs_blob():
+    """Test that receipt logs are the same after being packed in a blob and unpacked"""
+    logs = [
+        EvmTxReceiptLog(log_index=0, data=b'', address=ETH_ADDRESS1, removed=False),
+        EvmTxReceiptLog(
+            log_index=2 ** 20,
+            data=bytes(range(256)) * 5,
+            address=ETH_ADDRESS2,
+            removed=True,
+            topics=[bytes([x]) * 32 for x in range(4)],
+        ),
+    ]
+    blob = serialize_receipt_logs(logs)
+    assert deserialize_receipt_logs(blob) == logs
+    assert deserialize_receipt_logs(b'') == []
+    with pytest.raises(DeserializationError):
+        deserialize_receipt_logs(blob[:-1])
+    with pytest.raises(DeserializationError):
+        serialize_receipt_logs([EvmTxReceiptLog(log_index=0, data=b'', address=ETH_ADDRESS1, removed=False, topics=[b'short'])])  # noqa: E501
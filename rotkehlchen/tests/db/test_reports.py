@@ -1,7 +1,14 @@
-from rotkehlchen.accounting.pnl import PnlTotals
+from rotkehlchen.accounting.mixins.event import AccountingEventType
+from rotkehlchen.accounting.pnl import PNL, PnlTotals
+from rotkehlchen.accounting.structures.processed_event import ProcessedAccountingEvent
+from rotkehlchen.constants import ONE, ZERO
+from rotkehlchen.constants.assets import A_ETH
+from rotkehlchen.db.filtering import ReportDataFilterQuery
 from rotkehlchen.db.reports import DBAccountingReports
 from rotkehlchen.db.settings import DBSettings
+from rotkehlchen.fval import FVal
 from rotkehlchen.tests.utils.constants import A_GBP
+from rotkehlchen.types import Location, Price, Timestamp
 
 
 def test_report_settings(database):
@@ -55,3 +62,55 @@ def test_report_settings(database):
         else:
             value = getattr(settings, setting_name)
         assert returned_settings[x] == value
+
+
+def test_report_data_writer_batches(database):
+    """Test that the buffered report data writer only hits the DB per batch and
+    that buffered events are written together with the report overview"""
+    dbreport = DBAccountingReports(database)
+    report_id = dbreport.add_report(
+        first_processed_timestamp=Timestamp(1),
+        start_ts=Timestamp(0),
+        end_ts=Timestamp(100),
+        settings=DBSettings(),
+    )
+    writer = dbreport.report_data_writer(report_id=report_id, batch_size=3)
+    filter_query = ReportDataFilterQuery.make(report_id=report_id)
+    for idx in range(7):
+        event = ProcessedAccountingEvent(
+            type=AccountingEventType.TRADE,
+            notes=f'event {idx}',
+            location=Location.KRAKEN,
+            timestamp=Timestamp(idx + 1),
+            asset=A_ETH,
+            taxable_amount=ONE,
+            free_amount=ZERO,
+            price=Price(FVal(idx)),
+            pnl=PNL(),
+            cost_basis=None,
+            index=idx,
+        )
+        writer.add(time=event.timestamp, ts_converter=str, event=event)
+        _, entries_num = dbreport.get_report_data(filter_=filter_query, with_limit=False)
+        assert entries_num == (idx + 1) // 3 * 3
+
+    assert len(writer.pending) == 1
+    dbreport.add_report_overview(
+        report_id=report_id,
+        last_processed_timestamp=Timestamp(7),
+        processed_actions=7,
+        total_actions=7,
+        pnls=PnlTotals(),
+        report_data=writer,
+    )
+    assert len(writer.pending) == 0
+    events, entries_num = dbreport.get_report_data(filter_=filter_query, with_limit=False)
+    assert entries_num == 7
+    assert sorted(x.notes for x in events) == [f'event {idx}' for idx in range(7)]
+
+    # events buffered for an aborted report never reach the DB
+    writer.add(time=Timestamp(8), ts_converter=str, event=events[0])
+    writer.discard()
+    writer.flush()
+    _, entries_num = dbreport.get_report_data(filter_=filter_query, with_limit=False)
+    assert entries_num == 7
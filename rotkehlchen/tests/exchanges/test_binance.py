@@ -900,3 +900,39 @@ def test_binance_query_trade_history_custom_markets(function_scope_binance):
         binance.query_trade_history(start_ts=0, end_ts=1564301134, only_cache=False)
 
     assert count == len(markets)
+
+
+def test_binance_query_trade_history_from_cursors(function_scope_binance):
+    """Test that the markets are queried from the trade after the last one seen in them
+    and from the start if the queried range begins before that trade"""
+    binance = function_scope_binance
+    binance.selected_pairs = ['ETHBTC', 'BNBBTC']
+    from_ids = {}
+    p = re.compile(r'symbol=([A-Z]*)&fromId=([0-9]*)')
+
+    def mock_my_trades(url, **kwargs):  # pylint: disable=unused-argument
+        text = '[]'
+        if 'myTrades' in url:
+            symbol, from_id = p.search(url).groups()
+            from_ids[symbol] = int(from_id)
+            if symbol == 'BNBBTC' and from_id == '0':
+                text = BINANCE_MYTRADES_RESPONSE
+        return MockResponse(200, text)
+
+    with patch.object(binance.session, 'get', side_effect=mock_my_trades):
+        trades, _ = binance.query_online_trade_history(start_ts=0, end_ts=1499865549)
+        assert [x.link for x in trades] == ['28457']
+        assert from_ids == {'ETHBTC': 0, 'BNBBTC': 0}
+        with binance.db.conn.read_ctx() as cursor:
+            assert binance._get_trade_cursors(cursor, ['ETHBTC', 'BNBBTC']) == {
+                'BNBBTC': (28458, 1499865549),
+            }
+
+        trades, _ = binance.query_online_trade_history(start_ts=1499865550, end_ts=1638529919)
+        assert trades == []
+        assert from_ids == {'ETHBTC': 0, 'BNBBTC': 28458}
+
+        # a range starting before the last seen trade queries the market again
+        trades, _ = binance.query_online_trade_history(start_ts=1499865549, end_ts=1638529919)
+        assert [x.link for x in trades] == ['28457']
+        assert from_ids == {'ETHBTC': 0, 'BNBBTC': 0}
@@ -160,7 +160,7 @@ def test_querying_rate_limit_exhaustion(function_scope_kraken, database):
     """
     kraken = function_scope_kraken
     kraken.use_original_kraken = True
-    kraken.reduction_every_secs = 0.05
+    kraken.request_scheduler.register_limit(rate=20, capacity=kraken.call_limit)
 
     count = 0
 
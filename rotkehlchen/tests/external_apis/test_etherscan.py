@@ -1,6 +1,9 @@
+import json
 import os
+import time
 from unittest.mock import patch
 
+import gevent
 import pytest
 from eth_utils import to_checksum_address
 
@@ -11,6 +14,11 @@ from rotkehlchen.chain.evm.constants import GENESIS_HASH, ZERO_ADDRESS
 from rotkehlchen.db.dbhandler import DBHandler
 from rotkehlchen.db.evmtx import DBEvmTx
 from rotkehlchen.db.filtering import EvmTransactionsFilterQuery
+from rotkehlchen.errors.misc import RemoteError
+from rotkehlchen.externalapis.etherscan import (
+    ETHERSCAN_CALLS_PER_SECOND_WITH_KEY,
+    ETHERSCAN_CALLS_PER_SECOND_WITHOUT_KEY,
+)
 from rotkehlchen.serialization.deserialize import deserialize_evm_transaction
 from rotkehlchen.tests.utils.mock import MockResponse
 from rotkehlchen.types import (
@@ -84,6 +92,121 @@ def test_maximum_rate_limit_reached(temp_etherscan, **kwargs):  # pylint: disabl
     assert result == '0x1337'
 
 
+def test_rate_limit_concurrent_queries(temp_etherscan):
+    """Test that the queries that many greenlets make to etherscan share its rate limit"""
+    etherscan = temp_etherscan
+    response = '{"jsonrpc":"2.0","id":1,"result":"0x1337"}'
+    get_patch = patch.object(etherscan.session, 'get', return_value=MockResponse(200, response))  # noqa: E501
+    rates_patch = patch.multiple(
+        'rotkehlchen.externalapis.etherscan',
+        ETHERSCAN_CALLS_PER_SECOND_WITH_KEY=20,
+        ETHERSCAN_CALLS_PER_SECOND_WITHOUT_KEY=20,
+    )
+    with rates_patch, get_patch as get_mock:
+        start = time.monotonic()
+        greenlets = [gevent.spawn(
+            etherscan.eth_call,
+            '0x4678f0a6958e4D2Bc4F1BAF7Bc52E8F3564f3fE4',
+            '0xc455279100000000000000000000000027a2eaaa8bebea8d23db486fb49627c165baacb5',
+        ) for _ in range(6)]
+        gevent.joinall(greenlets, raise_error=True)
+
+    assert all(x.value == '0x1337' for x in greenlets)
+    assert get_mock.call_count == 6
+    assert time.monotonic() - start >= 0.2  # 20 tokens per second, starting with 1
+
+
+def test_keyless_rate_limit_after_refusal(temp_etherscan):
+    """Test that the queries without an API key are only throttled to the keyless rate
+    limit once etherscan refuses one of them"""
+    etherscan = temp_etherscan
+    if etherscan._get_api_key() is not None:
+        pytest.skip('Needs etherscan without an API key')
+
+    success = '{"jsonrpc":"2.0","id":1,"result":"0x1337"}'
+    refusal = (
+        '{"status":"0","message":"NOTOK",'
+        '"result":"Max rate limit reached, please use API Key for higher rate limit"}'
+    )
+    responses = [success, refusal, success]
+    with (
+        patch.object(etherscan.session, 'get', side_effect=lambda *args, **kwargs: MockResponse(200, responses.pop(0))),  # noqa: E501
+        patch('gevent.sleep'),  # the rate limit backoff
+    ):
+        assert etherscan.get_latest_block_number() == 0x1337
+        assert etherscan.rate_limiter.rate == ETHERSCAN_CALLS_PER_SECOND_WITH_KEY
+        assert etherscan.get_latest_block_number() == 0x1337
+        assert etherscan.keyless_limit_reached is True
+        assert etherscan.rate_limiter.rate == ETHERSCAN_CALLS_PER_SECOND_WITHOUT_KEY
+        responses.append(success)
+        assert etherscan.get_latest_block_number() == 0x1337
+        assert etherscan.rate_limiter.rate == ETHERSCAN_CALLS_PER_SECOND_WITHOUT_KEY
+
+
+def _token_transfers_response(entries: list[tuple[int, tuple[int, int]]]) -> str:
+    """Makes a tokentx page with a transfer per (index, (block number, timestamp)) entry"""
+    return json.dumps({'status': '1', 'message': 'OK', 'result': [{
+        'blockNumber': str(block_number),
+        'timeStamp': str(timestamp),
+        'hash': f'0x{idx:064x}',
+        'from': ZERO_ADDRESS,
+    } for idx, (block_number, timestamp) in entries]})
+
+
+def test_stream_token_transfer_pages(temp_etherscan):
+    """Test that the pages of etherscan are parsed while they arrive, that the query
+    continues from the last block of a full page and that the batches of hashes end
+    only between transfers of different timestamps"""
+    etherscan = temp_etherscan
+    first_page = [(idx, (10 + idx, 100 + idx // 4)) for idx in range(8)]
+    second_page = [(idx, (10 + idx, 100 + idx // 4)) for idx in range(7, 13)]
+    responses = [
+        '{"status":"0","message":"NOTOK","result":"Max rate limit reached"}',
+        _token_transfers_response(first_page),
+        _token_transfers_response(second_page),
+    ]
+    queried_urls = []
+
+    def mock_requests_get(url, timeout, stream):  # pylint: disable=unused-argument
+        assert stream is True
+        queried_urls.append(url)
+        return MockResponse(200, responses.pop(0))
+
+    with (
+        patch.object(etherscan.session, 'get', wraps=mock_requests_get),
+        patch('rotkehlchen.externalapis.etherscan.STREAM_CHUNK_SIZE', 7),
+        patch('rotkehlchen.externalapis.etherscan.ETHERSCAN_TX_QUERY_LIMIT', 8),
+        patch('rotkehlchen.externalapis.etherscan.TRANSACTIONS_BATCH_NUM', 3),
+        patch('gevent.sleep'),  # the rate limit backoff
+    ):
+        batches = list(etherscan.get_token_transaction_hashes(account=ZERO_ADDRESS))
+
+    assert len(queried_urls) == 3
+    assert 'startBlock' not in queried_urls[1]
+    assert 'startBlock=17' in queried_urls[2]
+    # transfers 0-3 have timestamp 100, 4-7 101, 8-11 102 and 12 103
+    assert [set(batch) for batch in batches] == [
+        {f'0x{idx:064x}' for idx in batch}
+        for batch in ([0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11], [12])
+    ]
+
+
+@pytest.mark.parametrize('response', [
+    '{"status":"1","message":"OK","result":[{"blockNumber":"1"},{"blockNu',
+    '{"status":"1","message":"OK","result":[{"blockNumber":"1"} {"blockNumber":"2"}]}',
+    '{"status":"1","message":"OK","result":"not a list"}',
+])
+def test_stream_invalid_page(temp_etherscan, response):
+    """Test that a cut or invalid page of etherscan raises a RemoteError"""
+    etherscan = temp_etherscan
+    with (
+        patch.object(etherscan.session, 'get', return_value=MockResponse(200, response)),
+        patch('rotkehlchen.externalapis.etherscan.STREAM_CHUNK_SIZE', 5),
+        pytest.raises(RemoteError),
+    ):
+        list(etherscan._query_list(module='account', action='tokentx', options={}))
+
+
 def test_deserialize_transaction_from_etherscan():
     # Make sure that a missing to address due to contract creation is handled
     data = {'blockNumber': 54092, 'timeStamp': 1439048640, 'hash': '0x9c81f44c29ff0226f835cd0a8a2f2a7eca6db52a711f8211b566fd15d3e0e8d4', 'nonce': 0, 'blockHash': '0xd3cabad6adab0b52ea632c386ea19403680571e682c62cb589b5abcd76de2159', 'transactionIndex': 0, 'from': '0x5153493bB1E1642A63A098A65dD3913daBB6AE24', 'to': '', 'value': 11901464239480000000000000, 'gas': 2000000, 'gasPrice': 10000000000000, 'isError': 0, 'txreceipt_status': '', 'input': '0x313233', 'contractAddress': '0xde0b295669a9fd93d5f28d9ec85e40f4cb697bae', 'cumulativeGasUsed': 1436963, 'gasUsed': 1436963, 'confirmations': 8569454}  # noqa: E501
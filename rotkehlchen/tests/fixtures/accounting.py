@@ -94,6 +94,12 @@ def fixture_accounting_initialize_parameters():
     return False
 
 
+@pytest.fixture(name='cost_basis_processes')
+def fixture_cost_basis_processes() -> int:
+    """Number of worker processes used to compute the cost basis of reports"""
+    return 0
+
+
 @pytest.fixture(name='ethereum_accounting_aggregator')
 def fixture_ethereum_accounting_aggregator(
         ethereum_inquirer,
@@ -136,6 +142,7 @@ def fixture_accountant(
         evm_accounting_aggregators,
         start_with_valid_premium,
         rotki_premium_credentials,
+        cost_basis_processes,
 ) -> Optional[Accountant]:
     if not start_with_logged_in_user:
         return None
@@ -149,6 +156,7 @@ def fixture_accountant(
         evm_accounting_aggregators=evm_accounting_aggregators,
         msg_aggregator=function_scope_messages_aggregator,
         premium=premium,
+        cost_basis_processes=cost_basis_processes,
     )
 
     if accounting_initialize_parameters:
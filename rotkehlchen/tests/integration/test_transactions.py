@@ -1,15 +1,19 @@
 from typing import TYPE_CHECKING
+from unittest.mock import patch
 
+import gevent
 import pytest
 from flaky import flaky
 
 from rotkehlchen.db.evmtx import DBEvmTx
 from rotkehlchen.db.filtering import EvmTransactionsFilterQuery
+from rotkehlchen.errors.misc import RemoteError
 from rotkehlchen.tests.utils.ethereum import (
     TEST_ADDR1,
     TEST_ADDR2,
     setup_ethereum_transactions_test,
 )
+from rotkehlchen.tests.utils.factories import make_evm_address
 
 if TYPE_CHECKING:
     from rotkehlchen.chain.ethereum.transactions import EthereumTransactions
@@ -45,3 +49,35 @@ def test_get_transaction_receipt(
         )
     assert len(results) == 1
     assert results[0] == transactions[0]
+
+
+@pytest.mark.parametrize('ethereum_accounts', [[make_evm_address() for _ in range(5)]])
+def test_query_chain_addresses_concurrently(
+        eth_transactions: 'EthereumTransactions',
+        ethereum_accounts,
+) -> None:
+    """Test that the transactions of all addresses are queried at the same time, up to the
+    concurrency limit, and that an error is raised after all addresses are queried"""
+    queried, running, max_running = [], 0, 0
+
+    def mock_single_address_query(address, start_ts, end_ts):  # pylint: disable=unused-argument  # noqa: E501
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        gevent.sleep(0.05)
+        running -= 1
+        queried.append(address)
+        if address == ethereum_accounts[0]:
+            raise RemoteError('boom')
+
+    query_patch = patch.object(
+        eth_transactions,
+        'single_address_query_transactions',
+        side_effect=mock_single_address_query,
+    )
+    concurrency_patch = patch('rotkehlchen.chain.evm.transactions.ADDRESSES_QUERY_CONCURRENCY', new=3)  # noqa: E501
+    with query_patch, concurrency_patch, pytest.raises(RemoteError):
+        eth_transactions.query_chain(EvmTransactionsFilterQuery.make())
+
+    assert sorted(queried) == sorted(ethereum_accounts)
+    assert max_running == 3
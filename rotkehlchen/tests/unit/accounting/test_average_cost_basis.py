@@ -0,0 +1,163 @@
+import random
+from typing import Callable, Optional
+
+import pytest
+
+from rotkehlchen.accounting.cost_basis.base import (
+    AssetAcquisitionEvent,
+    AverageCostBasisMethod,
+    CostBasisInfo,
+    FIFOCostBasisMethod,
+)
+from rotkehlchen.accounting.types import MissingAcquisition
+from rotkehlchen.assets.asset import Asset
+from rotkehlchen.constants.assets import A_ETH
+from rotkehlchen.constants.misc import ZERO
+from rotkehlchen.db.settings import DBSettings
+from rotkehlchen.fval import FVal
+from rotkehlchen.types import CostBasisMethod, Price, Timestamp
+
+
+class HeapAverageCostBasisMethod(FIFOCostBasisMethod):
+    """The average cost basis method implemented on top of the acquisitions heap.
+    This is what AverageCostBasisMethod has to give the same results as."""
+    def __init__(self) -> None:
+        super().__init__()
+        self.remaining_amount = ZERO
+        self.current_average_cost_basis = ZERO
+
+    def add_acquisition(self, acquisition: AssetAcquisitionEvent) -> None:
+        super().add_acquisition(acquisition)
+        self.current_average_cost_basis += (acquisition.rate * acquisition.amount)
+        self.remaining_amount += acquisition.amount
+
+    def consume_result(self, used_amount: FVal) -> None:
+        self.remaining_amount -= used_amount
+        super().consume_result(used_amount)
+
+    def calculate_spend_cost_basis(
+            self,
+            spending_amount: FVal,
+            spending_asset: Asset,
+            timestamp: Timestamp,
+            missing_acquisitions: list[MissingAcquisition],
+            used_acquisitions: list[AssetAcquisitionEvent],
+            settings: DBSettings,
+            timestamp_to_date: Callable[[Timestamp], str],
+            average_cost_basis: Optional[FVal] = None,
+    ) -> CostBasisInfo:
+        if self.remaining_amount == ZERO:
+            missing_acquisitions.append(MissingAcquisition(
+                asset=spending_asset,
+                time=timestamp,
+                found_amount=self.remaining_amount,
+                missing_amount=spending_amount,
+            ))
+            return CostBasisInfo(
+                taxable_amount=ZERO,
+                taxable_bought_cost=ZERO,
+                taxfree_bought_cost=ZERO,
+                matched_acquisitions=[],
+                is_complete=False,
+            )
+
+        self.current_average_cost_basis *= ((self.remaining_amount - spending_amount) / self.remaining_amount)  # noqa: E501
+        return super().calculate_spend_cost_basis(
+            spending_amount=spending_amount,
+            spending_asset=spending_asset,
+            timestamp=timestamp,
+            missing_acquisitions=missing_acquisitions,
+            used_acquisitions=used_acquisitions,
+            settings=settings,
+            timestamp_to_date=timestamp_to_date,
+            average_cost_basis=self.current_average_cost_basis,
+        )
+
+
+def _random_amount(rng: random.Random) -> FVal:
+    return FVal(f'{rng.randint(0, 20)}.{rng.randint(0, 10 ** 8 - 1):08}')
+
+
+def _random_spending_amount(rng: random.Random, manager: AverageCostBasisMethod) -> FVal:
+    """Returns an amount that often hits the edge cases of matching acquisitions"""
+    acquisitions = manager.get_acquisitions()
+    choice = rng.random()
+    if choice < 0.15 and len(acquisitions) != 0:  # exactly the next acquisition
+        return acquisitions[0].remaining_amount
+    if choice < 0.25:  # exactly all that is held
+        return manager.remaining_amount
+    if choice < 0.35:  # more than what is held
+        return manager.remaining_amount + _random_amount(rng)
+    if choice < 0.4:
+        return ZERO
+    return _random_amount(rng)
+
+
+@pytest.mark.parametrize('taxfree_after_period', [None, 50])
+@pytest.mark.parametrize('seed', range(15))
+def test_same_results_as_heap_implementation(seed, taxfree_after_period):
+    """Test that for random sequences of acquisitions, spends and reductions the average
+    cost basis method gives the same results as when it was using the acquisitions heap"""
+    rng = random.Random(seed)
+    settings = DBSettings(
+        taxfree_after_period=taxfree_after_period,
+        cost_basis_method=CostBasisMethod.ACB,
+    )
+    manager, expected_manager = AverageCostBasisMethod(), HeapAverageCostBasisMethod()
+    used_acquisitions: list[AssetAcquisitionEvent] = []
+    expected_used_acquisitions: list[AssetAcquisitionEvent] = []
+    missing_acquisitions: list[MissingAcquisition] = []
+    expected_missing_acquisitions: list[MissingAcquisition] = []
+    for idx in range(300):
+        timestamp = Timestamp(idx * 10)
+        choice = rng.random()
+        if choice < 0.5:
+            amount, rate = _random_amount(rng), Price(_random_amount(rng))
+            if amount == ZERO:
+                continue  # acquisitions of nothing are not recorded
+            for acquisitions_manager in (manager, expected_manager):
+                acquisitions_manager.add_acquisition(AssetAcquisitionEvent(
+                    amount=amount,
+                    timestamp=timestamp,
+                    rate=rate,
+                    index=idx,
+                ))
+        elif choice < 0.9:
+            spending_amount = _random_spending_amount(rng, manager)
+            cost_basis = manager.calculate_spend_cost_basis(
+                spending_amount=spending_amount,
+                spending_asset=A_ETH,
+                timestamp=timestamp,
+                missing_acquisitions=missing_acquisitions,
+                used_acquisitions=used_acquisitions,
+                settings=settings,
+                timestamp_to_date=str,
+            )
+            expected_cost_basis = expected_manager.calculate_spend_cost_basis(
+                spending_amount=spending_amount,
+                spending_asset=A_ETH,
+                timestamp=timestamp,
+                missing_acquisitions=expected_missing_acquisitions,
+                used_acquisitions=expected_used_acquisitions,
+                settings=settings,
+                timestamp_to_date=str,
+            )
+            assert cost_basis == expected_cost_basis
+        elif len(manager) != 0:
+            reduction = _random_spending_amount(rng, manager)
+            assert manager.reduce_amount(reduction) == expected_manager.reduce_amount(reduction)  # noqa: E501
+
+        assert manager.remaining_amount == expected_manager.remaining_amount
+        assert manager.current_average_cost_basis == expected_manager.current_average_cost_basis  # noqa: E501
+        # the heap gives the acquisitions in the order of its array and not in FIFO order
+        assert list(manager.get_acquisitions()) == sorted(expected_manager.get_acquisitions(), key=lambda x: x.index)  # noqa: E501
+        assert len(manager) == len(expected_manager)
+
+        if idx % 50 == 0:  # also check that the state is restored
+            restored_manager = AverageCostBasisMethod()
+            restored_manager.restore_state(manager.serialize_state())
+            assert restored_manager.serialize_state() == manager.serialize_state()
+
+    assert missing_acquisitions == expected_missing_acquisitions
+    assert len(missing_acquisitions) != 0
+    assert used_acquisitions == expected_used_acquisitions
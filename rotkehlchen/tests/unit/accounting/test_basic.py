@@ -1,3 +1,5 @@
+from unittest.mock import MagicMock, patch
+
 import pytest
 
 from rotkehlchen.accounting.ledger_actions import LedgerAction, LedgerActionType
@@ -335,3 +337,28 @@ def test_no_fiat_missing_acquisitions(accountant):
     no_message_errors(accountant.msg_aggregator)
     missing_acquisitions = accountant.pots[0].cost_basis.missing_acquisitions
     assert missing_acquisitions == []
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_prices_prefetched_per_batch(accountant):
+    """Test that the history is read in batches while it is processed and the prices
+    of each batch are prefetched before it, while all events are still counted"""
+    prefetched_batches = []
+    prefetch_prices = accountant._prefetch_prices
+
+    def prefetch_batch_prices(events, **kwargs):
+        prefetched_batches.append([x.get_timestamp() for x in events])
+        return prefetch_prices(events=events, **kwargs)
+
+    premium_patch = patch.object(accountant, 'premium', MagicMock())  # no events limit
+    batch_size_patch = patch('rotkehlchen.accounting.accountant.PNL_EVENTS_PREFETCH_BATCH_SIZE', 3)  # noqa: E501
+    prefetch_patch = patch.object(accountant, '_prefetch_prices', side_effect=prefetch_batch_prices)  # noqa: E501
+    with premium_patch, batch_size_patch, prefetch_patch:
+        report, _ = accounting_history_process(accountant, 1436979735, 1495751688, history1)
+
+    no_message_errors(accountant.msg_aggregator)
+    assert prefetched_batches == [
+        [x.timestamp for x in history1[:3]],
+        [history1[3].timestamp],
+    ]
+    assert report['processed_actions'] == report['total_actions'] == len(history1) == 4
@@ -0,0 +1,200 @@
+import heapq
+import json
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from rotkehlchen.accounting.checkpoints import PnlCheckpoint
+from rotkehlchen.accounting.cost_basis.base import (
+    AssetAcquisitionEvent,
+    FIFOCostBasisMethod,
+    LIFOCostBasisMethod,
+)
+from rotkehlchen.accounting.export.csv import FILENAME_ALL_CSV
+from rotkehlchen.constants.assets import A_ETH, A_EUR
+from rotkehlchen.db.reports import DBAccountingReports
+from rotkehlchen.db.settings import DBSettings
+from rotkehlchen.fval import FVal
+from rotkehlchen.globaldb.handler import GlobalDBHandler
+from rotkehlchen.history.types import HistoricalPrice, HistoricalPriceOracle
+from rotkehlchen.tests.utils.accounting import accounting_history_process, history1
+from rotkehlchen.tests.utils.history import prices
+from rotkehlchen.types import Price, Timestamp
+
+START_2016 = Timestamp(1451606400)
+END_TS = Timestamp(1495751688)
+
+
+def _get_checkpoint_timestamps(accountant) -> list[int]:
+    with accountant.db.conn_transient.read_ctx() as cursor:
+        cursor.execute('SELECT timestamp FROM pnl_checkpoints ORDER BY timestamp')
+        return [x[0] for x in cursor]
+
+
+def _process(accountant, history) -> tuple[dict, bool]:
+    """Processes the history for 2016 and returns the report and whether it
+    resumed from a checkpoint"""
+    pot = accountant.pots[0]
+    with patch.object(pot, 'restore_state', wraps=pot.restore_state) as restore_state:
+        report, _ = accounting_history_process(accountant, START_2016, END_TS, history)
+    return report, restore_state.call_count == 1
+
+
+def _get_report_data(accountant, report_id: int) -> tuple[list, list]:
+    with accountant.db.conn_transient.read_ctx() as cursor:
+        events = cursor.execute(
+            'SELECT timestamp, data FROM pnl_events WHERE report_id=? ORDER BY identifier',
+            (report_id,),
+        ).fetchall()
+        totals = cursor.execute(
+            'SELECT name, taxable_value, free_value FROM pnl_report_totals '
+            'WHERE report_id=? ORDER BY name',
+            (report_id,),
+        ).fetchall()
+    return events, totals
+
+
+def _export_csv(accountant, directory: Path) -> bytes:
+    success, msg = accountant.export(directory)
+    assert success is True, msg
+    return (directory / FILENAME_ALL_CSV).read_bytes()
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_report_resumes_from_checkpoint(accountant, tmp_path):
+    """Test that a report saves checkpoints at year boundaries up to its start and
+    that a later report with the same settings resumes from them with exactly the
+    same report data, totals and CSV export as processing all events"""
+    full_report, resumed = _process(accountant, history1)
+    assert resumed is False
+    assert _get_checkpoint_timestamps(accountant) == [START_2016]
+    full_csv = _export_csv(accountant, tmp_path / 'full')
+
+    resumed_report, resumed = _process(accountant, history1)
+    assert resumed is True
+    for key in ('first_processed_timestamp', 'last_processed_timestamp', 'processed_actions', 'total_actions'):  # noqa: E501
+        assert resumed_report[key] == full_report[key]
+    assert full_report['first_processed_timestamp'] == 1446979735
+    assert full_report['processed_actions'] == full_report['total_actions'] == 4
+    full_events, full_totals = _get_report_data(accountant, full_report['identifier'])
+    assert len(full_events) != 0 and len(full_totals) != 0
+    assert _get_report_data(accountant, resumed_report['identifier']) == (full_events, full_totals)  # noqa: E501
+    assert _export_csv(accountant, tmp_path / 'resumed') == full_csv
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_checkpoint_invalidated_by_earlier_event_edit(accountant):
+    """Test that editing an event before a checkpoint invalidates it"""
+    _process(accountant, history1)
+    assert _get_checkpoint_timestamps(accountant) == [START_2016]
+
+    edited_history = history1.copy()
+    edited_history[0] = replace(history1[0], rate=FVal('300'))
+    report, resumed = _process(accountant, edited_history)
+    # the checkpoint was not used and was saved again from the edited events
+    assert resumed is False
+    assert _get_checkpoint_timestamps(accountant) == [START_2016]
+
+    resumed_report, resumed = _process(accountant, edited_history)
+    assert resumed is True
+    assert _get_report_data(accountant, resumed_report['identifier']) == _get_report_data(accountant, report['identifier'])  # noqa: E501
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_checkpoint_invalidated_by_manual_price_edit(accountant):
+    """Test that adding a manual price before a checkpoint invalidates it"""
+    _process(accountant, history1)
+    GlobalDBHandler().add_single_historical_price(HistoricalPrice(
+        from_asset=A_ETH,
+        to_asset=A_EUR,
+        source=HistoricalPriceOracle.MANUAL,
+        timestamp=Timestamp(1446979735),
+        price=Price(FVal(1)),
+    ))
+    _, resumed = _process(accountant, history1)
+    assert resumed is False
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_corrupt_checkpoint_processes_all_events(accountant):
+    """Test that a checkpoint whose state can't be restored is deleted and the report
+    processes all events instead, without creating another report"""
+    full_report, _ = _process(accountant, history1)
+    with accountant.db.transient_write() as write_cursor:
+        write_cursor.execute('UPDATE pnl_checkpoints SET state=?', (json.dumps({'cost_basis': {}}),))  # noqa: E501
+    with accountant.db.conn_transient.read_ctx() as cursor:
+        reports_num = cursor.execute('SELECT COUNT(*) FROM pnl_reports').fetchone()[0]
+
+    report, _ = _process(accountant, history1)
+    with accountant.db.conn_transient.read_ctx() as cursor:
+        assert cursor.execute('SELECT COUNT(*) FROM pnl_reports').fetchone()[0] == reports_num + 1  # noqa: E501
+    assert _get_report_data(accountant, report['identifier']) == _get_report_data(accountant, full_report['identifier'])  # noqa: E501
+    # the checkpoint was saved again from the processed events
+    assert _get_checkpoint_timestamps(accountant) == [START_2016]
+    _, resumed = _process(accountant, history1)
+    assert resumed is True
+
+
+def test_edited_trade_deletes_later_checkpoints(database):
+    """Test that editing a trade in place deletes the checkpoints after it once
+    the edit is committed"""
+    trade = history1[2]
+    with database.user_write() as write_cursor:
+        database.add_trades(write_cursor, [trade])
+    dbpnl = DBAccountingReports(database)
+    report_id = dbpnl.add_report(
+        first_processed_timestamp=Timestamp(0),
+        start_ts=Timestamp(0),
+        end_ts=END_TS,
+        settings=DBSettings(),
+    )
+    for timestamp in (START_2016, Timestamp(1483228800)):
+        dbpnl.add_checkpoint(fingerprint='x', checkpoint=PnlCheckpoint(
+            timestamp=timestamp,
+            report_id=report_id,
+            first_processed_timestamp=Timestamp(0),
+            events_num=0,
+            history_fingerprint='',
+            processed_actions=0,
+            state={},
+        ))
+
+    with database.user_write() as write_cursor:
+        database.edit_trade(write_cursor, trade.identifier, replace(trade, rate=FVal('0.1')))
+        # not deleted before the edit is committed
+        assert dbpnl.get_checkpoint(fingerprint='x', start_ts=END_TS, end_ts=END_TS) is not None  # noqa: E501
+
+    assert dbpnl.get_checkpoint(fingerprint='x', start_ts=END_TS, end_ts=END_TS).timestamp == START_2016  # noqa: E501
+
+
+@pytest.mark.parametrize('method_class', [FIFOCostBasisMethod, LIFOCostBasisMethod])
+def test_restored_acquisitions_keep_order(method_class):
+    """Test that acquisitions added after restoring the state of a FIFO/LIFO method
+    are ordered the same as if the state was never saved"""
+    def acquisition(idx: int) -> AssetAcquisitionEvent:
+        return AssetAcquisitionEvent(
+            amount=FVal(idx + 1),
+            timestamp=Timestamp(idx * 10),
+            rate=Price(FVal(100)),
+            index=idx,
+        )
+
+    method, restored = method_class(), method_class()
+    for idx in range(3):
+        method.add_acquisition(acquisition(idx))
+    restored.restore_state(json.loads(json.dumps(method.serialize_state())))
+    assert restored._count == method._count == FVal(3)
+    for idx in range(3, 6):
+        method.add_acquisition(acquisition(idx))
+        restored.add_acquisition(acquisition(idx))
+
+    for acquisitions_method in (method, restored):
+        order = []
+        while len(acquisitions_method._acquisitions_heap) != 0:
+            order.append(heapq.heappop(acquisitions_method._acquisitions_heap).acquisition_event.timestamp)  # noqa: E501
+        if method_class == FIFOCostBasisMethod:
+            assert order == [0, 10, 20, 30, 40, 50]
+        else:
+            assert order == [50, 40, 30, 20, 10, 0]
@@ -22,6 +22,7 @@ from rotkehlchen.constants.assets import A_DAI, A_ETH
 from rotkehlchen.constants.misc import ONE
 from rotkehlchen.db.settings import ModifiableDBSettings
 from rotkehlchen.fval import FVal
+from rotkehlchen.tests.utils.accounting import get_pot_processed_events
 from rotkehlchen.tests.utils.factories import make_evm_address, make_random_bytes
 from rotkehlchen.types import Location, Price, Timestamp, TimestampMS, make_evm_tx_hash
 from rotkehlchen.utils.misc import ts_sec_to_ms
@@ -175,7 +176,7 @@ def test_accounting_receive_settings(
     expected_event.count_entire_amount_spend = False
     expected_event.count_cost_basis_pnl = is_taxable
 
-    assert accounting_pot.processed_events == [expected_event]
+    assert get_pot_processed_events(accounting_pot) == [expected_event]
     assert accounting_pot.pnls.taxable == ETH_PRICE_TS_1 if is_taxable else ZERO
     assert accounting_pot.pnls.free == ZERO
 
@@ -259,7 +260,7 @@ def test_accounting_spend_settings(
     )
     expected_event.count_entire_amount_spend = is_taxable
     expected_event.count_cost_basis_pnl = is_taxable and (counterparty != CPT_GAS or include_crypto2crypto)  # noqa: E501
-    assert accounting_pot.processed_events[-1] == expected_event
+    assert get_pot_processed_events(accounting_pot)[-1] == expected_event
     assert accounting_pot.pnls.taxable == ETH_PRICE_TS_1 + expected_event.pnl.taxable
     assert accounting_pot.pnls.free == ZERO
 
@@ -348,5 +349,5 @@ def test_accounting_swap_settings(accounting_pot: 'AccountingPot'):
     )
     expected_receive_event.count_entire_amount_spend = False
     expected_receive_event.count_cost_basis_pnl = False
-    assert accounting_pot.processed_events[1:] == [expected_spend_event, expected_receive_event]
+    assert get_pot_processed_events(accounting_pot)[1:] == [expected_spend_event, expected_receive_event]  # noqa: E501
     assert accounting_pot.pnls.taxable == ETH_PRICE_TS_1 + expected_spend_event.pnl.taxable
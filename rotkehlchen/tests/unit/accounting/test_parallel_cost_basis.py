@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+import pytest
+
+from rotkehlchen.accounting.cost_basis.parallel import can_defer_cost_basis
+from rotkehlchen.constants.assets import A_BTC, A_EUR
+from rotkehlchen.errors.serialization import DeserializationError
+from rotkehlchen.exchanges.data_structures import Trade
+from rotkehlchen.fval import FVal
+from rotkehlchen.tests.utils.accounting import (
+    accounting_history_process,
+    get_pot_processed_events,
+    history1,
+)
+from rotkehlchen.tests.utils.history import prices
+from rotkehlchen.types import (
+    AssetAmount,
+    CostBasisMethod,
+    Fee,
+    Location,
+    Price,
+    Timestamp,
+    TradeType,
+)
+
+HISTORY = history1 + [
+    Trade(  # sells more BTC than acquired
+        timestamp=Timestamp(1476979735),
+        location=Location.KRAKEN,
+        base_asset=A_BTC,
+        quote_asset=A_EUR,
+        trade_type=TradeType.SELL,
+        amount=AssetAmount(FVal(100)),
+        rate=Price(FVal(600)),
+        fee=Fee(FVal('0.1')),
+        fee_currency=A_BTC,
+        link=None,
+    ),
+]
+
+
+def _process_and_get_results(accountant):
+    report, _ = accounting_history_process(
+        accountant=accountant,
+        start_ts=Timestamp(1436979735),
+        end_ts=Timestamp(1495751688),
+        history_list=HISTORY,
+    )
+    pot = accountant.pots[0]
+    return (
+        report['overview'],
+        [event.serialize_to_dict(str) for event in get_pot_processed_events(pot)],
+        pot.cost_basis.missing_acquisitions,
+        pot.cost_basis.get_calculated_asset_amount(A_BTC),
+    )
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+@pytest.mark.parametrize('cost_basis_processes', [2])
+@pytest.mark.parametrize(('db_settings', 'min_operations_per_process'), [
+    # starting worker processes is slow so only use them for one method
+    ({'taxfree_after_period': -1, 'cost_basis_method': CostBasisMethod.FIFO}, 1),
+    ({'taxfree_after_period': -1, 'cost_basis_method': CostBasisMethod.LIFO}, 1000),
+    ({'taxfree_after_period': -1, 'cost_basis_method': CostBasisMethod.HIFO}, 1000),
+])
+def test_deferred_cost_basis_same_as_sequential(accountant, min_operations_per_process):
+    """Test that computing the cost basis after processing the events, in worker
+    processes or not, gives the same report as computing it while processing"""
+    with accountant.db.conn.read_ctx() as cursor:
+        assert can_defer_cost_basis(accountant.db.get_settings(cursor)) is True
+
+    with patch(
+        'rotkehlchen.accounting.cost_basis.parallel.MIN_OPERATIONS_PER_PROCESS',
+        new=min_operations_per_process,
+    ):
+        results = _process_and_get_results(accountant)
+    assert accountant.pots[0].cost_basis.deferred_operations is None
+    assert len(results[2]) != 0  # the sell has missing acquisitions
+
+    accountant.cost_basis_processes = 0
+    expected_results = _process_and_get_results(accountant)
+    assert results == expected_results
+
+
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+@pytest.mark.parametrize('cost_basis_processes', [2])
+@pytest.mark.parametrize('db_settings', [
+    {'taxfree_after_period': -1, 'cost_basis_method': CostBasisMethod.FIFO},
+])
+def test_deferred_cost_basis_unreadable_results(accountant):
+    """Test that if the results of the worker processes can't be read the cost basis
+    is computed in the main process, giving the same report, and the user is warned"""
+    with patch(
+        'rotkehlchen.accounting.pot.compute_cost_basis',
+        side_effect=DeserializationError('Failed to deserialize count value'),
+    ) as compute_mock:
+        results = _process_and_get_results(accountant)
+    assert compute_mock.call_count == 1
+    warnings = accountant.msg_aggregator.consume_warnings()
+    assert sum('computed in the main process instead' in x for x in warnings) == 1
+
+    accountant.cost_basis_processes = 0
+    expected_results = _process_and_get_results(accountant)
+    assert results == expected_results
+
+
+@pytest.mark.parametrize('cost_basis_processes', [2])
+@pytest.mark.parametrize('db_settings', [
+    {'taxfree_after_period': 31536000, 'cost_basis_method': CostBasisMethod.FIFO},
+    {'taxfree_after_period': -1, 'cost_basis_method': CostBasisMethod.ACB},
+])
+def test_cost_basis_not_deferred(accountant):
+    """Test that the cost basis is computed while processing if it affects processing"""
+    with accountant.db.conn.read_ctx() as cursor:
+        assert can_defer_cost_basis(accountant.db.get_settings(cursor)) is False
+
+    accounting_history_process(
+        accountant=accountant,
+        start_ts=Timestamp(0),
+        end_ts=Timestamp(1495751688),
+        history_list=[],
+    )
+    assert accountant.pots[0].cost_basis_processes == 0
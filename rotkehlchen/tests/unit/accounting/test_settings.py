@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 
 from rotkehlchen.accounting.mixins.event import AccountingEventType
@@ -229,6 +231,74 @@ def test_ignored_assets(accountant, google_service):
     check_pnls_and_csv(accountant, expected_pnls, google_service)
 
 
+@pytest.mark.parametrize('mocked_price_queries', [prices])
+def test_ignored_assets_edited_during_report(accountant):
+    """Test that the ignored assets are not queried from the DB for each event but
+    that ignoring an asset while a report runs is respected for the rest of it"""
+    history = [
+        Trade(
+            timestamp=1446979735,
+            location=Location.KRAKEN,
+            base_asset=A_ETH,
+            quote_asset=A_EUR,
+            trade_type=TradeType.BUY,
+            amount=FVal(10),
+            rate=FVal('0.2315893'),
+            fee=None,
+            fee_currency=None,
+            link=None,
+        ), Trade(
+            timestamp=1476979735,
+            location=Location.KRAKEN,
+            base_asset=A_DASH,
+            quote_asset=A_EUR,
+            trade_type=TradeType.BUY,
+            amount=FVal(10),
+            rate=FVal('9.76775956284'),
+            fee=None,
+            fee_currency=None,
+            link=None,
+        ), Trade(
+            timestamp=1496979735,
+            location=Location.KRAKEN,
+            base_asset=A_DASH,
+            quote_asset=A_EUR,
+            trade_type=TradeType.SELL,
+            amount=FVal(5),
+            rate=FVal('128.09'),
+            fee=None,
+            fee_currency=None,
+            link=None,
+        ),
+    ]
+    pot = accountant.pots[0]
+    original_add_acquisition = pot.add_acquisition
+
+    def add_acquisition_and_ignore_dash(**kwargs):
+        original_add_acquisition(**kwargs)
+        if kwargs['asset'] == A_ETH:
+            with accountant.db.user_write() as write_cursor:
+                accountant.db.add_to_ignored_assets(write_cursor=write_cursor, asset=A_DASH)
+
+    get_ignored_assets_patch = patch.object(
+        accountant.db,
+        'get_ignored_assets',
+        wraps=accountant.db.get_ignored_assets,
+    )
+    add_acquisition_patch = patch.object(
+        pot,
+        'add_acquisition',
+        side_effect=add_acquisition_and_ignore_dash,
+    )
+    with add_acquisition_patch, get_ignored_assets_patch as get_ignored_assets_mock:
+        _, events = accounting_history_process(accountant, 1436979735, 1519693374, history)
+
+    no_message_errors(accountant.msg_aggregator)
+    # once at the start and once more after the user ignored DASH
+    assert get_ignored_assets_mock.call_count == 2
+    assert A_DASH not in {x.asset for x in events}
+
+
 @pytest.mark.parametrize('mocked_price_queries', [prices])
 def test_margin_events_affect_gained_lost_amount(accountant, google_service):
     history = [
@@ -28,3 +28,13 @@ def test_arg_sql_vm_instructions_cb(argparser):
     assert args.sqlite_instructions == 200
     args = argparser.parse_args(['--sqlite-instructions', '0'])
     assert args.sqlite_instructions == 0
+
+
+def test_arg_accounting_processes(argparser):
+    with pytest.raises(SystemExit):
+        argparser.parse_args(['--accounting-processes', '-1'])
+
+    args = argparser.parse_args(['--data-dir', 'foo'])
+    assert args.accounting_processes == 0
+    args = argparser.parse_args(['--accounting-processes', '4'])
+    assert args.accounting_processes == 4
@@ -1,8 +1,13 @@
+import time
 from contextlib import ExitStack
+from functools import partial
+from unittest.mock import patch
 
+import gevent
 import pytest
 
 from rotkehlchen.chain.aggregator import _module_name_to_class
+from rotkehlchen.errors.misc import RemoteError
 from rotkehlchen.tests.utils.blockchain import setup_filter_active_evm_addresses_mock
 from rotkehlchen.tests.utils.factories import make_evm_address
 from rotkehlchen.types import AVAILABLE_MODULES_MAP, SupportedBlockchain
@@ -65,3 +70,47 @@ def test_filter_active_evm_addresses(blockchain):
             (SupportedBlockchain.ETHEREUM, optimism_addy),
             (SupportedBlockchain.OPTIMISM, optimism_addy),
         }
+
+
+@pytest.mark.parametrize('ethereum_modules', [[]])
+def test_query_balances_chains_concurrently(blockchain):
+    """Test that the balances of all chains are queried at the same time, that the
+    totals are calculated once and that an error in one chain is raised after the rest
+    are queried"""
+    queried = []
+
+    def mock_query_chain(chain, **kwargs):  # pylint: disable=unused-argument
+        gevent.sleep(0.5)
+        queried.append(chain)
+        if chain == SupportedBlockchain.BITCOIN_CASH:
+            raise RemoteError('Made a booboo')
+
+    recalculate_totals = blockchain.balances.recalculate_totals
+    with ExitStack() as stack:
+        for chain in (SupportedBlockchain.BITCOIN, SupportedBlockchain.ETHEREUM):
+            stack.enter_context(patch.object(
+                blockchain,
+                f'query_{chain.get_key()}_balances',
+                side_effect=partial(mock_query_chain, chain),
+            ))
+        totals_mock = stack.enter_context(patch.object(
+            blockchain.balances,
+            'recalculate_totals',
+            side_effect=recalculate_totals,
+        ))
+        start = time.monotonic()
+        blockchain.query_balances()
+        assert time.monotonic() - start < 0.9
+        assert set(queried) == {SupportedBlockchain.BITCOIN, SupportedBlockchain.ETHEREUM}
+        assert totals_mock.call_count == 1
+
+        stack.enter_context(patch.object(
+            blockchain,
+            'query_bch_balances',
+            side_effect=partial(mock_query_chain, SupportedBlockchain.BITCOIN_CASH),
+        ))
+        queried = []
+        with pytest.raises(RemoteError):
+            blockchain.query_balances(ignore_cache=True)
+        assert len(queried) == 3
+        assert totals_mock.call_count == 1
@@ -13,6 +13,7 @@ from rotkehlchen.constants.assets import A_3CRV, A_BTC, A_ETH, A_EUR, A_WETH
 from rotkehlchen.constants.misc import ONE, ZERO
 from rotkehlchen.db.settings import DBSettings
 from rotkehlchen.fval import FVal
+from rotkehlchen.tests.utils.accounting import get_pot_processed_events
 from rotkehlchen.tests.utils.factories import make_evm_address, make_random_bytes
 from rotkehlchen.types import CostBasisMethod, Location, Timestamp, make_evm_tx_hash
 
@@ -918,6 +919,7 @@ def test_accounting_average_cost_basis(accountant):
     ]
 
 
+@pytest.mark.parametrize('accounting_initialize_parameters', [True])
 @pytest.mark.parametrize('mocked_price_queries', [{
     A_ETH: {A_EUR: {1469020840: ONE}},
     A_3CRV: {A_EUR: {1469020840: ONE}},
@@ -974,19 +976,21 @@ def test_swaps_taxability(accountant, taxable):
         expected_pnl_totals = PnlTotals()
 
     assert pot.pnls == expected_pnl_totals
-    assert len(pot.processed_events) == 2
-    assert pot.processed_events[0].taxable_amount == ONE
-    assert pot.processed_events[0].free_amount == ZERO
+    processed_events = get_pot_processed_events(pot)
+    assert len(processed_events) == 2
+    assert processed_events[0].taxable_amount == ONE
+    assert processed_events[0].free_amount == ZERO
     # Check that dependping on whether is taxable or not, we see different values for spend event
-    assert pot.processed_events[0].pnl.taxable == expected_pnl_taxable
-    assert pot.processed_events[0].pnl.free == ZERO
+    assert processed_events[0].pnl.taxable == expected_pnl_taxable
+    assert processed_events[0].pnl.free == ZERO
     # Check that no matter whether taxable flag is True or not, acquisitions are never taxable
-    assert pot.processed_events[1].taxable_amount == ZERO
-    assert pot.processed_events[1].free_amount == ONE
-    assert pot.processed_events[1].pnl.taxable == ZERO
-    assert pot.processed_events[1].pnl.free == ZERO
+    assert processed_events[1].taxable_amount == ZERO
+    assert processed_events[1].free_amount == ONE
+    assert processed_events[1].pnl.taxable == ZERO
+    assert processed_events[1].pnl.free == ZERO
 
 
+@pytest.mark.parametrize('accounting_initialize_parameters', [True])
 @pytest.mark.parametrize('mocked_price_queries', [{A_ETH: {A_EUR: {1469020840: ONE}}}])
 def test_taxable_acquisition(accountant):
     """Make sure that taxable acquisitions are processed properly"""
@@ -1004,8 +1008,9 @@ def test_taxable_acquisition(accountant):
         totals={AccountingEventType.TRANSACTION_EVENT: PNL(taxable=ONE)},
     )
     assert pot.pnls == expected_pnl_totals
-    assert len(pot.processed_events) == 1
-    assert pot.processed_events[0].taxable_amount == ONE
-    assert pot.processed_events[0].free_amount == ZERO
-    assert pot.processed_events[0].pnl.taxable == ONE
-    assert pot.processed_events[0].pnl.free == ZERO
+    processed_events = get_pot_processed_events(pot)
+    assert len(processed_events) == 1
+    assert processed_events[0].taxable_amount == ONE
+    assert processed_events[0].free_amount == ZERO
+    assert processed_events[0].pnl.taxable == ONE
+    assert processed_events[0].pnl.free == ZERO
@@ -1,10 +1,19 @@
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import gevent
 import pytest
 
 from rotkehlchen.chain.accounts import BlockchainAccountData
 from rotkehlchen.chain.ethereum.constants import ETHEREUM_ETHERSCAN_NODE_NAME
 from rotkehlchen.chain.evm.constants import ZERO_ADDRESS
+from rotkehlchen.chain.evm.node_stats import NODE_STATS_MIN_HEDGE_SAMPLES
 from rotkehlchen.chain.evm.structures import EvmTxReceipt, EvmTxReceiptLog
+from rotkehlchen.chain.evm.types import NodeName, WeightedNode
+from rotkehlchen.constants import ONE
 from rotkehlchen.db.evmtx import DBEvmTx
+from rotkehlchen.errors.misc import RemoteError
 from rotkehlchen.tests.utils.checks import assert_serialized_dicts_equal
 from rotkehlchen.tests.utils.ethereum import (
     ETHEREUM_FULL_TEST_PARAMETERS,
@@ -291,6 +300,153 @@ def test_get_log_and_receipt_etherscan_bad_tx_index(
     assert all(x['transactionIndex'] == 0 for x in result['logs'])
 
 
+def test_get_transaction_receipts_batch(ethereum_inquirer):
+    """Test that the receipts of a JSON-RPC batch response are matched to their
+    transactions by id, whatever their order, and that the ones not found are skipped"""
+    tx_hashes = [make_evm_tx_hash(bytes([idx]) * 32) for idx in range(3)]
+    web3 = MagicMock()
+    web3.provider.endpoint_uri = 'https://node.example.com'
+    web3.provider.get_request_kwargs.return_value = {'timeout': 30}
+    response = [{
+        'jsonrpc': '2.0',
+        'id': idx,
+        'result': {
+            'transactionHash': tx_hashes[idx].hex(),
+            'blockNumber': '0xa',
+            'cumulativeGasUsed': '0x5208',
+            'gasUsed': '0x5208',
+            'status': '0x0',
+            'transactionIndex': '0x2',
+            'contractAddress': None,
+            'logs': [{'logIndex': '0x1f', 'data': '0x', 'topics': [], 'removed': False}],
+        },
+    } for idx in (2, 0)] + [{'jsonrpc': '2.0', 'id': 1, 'result': None}]
+    with patch(
+        'rotkehlchen.chain.evm.node_inquirer.make_post_request',
+        return_value=json.dumps(response).encode(),
+    ) as post_mock:
+        receipts = ethereum_inquirer._get_transaction_receipts(web3=web3, tx_hashes=tx_hashes)
+
+    assert post_mock.call_count == 1
+    assert post_mock.call_args.args[0] == 'https://node.example.com'
+    assert post_mock.call_args.kwargs == {'timeout': 30}
+    batch = json.loads(post_mock.call_args.args[1])
+    assert [x['params'] for x in batch] == [[x.hex()] for x in tx_hashes]
+    assert [x['method'] for x in batch] == ['eth_getTransactionReceipt'] * 3
+    assert set(receipts) == {tx_hashes[0], tx_hashes[2]}
+    for tx_hash, receipt in receipts.items():
+        assert receipt['transactionHash'] == tx_hash.hex()
+        assert receipt['blockNumber'] == 10
+        assert receipt['gasUsed'] == 21000
+        assert receipt['status'] == 0
+        assert receipt['logs'][0]['logIndex'] == 31
+        assert receipt['logs'][0]['transactionIndex'] == 2
+
+    error = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32600}}
+    with patch(
+        'rotkehlchen.chain.evm.node_inquirer.make_post_request',
+        return_value=json.dumps(error).encode(),
+    ), pytest.raises(RemoteError):
+        ethereum_inquirer._get_transaction_receipts(web3=web3, tx_hashes=tx_hashes)
+
+
+def _make_weighted_node(name: str) -> WeightedNode:
+    return WeightedNode(
+        node_info=NodeName(
+            name=name,
+            endpoint=f'https://{name}.example.com',
+            owned=False,
+            blockchain=SupportedBlockchain.ETHEREUM,
+        ),
+        active=True,
+        weight=ONE,
+    )
+
+
+def test_query_node_stats(ethereum_inquirer):
+    """Test that the latency and errors of the queries to each node are recorded and
+    that nodes which failed lately get a lower score"""
+    failing, working = _make_weighted_node('failing'), _make_weighted_node('working')
+    web3_mapping = {failing.node_info: MagicMock(), working.node_info: MagicMock()}
+
+    def query(web3, value):
+        if web3 is web3_mapping[failing.node_info]:
+            raise RemoteError('node failed')
+        return value
+
+    with patch.dict(ethereum_inquirer.web3_mapping, web3_mapping):
+        for idx in range(3):
+            assert ethereum_inquirer._query(method=query, call_order=[failing, working], value=idx) == idx  # noqa: E501
+
+    failing_stats = ethereum_inquirer.node_stats[failing.node_info]
+    working_stats = ethereum_inquirer.node_stats[working.node_info]
+    assert (failing_stats.queries, failing_stats.errors, failing_stats.latency) == (3, 3, None)
+    assert (working_stats.queries, working_stats.errors) == (3, 0)
+    assert working_stats.latency is not None
+    assert failing_stats.error_rate == pytest.approx(1 - 0.8 ** 3)
+    assert working_stats.error_rate == 0
+    assert failing_stats.score() < working_stats.score() <= 1
+
+
+def test_query_hedges_slow_node(ethereum_inquirer):
+    """Test that a query to a node taking longer than its p95 latency is also sent to
+    the next node and that the first successful response is used"""
+    slow, fast = _make_weighted_node('slow'), _make_weighted_node('fast')
+    web3_mapping = {slow.node_info: MagicMock(), fast.node_info: MagicMock()}
+    for _ in range(NODE_STATS_MIN_HEDGE_SAMPLES):
+        ethereum_inquirer.node_stats[slow.node_info].record(latency=0.01, success=True, method='query')  # noqa: E501
+        # a slower method of the node does not change when queries are hedged
+        ethereum_inquirer.node_stats[slow.node_info].record(latency=5, success=True, method='get_logs')  # noqa: E501
+
+    def query(web3):
+        if web3 is web3_mapping[slow.node_info]:
+            gevent.sleep(0.5)
+            return 'slow'
+        return 'fast'
+
+    with patch.dict(ethereum_inquirer.web3_mapping, web3_mapping):
+        start = time.monotonic()
+        assert ethereum_inquirer._query(method=query, call_order=[slow, fast]) == 'fast'
+        assert time.monotonic() - start < 0.4
+        assert ethereum_inquirer.node_stats[slow.node_info].hedged == 1
+        assert ethereum_inquirer.node_stats[fast.node_info].queries == 1
+        gevent.sleep(0.6)  # the slow query was killed once the fast one returned
+        assert ethereum_inquirer.node_stats[slow.node_info].queries == 2 * NODE_STATS_MIN_HEDGE_SAMPLES  # noqa: E501
+
+        ethereum_inquirer.hedge_requests = False
+        assert ethereum_inquirer._query(method=query, call_order=[slow, fast]) == 'slow'
+        assert ethereum_inquirer.node_stats[slow.node_info].hedged == 1
+
+
+def test_query_hedged_latency_not_drifting(ethereum_inquirer):
+    """Test that the latency of a query killed since the hedged query responded first
+    is still recorded so that the p95 latency of a node with constant latency does not
+    drift down by only keeping the queries faster than it"""
+    slow, fast = _make_weighted_node('slow'), _make_weighted_node('fast')
+    web3_mapping = {slow.node_info: MagicMock(), fast.node_info: MagicMock()}
+    latency = 0.05
+    slow_stats = ethereum_inquirer.node_stats[slow.node_info]
+    for _ in range(NODE_STATS_MIN_HEDGE_SAMPLES):
+        slow_stats.record(latency=latency, success=True, method='query')
+
+    def query(web3):
+        if web3 is web3_mapping[slow.node_info]:
+            gevent.sleep(latency)
+            return 'slow'
+        return 'fast'
+
+    with patch.dict(ethereum_inquirer.web3_mapping, web3_mapping):
+        for _ in range(NODE_STATS_MIN_HEDGE_SAMPLES):
+            ethereum_inquirer._query(method=query, call_order=[slow, fast])
+        gevent.sleep(latency)  # let the last killed query record its latency
+
+    assert slow_stats.hedged != 0
+    assert len(slow_stats.method_latencies['query']) == 2 * NODE_STATS_MIN_HEDGE_SAMPLES
+    assert slow_stats.p95_latency(method='query') >= latency * 0.9
+    # the killed queries are not counted as successful ones
+    assert slow_stats.queries == 2 * NODE_STATS_MIN_HEDGE_SAMPLES - slow_stats.hedged
+
+
 def _test_get_blocknumber_by_time(ethereum_inquirer, etherscan):
     result = ethereum_inquirer.get_blocknumber_by_time(1577836800, etherscan=etherscan)
     assert result == 9193265
@@ -304,3 +460,37 @@ def test_get_blocknumber_by_time_subgraph(ethereum_inquirer):
 def test_get_blocknumber_by_time_etherscan(ethereum_inquirer):
     """Queries etherscan for known block times"""
     _test_get_blocknumber_by_time(ethereum_inquirer, True)
+
+
+def test_get_transaction_receipts_missing_in_batch(ethereum_inquirer):
+    """Test that the receipts a node answers the batch with null for, like a pruned
+    node does for old transactions, are queried from the next nodes"""
+    pruned, full = _make_weighted_node('pruned'), _make_weighted_node('full')
+    web3_mapping = {pruned.node_info: MagicMock(), full.node_info: MagicMock()}
+    tx_hashes = [make_evm_tx_hash(bytes([idx]) * 32) for idx in range(3)]
+
+    def get_receipts(web3, tx_hashes):
+        assert web3 is web3_mapping[pruned.node_info]
+        return {tx_hashes[0]: {'transactionHash': tx_hashes[0].hex()}}
+
+    receipt_queries = []
+
+    def get_receipt(web3, tx_hash):
+        receipt_queries.append(tx_hash)
+        if web3 is web3_mapping[pruned.node_info] or tx_hash == tx_hashes[2]:
+            raise RemoteError('receipt not found')
+        return {'transactionHash': tx_hash.hex()}
+
+    with (
+        patch.dict(ethereum_inquirer.web3_mapping, web3_mapping),
+        patch.object(ethereum_inquirer, '_get_transaction_receipts', new=get_receipts),
+        patch.object(ethereum_inquirer, '_get_transaction_receipt', new=get_receipt),
+    ):
+        receipts = ethereum_inquirer.get_transaction_receipts(
+            tx_hashes=tx_hashes,
+            call_order=[pruned, full],
+        )
+
+    assert receipts == {x: {'transactionHash': x.hex()} for x in tx_hashes[:2]}
+    # both nodes were asked for each missing receipt
+    assert receipt_queries == [tx_hashes[1], tx_hashes[1], tx_hashes[2], tx_hashes[2]]
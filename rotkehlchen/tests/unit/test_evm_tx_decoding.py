@@ -8,12 +8,18 @@ from rotkehlchen.accounting.structures.base import (
     HistoryEventSubType,
     HistoryEventType,
 )
-from rotkehlchen.chain.evm.decoding.constants import CPT_GAS
+from rotkehlchen.chain.ethereum.modules.uniswap.v2.decoder import SWAP_SIGNATURE
+from rotkehlchen.chain.evm.decoding.constants import CPT_GAS, ERC20_OR_ERC721_TRANSFER
+from rotkehlchen.chain.evm.decoding.decoder import DecodingRules
+from rotkehlchen.chain.evm.structures import EvmTxReceiptLog
 from rotkehlchen.chain.evm.types import EvmAccount, string_to_evm_address
 from rotkehlchen.constants.assets import A_ETH, A_SAI
 from rotkehlchen.db.evmtx import DBEvmTx
 from rotkehlchen.db.filtering import EvmTransactionsFilterQuery
+from rotkehlchen.errors.misc import RemoteError
+from rotkehlchen.errors.serialization import DeserializationError
 from rotkehlchen.fval import FVal
+from rotkehlchen.tests.utils.factories import make_evm_address
 from rotkehlchen.types import ChainID, EvmTransaction, Location, Timestamp, deserialize_evm_tx_hash
 from rotkehlchen.utils.hexbytes import hexstring_to_bytes
 
@@ -155,3 +161,117 @@ def test_decode_pending_transactions_different_chains(
     assert dbevmtx.get_transaction_hashes_no_receipt(tx_filter_query=None, limit=None) == [evmhash_opt, evmhash_eth_yabir]  # noqa: E501
     optimism_transactions.get_receipts_for_transactions_missing_them()
     assert dbevmtx.get_transaction_hashes_no_receipt(tx_filter_query=None, limit=None) == [evmhash_eth_yabir]  # noqa: E501
+
+
+def _make_log(topics: list[bytes]) -> EvmTxReceiptLog:
+    return EvmTxReceiptLog(
+        log_index=0,
+        data=b'',
+        address=make_evm_address(),
+        removed=False,
+        topics=topics,
+    )
+
+
+def test_event_rules_indexed_by_topic(ethereum_transaction_decoder):
+    """Test that the event rules of a log are the ones given with its topic0 along
+    with the ones given without signatures, in the order they were given"""
+    topic_a, topic_b = b'\x01' * 32, b'\x02' * 32
+    rules = DecodingRules(
+        address_mappings={},
+        event_rules=[
+            ((topic_a,), 'a_rule'),
+            'wildcard_rule',
+            ((topic_a, topic_b), 'a_and_b_rule'),
+        ],
+        token_enricher_rules=[],
+        post_decoding_rules=[],
+        all_counterparties=set(),
+    )
+    rules.index_event_rules()
+    assert rules.get_event_rules(_make_log([topic_a, topic_b])) == ['a_rule', 'wildcard_rule', 'a_and_b_rule']  # noqa: E501
+    assert rules.get_event_rules(_make_log([topic_b])) == ['wildcard_rule', 'a_and_b_rule']
+    assert rules.get_event_rules(_make_log([b'\x03' * 32])) == ['wildcard_rule']
+    assert rules.get_event_rules(_make_log([])) == ['wildcard_rule']
+
+    # all the rules of the ethereum decoder are given with the signatures they decode
+    decoder = ethereum_transaction_decoder
+    assert decoder.rules.wildcard_event_rules == []
+    assert decoder.rules.get_event_rules(_make_log([ERC20_OR_ERC721_TRANSFER])) == [decoder._maybe_decode_erc20_721_transfer]  # noqa: E501
+    assert {x.__qualname__ for x in decoder.rules.get_event_rules(_make_log([SWAP_SIGNATURE]))} == {  # noqa: E501
+        'SushiswapDecoder._maybe_decode_v2_swap',
+        'Uniswapv2Decoder._maybe_decode_v2_swap',
+    }
+
+
+@pytest.mark.parametrize('use_custom_database', ['ethtxs.db'])
+def test_decode_transaction_hashes_pipeline(ethereum_transaction_decoder, database):
+    """Test that decoding transaction hashes through the pipeline gives and saves the same
+    events as decoding the transactions one by one and that its counters add up"""
+    dbevmtx = DBEvmTx(database)
+    with database.conn.read_ctx() as cursor:
+        transactions = dbevmtx.get_evm_transactions(
+            cursor=cursor,
+            filter_=EvmTransactionsFilterQuery.make(chain_id=ChainID.ETHEREUM),
+            has_premium=True,
+        )[:7]
+        receipts = dbevmtx.get_receipts(cursor, [x.tx_hash for x in transactions], ChainID.ETHEREUM)  # noqa: E501
+    tx_hashes = [x.tx_hash for x in transactions]
+    decoder = ethereum_transaction_decoder
+    expected_events = []
+    for transaction in transactions:
+        expected_events.extend(decoder.decode_transaction(transaction, receipts[transaction.tx_hash]))  # noqa: E501
+
+    with patch('rotkehlchen.chain.evm.decoding.decoder.WRITE_BATCH_SIZE', new=3):
+        events = decoder.decode_transaction_hashes(ignore_cache=True, tx_hashes=tx_hashes)
+    assert len(events) == len(expected_events)
+    for event, expected_event in zip(events, expected_events):
+        assert_events_equal(event, expected_event)
+    stats = decoder.decoding_stats
+    assert stats.loaded_transactions == stats.decoded_transactions == 7
+    assert stats.cached_transactions == 0
+    assert stats.written_events == len(events)
+    assert stats.write_batches == 3
+    assert 1 <= stats.max_decode_queue_depth <= 7
+
+    with database.conn.read_ctx() as cursor:
+        assert cursor.execute('SELECT COUNT(*) FROM history_events').fetchone()[0] == len(events)  # noqa: E501
+        assert cursor.execute('SELECT COUNT(*) FROM evm_tx_mappings').fetchone()[0] == 7
+
+    # decoding them again without ignoring the cache reads the saved events
+    events = decoder.decode_transaction_hashes(ignore_cache=False, tx_hashes=tx_hashes)
+    assert len(events) == len(expected_events)
+    assert decoder.decoding_stats.cached_transactions == 7
+    assert decoder.decoding_stats.decoded_transactions == 0
+    assert decoder.decoding_stats.write_batches == 0
+
+    # an error while decoding stops the pipeline after writing what was decoded before it
+    with database.user_write() as write_cursor:
+        write_cursor.execute('DELETE FROM evm_tx_mappings')
+    decode_transaction = decoder._decode_transaction
+
+    def decode_or_fail(transaction, tx_receipt):
+        if transaction.tx_hash == tx_hashes[2]:
+            raise DeserializationError('decoding failed')
+        return decode_transaction(transaction=transaction, tx_receipt=tx_receipt)
+
+    with patch.object(decoder, '_decode_transaction', side_effect=decode_or_fail), pytest.raises(DeserializationError):  # noqa: E501
+        decoder.decode_transaction_hashes(ignore_cache=True, tx_hashes=tx_hashes)
+    assert decoder.decoding_stats.decoded_transactions == 2
+    assert decoder.decoding_stats.write_batches == 1
+    with database.conn.read_ctx() as cursor:
+        assert cursor.execute('SELECT COUNT(*) FROM evm_tx_mappings').fetchone()[0] == 2
+
+    # an error of the writer does not replace the error that stopped decoding
+    with patch.object(decoder, '_decode_transaction', side_effect=decode_or_fail), patch.object(decoder, '_write_decoded_events', side_effect=ValueError('writing failed')), pytest.raises(DeserializationError):  # noqa: E501
+        decoder.decode_transaction_hashes(ignore_cache=True, tx_hashes=tx_hashes)
+
+    # a failure to query the receipts of a batch is retried one by one
+    with patch.object(
+        decoder.transactions,
+        'get_or_query_transaction_receipts',
+        side_effect=RemoteError('node timed out'),
+    ) as receipts_mock:
+        events = decoder.decode_transaction_hashes(ignore_cache=False, tx_hashes=tx_hashes)
+    assert receipts_mock.call_count == 1
+    assert len(events) == len(expected_events)
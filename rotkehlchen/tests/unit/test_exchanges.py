@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from rotkehlchen.db.settings import ModifiableDBSettings
 from rotkehlchen.exchanges.ftx import Ftx
 from rotkehlchen.tests.utils.factories import make_api_key, make_api_secret
@@ -54,3 +56,27 @@ def test_exchanges_filtering(database, exchange_manager, function_scope_messages
             non_syncing_exchanges=[ftx1.location_id()],
         ))
         assert set(exchange_manager.iterate_exchanges()) == {ftx2, kraken1, kraken2}
+
+
+def test_exchange_balances_saved(database, inquirer, function_scope_messages_aggregator):  # pylint: disable=unused-argument  # noqa: E501
+    """Test that the balances of an exchange are saved so that they are available to a new
+    exchange object after a restart, and that they are deleted when its key changes"""
+    def make_kraken():
+        return MockKraken(
+            name='mockkraken',
+            api_key=make_api_key(),
+            secret=make_api_secret(),
+            database=database,
+            msg_aggregator=function_scope_messages_aggregator,
+        )
+
+    balances, msg = make_kraken().query_balances()
+    assert msg == '' and len(balances) != 0
+
+    kraken = make_kraken()
+    with patch.object(kraken, 'api_query', side_effect=AssertionError('should not query')):
+        assert kraken.query_balances() == (balances, '')
+
+    with patch.object(kraken, 'validate_api_key', return_value=(True, '')):
+        assert kraken.edit_exchange(name=None, api_key=make_api_key(), api_secret=None) == (True, '')  # noqa: E501
+    assert kraken.results_store.get(next(iter(kraken.persisted_results))) is None
@@ -1,3 +1,5 @@
+from decimal import InvalidOperation
+
 import pytest
 
 from rotkehlchen.constants import ZERO
@@ -157,3 +159,42 @@ def test_initialize_with_bool_fails():
     with pytest.raises(ValueError):
         FVal(True)
         FVal(False)
+
+
+def test_operation_results():
+    """Test that the results of operations are plain FVals that behave like the ones
+    created with the constructor and that the operands are not modified"""
+    a = FVal('0.100000000000000001')
+    b = FVal('3')
+    for result, expected in (
+            (a + b, '3.100000000000000001'),
+            (b - a, '2.899999999999999999'),
+            (a * b, '0.300000000000000003'),
+            (b / a, '29.99999999999999970000000000'),
+            (-a, '-0.100000000000000001'),
+            (abs(-a), '0.100000000000000001'),
+            (1 - a, '0.899999999999999999'),
+            (b % 2, '1'),
+    ):
+        assert isinstance(result, FVal)
+        assert result == FVal(expected)
+        assert str(result) == expected
+        assert FVal(result) == result
+
+    assert str(a) == '0.100000000000000001'
+    assert str(b) == '3'
+
+
+def test_nan_comparison_fails():
+    """Test that all comparisons with a NaN FVal raise instead of returning False"""
+    a = FVal('NaN')
+    for comparison in (
+            lambda: a == FVal(1),
+            lambda: FVal(1) == a,
+            lambda: a == 1,
+            lambda: a != ZERO,
+            lambda: a < 1,
+            lambda: a >= FVal(1),
+    ):
+        with pytest.raises(InvalidOperation):
+            comparison()
@@ -968,6 +968,51 @@ def test_asset_deletion(globaldb):
     )
 
 
+def test_evm_tokens_cache(globaldb):
+    """Test that get_evm_token keeps both tokens and addresses that are not tokens in memory
+    per chain and that adding, editing and deleting tokens cleans the cache"""
+    cache = globaldb.evm_tokens_cache
+    address, underlying_address = make_evm_address(), make_evm_address()
+    for _ in range(2):
+        assert globaldb.get_evm_token(address=address, chain_id=ChainID.ETHEREUM) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    token = EvmToken.initialize(
+        address=address,
+        chain_id=ChainID.ETHEREUM,
+        token_kind=EvmTokenKind.ERC20,
+        symbol='a',
+        name='b',
+        decimals=18,
+        underlying_tokens=[UnderlyingToken(
+            address=underlying_address,
+            token_kind=EvmTokenKind.ERC20,
+            weight=ONE,
+        )],
+    )
+    assert globaldb.get_evm_token(address=underlying_address, chain_id=ChainID.ETHEREUM) is None
+    globaldb.add_asset(asset_id=token.identifier, asset_type=AssetType.EVM_TOKEN, data=token)
+    for _ in range(2):
+        assert globaldb.get_evm_token(address=address, chain_id=ChainID.ETHEREUM) == token
+        assert globaldb.get_evm_token(address=address, chain_id=ChainID.OPTIMISM) is None
+        assert globaldb.get_evm_token(address=underlying_address, chain_id=ChainID.ETHEREUM).identifier == ethaddress_to_identifier(underlying_address)  # noqa: E501
+    assert (cache.hits, cache.misses) == (4, 5)
+
+    edited_token = EvmToken.initialize(
+        address=address,
+        chain_id=ChainID.ETHEREUM,
+        token_kind=EvmTokenKind.ERC20,
+        symbol='c',
+        name='d',
+        decimals=6,
+    )
+    globaldb.edit_evm_token(edited_token)
+    assert globaldb.get_evm_token(address=address, chain_id=ChainID.ETHEREUM) == edited_token
+    globaldb.delete_evm_token(address=address, chain_id=ChainID.ETHEREUM)
+    assert globaldb.get_evm_token(address=address, chain_id=ChainID.ETHEREUM) is None
+    assert (cache.hits, cache.misses) == (4, 7)
+
+
 def test_general_cache(globaldb):
     """Test that cache in the globaldb works properly. Tests insertion, deletion and reading."""
 
@@ -131,3 +131,36 @@ def test_get_historical_price(globaldb, historical_price_test_data):  # pylint:
         max_seconds_distance=3600,
     )
     assert price_entry is None
+
+
+def test_get_historical_price_equidistant(globaldb):
+    """Test that the exact timestamp is preferred and ties resolve to the earlier price"""
+    globaldb.add_historical_prices([HistoricalPrice(
+        from_asset=A_BTC,
+        to_asset=A_EUR,
+        source=source,
+        timestamp=Timestamp(timestamp),
+        price=Price(FVal(price)),
+    ) for source, timestamp, price in (
+        (HistoricalPriceOracle.CRYPTOCOMPARE, 1600000000, 10),
+        (HistoricalPriceOracle.COINGECKO, 1600000100, 11),
+        (HistoricalPriceOracle.CRYPTOCOMPARE, 1600000200, 12),
+    )])
+    for timestamp, expected_price in ((1600000050, 10), (1600000100, 11), (1600000151, 12)):
+        price_entry = globaldb.get_historical_price(
+            from_asset=A_BTC,
+            to_asset=A_EUR,
+            timestamp=timestamp,
+            max_seconds_distance=3600,
+        )
+        assert price_entry.price == FVal(expected_price)
+
+    # with a source only the prices of that source are considered
+    price_entry = globaldb.get_historical_price(
+        from_asset=A_BTC,
+        to_asset=A_EUR,
+        timestamp=1600000100,
+        max_seconds_distance=3600,
+        source=HistoricalPriceOracle.CRYPTOCOMPARE,
+    )
+    assert price_entry.timestamp == 1600000000
@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 
 from rotkehlchen.accounting.ledger_actions import LedgerAction, LedgerActionType
@@ -7,16 +9,20 @@ from rotkehlchen.accounting.structures.balance import Balance
 from rotkehlchen.accounting.structures.base import HistoryBaseEntry
 from rotkehlchen.accounting.structures.types import HistoryEventSubType, HistoryEventType
 from rotkehlchen.chain.ethereum.modules.eth2.structures import ValidatorDailyStats
+from rotkehlchen.chain.evm.decoding.decoder import EVMTransactionDecoder
+from rotkehlchen.chain.evm.transactions import EvmTransactions
 from rotkehlchen.constants import ONE, ZERO
 from rotkehlchen.constants.assets import A_ETH, A_ETH2, A_USDC
 from rotkehlchen.db.filtering import LedgerActionsFilterQuery
+from rotkehlchen.db.history_events import DBHistoryEvents
 from rotkehlchen.db.ledger_actions import DBLedgerActions
+from rotkehlchen.exchanges.data_structures import Trade
 from rotkehlchen.fval import FVal
 from rotkehlchen.history.types import HistoricalPriceOracle
 from rotkehlchen.tests.utils.accounting import accounting_history_process, check_pnls_and_csv
 from rotkehlchen.tests.utils.history import prices
 from rotkehlchen.tests.utils.messages import no_message_errors
-from rotkehlchen.types import Location
+from rotkehlchen.types import Location, Timestamp, TimestampMS, TradeType
 
 
 def test_query_ledger_actions(events_historian, function_scope_messages_aggregator):
@@ -162,3 +168,82 @@ def test_pnl_processing_with_eth2_staking_setting(accountant, db_settings):
             AccountingEventType.STAKING: PNL(taxable=FVal('20.55537445038'), free=ZERO),
         })
     check_pnls_and_csv(accountant, expected_pnls, None)
+
+
+def test_get_history_merges_sources(events_historian, function_scope_messages_aggregator):
+    """Test that the history is returned as a lazy stream merged from each source
+    in timestamp order, with history events of the same second ordered by sequence index"""
+    db = events_historian.db
+    trade = Trade(
+        timestamp=Timestamp(1600000010),
+        location=Location.EXTERNAL,
+        base_asset=A_ETH,
+        quote_asset=A_USDC,
+        trade_type=TradeType.BUY,
+        amount=ONE,
+        rate=FVal(400),
+        fee=None,
+        fee_currency=None,
+        link=None,
+    )
+    action = LedgerAction(
+        identifier=1,
+        timestamp=Timestamp(1600000005),
+        action_type=LedgerActionType.INCOME,
+        location=Location.EXTERNAL,
+        amount=ONE,
+        asset=A_ETH,
+        rate=None,
+        rate_asset=None,
+        link=None,
+        notes=None,
+    )
+    history_events = [HistoryBaseEntry(
+        event_identifier=HistoryBaseEntry.deserialize_event_identifier('XXX'),
+        sequence_index=sequence_index,
+        timestamp=TimestampMS(timestamp),
+        location=Location.KRAKEN,
+        location_label='Kraken 1',
+        asset=A_ETH,
+        balance=Balance(amount=ONE),
+        notes=None,
+        event_type=HistoryEventType.STAKING,
+        event_subtype=HistoryEventSubType.REWARD,
+    ) for sequence_index, timestamp in ((1, 1600000010100), (0, 1600000010900), (2, 1600000000000))]  # noqa: E501
+    with db.user_write() as write_cursor:
+        db.add_trades(write_cursor, [trade])
+        DBLedgerActions(db, function_scope_messages_aggregator).add_ledger_action(write_cursor, action)  # noqa: E501
+        DBHistoryEvents(db).add_history_events(write_cursor, history_events)
+
+    # no transactions to query or decode in this test
+    query_patch = patch.object(EvmTransactions, 'query_chain')
+    receipts_patch = patch.object(EvmTransactions, 'get_receipts_for_transactions_missing_them')
+    decode_patch = patch.object(EVMTransactionDecoder, 'get_and_decode_undecoded_transactions')
+    with query_patch, receipts_patch, decode_patch:
+        error_or_empty, history = events_historian.get_history(
+            start_ts=Timestamp(0),
+            end_ts=Timestamp(1600000100),
+            has_premium=True,
+        )
+    assert error_or_empty == ''
+    assert not isinstance(history, list)
+    assert [
+        (x.get_timestamp(), x.sequence_index if isinstance(x, HistoryBaseEntry) else type(x))
+        for x in history
+    ] == [
+        (1600000000, 2),
+        (1600000005, LedgerAction),
+        (1600000010, 0),
+        (1600000010, Trade),  # equal keys keep the order of the sources
+        (1600000010, 1),
+    ]
+    # the sources are counted and skip the earlier events without reading them
+    assert history.count() == 5
+    assert sum(events_num for events_num, _ in history.summarize()) == 5
+    assert sum(events_num for events_num, _ in history.summarize(before_ts=Timestamp(1600000010))) == 2  # noqa: E501
+    assert [x.get_timestamp() for x in history.iterate(from_ts=Timestamp(1600000005))] == [
+        1600000005,
+        1600000010,
+        1600000010,
+        1600000010,
+    ]
@@ -4,7 +4,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from rotkehlchen.constants.assets import A_BTC, A_USD
+from rotkehlchen.constants.assets import A_BTC, A_ETH, A_USD
 from rotkehlchen.errors.price import NoPriceForGivenTimestamp, PriceQueryUnsupportedAsset
 from rotkehlchen.externalapis.coingecko import Coingecko
 from rotkehlchen.externalapis.cryptocompare import Cryptocompare
@@ -12,6 +12,7 @@ from rotkehlchen.externalapis.defillama import Defillama
 from rotkehlchen.fval import FVal
 from rotkehlchen.globaldb.manual_price_oracles import ManualPriceOracle
 from rotkehlchen.history.price import PriceHistorian
+from rotkehlchen.history.price_cache import PriceSeriesCache
 from rotkehlchen.history.types import (
     DEFAULT_HISTORICAL_PRICE_ORACLES_ORDER,
     HistoricalPrice,
@@ -212,3 +213,118 @@ def test_manual_oracle_correctly_returns_price(globaldb, fake_price_historian):
             to_asset=A_USD,
             timestamp=Timestamp(1610595466),
         )
+
+
+def test_price_series_cache(globaldb, fake_price_historian):
+    """Test that the report price cache follows the oracles order, only falls back
+    to querying the oracles when a price is not saved and evicts least used pairs"""
+    price_historian = fake_price_historian
+    globaldb.add_historical_prices([HistoricalPrice(
+        from_asset=A_BTC,
+        to_asset=A_USD,
+        source=source,
+        timestamp=Timestamp(timestamp),
+        price=Price(FVal(price)),
+    ) for source, timestamp, price in (
+        (HistoricalPriceOracle.MANUAL, 1611590000, 1),
+        (HistoricalPriceOracle.CRYPTOCOMPARE, 1611590000, 2),
+        (HistoricalPriceOracle.CRYPTOCOMPARE, 1611600000, 3),
+        (HistoricalPriceOracle.CRYPTOCOMPARE, 1611607200, 4),
+        (HistoricalPriceOracle.COINGECKO, 1611600000, 5),
+    )])
+    series_cache = PriceSeriesCache()
+    oracle_instances = price_historian._oracle_instances
+    oracle_instances[1].query_historical_price.return_value = Price(FVal(6))
+    for timestamp, expected_price in (
+            (1611590500, 1),  # manual price first
+            (1611600500, 3),  # manual misses so cryptocompare
+            (1611603600, 3),  # equally close prices
+            (1611603601, 4),
+            (1611620000, 6),  # no saved cryptocompare price so query it
+            (1611620000, 6),  # the queried price is remembered
+    ):
+        price = price_historian.query_historical_price(
+            from_asset=A_BTC,
+            to_asset=A_USD,
+            timestamp=Timestamp(timestamp),
+            series_cache=series_cache,
+        )
+        assert price == FVal(expected_price)
+
+    assert oracle_instances[1].query_historical_price.call_count == 1
+    assert series_cache.hits == 5
+    assert series_cache.misses == 1
+
+    # when cryptocompare is not used the coingecko prices are within a day
+    price_historian.set_oracles_order([HistoricalPriceOracle.COINGECKO])
+    assert price_historian.query_historical_price(
+        from_asset=A_BTC,
+        to_asset=A_USD,
+        timestamp=Timestamp(1611650000),
+        series_cache=series_cache,
+    ) == FVal(5)
+
+    # only the most recently used pair is kept when the cache is too small
+    series_cache.max_bytes = series_cache.size - 1
+    price_historian.query_historical_price(
+        from_asset=A_ETH,
+        to_asset=A_USD,
+        timestamp=Timestamp(1611650000),
+        series_cache=series_cache,
+    )
+    assert list(series_cache.pairs) == [(A_ETH.identifier, A_USD.identifier)]
+
+
+def test_prefetch_historical_prices(globaldb, fake_price_historian):
+    """Test that prefetching asks each oracle once per pair and hour only for the
+    prices that are not saved or found by the oracles before it and remembers the
+    ones that are not found"""
+    price_historian = fake_price_historian
+    globaldb.add_single_historical_price(HistoricalPrice(
+        from_asset=A_BTC,
+        to_asset=A_USD,
+        source=HistoricalPriceOracle.CRYPTOCOMPARE,
+        timestamp=Timestamp(1611590000),
+        price=Price(FVal(30000)),
+    ))
+    cryptocompare = price_historian._oracle_instances[1]
+
+    def mock_query_historical_price(from_asset, to_asset, timestamp):
+        if from_asset == A_ETH:
+            raise NoPriceForGivenTimestamp(from_asset=from_asset, to_asset=to_asset, time=timestamp)  # noqa: E501
+        return Price(FVal(31000))
+
+    cryptocompare.query_historical_price.side_effect = mock_query_historical_price
+    for oracle_instance in price_historian._oracle_instances[2:]:
+        oracle_instance.query_historical_price.side_effect = NoPriceForGivenTimestamp(from_asset=A_ETH, to_asset=A_USD, time=0)  # noqa: E501
+    series_cache = PriceSeriesCache()
+    not_found = price_historian.prefetch_historical_prices(
+        queries=[
+            (A_BTC, A_USD, Timestamp(1611590100)),  # saved
+            (A_BTC, A_USD, Timestamp(1611630010)),
+            (A_BTC, A_USD, Timestamp(1611632000)),  # same hour as the previous one
+            (A_ETH, A_USD, Timestamp(1611630010)),
+            (A_USD, A_USD, Timestamp(1611630010)),
+        ],
+        series_cache=series_cache,
+    )
+    assert cryptocompare.query_historical_price.call_count == 2
+    # the hourly history is saved once per pair before querying the single prices
+    assert cryptocompare.query_and_store_historical_data.call_count == 2
+    # only the price that cryptocompare did not find is asked from the next oracle
+    assert price_historian._oracle_instances[2].query_historical_price.call_count == 1
+    assert [(x.from_asset, x.time) for x in not_found] == [(A_ETH, 1611630010)]
+    assert series_cache.get_price(
+        from_asset=A_BTC,
+        to_asset=A_USD,
+        timestamp=Timestamp(1611632000),
+        oracles=DEFAULT_HISTORICAL_PRICE_ORACLES_ORDER,
+    ) == Price(FVal(31000))
+    with pytest.raises(NoPriceForGivenTimestamp):
+        price_historian.query_historical_price(
+            from_asset=A_ETH,
+            to_asset=A_USD,
+            timestamp=Timestamp(1611630010),
+            series_cache=series_cache,
+        )
+    assert cryptocompare.query_historical_price.call_count == 2
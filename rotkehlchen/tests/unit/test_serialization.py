@@ -1,3 +1,6 @@
+import json
+from json.decoder import JSONDecodeError
+
 import pytest
 
 from rotkehlchen.accounting.structures.balance import BalanceType
@@ -20,7 +23,7 @@ from rotkehlchen.types import (
     TradeType,
     deserialize_evm_tx_hash,
 )
-from rotkehlchen.utils.serialization import pretty_json_dumps, rlk_jsondumps
+from rotkehlchen.utils.serialization import jsonloads_array_items, pretty_json_dumps, rlk_jsondumps
 
 TEST_DATA = {
     'a': FVal('5.4'),
@@ -48,6 +51,30 @@ def test_pretty_json_dumps():
     assert result
 
 
+def _array_items(text: str, chunk_size: int) -> list:
+    chunks = iter([text[idx:idx + chunk_size] for idx in range(0, len(text), chunk_size)])
+    start = ''
+    while '[' not in start:
+        start += next(chunks)
+    return list(jsonloads_array_items(chunks, start, start.index('[') + 1))
+
+
+def test_jsonloads_array_items():
+    """Test that the items of a JSON array are parsed the same no matter how the text of
+    the document is split while it arrives"""
+    items = [{'a': 'b[,]', 'c': [1, 2.5, None]}, 1234567, 'foo', [], {}, True, -1.5e10]
+    text = '{"result": [ ' + ' ,\n'.join(json.dumps(x) for x in items) + ' ], "other": 1}'
+    for chunk_size in (1, 2, 3, 7, 16, len(text)):
+        assert _array_items(text, chunk_size) == items
+
+    assert _array_items('{"result": [ ]}', 1) == []
+    assert _array_items('[12]', 1) == [12]
+    for bad_text in ('[1, 2', '[1,]', '[1 2]', '[{"a": 1]', '[1, 2, {"a"'):
+        for chunk_size in (1, 3, len(bad_text)):
+            with pytest.raises(JSONDecodeError):
+                _array_items(bad_text, chunk_size)
+
+
 def test_deserialize_trade_type():
     assert TradeType.deserialize('buy') == TradeType.BUY
     assert TradeType.deserialize('LIMIT_BUY') == TradeType.BUY
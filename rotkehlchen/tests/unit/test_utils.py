@@ -3,6 +3,7 @@ import time
 from json.decoder import JSONDecodeError
 from unittest.mock import patch
 
+import gevent
 import pytest
 from eth_typing import HexAddress, HexStr
 from eth_utils import to_checksum_address
@@ -23,7 +24,15 @@ from rotkehlchen.utils.misc import (
     pairwise_longest,
     timestamp_to_date,
 )
-from rotkehlchen.utils.mixins.cacheable import CacheableMixIn, cache_response_timewise
+from rotkehlchen.utils.mixins.cacheable import (
+    CacheableMixIn,
+    ResultSerializer,
+    ResultsStore,
+    _copy_containers,
+    cache_response_timewise,
+    cache_response_timewise_immutable,
+)
+from rotkehlchen.utils.ratelimit import RequestScheduler, TokenBucket
 from rotkehlchen.utils.serialization import jsonloads_dict, jsonloads_list
 from rotkehlchen.utils.version_check import get_current_version
 
@@ -198,6 +207,48 @@ class Foo(CacheableMixIn):
         self.do_something_arguments_dont_matter_count += 1
         return arg1 + arg2
 
+    @cache_response_timewise(ttl_secs=60)
+    def do_sum_short_ttl(self, arg1, arg2, **kwargs):  # pylint: disable=unused-argument
+        self.do_sum_call_count += 1
+        return arg1 + arg2
+
+
+class MemoryResultsStore(ResultsStore):
+    """Keeps the saved results in memory, like a DB would across restarts"""
+
+    def __init__(self):
+        self.results = {}
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def set(self, key, timestamp, value):
+        self.results[key] = (timestamp, value)
+
+    def delete(self, key):
+        self.results.pop(key, None)
+
+    def clear(self):
+        self.results.clear()
+
+
+class Bar(CacheableMixIn):
+
+    persisted_results = {'get_balances': ResultSerializer(
+        serialize=lambda result: {key: str(value) for key, value in result.items()},
+        deserialize=lambda value: {key: FVal(entry) for key, entry in value.items()},
+    )}
+
+    def __init__(self, results_store):
+        super().__init__()
+        self.results_store = results_store
+        self.get_balances_call_count = 0
+
+    @cache_response_timewise()
+    def get_balances(self, **kwargs):  # pylint: disable=unused-argument
+        self.get_balances_call_count += 1
+        return {'BTC': FVal(self.get_balances_call_count)}
+
 
 def test_cache_response_timewise():
     """Test that cached value is called and not the function again"""
@@ -247,6 +298,119 @@ def test_cache_response_timewise_with_arguments_matter_false():
     assert instance.do_something_arguments_dont_matter_count == 2
 
 
+def test_cache_response_timewise_ttl_and_eviction():
+    """Test that a function can have its own cache ttl and that the least recently used
+    results are evicted from the memory cache"""
+    instance = Foo()
+    now = 1000
+    with patch('rotkehlchen.utils.mixins.cacheable.ts_now', side_effect=lambda: now):
+        assert instance.do_sum_short_ttl(1, 1) == 2
+        now += 59
+        assert instance.do_sum_short_ttl(1, 1) == 2
+        assert instance.do_sum_call_count == 1
+        now += 1
+        assert instance.do_sum_short_ttl(1, 1) == 2
+        assert instance.do_sum_call_count == 2
+
+        instance.cache_ttl_secs = 0  # the object's cache being disabled also disables it
+        assert instance.do_sum_short_ttl(1, 1) == 2
+        assert instance.do_sum_call_count == 3
+
+    instance = Foo()
+    instance.results_cache.max_entries = 2
+    assert instance.do_sum(1, 1) == 2
+    assert instance.do_sum(2, 2) == 4
+    assert instance.do_sum(1, 1) == 2
+    assert instance.do_sum(3, 3) == 6  # evicts the result of do_sum(2, 2)
+    assert len(instance.results_cache) == 2
+    assert instance.do_sum_call_count == 3
+    assert instance.do_sum(1, 1) == 2
+    assert instance.do_sum(2, 2) == 4
+    assert instance.do_sum_call_count == 4
+
+
+def test_cache_response_timewise_persisted():
+    """Test that persisted results are read from the results store by a new object, and
+    that stale ones are returned while they are refreshed in the background"""
+    store = MemoryResultsStore()
+    now = 1000
+    with patch('rotkehlchen.utils.mixins.cacheable.ts_now', side_effect=lambda: now):
+        instance = Bar(store)
+        assert instance.get_balances() == {'BTC': FVal(1)}
+        assert len(store.results) == 1
+
+        now += 10  # as if restarted before the result expired
+        instance = Bar(store)
+        assert instance.get_balances() == {'BTC': FVal(1)}
+        assert instance.get_balances_call_count == 0
+
+        now += instance.cache_ttl_secs  # restarted after the result expired
+        instance = Bar(store)
+        instance.get_balances_call_count = 1  # to tell the refreshed result apart
+        assert instance.get_balances() == {'BTC': FVal(1)}
+        assert instance.get_balances() == {'BTC': FVal(1)}  # refreshed only once
+        assert instance.get_balances_call_count == 1
+        gevent.sleep(0.01)  # let the refresh run
+        assert instance.get_balances_call_count == 2
+        assert instance.get_balances() == {'BTC': FVal(2)}
+        assert list(store.results.values()) == [(now, {'BTC': '2'})]
+
+        instance.clear_cache()
+        assert len(store.results) == 0
+        assert len(instance.results_cache) == 0
+
+
+def test_cache_response_timewise_ignore_persisted_and_clear():
+    """Test that only the results read from the results store are skipped with
+    ignore_persisted_cache and that a query running while the cache gets cleared
+    does not save its result"""
+    store = MemoryResultsStore()
+    instance = Bar(store)
+    assert instance.get_balances() == {'BTC': FVal(1)}
+    # queried since the start so it's used
+    assert instance.get_balances(ignore_persisted_cache=True) == {'BTC': FVal(1)}
+    assert instance.get_balances_call_count == 1
+
+    instance = Bar(store)  # as if restarted
+    instance.get_balances_call_count = 1  # to tell the queried result apart
+    assert instance.get_balances(ignore_persisted_cache=True) == {'BTC': FVal(2)}
+    assert instance.get_balances(ignore_persisted_cache=True) == {'BTC': FVal(2)}
+    assert instance.get_balances_call_count == 2
+    assert [x[1] for x in store.results.values()] == [{'BTC': '2'}]
+
+    class ClearedBar(Bar):
+        @cache_response_timewise()
+        def get_balances(self, **kwargs):  # pylint: disable=unused-argument
+            self.clear_cache()  # as if the object was removed while querying
+            return {'BTC': FVal(3)}
+
+    instance = ClearedBar(store)
+    assert instance.get_balances(ignore_cache=True) == {'BTC': FVal(3)}
+    assert len(store.results) == 0
+    assert len(instance.results_cache) == 0
+
+
+def test_cache_response_timewise_immutable():
+    """Test that the containers of the results are copied but not their contents"""
+    class Baz(CacheableMixIn):
+        @cache_response_timewise_immutable()
+        def get_entries(self):  # pylint: disable=no-self-use
+            return {'a': [Foo, FVal(1)], 'b': (FVal(2), {3})}, 1
+
+    instance = Baz()
+    result, _ = instance.get_entries()
+    result['a'].append(3)
+    result['b'][1].add(4)
+    result.pop('b')
+    cached_result, _ = instance.get_entries()
+    assert cached_result == {'a': [Foo, FVal(1)], 'b': (FVal(2), {3})}
+    assert cached_result['a'][1] is result['a'][1]
+
+    value = {'a': {'b': [1]}}
+    copied = _copy_containers(value)
+    assert copied == value and copied['a'] is not value['a']
+
+
 def test_convert_to_int():
     assert convert_to_int('5') == 5
     assert convert_to_int('37451082560000003241000000000003221111111111') == 37451082560000003241000000000003221111111111  # noqa: E501
@@ -393,3 +557,48 @@ def test_pairwise():
     a = [1, 2, 3, 4, 5]
     assert [x + y for x, y in pairwise(a)] == [3, 7]
     assert list(pairwise_longest(a)) == [(1, 2), (3, 4), (5, None)]
+
+
+def test_token_bucket():
+    """Test that the token bucket lets through bursts up to its capacity, then limits the
+    rate of the requests of all greenlets and that heavy requests make the next ones wait"""
+    bucket = TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    assert bucket.acquire() == bucket.acquire() == 0
+    served = []
+    greenlets = [gevent.spawn(lambda x: (bucket.acquire(), served.append(x)), idx) for idx in range(5)]  # noqa: E501
+    gevent.joinall(greenlets, raise_error=True)
+    assert time.monotonic() - start >= 0.09  # 5 requests at 50 per second
+    assert served == list(range(5))
+
+    bucket = TokenBucket(rate=50, capacity=2)
+    assert bucket.acquire(weight=4) == 0  # heavier than the bucket. Leaves it in debt
+    assert bucket.acquire() >= 0.05
+
+    bucket.set_rate(rate=1000)
+    assert bucket.capacity == 1000
+    assert bucket.tokens <= 2
+
+
+def test_request_scheduler():
+    """Test that the request scheduler weighs the requests per endpoint, is held back by a
+    pause and counts the time the requests waited"""
+    scheduler = RequestScheduler()
+    assert scheduler.acquire('balances') == 0  # not limited before registering a limit
+    scheduler.register_limit(rate=100, capacity=4, weights={'trades': 4})
+    assert scheduler.acquire('trades') == 0
+    assert scheduler.acquire('balances') >= 0.009
+    assert scheduler.acquire('trades') >= 0.039
+
+    scheduler.register_limit(rate=1000)
+    scheduler.pause(0.05)
+    greenlets = [gevent.spawn(scheduler.acquire, 'balances') for _ in range(3)]
+    gevent.joinall(greenlets, raise_error=True)
+    assert all(x.get() >= 0.04 for x in greenlets)
+
+    stats = scheduler.serialize()
+    assert stats['rate'] == stats['capacity'] == 1000
+    assert stats['requests'] == 7
+    assert stats['delayed_requests'] == 5
+    assert stats['waited_seconds'] >= 0.17
+    assert stats['max_waited_seconds'] >= 0.039
@@ -18,6 +18,7 @@ from rotkehlchen.utils.version_check import get_current_version
 
 if TYPE_CHECKING:
     from rotkehlchen.accounting.accountant import Accountant
+    from rotkehlchen.accounting.pot import AccountingPot
     from rotkehlchen.db.dbhandler import DBHandler
     from rotkehlchen.rotkehlchen import Rotkehlchen
     from rotkehlchen.tests.fixtures.google import GoogleService
@@ -85,6 +86,24 @@ def _get_pnl_report_after_processing(
     return report, events
 
 
+def get_pot_processed_events(pot: 'AccountingPot') -> list[ProcessedAccountingEvent]:
+    """Returns the events processed by the pot so far in the order they were processed.
+
+    They are only kept in the report data of the DB, where the latest ones may still be
+    buffered to be written."""
+    assert pot.report_data is not None, 'pot should have been reset before processing'
+    with pot.database.conn_transient.read_ctx() as cursor:
+        written = cursor.execute(
+            'SELECT timestamp, data FROM pnl_events WHERE report_id=? ORDER BY identifier',
+            (pot.report_id,),
+        ).fetchall()
+    buffered = [(timestamp, data) for _, timestamp, data in pot.report_data.pending]
+    return [
+        ProcessedAccountingEvent.deserialize_from_db(timestamp, data)
+        for timestamp, data in written + buffered
+    ]
+
+
 def accounting_create_and_process_history(
         rotki: 'Rotkehlchen',
         start_ts: Timestamp,
@@ -251,7 +270,8 @@ def assert_csv_export(
     If google_service exists then it's also uploaded to a sheet to check the formular rendering
     """
     csvexporter = accountant.csvexporter
-    if len(accountant.pots[0].processed_events) == 0:
+    events = get_pot_processed_events(accountant.pots[0])
+    if len(events) == 0:
         return  # nothing to do for no events as no csv is generated
 
     with tempfile.TemporaryDirectory() as tmpdirname:
@@ -259,7 +279,7 @@ def assert_csv_export(
         # first make sure we export without formulas
         csvexporter.settings = csvexporter.settings._replace(pnl_csv_with_formulas=False)
         accountant.csvexporter.export(
-            events=accountant.pots[0].processed_events,
+            events=events,
             pnls=accountant.pots[0].pnls,
             directory=tmpdir,
         )
@@ -283,7 +303,7 @@ def assert_csv_export(
         # export with formulas and summary
         csvexporter.settings = csvexporter.settings._replace(pnl_csv_with_formulas=True, pnl_csv_have_summary=True)  # noqa: E501
         accountant.csvexporter.export(
-            events=accountant.pots[0].processed_events,
+            events=events,
             pnls=accountant.pots[0].pnls,
             directory=tmpdir,
         )
@@ -596,6 +596,9 @@ def create_test_binance(
 
     binance._symbols_to_pair = create_binance_symbols_to_pair(json_data, location)
     binance.first_connection_made = True
+    # querying the trades of all the markets of the test data within the request weight
+    # limit would take minutes and the api is mocked anyway
+    binance.request_scheduler.register_limit(rate=1000000)
     return binance
 
 
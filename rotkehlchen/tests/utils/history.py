@@ -1150,7 +1150,7 @@ def maybe_mock_historical_price_queries(
     # the list of assets to not mock is non empty.
     original_function = historian.query_historical_price
 
-    def mock_historical_price_query(from_asset, to_asset, timestamp):
+    def mock_historical_price_query(from_asset, to_asset, timestamp, series_cache=None):
         if from_asset == to_asset:
             return ONE
 
@@ -1158,7 +1158,7 @@ def maybe_mock_historical_price_queries(
             from_asset = A_ETH
 
         if from_asset in dont_mock_price_for:
-            return original_function(from_asset, to_asset, timestamp)
+            return original_function(from_asset, to_asset, timestamp, series_cache)
 
         if (from_asset, timestamp) in force_no_price_found_for:
             raise NoPriceForGivenTimestamp(
@@ -1181,7 +1181,11 @@ def maybe_mock_historical_price_queries(
 
         return price
 
+    def mock_prefetch_historical_prices(queries, series_cache, concurrency=None):  # pylint: disable=unused-argument  # noqa: E501
+        return []  # with mocked prices there is nothing to prefetch
+
     historian.query_historical_price = mock_historical_price_query
+    historian.prefetch_historical_prices = mock_prefetch_historical_prices
 
 
 def assert_pnl_debug_import(filepath: Path, database: DBHandler) -> None:
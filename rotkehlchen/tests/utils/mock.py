@@ -2,7 +2,7 @@ import json
 import re
 from collections import namedtuple
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 from unittest.mock import patch
 
 import requests
@@ -34,6 +34,13 @@ class MockResponse():
     def json(self) -> dict[str, Any]:
         return json.loads(self.text)
 
+    def iter_content(self, chunk_size: int = 1) -> Iterator[bytes]:
+        for idx in range(0, len(self.content), chunk_size):
+            yield self.content[idx:idx + chunk_size]
+
+    def close(self) -> None:
+        pass
+
 
 class MockEth():
 
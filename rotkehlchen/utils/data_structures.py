@@ -5,17 +5,24 @@ RT = TypeVar('RT')
 
 
 class LRUCacheWithRemove(Generic[RT]):
-    """Create a LRU cache with the option to remove keys from the cache"""
+    """Create a LRU cache with the option to remove keys from the cache
+
+    Counts the hits and misses of get to see how well the cache works.
+    """
 
     def __init__(self, maxsize: int = 512):
         self.cache: OrderedDict[str, RT] = collections.OrderedDict()
         self.maxsize: int = maxsize
+        self.hits = 0
+        self.misses = 0
 
     def get(self, key: str) -> Optional[RT]:
         lowered_key = key.lower()
         if lowered_key in self.cache:
+            self.hits += 1
             self.cache.move_to_end(lowered_key)
             return self.cache[lowered_key]
+        self.misses += 1
         return None
 
     def set(self, key: str, value: RT) -> None:
@@ -1,25 +1,101 @@
-from copy import deepcopy
+import logging
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from copy import copy
 from functools import wraps
-from typing import TYPE_CHECKING, Any, Callable, NamedTuple
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Optional
 
+import gevent
+
+from rotkehlchen.errors.serialization import DeserializationError
+from rotkehlchen.logging import RotkehlchenLogsAdapter
 from rotkehlchen.utils.misc import ts_now
 
-from .common import function_sig_key
+from .common import function_sig
 
 if TYPE_CHECKING:
     from rotkehlchen.types import Timestamp
 
+logger = logging.getLogger(__name__)
+log = RotkehlchenLogsAdapter(logger)
+
 
 class ResultCache(NamedTuple):
     """Represents a time-cached result of some API query"""
-    result: dict
+    result: Any
     timestamp: 'Timestamp'
+    persisted: bool = False  # True if it was loaded from the results store
 
 
 # Seconds for which cached api queries will be cached
 # By default 10 minutes.
 # TODO: Make configurable!
 CACHE_RESPONSE_FOR_SECS = 600
+# Results kept in memory per object. The least recently used are evicted first.
+CACHE_MAX_ENTRIES = 256
+# Persisted results older than their ttl but younger than this are still returned,
+# while they are queried again in the background, so that they are available right
+# after a restart
+PERSISTED_RESULTS_MAX_AGE_SECS = 86400
+
+
+class ResultSerializer(NamedTuple):
+    """How the results of a method are saved in a ResultsStore
+
+    serialize returns a json serializable value, or None if the result should not be
+    saved, for example because it is an error. deserialize may raise DeserializationError.
+    """
+    serialize: Callable[[Any], Optional[Any]]
+    deserialize: Callable[[Any], Any]
+
+
+class ResultsStore(metaclass=ABCMeta):
+    """Persistent storage of the cached results of an object"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[tuple['Timestamp', Any]]:
+        """Returns the timestamp and the serialized result saved for the key, if any"""
+
+    @abstractmethod
+    def set(self, key: str, timestamp: 'Timestamp', value: Any) -> None:
+        """Saves the serialized result for the key, replacing any older one"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Deletes the result saved for the key, if any"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Deletes all the results of the object"""
+
+
+class MemoryResultsCache:
+    """In memory cache of the results of an object holding at most max_entries"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, ResultCache] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[ResultCache]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: ResultCache) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.entries.clear()
 
 
 class CacheableMixIn:
@@ -29,21 +105,112 @@ class CacheableMixIn:
     use the @cache_response_timewise decorator
     """
 
+    # Methods whose results are also saved in the results store, if the object has one
+    persisted_results: dict[str, ResultSerializer] = {}
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
-        self.results_cache: dict[int, ResultCache] = {}
+        self.results_cache = MemoryResultsCache()
+        self.results_store: Optional[ResultsStore] = None
+        self.refreshing_results: set[str] = set()  # keys being refreshed in the background
+        # increased when the cache is cleared so that queries that were already running
+        # don't save their results in the cleared cache
+        self.cache_generation = 0
         # Can also be 0 which means cache is disabled.
         self.cache_ttl_secs = CACHE_RESPONSE_FOR_SECS
 
     def flush_cache(self, name: str, *args: Any, **kwargs: Any) -> None:
-        cache_key = function_sig_key(
+        cache_key = function_sig(
             name,
             True,  # arguments_matter
             True,  # skip_ignore_cache
             *args,
             **kwargs,
         )
-        self.results_cache.pop(cache_key, None)
+        self.results_cache.pop(cache_key)
+        if self.results_store is not None and name in self.persisted_results:
+            self.results_store.delete(cache_key)
+
+    def clear_cache(self) -> None:
+        """Removes all cached results, including the persisted ones"""
+        self.cache_generation += 1
+        self.results_cache.clear()
+        if self.results_store is not None:
+            self.results_store.clear()
+
+
+def _load_persisted_result(
+        wrappingobj: CacheableMixIn,
+        name: str,
+        cache_key: str,
+) -> Optional[ResultCache]:
+    serializer = wrappingobj.persisted_results.get(name)
+    if serializer is None or wrappingobj.results_store is None:
+        return None
+
+    saved = wrappingobj.results_store.get(cache_key)
+    if saved is None:
+        return None
+
+    timestamp, value = saved
+    try:
+        result = serializer.deserialize(value)
+    except DeserializationError as e:
+        log.warning(f'Could not deserialize the saved result of {name}: {str(e)}')
+        wrappingobj.results_store.delete(cache_key)
+        return None
+
+    return ResultCache(result=result, timestamp=timestamp, persisted=True)
+
+
+def _save_result(
+        wrappingobj: CacheableMixIn,
+        name: str,
+        cache_key: str,
+        result: Any,
+        now: 'Timestamp',
+        generation: int,
+) -> None:
+    if generation != wrappingobj.cache_generation:
+        log.debug(f'Not caching the result of {name} since the cache was cleared while querying it')  # noqa: E501
+        return
+
+    wrappingobj.results_cache.set(cache_key, ResultCache(result=result, timestamp=now))
+    serializer = wrappingobj.persisted_results.get(name)
+    if serializer is None or wrappingobj.results_store is None:
+        return
+
+    value = serializer.serialize(result)
+    if value is not None:  # else keep any older saved result
+        wrappingobj.results_store.set(cache_key, now, value)
+
+
+def _refresh_in_background(
+        wrappingobj: CacheableMixIn,
+        name: str,
+        cache_key: str,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+) -> None:
+    """Queries the method again in a new greenlet, which updates the cache"""
+    if cache_key in wrappingobj.refreshing_results:
+        return
+
+    generation = wrappingobj.cache_generation
+
+    def refresh() -> None:
+        try:
+            if wrappingobj.cache_generation != generation:
+                return  # the cache was cleared, for example because the object was removed
+            # call it through the object so that any lock of the method is respected
+            getattr(wrappingobj, name)(*args, **{**kwargs, 'ignore_cache': True})
+        except Exception as e:  # pylint: disable=broad-except  # nobody waits for the greenlet
+            log.error(f'Failed to refresh the saved result of {name} due to {str(e)}')
+        finally:
+            wrappingobj.refreshing_results.discard(cache_key)
+
+    wrappingobj.refreshing_results.add(cache_key)
+    gevent.spawn(refresh)
 
 
 def _cache_response_timewise_base(
@@ -51,15 +218,21 @@ def _cache_response_timewise_base(
         f: Callable,
         arguments_matter: bool,
         forward_ignore_cache: bool,
+        ttl_secs: Optional[int],
         *args: Any,
         **kwargs: Any,
-) -> tuple[bool, int, 'Timestamp', dict]:
-    """Base code used in the 2 cache_response_timewise decorators"""
+) -> tuple[Optional[ResultCache], str, 'Timestamp', dict]:
+    """Base code used in the 2 cache_response_timewise decorators
+
+    Returns the cached entry to return, which is None for a cache miss, the cache key,
+    the current timestamp and the kwargs to call the function with.
+    """
     if forward_ignore_cache:
         ignore_cache = kwargs.get('ignore_cache', False)
     else:
         ignore_cache = kwargs.pop('ignore_cache', False)
-    cache_key = function_sig_key(
+    ignore_persisted_cache = kwargs.pop('ignore_persisted_cache', False)
+    cache_key = function_sig(
         f.__name__,        # name
         arguments_matter,  # arguments_matter
         True,              # skip_ignore_cache
@@ -67,21 +240,62 @@ def _cache_response_timewise_base(
         **kwargs,
     )
     now = ts_now()
-    if ignore_cache is False and cache_key in wrappingobj.results_cache:
-        # Check the cache
-        cache_life_secs = now - wrappingobj.results_cache[cache_key].timestamp
-
-    cache_miss = (
-        ignore_cache is True or
-        cache_key not in wrappingobj.results_cache or
-        cache_life_secs >= wrappingobj.cache_ttl_secs
-    )
-    return cache_miss, cache_key, now, kwargs
+    ttl = wrappingobj.cache_ttl_secs
+    if ttl_secs is not None and ttl != 0:
+        ttl = ttl_secs
+    if ignore_cache is True or ttl == 0:
+        return None, cache_key, now, kwargs
+
+    entry = wrappingobj.results_cache.get(cache_key)
+    if entry is None:
+        if ignore_persisted_cache is True:
+            return None, cache_key, now, kwargs
+        entry = _load_persisted_result(wrappingobj, name=f.__name__, cache_key=cache_key)
+        if entry is None:
+            return None, cache_key, now, kwargs
+        wrappingobj.results_cache.set(cache_key, entry)
+    elif entry.persisted is True and ignore_persisted_cache is True:
+        return None, cache_key, now, kwargs
+
+    cache_life_secs = now - entry.timestamp
+    if cache_life_secs < ttl:
+        return entry, cache_key, now, kwargs
+
+    if entry.persisted is True and cache_life_secs < PERSISTED_RESULTS_MAX_AGE_SECS:
+        _refresh_in_background(
+            wrappingobj,
+            name=f.__name__,
+            cache_key=cache_key,
+            args=args,
+            kwargs=kwargs,
+        )
+        return entry, cache_key, now, kwargs
+
+    return None, cache_key, now, kwargs
+
+
+def _copy_containers(value: Any) -> Any:
+    """Copies the dicts, lists, sets and tuples of a cached result so that it can be
+    mutated without mutating the cache. Any other object, such as a NamedTuple, an FVal or
+    an asset, is shared with the cache instead of copied."""
+    if isinstance(value, dict):
+        value = copy(value)  # keeps the type, for example of a defaultdict
+        for key, entry in value.items():
+            value[key] = _copy_containers(entry)
+        return value
+    if isinstance(value, list):
+        return [_copy_containers(x) for x in value]
+    if isinstance(value, set):
+        return set(value)
+    if type(value) is tuple:  # namedtuples are shared
+        return tuple(_copy_containers(x) for x in value)
+    return value
 
 
 def cache_response_timewise(
         arguments_matter: bool = True,
         forward_ignore_cache: bool = False,
+        ttl_secs: Optional[int] = None,
 ) -> Callable:
     """ This is a decorator for caching results of functions of objects.
     The objects must adhere to the CachableOject interface.
@@ -98,33 +312,42 @@ def cache_response_timewise(
         - the Blockchain object
 
     If the special keyword argument ignore_cache=True is given then the cache check
-    is completely skipped
+    is completely skipped. If ignore_persisted_cache=True is given then only the results
+    read from the results store are skipped.
 
     If arguments_matter is True then a different cache is kept for each different
     combination of arguments.
 
     if forward_ignore_cache is True then if the ignore_cache argument is given it's
     forward to the decorated function instead of being silently consumed.
+
+    If ttl_secs is given the results of this function are cached for that many seconds
+    instead of the cache_ttl_secs of the object, unless the cache of the object is disabled.
+
+    If the function is in the persisted_results of the object its results are also saved
+    in the results store of the object and are read from it when not in memory.
     """
     def _cache_response_timewise(f: Callable) -> Callable:
         @wraps(f)
         def wrapper(wrappingobj: CacheableMixIn, *args: Any, **kwargs: Any) -> Any:
-            cache_miss, cache_key, now, kwargs = _cache_response_timewise_base(
+            entry, cache_key, now, kwargs = _cache_response_timewise_base(
                 wrappingobj,
                 f,
                 arguments_matter,
                 forward_ignore_cache,
+                ttl_secs,
                 *args,
                 **kwargs,
             )
-            if cache_miss:
+            if entry is None:
                 # Call the function, write the result in cache and return it
+                generation = wrappingobj.cache_generation
                 result = f(wrappingobj, *args, **kwargs)
-                wrappingobj.results_cache[cache_key] = ResultCache(result, now)
+                _save_result(wrappingobj, f.__name__, cache_key, result, now, generation)
                 return result
 
             # else hit the cache and return it
-            return wrappingobj.results_cache[cache_key].result
+            return entry.result
 
         return wrapper
     return _cache_response_timewise
@@ -133,28 +356,33 @@ def cache_response_timewise(
 def cache_response_timewise_immutable(
         arguments_matter: bool = True,
         forward_ignore_cache: bool = False,
+        ttl_secs: Optional[int] = None,
 ) -> Callable:
-    """ Same as cache_response_timewise but resulting dict is a copy so, the cache
-    itself can't be mutated.
+    """ Same as cache_response_timewise but the containers of the resulting dict are
+    copies so, the cache itself can't be mutated. The objects in them are shared with
+    the cache so they should be immutable.
     """
     def _cache_response_timewise_immutable(f: Callable) -> Callable:
         @wraps(f)
         def wrapper(wrappingobj: CacheableMixIn, *args: Any, **kwargs: Any) -> Any:
-            cache_miss, cache_key, now, kwargs = _cache_response_timewise_base(
+            entry, cache_key, now, kwargs = _cache_response_timewise_base(
                 wrappingobj,
                 f,
                 arguments_matter,
                 forward_ignore_cache,
+                ttl_secs,
                 *args,
                 **kwargs,
             )
-            if cache_miss:
+            if entry is None:
                 # Call the function, and write the result in cache
+                generation = wrappingobj.cache_generation
                 result = f(wrappingobj, *args, **kwargs)
-                wrappingobj.results_cache[cache_key] = ResultCache(result, now)
+                _save_result(wrappingobj, f.__name__, cache_key, result, now, generation)
+                return _copy_containers(result)
 
             # in any case return a copy of the cache to avoid potential mutation
-            return deepcopy(wrappingobj.results_cache[cache_key].result)
+            return _copy_containers(entry.result)
 
         return wrapper
     return _cache_response_timewise_immutable
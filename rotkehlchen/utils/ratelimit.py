@@ -0,0 +1,129 @@
+import time
+from typing import Any, Optional
+
+import gevent
+from gevent.lock import Semaphore
+
+
+class TokenBucket:
+    """A token bucket that limits the rate of the requests greenlets make to a remote.
+
+    The bucket gets `rate` tokens per second and holds up to `capacity` of them, which is
+    the number of requests that can be made at once after some idle time. A request takes
+    as many tokens as its weight and the greenlet sleeps until there are enough of them.
+    Greenlets waiting for tokens are served in the order they asked for them.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = Semaphore()
+        self.waited_seconds = 0.0  # total time greenlets waited for tokens
+
+    def set_rate(self, rate: float, capacity: Optional[float] = None) -> None:
+        """Change the rate, for example when the API key of a service changes"""
+        capacity = capacity if capacity is not None else max(rate, 1)
+        if rate == self.rate and capacity == self.capacity:
+            return
+
+        self._refill()
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, weight: float = 1) -> float:
+        """Take `weight` tokens, waiting until they are available. A request weighing more
+        than the capacity waits for a full bucket and leaves it in debt so that the
+        requests after it wait for the rest.
+
+        Returns the seconds the greenlet waited.
+        """
+        waited = 0.0
+        with self.lock:
+            self._refill()
+            needed = min(weight, self.capacity)
+            if self.tokens < needed:
+                waited = (needed - self.tokens) / self.rate
+                gevent.sleep(waited)
+                self._refill()
+
+            self.tokens -= weight
+            self.waited_seconds += waited
+
+        return waited
+
+
+class RequestScheduler:
+    """Lets the greenlets of a remote, such as an exchange, make requests at the same
+    time within the request weight budget of its api.
+
+    Each endpoint weighs `default_weight` unless registered with its own weight. Until a
+    limit is registered requests are not delayed, but they are still counted.
+    """
+
+    def __init__(self) -> None:
+        self.bucket: Optional[TokenBucket] = None
+        self.weights: dict[str, float] = {}
+        self.default_weight: float = 1
+        self.paused_until = 0.0  # monotonic time until which no request is made
+        self.requests = 0
+        self.delayed_requests = 0
+        self.waited_seconds = 0.0
+        self.max_waited_seconds = 0.0
+
+    def register_limit(
+            self,
+            rate: float,
+            capacity: Optional[float] = None,
+            weights: Optional[dict[str, float]] = None,
+            default_weight: float = 1,
+    ) -> None:
+        """Set the request weight per second and the burst capacity of the api and the
+        weight of its endpoints. Can be called again when the limits change."""
+        if self.bucket is None:
+            self.bucket = TokenBucket(rate=rate, capacity=capacity)
+        else:
+            self.bucket.set_rate(rate=rate, capacity=capacity)
+        self.weights = weights if weights is not None else {}
+        self.default_weight = default_weight
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all requests for the given seconds. For when the remote tells us
+        that we hit its limits and when to retry."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self, endpoint: str) -> float:
+        """Waits until a request to the endpoint fits in the budget and counts it
+
+        Returns the seconds the greenlet waited.
+        """
+        waited = 0.0
+        if (pause := self.paused_until - time.monotonic()) > 0:
+            gevent.sleep(pause)
+            waited += pause
+        if self.bucket is not None:
+            waited += self.bucket.acquire(self.weights.get(endpoint, self.default_weight))
+
+        self.requests += 1
+        if waited != 0:
+            self.delayed_requests += 1
+            self.waited_seconds += waited
+            self.max_waited_seconds = max(self.max_waited_seconds, waited)
+        return waited
+
+    def serialize(self) -> dict[str, Any]:
+        return {
+            'rate': self.bucket.rate if self.bucket is not None else None,
+            'capacity': self.bucket.capacity if self.bucket is not None else None,
+            'requests': self.requests,
+            'delayed_requests': self.delayed_requests,
+            'waited_seconds': self.waited_seconds,
+            'max_waited_seconds': self.max_waited_seconds,
+        }
@@ -1,6 +1,6 @@
 import json
 from json.decoder import JSONDecodeError
-from typing import Any, Optional, Union
+from typing import Any, Iterator, Optional, Union
 
 from rotkehlchen.assets.asset import (
     Asset,
@@ -58,6 +58,63 @@ def jsonloads_list(data: str) -> list:
     return value
 
 
+def jsonloads_array_items(
+        text_chunks: Iterator[str],
+        text: str,
+        position: int,
+) -> Iterator[Any]:
+    """Parses the items of a JSON array one by one while the text of the document arrives
+    so that the whole array never has to be in memory. `text` is what has arrived so far
+    and `position` is right after the opening bracket of the array in it. The text
+    after the closing bracket of the array is not read.
+
+    May raise:
+    - JSONDecodeError if the array is not valid JSON or the text ends before it
+    """
+    decoder = json.JSONDecoder()
+    expect_item = True  # an item or the end of the array are expected, else , or ]
+    is_empty = True
+    while True:
+        while position < len(text) and text[position] in ' \t\n\r':
+            position += 1
+        if position == len(text):
+            if (chunk := next(text_chunks, None)) is None:
+                raise JSONDecodeError(msg='Unterminated array', doc=text, pos=position)
+            text, position = chunk, 0  # everything before position has been parsed
+            continue
+
+        if text[position] == ']' and (is_empty or expect_item is False):
+            return
+
+        if expect_item is False:
+            if text[position] != ',':
+                raise JSONDecodeError(msg='Expecting , delimiter', doc=text, pos=position)
+            position += 1
+            expect_item = True
+            continue
+
+        try:
+            item, end = decoder.raw_decode(text, position)
+            next_position = end
+            while next_position < len(text) and text[next_position] in ' \t\n\r':
+                next_position += 1
+            next_char = text[next_position:next_position + 1]
+        except JSONDecodeError:  # the item may not have fully arrived yet
+            item, end, next_char = None, len(text), ''
+        # an item is complete only when followed by , or ] since a number at the end
+        # of the text could continue in the next chunk, e.g. 1.5 of 1.5e10
+        if next_char not in (',', ']'):
+            if (chunk := next(text_chunks, None)) is not None:
+                text, position = text[position:] + chunk, 0
+                continue
+            if next_char == '':
+                raise JSONDecodeError(msg='Unterminated array', doc=text, pos=position)
+
+        yield item
+        position = end
+        expect_item = is_empty = False
+
+
 def rlk_jsondumps(data: Union[dict, list]) -> str:
     return json.dumps(data, cls=RKLEncoder)
 
@@ -0,0 +1,130 @@
+"""
+This script benchmarks the decoding of the recorded ethereum transactions and receipts of a
+rotki user DB. It copies the DB to a temporary directory, decodes all transactions of the
+DB a number of times and reports the decoded receipt logs per second, first with the event
+rules indexed by topic0 and then with all event rules tried for every log as they were
+before DecodingRules.index_event_rules.
+
+The first round is not timed since it may need to query the chain for unknown tokens.
+
+Example: python tools/scripts/benchmark_evm_decoding.py --rounds 5
+which uses the mainnet transactions of rotkehlchen/tests/data/ethtxs.db
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from gevent import monkey  # isort:skip
+monkey.patch_all()  # isort:skip
+# the DB handler has to be imported before the decoders due to circular imports
+from rotkehlchen.db.dbhandler import DBHandler  # isort:skip
+
+from rotkehlchen.chain.ethereum.decoding.decoder import EthereumTransactionDecoder
+from rotkehlchen.chain.ethereum.node_inquirer import EthereumInquirer
+from rotkehlchen.chain.ethereum.transactions import EthereumTransactions
+from rotkehlchen.chain.evm.decoding.decoder import DecodingRules
+from rotkehlchen.chain.evm.structures import EvmTxReceipt
+from rotkehlchen.db.evmtx import DBEvmTx
+from rotkehlchen.db.filtering import EvmTransactionsFilterQuery
+from rotkehlchen.globaldb.handler import GlobalDBHandler
+from rotkehlchen.greenlets.manager import GreenletManager
+from rotkehlchen.logging import TRACE, add_logging_level
+from rotkehlchen.tests.utils.database import mock_db_schema_sanity_check
+from rotkehlchen.types import ChainID, EvmTransaction
+from rotkehlchen.user_messages import MessagesAggregator
+
+add_logging_level('TRACE', TRACE)
+
+DEFAULT_DB = Path(__file__).parents[2] / 'rotkehlchen' / 'tests' / 'data' / 'ethtxs.db'
+
+
+def decode_all(
+        decoder: EthereumTransactionDecoder,
+        corpus: list[tuple[EvmTransaction, EvmTxReceipt]],
+) -> float:
+    """Decodes all transactions of the corpus and returns the time it took"""
+    with decoder.database.user_write() as write_cursor:
+        write_cursor.execute('DELETE FROM history_events')
+        write_cursor.execute('DELETE FROM evm_tx_mappings')
+
+    start = time.perf_counter()
+    for transaction, receipt in corpus:
+        decoder.decode_transaction(transaction, receipt)
+    return time.perf_counter() - start
+
+
+def try_all_event_rules(rules: DecodingRules) -> None:
+    """Makes all logs go through all event rules, as without the topic0 index"""
+    rules.event_rules_by_topic.clear()
+    rules.wildcard_event_rules[:] = [
+        rule[1] if isinstance(rule, tuple) else rule for rule in rules.event_rules
+    ]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument('--db', help='The rotki user DB to take the transactions from', type=Path, default=DEFAULT_DB)  # noqa: E501
+    p.add_argument('--password', help='The password of the user DB', default='123')
+    p.add_argument('--rounds', help='Number of timed decoding rounds', type=int, default=5)
+    args = p.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp())
+    user_dir = data_dir / 'benchmark'
+    user_dir.mkdir()
+    shutil.copyfile(args.db, user_dir / 'rotkehlchen.db')
+    msg_aggregator = MessagesAggregator()
+    GlobalDBHandler(data_dir=data_dir, sql_vm_instructions_cb=0)
+    with mock_db_schema_sanity_check():  # as the tests do for their prepared DBs
+        database = DBHandler(
+            user_data_dir=user_dir,
+            password=args.password,
+            msg_aggregator=msg_aggregator,
+            initial_settings=None,
+            sql_vm_instructions_cb=0,
+        )
+    ethereum_inquirer = EthereumInquirer(
+        greenlet_manager=GreenletManager(msg_aggregator=msg_aggregator),
+        database=database,
+        connect_at_start=(),
+    )
+    decoder = EthereumTransactionDecoder(
+        database=database,
+        ethereum_inquirer=ethereum_inquirer,
+        transactions=EthereumTransactions(ethereum_inquirer=ethereum_inquirer, database=database),  # noqa: E501
+    )
+    dbevmtx = DBEvmTx(database)
+    corpus = []
+    with database.conn.read_ctx() as cursor:
+        decoder.reload_data(cursor)
+        transactions = dbevmtx.get_evm_transactions(
+            cursor=cursor,
+            filter_=EvmTransactionsFilterQuery.make(chain_id=ChainID.ETHEREUM),
+            has_premium=True,
+        )
+        for transaction in transactions:
+            receipt = dbevmtx.get_receipt(cursor, transaction.tx_hash, ChainID.ETHEREUM)
+            if receipt is not None:
+                corpus.append((transaction, receipt))
+
+    logs = sum(len(receipt.logs) for _, receipt in corpus)
+    unmapped_logs = [
+        tx_log for _, receipt in corpus for tx_log in receipt.logs
+        if tx_log.address not in decoder.rules.address_mappings
+    ]
+    rule_calls = sum(len(decoder.rules.get_event_rules(tx_log)) for tx_log in unmapped_logs)
+    print(f'Decoding {len(corpus)} transactions with {logs} logs, {len(unmapped_logs)} of them not claimed by address mappings')  # noqa: E501
+    print(f'event rules per unclaimed log: {rule_calls / len(unmapped_logs):.2f} indexed, {len(decoder.rules.event_rules)} without the index')  # noqa: E501
+
+    decode_all(decoder, corpus)  # warm up
+    indexed_duration = min(decode_all(decoder, corpus) for _ in range(args.rounds))
+    try_all_event_rules(decoder.rules)
+    all_rules_duration = min(decode_all(decoder, corpus) for _ in range(args.rounds))
+    print(f'topic0 index:    {logs / indexed_duration:10.0f} logs/s')
+    print(f'all event rules: {logs / all_rules_duration:10.0f} logs/s')
+
+
+if __name__ == '__main__':
+    main()
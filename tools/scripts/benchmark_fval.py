@@ -0,0 +1,102 @@
+"""
+This script micro-benchmarks the FVal operations that the accounting code uses the most.
+The amounts and rates of the benchmark are random decimals with up to 18 decimal places
+like the ones of the events of a PnL report. It reports the time per operation of each
+FVal operation, of adding PNLs and of the spend cost basis calculation of FIFO.
+
+Example: python tools/scripts/benchmark_fval.py --number 200000
+"""
+
+import argparse
+import random
+import timeit
+from decimal import Decimal
+
+from rotkehlchen.accounting.cost_basis.base import AssetAcquisitionEvent, CostBasisEvents
+from rotkehlchen.accounting.pnl import PNL
+from rotkehlchen.assets.asset import Asset
+from rotkehlchen.constants.misc import ONE, ZERO
+from rotkehlchen.db.settings import DBSettings
+from rotkehlchen.fval import FVal
+from rotkehlchen.types import CostBasisMethod, Price, Timestamp
+
+START_TS = 1451606400  # 2016-01-01
+
+
+def random_decimal_string() -> str:
+    return f'{random.randint(0, 100000)}.{random.randint(0, 10 ** 18 - 1):018}'
+
+
+def benchmark_cost_basis(number: int) -> float:
+    """Times the FIFO spend cost basis calculation. Each spend uses up one acquisition
+    entirely and part of the next one. Returns the time per spend"""
+    settings = DBSettings(taxfree_after_period=None, cost_basis_method=CostBasisMethod.FIFO)
+    acquisitions_manager = CostBasisEvents(CostBasisMethod.FIFO).acquisitions_manager
+    for idx in range(number * 2 + 1):
+        acquisitions_manager.add_acquisition(AssetAcquisitionEvent(
+            amount=FVal(random_decimal_string()) + ONE,
+            timestamp=Timestamp(START_TS + idx),
+            rate=Price(FVal(random_decimal_string())),
+            index=idx,
+        ))
+
+    asset = Asset('ETH')
+    spending_amounts = [FVal(random.randint(1, 1000)) for _ in range(number)]
+    start = timeit.default_timer()
+    for idx, spending_amount in enumerate(spending_amounts):
+        acquisitions_manager.calculate_spend_cost_basis(
+            spending_amount=spending_amount,
+            spending_asset=asset,
+            timestamp=Timestamp(START_TS + number * 2 + idx),
+            missing_acquisitions=[],
+            used_acquisitions=[],
+            settings=settings,
+            timestamp_to_date=str,
+        )
+    return (timeit.default_timer() - start) / number
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument('--number', help='Number of times to run each operation', type=int, default=200000)  # noqa: E501
+    p.add_argument('--repeat', help='Number of runs to take the best one of', type=int, default=5)  # noqa: E501
+    args = p.parse_args()
+
+    a, b = FVal(random_decimal_string()), FVal(random_decimal_string())
+    pnl_a, pnl_b = PNL(taxable=a, free=b), PNL(taxable=b, free=a)
+    decimal_string = random_decimal_string()
+    decimal = Decimal(decimal_string)
+    operations = {
+        'FVal(str)': lambda: FVal(decimal_string),
+        'FVal(Decimal)': lambda: FVal(decimal),
+        'FVal(int)': lambda: FVal(42),
+        'FVal(FVal)': lambda: FVal(a),
+        'a + b': lambda: a + b,
+        'a - b': lambda: a - b,
+        'a * b': lambda: a * b,
+        'a / b': lambda: a / b,
+        'a + 1': lambda: a + 1,
+        '1 - a': lambda: 1 - a,
+        '-a': lambda: -a,
+        'abs(a)': lambda: abs(a),
+        'a < b': lambda: a < b,
+        'a <= b': lambda: a <= b,
+        'a > b': lambda: a > b,
+        'a >= b': lambda: a >= b,
+        'a == b': lambda: a == b,
+        'a != ZERO': lambda: a != ZERO,
+        'a < 0': lambda: a < 0,
+        'PNL + PNL': lambda: pnl_a + pnl_b,
+        'PNL - PNL': lambda: pnl_a - pnl_b,
+        'str(a)': lambda: str(a),
+    }
+    for name, operation in operations.items():
+        duration = min(timeit.repeat(operation, number=args.number, repeat=args.repeat))
+        print(f'{name:<14} {duration / args.number * 1e9:8.0f} ns')
+
+    duration = min(benchmark_cost_basis(args.number // 10) for _ in range(args.repeat))
+    print(f'{"FIFO spend":<14} {duration * 1e9:8.0f} ns')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+This script benchmarks computing the cost basis of a PnL report in worker processes.
+It creates a synthetic history of acquisitions and taxable spends spread over a number
+of assets and times computing their cost basis one operation after the other, the way
+CostBasisCalculator does while processing the events, against computing it in worker
+processes with compute_cost_basis.
+
+Example: python tools/scripts/benchmark_parallel_cost_basis.py --events 1000000 --processes 4
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from rotkehlchen.accounting.cost_basis.base import (
+    AssetAcquisitionEvent,
+    AssetSpendEvent,
+    CostBasisEvents,
+    CostBasisInfo,
+    CostBasisOperation,
+)
+from rotkehlchen.accounting.cost_basis.parallel import (
+    MIN_OPERATIONS_PER_PROCESS,
+    compute_cost_basis,
+)
+from rotkehlchen.assets.asset import Asset
+from rotkehlchen.db.settings import DBSettings
+from rotkehlchen.fval import FVal
+from rotkehlchen.types import CostBasisMethod, Location, Price, Timestamp
+
+START_TS = 1451606400  # 2016-01-01
+
+
+def compute_sequentially(
+        operations: list[CostBasisOperation],
+        settings: DBSettings,
+) -> dict[int, CostBasisInfo]:
+    """Does what CostBasisCalculator does for each acquisition and taxable spend"""
+    assets_events: defaultdict[Asset, CostBasisEvents] = defaultdict(lambda: CostBasisEvents(settings.cost_basis_method))  # noqa: E501
+    spend_costs = {}
+    for operation in operations:
+        events = assets_events[operation.asset]
+        if operation.type == 'acquisition':
+            events.acquisitions_manager.add_acquisition(AssetAcquisitionEvent(
+                amount=operation.amount,
+                timestamp=operation.timestamp,
+                rate=Price(operation.rate),
+                index=operation.event_index,
+            ))
+            continue
+
+        events.spends.append(AssetSpendEvent(
+            location=operation.location,
+            timestamp=operation.timestamp,
+            amount=operation.amount,
+            rate=operation.rate,
+        ))
+        spend_costs[operation.sequence] = events.acquisitions_manager.calculate_spend_cost_basis(
+            spending_amount=operation.amount,
+            spending_asset=operation.asset,
+            timestamp=operation.timestamp,
+            missing_acquisitions=[],
+            used_acquisitions=events.used_acquisitions,
+            settings=settings,
+            timestamp_to_date=str,
+        )
+
+    return spend_costs
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument('--events', help='Number of acquisitions and spends', type=int, default=1000000)  # noqa: E501
+    p.add_argument('--assets', help='Number of assets the events are spread over', type=int, default=200)  # noqa: E501
+    p.add_argument('--processes', help='Number of worker processes', type=int, default=4)
+    p.add_argument(
+        '--method',
+        help='Cost basis method',
+        choices=['fifo', 'lifo', 'hifo'],
+        default='fifo',
+    )
+    args = p.parse_args()
+
+    settings = DBSettings(
+        taxfree_after_period=None,
+        cost_basis_method=CostBasisMethod.deserialize(args.method),
+    )
+    assets = [Asset(f'ASSET{idx}') for idx in range(args.assets)]
+    held = {asset: 0 for asset in assets}
+    operations = []
+    print(f'Creating {args.events} events for {args.assets} assets ...')
+    for sequence in range(args.events):
+        asset = random.choice(assets)
+        timestamp = Timestamp(START_TS + sequence * 60)
+        rate = FVal(random.randint(1, 10000))
+        if held[asset] == 0 or random.random() < 0.55:
+            amount = random.randint(1, 100)
+            held[asset] += amount
+            operations.append(CostBasisOperation(
+                sequence=sequence,
+                type='acquisition',
+                asset=asset,
+                timestamp=timestamp,
+                amount=FVal(amount),
+                rate=rate,
+                event_index=sequence,
+            ))
+        else:
+            amount = random.randint(1, held[asset])
+            held[asset] -= amount
+            operations.append(CostBasisOperation(
+                sequence=sequence,
+                type='taxable_spend',
+                asset=asset,
+                timestamp=timestamp,
+                amount=FVal(amount),
+                rate=rate,
+                location=Location.EXTERNAL,
+            ))
+
+    start = time.perf_counter()
+    sequential_costs = compute_sequentially(operations, settings=settings)
+    sequential_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel_results = compute_cost_basis(operations, settings=settings, processes=args.processes)  # noqa: E501
+    parallel_duration = time.perf_counter() - start
+    if parallel_results is None:
+        print(
+            f'compute_cost_basis did not use worker processes. Each process needs at least '
+            f'{MIN_OPERATIONS_PER_PROCESS} operations and the pool must not fail.',
+        )
+        return
+
+    parallel_costs = dict(x for result in parallel_results for x in result.spend_costs)
+    mismatches = sum(
+        1 for sequence, cost in sequential_costs.items()
+        if parallel_costs[sequence].taxable_bought_cost != cost.taxable_bought_cost
+    )
+    print(f'sequential:         {sequential_duration:.2f} s')
+    print(f'{args.processes} worker processes: {parallel_duration:.2f} s')
+    print(f'cost basis mismatches: {mismatches}')
+
+
+if __name__ == '__main__':  # the worker processes import this module again
+    main()
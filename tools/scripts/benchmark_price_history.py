@@ -0,0 +1,106 @@
+"""
+This script benchmarks the nearest price lookup of the global DB price_history table.
+It creates a temporary sqlite DB with the global DB price_history schema, fills it with
+hourly cryptocompare prices for a number of pairs and then times the old
+ABS(timestamp - ?) lookup against the two range probes used by
+GlobalDBHandler.get_historical_price.
+
+Example: python tools/scripts/benchmark_price_history.py --pairs 2000 --years 5
+which creates ~87 million rows.
+"""
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from rotkehlchen.globaldb.schema import DB_CREATE_PRICE_HISTORY
+from rotkehlchen.history.types import HistoricalPriceOracle
+
+HOUR_IN_SECONDS = 3600
+START_TS = 1451606400  # 2016-01-01
+OLD_QUERY = (
+    'SELECT from_asset, to_asset, source_type, timestamp, price FROM price_history '
+    'WHERE from_asset=? AND to_asset=? AND ABS(timestamp - ?) <= ? AND source_type=? '
+    'ORDER BY ABS(timestamp - ?) ASC LIMIT 1'
+)
+NEW_QUERY_BASE = (
+    'SELECT from_asset, to_asset, source_type, timestamp, price FROM price_history '
+    'WHERE from_asset=? AND to_asset=? AND source_type=? '
+)
+NEW_QUERY_BEFORE = NEW_QUERY_BASE + 'AND timestamp BETWEEN ? AND ? ORDER BY timestamp DESC LIMIT 1'  # noqa: E501
+NEW_QUERY_AFTER = NEW_QUERY_BASE + 'AND timestamp > ? AND timestamp <= ? ORDER BY timestamp ASC LIMIT 1'  # noqa: E501
+
+p = argparse.ArgumentParser()
+p.add_argument('--pairs', help='Number of asset pairs to create', type=int, default=500)
+p.add_argument('--years', help='Years of hourly prices per pair', type=int, default=5)
+p.add_argument('--lookups', help='Number of lookups to time', type=int, default=2000)
+p.add_argument(
+    '--db-path',
+    help='Reuse an already populated DB instead of creating a temporary one',
+    type=Path,
+    default=None,
+)
+args = p.parse_args()
+
+source = HistoricalPriceOracle.CRYPTOCOMPARE.serialize_for_db()
+end_ts = START_TS + args.years * 365 * 24 * HOUR_IN_SECONDS
+db_path = args.db_path
+if db_path is None:
+    db_path = Path(tempfile.mkdtemp()) / 'price_history_benchmark.db'
+
+conn = sqlite3.connect(db_path)
+conn.executescript(DB_CREATE_PRICE_HISTORY)
+if conn.execute('SELECT COUNT(*) FROM price_history').fetchone()[0] == 0:
+    print(f'Populating {db_path} ...')
+    for pair_idx in range(args.pairs):
+        conn.executemany(
+            'INSERT INTO price_history(from_asset, to_asset, source_type, timestamp, price) '
+            'VALUES(?, ?, ?, ?, ?)',
+            ((f'ASSET{pair_idx}', 'USD', source, ts, '1.0') for ts in range(START_TS, end_ts, HOUR_IN_SECONDS)),  # noqa: E501
+        )
+        conn.commit()
+
+rows = conn.execute('SELECT COUNT(*) FROM price_history').fetchone()[0]
+print(f'price_history has {rows} rows')
+lookups = [
+    (f'ASSET{random.randrange(args.pairs)}', random.randrange(START_TS, end_ts))
+    for _ in range(args.lookups)
+]
+
+start = time.perf_counter()
+old_results = []
+for asset, ts in lookups:
+    old_results.append(conn.execute(
+        OLD_QUERY,
+        (asset, 'USD', ts, HOUR_IN_SECONDS, source, ts),
+    ).fetchone())
+old_duration = time.perf_counter() - start
+
+start = time.perf_counter()
+new_results = []
+for asset, ts in lookups:
+    before = conn.execute(
+        NEW_QUERY_BEFORE,
+        (asset, 'USD', source, ts - HOUR_IN_SECONDS, ts),
+    ).fetchone()
+    after = conn.execute(
+        NEW_QUERY_AFTER,
+        (asset, 'USD', source, ts, ts + HOUR_IN_SECONDS),
+    ).fetchone()
+    if before is None or (after is not None and after[3] - ts < ts - before[3]):
+        new_results.append(after)
+    else:
+        new_results.append(before)
+new_duration = time.perf_counter() - start
+
+mismatches = sum(  # compare distances since ties can be resolved differently
+    1 for (_, ts), old, new in zip(lookups, old_results, new_results)
+    if abs(old[3] - ts) != abs(new[3] - ts)
+)
+print(f'ABS() lookup:      {old_duration / args.lookups * 1000:.3f} ms per lookup')
+print(f'range probes:      {new_duration / args.lookups * 1000:.3f} ms per lookup')
+print(f'distance mismatches: {mismatches}')
+conn.close()
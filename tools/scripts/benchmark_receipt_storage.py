@@ -0,0 +1,265 @@
+"""
+This script compares the storage of the evm receipt logs in the user DB, with the logs and
+topics of each receipt packed in one blob and an (address, topic0) index table, against the
+previous schema of one row per log in evmtx_receipt_logs and one per topic in
+evmtx_receipt_log_topics. It takes the receipts of a rotki user DB, writes them a number
+of times with different hashes in a plain sqlite DB of each schema and reports the size of
+the receipt tables and the receipts read per second with all their logs.
+
+Example: python tools/scripts/benchmark_receipt_storage.py --copies 20
+which uses the mainnet receipts of rotkehlchen/tests/data/ethtxs.db
+"""
+
+import argparse
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from gevent import monkey  # isort:skip
+monkey.patch_all()  # isort:skip
+from rotkehlchen.db.dbhandler import DBHandler  # isort:skip
+
+from rotkehlchen.chain.evm.structures import (
+    EvmTxReceipt,
+    EvmTxReceiptLog,
+    deserialize_receipt_logs,
+    serialize_receipt_logs,
+)
+from rotkehlchen.db.constants import SQL_VARIABLES_LIMIT
+from rotkehlchen.db.evmtx import DBEvmTx
+from rotkehlchen.globaldb.handler import GlobalDBHandler
+from rotkehlchen.logging import TRACE, add_logging_level
+from rotkehlchen.tests.utils.database import mock_db_schema_sanity_check
+from rotkehlchen.types import ChainID, make_evm_tx_hash
+from rotkehlchen.user_messages import MessagesAggregator
+from rotkehlchen.utils.misc import get_chunks
+
+add_logging_level('TRACE', TRACE)
+
+DEFAULT_DB = Path(__file__).parents[2] / 'rotkehlchen' / 'tests' / 'data' / 'ethtxs.db'
+
+RECEIPTS_TABLE = """
+CREATE TABLE evmtx_receipts (
+    tx_hash BLOB NOT NULL,
+    chain_id INTEGER NOT NULL,
+    contract_address TEXT,
+    status INTEGER NOT NULL CHECK (status IN (0, 1)),
+    type INTEGER NOT NULL,
+    {logs_column}
+    PRIMARY KEY(tx_hash, chain_id)
+);
+"""
+NORMALIZED_SCHEMA = RECEIPTS_TABLE.format(logs_column='') + """
+CREATE TABLE evmtx_receipt_logs (
+    tx_hash BLOB NOT NULL,
+    chain_id INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    address TEXT NOT NULL,
+    removed INTEGER NOT NULL CHECK (removed IN (0, 1)),
+    FOREIGN KEY(tx_hash, chain_id) REFERENCES evmtx_receipts(tx_hash, chain_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    PRIMARY KEY(tx_hash, chain_id, log_index)
+);
+CREATE TABLE evmtx_receipt_log_topics (
+    tx_hash BLOB NOT NULL,
+    chain_id INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    topic BLOB NOT NULL,
+    topic_index INTEGER NOT NULL,
+    FOREIGN KEY(tx_hash, chain_id, log_index) REFERENCES evmtx_receipt_logs(tx_hash, chain_id, log_index) ON DELETE CASCADE ON UPDATE CASCADE,
+    PRIMARY KEY(tx_hash, chain_id, log_index, topic_index)
+);
+"""  # noqa: E501
+PACKED_SCHEMA = RECEIPTS_TABLE.format(logs_column='logs BLOB NOT NULL,') + """
+CREATE TABLE evmtx_receipt_log_index (
+    tx_hash BLOB NOT NULL,
+    chain_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    topic0 BLOB NOT NULL,
+    FOREIGN KEY(tx_hash, chain_id) REFERENCES evmtx_receipts(tx_hash, chain_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    PRIMARY KEY(tx_hash, chain_id, address, topic0)
+);
+CREATE INDEX idx_evmtx_receipt_log_index_address_topic0 ON evmtx_receipt_log_index(address, topic0);
+"""  # noqa: E501
+
+
+def read_user_db_receipts(db_path: Path, password: str) -> list[EvmTxReceipt]:
+    """Reads all ethereum receipts of the user DB, upgrading a copy of it if needed"""
+    data_dir = Path(tempfile.mkdtemp())
+    user_dir = data_dir / 'benchmark'
+    user_dir.mkdir()
+    shutil.copyfile(db_path, user_dir / 'rotkehlchen.db')
+    GlobalDBHandler(data_dir=data_dir, sql_vm_instructions_cb=0)
+    with mock_db_schema_sanity_check():  # as the tests do for their prepared DBs
+        database = DBHandler(
+            user_data_dir=user_dir,
+            password=password,
+            msg_aggregator=MessagesAggregator(),
+            initial_settings=None,
+            sql_vm_instructions_cb=0,
+        )
+    with database.conn.read_ctx() as cursor:
+        tx_hashes = [
+            make_evm_tx_hash(entry[0]) for entry in
+            cursor.execute('SELECT tx_hash FROM evmtx_receipts WHERE chain_id=1')
+        ]
+        receipts = DBEvmTx(database).get_receipts(cursor, tx_hashes, ChainID.ETHEREUM)
+    database.logout()
+    return list(receipts.values())
+
+
+def copy_hash(tx_hash: bytes, copy_idx: int) -> bytes:
+    return copy_idx.to_bytes(4, 'big') + tx_hash[4:]
+
+
+def write_normalized(conn: sqlite3.Connection, receipts: list[EvmTxReceipt], copies: int) -> None:  # noqa: E501
+    conn.executescript(NORMALIZED_SCHEMA)
+    for copy_idx in range(copies):
+        conn.executemany(
+            'INSERT INTO evmtx_receipts VALUES(?, ?, ?, ?, ?)',
+            [(copy_hash(x.tx_hash, copy_idx), 1, x.contract_address, x.status, x.type) for x in receipts],  # noqa: E501
+        )
+        conn.executemany(
+            'INSERT INTO evmtx_receipt_logs VALUES(?, ?, ?, ?, ?, ?)',
+            [
+                (copy_hash(x.tx_hash, copy_idx), 1, tx_log.log_index, tx_log.data, tx_log.address, tx_log.removed)  # noqa: E501
+                for x in receipts for tx_log in x.logs
+            ],
+        )
+        conn.executemany(
+            'INSERT INTO evmtx_receipt_log_topics VALUES(?, ?, ?, ?, ?)',
+            [
+                (copy_hash(x.tx_hash, copy_idx), 1, tx_log.log_index, topic, topic_index)
+                for x in receipts for tx_log in x.logs
+                for topic_index, topic in enumerate(tx_log.topics)
+            ],
+        )
+    conn.commit()
+
+
+def write_packed(conn: sqlite3.Connection, receipts: list[EvmTxReceipt], copies: int) -> None:
+    conn.executescript(PACKED_SCHEMA)
+    for copy_idx in range(copies):
+        conn.executemany(
+            'INSERT INTO evmtx_receipts VALUES(?, ?, ?, ?, ?, ?)',
+            [(copy_hash(x.tx_hash, copy_idx), 1, x.contract_address, x.status, x.type, serialize_receipt_logs(x.logs)) for x in receipts],  # noqa: E501
+        )
+        conn.executemany(
+            'INSERT OR IGNORE INTO evmtx_receipt_log_index VALUES(?, ?, ?, ?)',
+            [
+                (copy_hash(x.tx_hash, copy_idx), 1, tx_log.address, tx_log.topics[0])
+                for x in receipts for tx_log in x.logs if len(tx_log.topics) != 0
+            ],
+        )
+    conn.commit()
+
+
+def read_normalized(conn: sqlite3.Connection, tx_hashes: list[bytes]) -> int:
+    """Reads the receipts as DBEvmTx.get_receipts did with the previous schema"""
+    receipts: dict[bytes, EvmTxReceipt] = {}
+    for chunk in get_chunks(tx_hashes, n=SQL_VARIABLES_LIMIT - 1):
+        questionmarks = ','.join('?' * len(chunk))
+        bindings = (1, *chunk)
+        cursor = conn.execute(
+            f'SELECT tx_hash, contract_address, status, type from evmtx_receipts '
+            f'WHERE chain_id=? AND tx_hash IN ({questionmarks})',
+            bindings,
+        )
+        for result in cursor:
+            receipts[result[0]] = EvmTxReceipt(
+                tx_hash=make_evm_tx_hash(result[0]),
+                chain_id=ChainID.ETHEREUM,
+                contract_address=result[1],
+                status=bool(result[2]),
+                type=result[3],
+            )
+        logs: dict[tuple[bytes, int], EvmTxReceiptLog] = {}
+        cursor = conn.execute(
+            f'SELECT tx_hash, log_index, data, address, removed from evmtx_receipt_logs '
+            f'WHERE chain_id=? AND tx_hash IN ({questionmarks}) ORDER BY tx_hash, log_index',  # noqa: E501
+            bindings,
+        )
+        for result in cursor:
+            tx_receipt_log = EvmTxReceiptLog(
+                log_index=result[1],
+                data=result[2],
+                address=result[3],
+                removed=bool(result[4]),
+            )
+            logs[(result[0], result[1])] = tx_receipt_log
+            receipts[result[0]].logs.append(tx_receipt_log)
+        cursor = conn.execute(
+            f'SELECT tx_hash, log_index, topic from evmtx_receipt_log_topics '
+            f'WHERE chain_id=? AND tx_hash IN ({questionmarks}) '
+            f'ORDER BY tx_hash, log_index, topic_index',
+            bindings,
+        )
+        for result in cursor:
+            logs[(result[0], result[1])].topics.append(result[2])
+
+    return len(receipts)
+
+
+def read_packed(conn: sqlite3.Connection, tx_hashes: list[bytes]) -> int:
+    """Reads the receipts as DBEvmTx.get_receipts does with the packed logs"""
+    receipts: dict[bytes, EvmTxReceipt] = {}
+    for chunk in get_chunks(tx_hashes, n=SQL_VARIABLES_LIMIT - 1):
+        questionmarks = ','.join('?' * len(chunk))
+        cursor = conn.execute(
+            f'SELECT tx_hash, contract_address, status, type, logs from evmtx_receipts '
+            f'WHERE chain_id=? AND tx_hash IN ({questionmarks})',
+            (1, *chunk),
+        )
+        for result in cursor:
+            receipts[result[0]] = EvmTxReceipt(
+                tx_hash=make_evm_tx_hash(result[0]),
+                chain_id=ChainID.ETHEREUM,
+                contract_address=result[1],
+                status=bool(result[2]),
+                type=result[3],
+                logs=deserialize_receipt_logs(result[4]),
+            )
+
+    return len(receipts)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument('--db', help='The rotki user DB to take the receipts from', type=Path, default=DEFAULT_DB)  # noqa: E501
+    p.add_argument('--password', help='The password of the user DB', default='123')
+    p.add_argument('--copies', help='Number of times to write the receipts in each DB', type=int, default=20)  # noqa: E501
+    p.add_argument('--rounds', help='Number of timed reading rounds', type=int, default=5)
+    args = p.parse_args()
+
+    receipts = read_user_db_receipts(args.db, args.password)
+    logs = sum(len(x.logs) for x in receipts)
+    topics = sum(len(tx_log.topics) for x in receipts for tx_log in x.logs)
+    print(f'Writing {len(receipts)} receipts with {logs} logs and {topics} topics {args.copies} times')  # noqa: E501
+
+    bench_dir = Path(tempfile.mkdtemp())
+    tx_hashes = [copy_hash(x.tx_hash, idx) for idx in range(args.copies) for x in receipts]
+    for name, write, read in (
+            ('normalized', write_normalized, read_normalized),
+            ('packed', write_packed, read_packed),
+    ):
+        db_path = bench_dir / f'{name}.db'
+        conn = sqlite3.connect(db_path)
+        write(conn, receipts, args.copies)
+        conn.execute('VACUUM')
+        size = db_path.stat().st_size
+        duration = float('inf')
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            read_receipts = read(conn, tx_hashes)
+            duration = min(duration, time.perf_counter() - start)
+        assert read_receipts == len(tx_hashes)
+        conn.close()
+        print(f'{name:<10} {size / 2 ** 20:8.2f} MiB {len(tx_hashes) / duration:10.0f} receipts/s')  # noqa: E501
+
+    shutil.rmtree(bench_dir)
+
+
+if __name__ == '__main__':
+    main()